@@ -54,8 +54,6 @@
 # _safe_read_csv: line 1913
 # _winsorize_series: line 1922
 # _strip_count_from_stats: line 1930
-# build_eda_payload: line 1940
-# _cramers_v: line 2080
 # _make_upload_dir: line 2163
 # _paths: line 2169
 # _best_guess_mapping: line 2182
@@ -96,6 +94,7 @@ import pickle
 import math
 import secrets
 import hashlib
+import threading
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 import click
@@ -184,7 +183,31 @@ from outlier_detection import (
 
 from auth.decorators import require_module_access, require_roles
 from auth.rbac import Role, rbac_can, is_superadmin
-from services.pdf import generate_prediction_pdf, generate_dashboard_pdf
+from services.pdf import PLOT_LOCK, generate_prediction_pdf, generate_dashboard_pdf
+from services.model_registry import ModelRegistry
+from services.prediction_cache import PredictionCache
+from services.batching import MicroBatcher
+from services.batch_predict import score_dataset
+from services.bulk_insert import BulkInserter, prediction_rows
+from services.ingest import (
+    CsvFormat,
+    IngestLimitError,
+    ingest_csv,
+    read_header,
+    save_upload,
+    sniff_csv,
+    upload_compression,
+)
+from services.jobs import JobBusy, JobError, JobRunner
+from services.upload_sessions import UploadSessions
+from services.frame_store import (
+    copy_frame, export_csv, frame_columns, frame_exists, frame_rows, frame_version, iter_frames,
+    read_frame, write_frame,
+)
+from services.history import FrameHistory
+from services.eda import EDA_VERSION
+from services.eda_cache import EdaCache
+from simulations.partial_dependence import READY, precompute_async, precompute_recorded
 from services.data import (
     INPUT_COLUMNS,
     NUMERIC_COLS,
@@ -195,8 +218,8 @@ from services.data import (
     NUMERIC_FEATURES_INT,
     NUMERIC_FEATURES_FLOAT,
     BINARY_FEATURES,
-    CATEGORICAL_FEATURES,
     CATEGORICAL_ALLOWED,
+    IMPUTE_STRATEGIES,
     group_cleaning_log,
     normalize_log,
     clean_dataframe,
@@ -1205,18 +1228,97 @@ MODEL_PATH = app.config["MODEL_PATH"]
 if not os.path.exists(MODEL_PATH):
     print("model.pkl not found at", MODEL_PATH)
 
-def load_model(path: str):  # Load machine learning model from file
-    with open(path, "rb") as f:
-        return pickle.load(f)
-
-model = load_model(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
-model_name = os.path.basename(MODEL_PATH)
-model_date = datetime.fromtimestamp(os.path.getmtime(MODEL_PATH)).date().isoformat() if os.path.exists(MODEL_PATH) else ""
-# Expose model info on the app for blueprint access without importing
+# Models are loaded lazily on first use; the registry resolves the active
+# version on every call so a swap takes effect without a restart.
+model_registry = ModelRegistry(
+    app.config["MODEL_REGISTRY_DIR"],
+    legacy_path=MODEL_PATH,
+    cache_size=app.config.get("MODEL_CACHE_SIZE", 2),
+)
+# Expose the registry on the app for blueprint access without importing
 # this module again.
-app.model = model
-app.model_name = model_name
-app.model_date = model_date
+app.model_registry = model_registry
+# Partial-dependence tables are rebuilt in the background for each version
+# activated in this process so the simulations page can serve them from
+# disk. The CLI activates with notify=False and computes them synchronously.
+model_registry.on_activate(lambda version: precompute_async(app, version))
+# Inference results keyed by (model version, input record); a version swap
+# changes every key, so stale results are never served.
+app.prediction_cache = PredictionCache(
+    max_entries=app.config.get("PREDICTION_CACHE_SIZE", 10000),
+    ttl=app.config.get("PREDICTION_CACHE_TTL_SEC", 3600),
+    max_rows=app.config.get("PREDICTION_CACHE_MAX_ROWS", 256),
+)
+# Finished simulation payloads (e.g. risk surfaces) keyed by model version,
+# baseline and grid spec; kept apart so large grids never evict patients.
+app.simulation_cache = PredictionCache(
+    max_entries=app.config.get("SIMULATION_CACHE_SIZE", 256),
+    ttl=app.config.get("PREDICTION_CACHE_TTL_SEC", 3600),
+)
+# EDA payloads keyed by dataset content and EDA version, on disk so every
+# worker and every session with the same data shares them.
+app.eda_cache = EdaCache(
+    os.path.join(app.instance_path, "eda_cache"),
+    max_entries=app.config.get("EDA_CACHE_ENTRIES", 256),
+)
+# Optional dispatcher that coalesces concurrent single predictions.
+app.inference_batcher = (
+    MicroBatcher(
+        max_batch=app.config.get("INFERENCE_MAX_BATCH", 64),
+        max_wait_ms=app.config.get("INFERENCE_MAX_WAIT_MS", 2),
+    )
+    if app.config.get("INFERENCE_BATCHING")
+    else None
+)
+# Background jobs for long upload and PDF steps; records live next to the
+# uploads so every worker process can answer status polls.
+app.job_runner = JobRunner(
+    os.path.join(app.instance_path, "jobs"),
+    max_workers=app.config.get("JOB_WORKERS", 2),
+    app=app,
+    ttl=app.config.get("JOB_TTL_SEC", 86400),
+    sweep_interval=app.config.get("UPLOAD_SWEEP_INTERVAL_SEC", 600),
+)
+# Upload directories expire after UPLOAD_SESSION_TTL_SEC idle and are evicted
+# least recently used first once an owner or the whole store is over quota.
+app.upload_sessions = UploadSessions(
+    UPLOADS_DIR,
+    ttl=app.config.get("UPLOAD_SESSION_TTL_SEC", 86400),
+    user_quota=app.config.get("UPLOAD_USER_QUOTA_BYTES", 0),
+    total_quota=app.config.get("UPLOAD_TOTAL_QUOTA_BYTES", 0),
+    sweep_interval=app.config.get("UPLOAD_SWEEP_INTERVAL_SEC", 600),
+    busy=app.job_runner.active_scopes,
+)
+_background_lock = threading.Lock()
+_background_started = False
+
+
+@app.before_request
+def start_background_sweeps():  # Start this process's sweeper threads once
+    """Start the upload and job sweepers in the process serving requests.
+
+    Doing this on the first request instead of at import keeps CLI commands,
+    tests and benchmarks free of background threads, and gives every
+    pre-forked server worker its own sweepers.
+    """
+    global _background_started
+    if _background_started or app.testing:
+        return
+    with _background_lock:
+        if not _background_started:
+            app.upload_sessions.start()
+            app.job_runner.start()
+            _background_started = True
+
+
+def active_model_info() -> tuple[str, str]:  # Name and training date of the active model
+    version = model_registry.active_version()
+    if version is None:
+        return os.path.basename(MODEL_PATH), ""
+    try:
+        return version, model_registry.metadata(version).get("trained_at") or ""
+    except KeyError:
+        return version, ""
 
 # ---------------------------
 # Training Schema (exact columns used by model)
@@ -1234,6 +1336,8 @@ from user import user_bp
 from blueprints.settings.profile import settings_bp
 from simulations import simulations_bp
 from routes.debug import debug_bp
+from routes.jobs import jobs_bp
+from routes.batch_api import batch_api_bp
 
 app.register_blueprint(predict_bp)
 app.register_blueprint(auth_bp)
@@ -1243,6 +1347,8 @@ app.register_blueprint(user_bp)
 app.register_blueprint(settings_bp)
 app.register_blueprint(simulations_bp)
 app.register_blueprint(debug_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(batch_api_bp)
 
 
 @app.route("/admin/")
@@ -1362,7 +1468,8 @@ def index():  # Main application homepage
         "num_major_vessels": 0,
         "thalassemia_type": "normal",
     }
-    return render_template("predict/form.html", defaults=defaults, model_name=model_name, model_date=app.model_date)
+    model_name, model_date = active_model_info()
+    return render_template("predict/form.html", defaults=defaults, model_name=model_name, model_date=model_date)
 
 
 # ---------------------------
@@ -1441,6 +1548,42 @@ def dashboard_pdf():  # Generate PDF report for dashboard
 @login_required
 @require_module_access("Dashboard")
 def dashboard_pdf_generate():  # Generate and download PDF report
+    buf = _dashboard_pdf(request.form)
+    return send_file(buf, as_attachment=True, download_name="predictions.pdf", mimetype="application/pdf")
+
+
+@app.post("/dashboard/pdf/jobs")
+@login_required
+@require_module_access("Dashboard")
+@csrf_protect
+def dashboard_pdf_submit_job():
+    """Queue the dashboard PDF as a background job and return its id."""
+    form = request.form.copy()
+    runner = app.job_runner
+
+    def job(ctx):
+        buf = _dashboard_pdf(form)
+        ctx.check()
+        path = runner.file_path(ctx.job_id, ".pdf")
+        with open(path, "wb") as f:
+            f.write(buf.getbuffer())
+        return {"file": path, "download_name": "predictions.pdf", "mimetype": "application/pdf"}
+
+    job_id = runner.submit("dashboard_pdf", job, owner=current_user.id)
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status_url": url_for("jobs.job_status", job_id=job_id),
+    }), 202
+
+
+def _dashboard_pdf(form) -> io.BytesIO:
+    """Build the dashboard PDF for the filters and options in ``form``."""
+    with PLOT_LOCK:
+        return _build_dashboard_pdf(form)
+
+
+def _build_dashboard_pdf(form) -> io.BytesIO:
     from reportlab.lib import colors
     from reportlab.lib.pagesizes import A4, landscape
     from reportlab.lib.units import cm
@@ -1461,16 +1604,16 @@ def dashboard_pdf_generate():  # Generate and download PDF report
     include_inputs = True
     include_results = True
     include_visuals = True
-    notes = request.form.get("doctor_notes", "").strip()
-    start_date = request.form.get("start_date")
-    end_date = request.form.get("end_date")
-    min_pct = float(request.form.get("min_pct", 0) or 0)
-    max_pct = float(request.form.get("max_pct", 100) or 100)
-    genders = request.form.getlist("gender")
-    diseases = request.form.getlist("disease")
-    sort_by = request.form.get("sort_by", "id")
-    where_clause = request.form.get("custom_where", "").strip()
-    columns = request.form.get("columns", "")
+    notes = form.get("doctor_notes", "").strip()
+    start_date = form.get("start_date")
+    end_date = form.get("end_date")
+    min_pct = float(form.get("min_pct", 0) or 0)
+    max_pct = float(form.get("max_pct", 100) or 100)
+    genders = form.getlist("gender")
+    diseases = form.getlist("disease")
+    sort_by = form.get("sort_by", "id")
+    where_clause = form.get("custom_where", "").strip()
+    columns = form.get("columns", "")
     if columns:
         columns = [c for c in columns.split(",") if c]
     else:
@@ -1488,7 +1631,7 @@ def dashboard_pdf_generate():  # Generate and download PDF report
 
     # PDF theme selection was removed from the UI, but some deployments may still
     # send a `theme` field. Default to light theme to avoid NameError on access.
-    theme = request.form.get("theme", "light")
+    theme = form.get("theme", "light")
     try:
         import matplotlib
         matplotlib.use("Agg")
@@ -1670,7 +1813,7 @@ def dashboard_pdf_generate():  # Generate and download PDF report
         sex_map=SEX_MAP,
         logo_path=os.path.join(app.root_path, "static", "logo.svg"),
     )
-    return send_file(buf, as_attachment=True, download_name="predictions.pdf", mimetype="application/pdf")
+    return buf
 
     buf = io.BytesIO()
     pagesize = landscape(A4)
@@ -2082,13 +2225,6 @@ def report(pid: int):  # Generate individual patient PDF report
 # CSV Upload / Cleaning / EDA / Batch Predict
 # ============================
 
-def _safe_read_csv(fobj) -> pd.DataFrame:  # Safely read CSV file with error handling
-    try:
-        return pd.read_csv(fobj)
-    except UnicodeDecodeError:
-        fobj.seek(0)
-        return pd.read_csv(fobj, encoding="latin-1")
-
 # ---------- EDA helpers ----------
 
 def _winsorize_series(s: pd.Series, lower=0.01, upper=0.99):  # Winsorize outliers in data series
@@ -2099,6 +2235,26 @@ def _winsorize_series(s: pd.Series, lower=0.01, upper=0.99):  # Winsorize outlie
     return clipped, n_changed, float(ql), float(qu)
 
 
+def _session_eda(frame_path: str) -> tuple[str, dict]:
+    """Return ``(key, payload)`` for an upload's stored dataset from the EDA cache.
+
+    Datasets above ``EDA_SKETCH_ROWS`` rows get the streaming approximate
+    payload. Scored datasets also get the predicted class counts.
+    """
+    key, eda = app.eda_cache.payload_for_frame(
+        frame_path,
+        sketch_rows=app.config.get("EDA_SKETCH_ROWS", 0),
+        chunk_rows=app.config.get("UPLOAD_CHUNK_ROWS", 50000),
+    )
+    if "prediction" in frame_columns(frame_path):
+        pred = read_frame(frame_path, ["prediction"])["prediction"]
+        eda["predicted_distribution"] = {
+            "labels": ["No (0)", "Yes (1)"],
+            "values": [int((pred == 0).sum()), int((pred == 1).sum())],
+        }
+    return key, eda
+
+
 def _strip_count_from_stats(stats: dict) -> dict:  # Remove count fields from statistics
     if not isinstance(stats, dict):
         return stats
@@ -2109,246 +2265,82 @@ def _strip_count_from_stats(stats: dict) -> dict:  # Remove count fields from st
     return stats
 
 
-def build_eda_payload(df: pd.DataFrame) -> dict:  # Build exploratory data analysis payload
-    # Positive probability distribution (if available)
-    prob_dist = None
-    if "positive_probability" in df.columns:
-        vals = pd.to_numeric(df["positive_probability"], errors="coerce").dropna().values
-        if vals.size:
-            counts, edges = np.histogram(vals, bins=20, range=(0, 1))
-            centers = (edges[:-1] + edges[1:]) / 2
-
-            # Normal fit for a â€œbell-curveâ€ overlay, scaled to histogram area
-            n = vals.size
-            mu = float(vals.mean())
-            sigma = float(vals.std(ddof=1)) if n > 1 else 0.0
-            bin_width = float(edges[1] - edges[0])
-            if sigma > 0:
-                normal_y = (1.0 / (sigma * np.sqrt(2*np.pi))) * np.exp(-0.5 * ((centers - mu)/sigma)**2)
-                normal_y = (normal_y * n * bin_width).tolist()
-            else:
-                normal_y = [0.0] * len(centers)
-
-            prob_dist = {
-                "x": centers.tolist(),
-                "y": counts.astype(int).tolist(),
-                "normal_fit": {"mu": mu, "sigma": sigma, "y": normal_y}
-            }
-        else:
-            prob_dist = {"x": [], "y": [], "normal_fit": {"mu": None, "sigma": None, "y": []}}
-
-
 
 
+# ============================
+# Upload session helpers
+# ============================
+def _make_upload_dir() -> tuple[str, str]:  # Create unique upload directory
+    owner = current_user.id if current_user.is_authenticated else None
+    return app.upload_sessions.create(owner)
 
-
-
-    # # After you compute centers and counts for positive_probability
-    # n = int(vals.size)
-    # mu = float(vals.mean())
-    # sigma = float(vals.std(ddof=1)) if n > 1 else 0.0
-    # bin_width = float(edges[1] - edges[0])
-    # if sigma > 0:
-    #     # Normal PDF scaled to histogram scale
-    #     normal_y = (1.0 / (sigma * np.sqrt(2*np.pi))) * np.exp(-0.5 * ((np.array(centers) - mu)/sigma)**2)
-    #     normal_y = (normal_y * n * bin_width).tolist()
-    # else:
-    #     normal_y = [0.0] * len(centers)
-
-    # prob_dist = {
-    #     "x": centers,
-    #     "y": counts.astype(int).tolist(),
-    #     "normal_fit": {"mu": mu, "sigma": sigma, "y": normal_y}
-    # }
-
-
-    # optional: p-values via scipy if installed
-    try:
-        from scipy.stats import chi2_contingency  # type: ignore
-        _HAS_SCIPY = True
-    except Exception:
-        _HAS_SCIPY = False
-
-    # ----- numeric summary (drop 'count') -----
-    num_cols = list((NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT))
-    present_num = [c for c in num_cols if c in df.columns]
-    if present_num:
-        desc = df[present_num].describe().round(2)
-        if "count" in desc.index:
-            desc = desc.drop(index="count")
-        stats = desc.to_dict()
-    else:
-        stats = {}
-
-    # ----- histograms for numerics -----
-    hists = {}
-    for c in present_num:
-        vals = df[c].dropna().values
-        if len(vals):
-            counts, edges = np.histogram(vals, bins=20)
-            centers = (edges[:-1] + edges[1:]) / 2
-            hists[c] = {"x": centers.tolist(), "y": counts.tolist()}
-        else:
-            hists[c] = {"x": [], "y": []}
-
-    # ----- numeric correlation -----
-    corr = df[present_num].corr(numeric_only=True).fillna(0) if present_num else pd.DataFrame()
-    corr_payload = {
-        "z": (corr.values.tolist() if not corr.empty else []),
-        "x": (list(corr.columns) if not corr.empty else []),
-        "y": (list(corr.index) if not corr.empty else [])
-    }
-
-    # ----- choose a target-like column if available -----
-    # Many heart-disease datasets use different column names for the
-    # ground-truth label (e.g. ``HeartDisease``).  Normalize lookups so
-    # EDA visualisations that require a target column (such as "Resting
-    # Blood Pressure by Status") still render even when the uploaded CSV
-    # uses a different heading.
-    target_col = None
-    lower_map = {c.lower(): c for c in df.columns}
-    if "num" in lower_map:             # staged 0..4 (if present)
-        target_col = lower_map["num"]
-    elif "target" in lower_map:        # 0/1
-        target_col = lower_map["target"]
-    elif "prediction" in lower_map:    # 0/1 after batch predict
-        target_col = lower_map["prediction"]
-    elif "heartdisease" in lower_map:  # e.g. HeartDisease (Yes/No)
-        target_col = lower_map["heartdisease"]
-    elif "heart_disease" in lower_map:  # alternative snake_case name
-        target_col = lower_map["heart_disease"]
-
-    # ----- categorical columns present -----
-    cat_cols = [c for c in CATEGORICAL_FEATURES if c in df.columns]
-
-    # ----- categorical distributions -----
-    categorical = {}
-    for col in cat_cols:
-        vc = df[col].astype(str).value_counts(dropna=False)
-        labels = [str(x) for x in vc.index.tolist()]
-        counts = vc.values.astype(int).tolist()
-        total = int(vc.sum()) if int(vc.sum()) else 1
-        percents = [round(100.0 * v / total, 2) for v in vc.values.tolist()]
-        categorical[col] = {
-            "counts": {"labels": labels, "counts": counts, "percents": percents}
-        }
-
-    # ----- categorical vs target (stacked %) -----
-    cat_vs_target = {}
-    if target_col is not None:
-        y = df[target_col].astype(str)
-        for col in cat_cols:
-            ct = pd.crosstab(df[col].astype(str), y, dropna=False).fillna(0)
-            with np.errstate(divide="ignore", invalid="ignore"):
-                row_pct = (ct.div(ct.sum(axis=1).replace(0, np.nan), axis=0) * 100).fillna(0)
-            cat_vs_target[col] = {
-                "index": ct.index.tolist(),
-                "columns": ct.columns.tolist(),
-                "counts": ct.values.astype(int).tolist(),
-                "col_percents": row_pct.values.round(2).tolist()
-            }
-
-    # ----- CramÃ©râ€™s V helpers -----
-    def _cramers_v(table: pd.DataFrame) -> float:
-        n = table.values.sum()
-        if n == 0:
-            return 0.0
-        row_sums = table.sum(axis=1).values.reshape(-1, 1)
-        col_sums = table.sum(axis=0).values.reshape(1, -1)
-        expected = row_sums.dot(col_sums) / n
-        with np.errstate(divide="ignore", invalid="ignore"):
-            chi2 = np.nansum((table.values - expected) ** 2 / np.where(expected == 0, np.nan, expected))
-        k = table.shape[1]
-        r = table.shape[0]
-        denom = n * (min(k - 1, r - 1))
-        if denom <= 0:
-            return 0.0
-        v = math.sqrt(max(chi2, 0.0) / denom)
-        return float(v)
-
-    # ----- categorical associations vs target -----
-    cat_associations = []
-    if target_col is not None:
-        y = df[target_col].astype(str)
-        for col in cat_cols:
-            ct = pd.crosstab(df[col].astype(str), y, dropna=False)
-            v = _cramers_v(ct)
-            pval = None
-            if _HAS_SCIPY:
-                try:
-                    _, p, _, _ = chi2_contingency(ct.values, correction=False)
-                    pval = float(p)
-                except Exception:
-                    pval = None
-            cat_associations.append({
-                "col": col,
-                "cramers_v": round(v, 4),
-                "p_value": (None if pval is None else round(pval, 6))
-            })
-
-    # ----- categorical association matrix (CramÃ©râ€™s V between cats) -----
-    cat_assoc_matrix = None
-    if len(cat_cols) >= 2:
-        z = []
-        for rcol in cat_cols:
-            row_vals = []
-            for ccol in cat_cols:
-                ct = pd.crosstab(df[rcol].astype(str), df[ccol].astype(str), dropna=False)
-                row_vals.append(round(_cramers_v(ct), 4))
-            z.append(row_vals)
-        cat_assoc_matrix = {"z": z, "x": cat_cols, "y": cat_cols}
-
-    # ----- optional raw target distribution -----
-    target_dist = None
-    if target_col is not None:
-        counts = df[target_col].astype(str).value_counts(dropna=False).to_dict()
-        target_dist = {"labels": list(counts.keys()), "values": list(counts.values())}
-    viz_payload = {}
-
-
+def _paths(uid: str) -> dict:  # Get file paths for upload session
+    base = os.path.join(UPLOADS_DIR, uid)
+    app.upload_sessions.touch(uid)
+    raw = os.path.join(base, "raw.csv.gz")
+    if not os.path.exists(raw) and os.path.exists(os.path.join(base, "raw.csv")):
+        raw = os.path.join(base, "raw.csv")  # sessions from before raw uploads were compressed
     return {
-        "stats": stats,
-        "hists": hists,
-        "corr": corr_payload,
-        "target": target_dist,
-        "categorical": categorical,
-        "cat_vs_target": cat_vs_target,
-        "cat_associations": cat_associations,
-        "cat_assoc_matrix": cat_assoc_matrix,
-        "viz": viz_payload,
-        "probability_distribution": prob_dist
+        "base": base,
+        # Decompressed upload, stored gzip-compressed (see services.ingest)
+        "raw": raw,
+        # Frame stores (see services.frame_store); CSV only for downloads.
+        "mapped": os.path.join(base, "mapped"),
+        "clean": os.path.join(base, "clean"),
+        "results": os.path.join(base, "results"),
+        "clean_csv": os.path.join(base, "clean.csv"),
+        "results_csv": os.path.join(base, "results.csv"),
+        "eda_json": os.path.join(base, "eda.json"),
+        "pre_log": os.path.join(base, "pre_log.json"),
+        # Undoable preprocessing steps over "mapped" (see services.history)
+        "history": os.path.join(base, "history"),
+        "progress": os.path.join(base, "progress.json"),
+        "format": os.path.join(base, "format.json"),
     }
 
 
+def _records(df: pd.DataFrame) -> list[dict]:
+    """Return rows as JSON-safe dicts; ``NaN`` and ``pd.NA`` become ``None``."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
 
 
+def _raw_format(p: dict) -> CsvFormat:
+    """Return the sniffed encoding/delimiter of the session's raw upload."""
+    fmt = CsvFormat.load(p["format"])
+    if fmt is None:
+        fmt = sniff_csv(p["raw"])
+        fmt.save(p["format"])
+    return fmt
 
 
+def _history(p: dict) -> FrameHistory:
+    return FrameHistory(p["mapped"], p["history"])
 
 
+def _ingest_raw(p: dict, transform) -> int:
+    """Stream the raw upload through ``transform`` into the mapped frame."""
+    rows, fmt = ingest_csv(
+        p["raw"],
+        p["mapped"],
+        _raw_format(p),
+        transform,
+        chunk_rows=app.config.get("UPLOAD_CHUNK_ROWS", 50000),
+        max_rows=app.config.get("UPLOAD_MAX_ROWS", 0),
+    )
+    fmt.save(p["format"])
+    _history(p).reset()
+    return rows
 
 
-
-# ============================
-# Upload session helpers
-# ============================
-def _make_upload_dir() -> tuple[str, str]:  # Create unique upload directory
-    uid = uuid.uuid4().hex[:12]
-    path = os.path.join(UPLOADS_DIR, uid)
-    os.makedirs(path, exist_ok=True)
-    return uid, path
-
-def _paths(uid: str) -> dict:  # Get file paths for upload session
-    base = os.path.join(UPLOADS_DIR, uid)
-    return {
-        "base": base,
-        "raw": os.path.join(base, "raw.csv"),
-        "mapped": os.path.join(base, "mapped.csv"),
-        "clean": os.path.join(base, "clean.csv"),
-        "results": os.path.join(base, "results.csv"),
-        "eda_json": os.path.join(base, "eda.json"),
-        "pre_log": os.path.join(base, "pre_log.json"),
-    }
+def _write_progress(path: str, stage: str, done: int, total: int) -> None:
+    """Record how far a long-running step has got for the progress endpoint."""
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stage": stage, "done": done, "total": total}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
 
 # ========= Column mapping helpers =========
 def _best_guess_mapping(upload_cols: list[str]) -> dict:  # Auto-map uploaded columns to internal columns
@@ -2421,7 +2413,7 @@ def _apply_user_mapping(df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
 def upload_form():  # Display CSV upload form
     return render_template("uploads/form.html",
                            required_cols=sorted(list(REQUIRED_INTERNAL_COLUMNS)),
-                           model_name=model_name)
+                           model_name=active_model_info()[0])
 
 @app.post("/upload")
 @login_required
@@ -2436,38 +2428,52 @@ def upload_post():  # Handle CSV file upload
                                messages=["Please choose a .csv file to upload."]), 400
 
     fname = secure_filename(file.filename)
-    if not fname.lower().endswith(".csv"):
+    try:
+        compression = upload_compression(fname)
+    except ValueError as e:
         if request.args.get("ajax") == "1":
-            return jsonify({"error": "Only .csv files are supported."}), 400
+            return jsonify({"error": str(e)}), 400
         return render_template("error.html", title="Invalid file type",
-                               messages=["Only .csv files are supported."]), 400
+                               messages=[str(e)]), 400
 
     uid, _dir = _make_upload_dir()
     p = _paths(uid)
-    file.save(p["raw"])
 
     try:
-        with open(p["raw"], "rb") as f:
-            df_raw = _safe_read_csv(f)
+        save_upload(file.stream, p["raw"], app.config.get("UPLOAD_MAX_BYTES", 0),
+                    compression=compression)
+        upload_cols = read_header(p["raw"], _raw_format(p))
+        log: list[str] = []
+        ok, errs = validate_structure(normalize_columns(pd.DataFrame(columns=upload_cols), log))
+        orig_rows = _ingest_raw(p, lambda chunk: normalize_columns(chunk, [])) if ok else 0
+    except IngestLimitError as e:
+        if request.args.get("ajax") == "1":
+            return jsonify({"error": str(e)}), 413
+        return render_template("error.html", title="File too large",
+                               messages=[str(e)]), 413
     except Exception as e:
         if request.args.get("ajax") == "1":
             return jsonify({"error": f"{type(e).__name__}: {e}"}), 400
         return render_template("error.html", title="Failed to read CSV",
                                messages=[f"{type(e).__name__}: {e}"]), 400
 
-    log: list[str] = []
-    df_norm = normalize_columns(df_raw, log)
-    ok, errs = validate_structure(df_norm)
+    # Refuse the new session if it does not fit; sweeps only when over quota.
+    over = app.upload_sessions.admit(uid)
+    if over:
+        app.upload_sessions.remove(uid)
+        if request.args.get("ajax") == "1":
+            return jsonify({"error": over}), 413
+        return render_template("error.html", title="Storage quota exceeded",
+                               messages=[over]), 413
+
     if ok:
-        df_norm.to_csv(p["mapped"], index=False)
         with open(p["pre_log"], "w", encoding="utf-8") as f:
-            json.dump({"log": log, "orig_rows": len(df_norm)}, f)
+            json.dump({"log": log, "orig_rows": orig_rows}, f)
         next_url = url_for("upload_preprocess", uid=uid)
         if request.args.get("ajax") == "1":
             return jsonify({"redirect": next_url})
         return redirect(next_url)
     else:
-        upload_cols = list(df_raw.columns)
         proposal = _best_guess_mapping(upload_cols)
         _save_map_payload(uid, upload_cols, proposal)
         next_url = url_for("upload_columns_map", uid=uid)
@@ -2486,9 +2492,7 @@ def upload_columns_map(uid: str):  # Display column mapping interface
 
     payload = _load_map_payload(uid)
     if not payload:
-        with open(p["raw"], "rb") as f:
-            df = _safe_read_csv(f)
-        upload_cols = list(df.columns)
+        upload_cols = read_header(p["raw"], _raw_format(p))
         proposal = _best_guess_mapping(upload_cols)
         _save_map_payload(uid, upload_cols, proposal)
         payload = _load_map_payload(uid)
@@ -2533,7 +2537,7 @@ def upload_columns_map(uid: str):  # Display column mapping interface
         proposal=payload["proposal"],
         mapping_tips=mapping_tips,
         var_info=var_info,
-        model_name=model_name
+        model_name=active_model_info()[0]
     )
 
 @app.post("/upload/<uid>/columns")
@@ -2557,18 +2561,14 @@ def upload_columns_map_submit(uid: str):  # Process column mapping submission
         return render_template("error.html", title="Missing selections",
                                messages=[f"Please select a source column for: {', '.join(missing)}"]), 400
 
-    with open(p["raw"], "rb") as f:
-        df_raw = _safe_read_csv(f)
-
     try:
-        df_mapped = _apply_user_mapping(df_raw, mapping)
+        orig_rows = _ingest_raw(p, lambda chunk: _apply_user_mapping(chunk, mapping))
     except Exception as e:
         return render_template("error.html", title="Mapping error", messages=[str(e)]), 400
-    df_mapped.to_csv(p["mapped"], index=False)
     with open(p["pre_log"], "w", encoding="utf-8") as f:
         json.dump({
             "log": [{"text": "User provided column mapping.", "step": "info"}],
-            "orig_rows": len(df_mapped),
+            "orig_rows": orig_rows,
         }, f)
     return redirect(url_for("upload_preprocess", uid=uid))
 
@@ -2578,18 +2578,17 @@ def upload_columns_map_submit(uid: str):  # Process column mapping submission
 @login_required
 def upload_preprocess(uid: str):  # Display data preprocessing interface
     p = _paths(uid)
-    if not os.path.exists(p["mapped"]):
+    if not frame_exists(p["mapped"]):
         return render_template(
             "error.html",
             title="Session expired",
             messages=["We couldn't find your mapped dataset. Please upload again."],
         ), 404
-    df = pd.read_csv(p["mapped"])
-    preview = df.head(5).drop(columns=["patient_name"], errors="ignore").to_dict(orient="records")
-    # Count rows with any missing values (ignore optional name)
-    df_for_missing = df.drop(columns=["patient_name"], errors="ignore")
-    missing_rows = int(df_for_missing.isna().any(axis=1).sum())
-    total_rows = int(len(df))
+    df = _history(p).current()
+    state = _preprocess_state(df)
+    preview = state["preview"]
+    missing_rows = state["missing_rows"]
+    total_rows = state["total_rows"]
     missing_pct = round((missing_rows * 100.0 / total_rows), 1) if total_rows else 0.0
     # Limit after which bulk delete is disabled (percentage of rows)
     missing_drop_limit_pct = float(app.config.get("MISSING_DROP_LIMIT_PCT", 30))
@@ -2601,21 +2600,33 @@ def upload_preprocess(uid: str):  # Display data preprocessing interface
         total_rows=total_rows,
         missing_pct=missing_pct,
         missing_drop_limit_pct=missing_drop_limit_pct,
+        impute_strategy=app.config.get("IMPUTE_STRATEGY", "rf"),
+        history=_history(p).state(),
     )
 
 
+def _preprocess_state(df: pd.DataFrame) -> dict:
+    """Preview rows and missing-value counts shown on the preprocessing page."""
+    # Count rows with any missing values (ignore optional name)
+    df_for_missing = df.drop(columns=["patient_name"], errors="ignore")
+    return {
+        "preview": _records(df_for_missing.head(5)),
+        "missing_rows": int(df_for_missing.isna().any(axis=1).sum()),
+        "total_rows": int(len(df)),
+    }
 
-@app.post("/upload/<uid>/preprocess/<task>")
-@login_required
-@csrf_protect_api
-def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing task
+
+
+def _preprocess_task(uid: str, task: str, strategy: str | None = None) -> tuple[dict, int]:
+    """Run one preprocessing step; returns the JSON payload and HTTP status."""
     p = _paths(uid)
-    if not os.path.exists(p["mapped"]):
-        return jsonify({"ok": False, "error": "No mapped dataset"}), 404
+    if not frame_exists(p["mapped"]):
+        return {"ok": False, "error": "No mapped dataset"}, 404
+    history = _history(p)
     try:
-        df = pd.read_csv(p["mapped"])
+        df = history.current()
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 400
+        return {"ok": False, "error": str(e)}, 400
 
     opts = {
         "handle_duplicates": False,
@@ -2628,65 +2639,75 @@ def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing t
     elif task == "invalid":
         opts["invalid_to_nan"] = True
     elif task == "impute":
-        opts["impute_missing"] = True
+        strategy = strategy or app.config.get("IMPUTE_STRATEGY", "rf")
+        if strategy not in IMPUTE_STRATEGIES:
+            return {"ok": False, "error": f"Unknown imputation strategy: {strategy}"}, 400
+        opts.update(
+            impute_missing=True,
+            impute_strategy=strategy,
+            impute_max_rows=app.config.get("IMPUTE_MAX_ROWS", 20000),
+            impute_score=app.config.get("IMPUTE_SCORE", True),
+        )
     elif task == "outliers":
         opts["soften_outliers"] = True
     elif task == "dropna":
         # handled explicitly later
         pass
     else:
-        return jsonify({"ok": False, "error": "Unknown task"}), 400
+        return {"ok": False, "error": "Unknown task"}, 400
 
     TASK_INFO = {
         "dup": "Removed exact duplicate rows using pandas drop_duplicates (kept first occurrence).",
         "invalid": "Replaced implausible values with NaN so they can be imputed later.",
-        "impute": "Filled missing values via median (numeric) or Random Forest (categorical).",
         "outliers": "Clipped extreme numeric values outside 1.5Ã—IQR range to soften outliers.",
     }
     TASK_INFO["dropna"] = "Removed rows containing any missing values (ignoring optional patient_name)."
+    if task == "impute":
+        TASK_INFO["impute"] = {
+            "rf": "Filled missing values with a Random Forest per column, fit on a capped sample of rows.",
+            "rf_parallel": "Filled missing values with independent Random Forests per column, fit in parallel.",
+            "iterative": "Filled missing values with one joint IterativeImputer pass over all columns.",
+            "knn": "Filled missing values from the 5 nearest neighbours across all columns.",
+            "median": "Filled missing values with the median (numeric) or mode (categorical).",
+        }[opts["impute_strategy"]]
+
+    # Affected rows are kept as positions in df_orig; the log inlines only a
+    # sample and the rest is paged from the history on demand.
+    def _positions(mask) -> np.ndarray:
+        return np.flatnonzero(pd.Series(mask).fillna(False).to_numpy(dtype=bool))
 
-    dup_rows: list[dict] = []
     df_orig = df.copy()
-    if task == "dup":
-        dup_df = df_orig[df_orig.duplicated()]
-        if "patient_name" in dup_df.columns:
-            dup_df = dup_df.drop(columns=["patient_name"])  # type: ignore[arg-type]
-        dup_rows = dup_df.replace({np.nan: None}).to_dict(orient="records")
+    dup_pos = _positions(df_orig.duplicated()) if task == "dup" else None
 
     # Build optional details per step
-    details_by_col: dict[str, list[dict]] = {}
-    def _rows_for_mask(mask, base_df):
-        sub = base_df.loc[mask]
-        if "patient_name" in sub.columns:
-            sub = sub.drop(columns=["patient_name"])  # type: ignore[arg-type]
-        return sub.replace({np.nan: None}).to_dict(orient="records")
+    details_by_col: dict[str, np.ndarray] = {}
 
     if task == "invalid":
         if "cholesterol" in df_orig.columns:
             mask = df_orig["cholesterol"] <= 0
-            if mask.any(): details_by_col["cholesterol"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["cholesterol"] = _positions(mask)
         if "fasting_blood_sugar" in df_orig.columns:
             mask = ~df_orig["fasting_blood_sugar"].isin([0, 1])
-            if mask.any(): details_by_col["fasting_blood_sugar"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["fasting_blood_sugar"] = _positions(mask)
         if "exercise_induced_angina" in df_orig.columns:
             mask = ~df_orig["exercise_induced_angina"].isin([0, 1])
-            if mask.any(): details_by_col["exercise_induced_angina"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["exercise_induced_angina"] = _positions(mask)
         if "st_depression" in df_orig.columns:
             mask = (df_orig["st_depression"] < 0) | (df_orig["st_depression"] > 7)
-            if mask.any(): details_by_col["st_depression"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["st_depression"] = _positions(mask)
         if "max_heart_rate_achieved" in df_orig.columns:
             mask = ~df_orig["max_heart_rate_achieved"].between(60, 250)
-            if mask.any(): details_by_col["max_heart_rate_achieved"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["max_heart_rate_achieved"] = _positions(mask)
         if "resting_blood_pressure" in df_orig.columns:
             mask = ~df_orig["resting_blood_pressure"].between(80, 260)
-            if mask.any(): details_by_col["resting_blood_pressure"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["resting_blood_pressure"] = _positions(mask)
         if "num_major_vessels" in df_orig.columns:
             mask = ~df_orig["num_major_vessels"].between(0, 4)
-            if mask.any(): details_by_col["num_major_vessels"] = _rows_for_mask(mask, df_orig)
+            if mask.any(): details_by_col["num_major_vessels"] = _positions(mask)
         for col, allowed in CATEGORICAL_ALLOWED.items():
             if col in df_orig.columns:
                 bad_mask = ~df_orig[col].isin(allowed)
-                if bad_mask.any(): details_by_col[col] = _rows_for_mask(bad_mask, df_orig)
+                if bad_mask.any(): details_by_col[col] = _positions(bad_mask)
 
     if task == "impute":
         for col in list(NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT) + [
@@ -2694,7 +2715,7 @@ def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing t
             "chest_pain_type", "Restecg", "st_slope_type", "thalassemia_type",
         ]:
             if col in df_orig.columns and df_orig[col].isna().any():
-                details_by_col[col] = _rows_for_mask(df_orig[col].isna(), df_orig)
+                details_by_col[col] = _positions(df_orig[col].isna())
 
     if task == "outliers":
         for col in (NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT):
@@ -2705,7 +2726,7 @@ def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing t
                 if np.isfinite(iqr) and iqr > 0:
                     low = q1 - 1.5 * iqr; high = q3 + 1.5 * iqr
                     mask = (s < low) | (s > high)
-                    if mask.any(): details_by_col[col] = _rows_for_mask(mask, df_orig)
+                    if mask.any(): details_by_col[col] = _positions(mask)
 
     if task == "dropna":
         base = df.drop(columns=["patient_name"], errors="ignore")
@@ -2721,65 +2742,120 @@ def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing t
         try:
             df_clean, clog = clean_dataframe(df, **opts)
         except Exception as e:
-            return jsonify({"ok": False, "error": f"{type(e).__name__}: {e}"}), 400
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}, 400
     clog = [m for m in clog if "skipped" not in m and "0 renamed" not in m and not m.startswith("Final rows")]
-    df_clean.to_csv(p["mapped"], index=False)
-
-    # persist log with optional detail payloads
-
-    log_path = p["pre_log"]
-    if os.path.exists(log_path):
-        with open(log_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {"log": [], "orig_rows": len(df)}
 
+    # Log entries with a capped sample of their rows; stored with the step's delta
+    sample_rows = app.config.get("LOG_DETAIL_SAMPLE_ROWS", 20)
     entries = []
+    refs: dict[int, np.ndarray] = {}
     for m in clog:
         entry = {"text": m, "step": task}
-        if task == "dup" and dup_rows:
-            entry["details"] = dup_rows
+        if task == "dup":
+            pos = dup_pos
         else:
-            if ":" in m:
-                col_prefix = m.split(":", 1)[0]
-                det = details_by_col.get(col_prefix)
-                if det:
-                    entry["details"] = det
+            pos = details_by_col.get(m.split(":", 1)[0]) if ":" in m else None
+        if pos is not None and len(pos):
+            sample = df_orig.iloc[pos[:sample_rows]].drop(columns=["patient_name"], errors="ignore")
+            entry["details"] = _records(sample)
+            entry["details_total"] = int(len(pos))
+            refs[len(entries)] = pos
         entries.append(entry)
-    data["log"].extend(entries)
-    with open(log_path, "w", encoding="utf-8") as f:
-        json.dump(data, f)
-
-    preview = df_clean.head(5).drop(columns=["patient_name"], errors="ignore").replace({np.nan: None}).to_dict(orient="records")
-    # Recompute missing counts after this step
-    df_for_missing = df_clean.drop(columns=["patient_name"], errors="ignore")
-    missing_rows = int(df_for_missing.isna().any(axis=1).sum())
-    total_rows = int(len(df_clean))
-    return jsonify({
+    # Only the deleted rows, changed cells and row references are written.
+    history.commit(task, df_clean, entries, refs)
+    dup_entry = next((e for e in entries if task == "dup" and e.get("details")), {})
+
+    return {
         "ok": True,
         "message": "; ".join(clog) or "No changes",
-        "preview": preview,
         "info": TASK_INFO.get(task, ""),
-        "details": dup_rows,
-        "missing_rows": missing_rows,
-        "total_rows": total_rows,
-    })
+        "details": dup_entry.get("details", []),
+        "details_total": dup_entry.get("details_total", 0),
+        "details_ref": dup_entry.get("details_ref"),
+        **_preprocess_state(df_clean),
+        "history": history.state(),
+    }, 200
 
 
-@app.post("/upload/<uid>/preprocess/finish")
+@app.post("/upload/<uid>/preprocess/<task>")
 @login_required
 @csrf_protect_api
-def upload_preprocess_finish(uid: str):  # Complete data preprocessing
+def upload_preprocess_task(uid: str, task: str):  # Execute data preprocessing task
+    payload, status = _preprocess_task(uid, task, request.values.get("strategy"))
+    return jsonify(payload), status
+
+
+@app.post("/upload/<uid>/preprocess/undo")
+@login_required
+@csrf_protect_api
+def upload_preprocess_undo(uid: str):
+    """Revert the last applied preprocessing step."""
+    return _preprocess_move(uid, undo=True)
+
+
+@app.post("/upload/<uid>/preprocess/redo")
+@login_required
+@csrf_protect_api
+def upload_preprocess_redo(uid: str):
+    """Re-apply the most recently undone preprocessing step."""
+    return _preprocess_move(uid, undo=False)
+
+
+@app.get("/upload/<uid>/preprocess/details/<ref>")
+@login_required
+def upload_preprocess_details(uid: str, ref: str):
+    """Page the rows a cleaning-log entry refers to (``details_ref``)."""
     p = _paths(uid)
-    if not os.path.exists(p["mapped"]):
+    if not frame_exists(p["mapped"]):
         return jsonify({"ok": False, "error": "No mapped dataset"}), 404
+    start = max(0, request.args.get("start", 0, type=int))
+    limit = min(max(0, request.args.get("limit", 100, type=int)), 1000)
+    try:
+        df, total = _history(p).referenced_rows(ref, start, start + limit)
+    except KeyError:
+        return jsonify({"ok": False, "error": "Details are no longer available"}), 404
+    return jsonify({
+        "ok": True,
+        "rows": _records(df.drop(columns=["patient_name"], errors="ignore")),
+        "start": start,
+        "total": total,
+    })
+
+
+def _preprocess_move(uid: str, undo: bool):
+    p = _paths(uid)
+    if not frame_exists(p["mapped"]):
+        return jsonify({"ok": False, "error": "No mapped dataset"}), 404
+    history = _history(p)
+    step = history.undo() if undo else history.redo()
+    if step is None:
+        return jsonify({"ok": False, "error": f"Nothing to {'undo' if undo else 'redo'}"}), 409
+    return jsonify({
+        "ok": True,
+        "message": f"{'Undid' if undo else 'Redid'} step: {step['task']}",
+        "step": step["task"],
+        **_preprocess_state(history.current()),
+        "history": history.state(),
+    })
+
+
+def _preprocess_finish(uid: str) -> tuple[dict, int]:
+    """Publish the mapped dataset as the cleaned one and build its EDA payload."""
+    p = _paths(uid)
+    if not frame_exists(p["mapped"]):
+        return {"ok": False, "error": "No mapped dataset"}, 404
+    history = _history(p)
     try:
-        df = pd.read_csv(p["mapped"])
+        if history.state()["cursor"]:
+            df = history.current()
+            write_frame(df, p["clean"])
+        else:
+            copy_frame(p["mapped"], p["clean"])
+            df = read_frame(p["clean"])
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 400
+        return {"ok": False, "error": str(e)}, 400
 
-    df.to_csv(p["clean"], index=False)
-    eda_payload = build_eda_payload(df)
+    eda_key, eda_payload = _session_eda(p["clean"])
 
     log_path = p["pre_log"]
     if os.path.exists(log_path):
@@ -2790,6 +2866,7 @@ def upload_preprocess_finish(uid: str):  # Complete data preprocessing
     else:
         log = []
         orig_rows = len(df)
+    log.extend(history.entries())
     log.append({"text": f"Final rows: {len(df)} (from {orig_rows})", "step": "summary"})
 
 
@@ -2797,17 +2874,27 @@ def upload_preprocess_finish(uid: str):  # Complete data preprocessing
         json.dump({
             "log": log,
             "eda": eda_payload,
-            "preview": df.head(20).drop(columns=["patient_name"], errors="ignore").replace({np.nan: None}).to_dict(orient="records"),
+            "eda_version": EDA_VERSION,
+            "eda_key": eda_key,
+            "preview": _records(df.head(20).drop(columns=["patient_name"], errors="ignore")),
         }, f)
 
-    return jsonify({"ok": True})
+    return {"ok": True}, 200
+
+
+@app.post("/upload/<uid>/preprocess/finish")
+@login_required
+@csrf_protect_api
+def upload_preprocess_finish(uid: str):  # Complete data preprocessing
+    payload, status = _preprocess_finish(uid)
+    return jsonify(payload), status
 
 
 @app.get("/upload/<uid>/eda")
 @login_required
 def upload_eda(uid: str):  # Display exploratory data analysis results
     p = _paths(uid)
-    if not os.path.exists(p["clean"]) and not os.path.exists(p["results"]):
+    if not frame_exists(p["clean"]) and not frame_exists(p["results"]):
         return render_template(
             "error.html",
             title="Session expired",
@@ -2818,62 +2905,30 @@ def upload_eda(uid: str):  # Display exploratory data analysis results
         with open(p["eda_json"], "r", encoding="utf-8") as f:
             payload = json.load(f)
 
-        try:
-            eda = payload.get("eda", {})
-            if "stats" in eda:
-                eda["stats"] = _strip_count_from_stats(eda["stats"])
-
-            # If predictions exist but viz payload is missing status-based plots,
-            # rebuild the EDA from results so those charts render.
-            needs_viz = False
-            if os.path.exists(p["results"]):
-                viz = eda.get("viz") or {}
-
-                def _missing(key: str) -> bool:
-                    val = viz.get(key)
-                    if val is None:
-                        return True
-                    if isinstance(val, (list, dict)) and len(val) == 0:
-                        return True
-                    # If a list-based viz has only the "All Patients" series,
-                    # treat it as missing so we regenerate charts after
-                    # predictions introduce additional groups (e.g. No Disease,
-                    # Heart Disease or staged values).
-                    if (
-                        isinstance(val, list)
-                        and key in ("bp_box_by_status", "chol_violin_by_stage")
-                        and len(val) <= 1
-                    ):
-                        return True
-                    return False
-
-                if (
-                    _missing("bp_box_by_status")
-                    or _missing("chol_violin_by_stage")
-                    or _missing("bp_hist_by_stage")
-                ):
-                    needs_viz = True
-            if needs_viz:
-                try:
-                    df_res = pd.read_csv(p["results"])
-                    eda = build_eda_payload(df_res)
-                    payload["preview"] = (
-                        df_res.head(20)
-                        .drop(columns=["patient_name"], errors="ignore")
-                        .replace({np.nan: None})
-                        .to_dict(orient="records")
-                    )
-                except Exception:
-                    pass
-            payload["eda"] = eda
-            with open(p["eda_json"], "w", encoding="utf-8") as wf:
-                json.dump(payload, wf)
-        except Exception:
-            pass
+        # Payloads from an older EDA version are rebuilt once from the newest
+        # dataset (through the shared cache) and saved back.
+        if payload.get("eda_version") != EDA_VERSION:
+            try:
+                frame_path = p["results"] if frame_exists(p["results"]) else p["clean"]
+                payload["eda_key"], payload["eda"] = _session_eda(frame_path)
+                payload["eda_version"] = EDA_VERSION
+                with open(p["eda_json"], "w", encoding="utf-8") as wf:
+                    json.dump(payload, wf)
+            except Exception:
+                app.logger.exception("Could not rebuild EDA for upload %s", uid)
+                eda = payload.get("eda", {})
+                if "stats" in eda:
+                    eda["stats"] = _strip_count_from_stats(eda["stats"])
 
-        has_results = os.path.exists(p["results"])
+        has_results = frame_exists(p["results"])
         raw_log = payload.get("log", [])
         log = normalize_log(raw_log)
+        # Logs written before details were capped may inline every row.
+        sample_rows = app.config.get("LOG_DETAIL_SAMPLE_ROWS", 20)
+        for entry in log:
+            if len(entry.get("details") or []) > sample_rows:
+                entry.setdefault("details_total", len(entry["details"]))
+                entry["details"] = entry["details"][:sample_rows]
         predict_notice = None
         if len(log) == 1 and log[0].get("text", "").startswith("Predictions added"):
             predict_notice = log[0]["text"]
@@ -2893,9 +2948,11 @@ def upload_eda(uid: str):  # Display exploratory data analysis results
             predict_notice=predict_notice,
         )
 
-    csv_path = p["results"] if os.path.exists(p["results"]) else p["clean"]
+    frame_path = p["results"] if frame_exists(p["results"]) else p["clean"]
     try:
-        df = pd.read_csv(csv_path)
+        # Only the preview rows are loaded; the EDA streams the stored frame.
+        head = read_frame(frame_path, stop=20)
+        rows = frame_rows(frame_path)
     except Exception as e:
         return render_template(
             "error.html",
@@ -2904,25 +2961,21 @@ def upload_eda(uid: str):  # Display exploratory data analysis results
         ), 400
 
     try:
-        eda_payload = build_eda_payload(df)
+        eda_key, eda_payload = _session_eda(frame_path)
     except Exception as e:
         return render_template("error.html", title="EDA failed",
                                messages=[f"{type(e).__name__}: {e}"]), 500
 
-    preview = (
-        df.head(20)
-        .drop(columns=["patient_name"], errors="ignore")
-        .replace({np.nan: None})
-        .to_dict(orient="records")
-    )
+    preview = head.drop(columns=["patient_name"], errors="ignore").pipe(_records)
     cleaning_log = [
-        {"text": "Loaded results dataset" if os.path.exists(p["results"]) else "Loaded cleaned dataset"},
-        {"text": f"Rows: {len(df)}"},
+        {"text": "Loaded results dataset" if frame_exists(p["results"]) else "Loaded cleaned dataset"},
+        {"text": f"Rows: {rows}"},
     ]
     cleaning_log = normalize_log(cleaning_log)
     groups = group_cleaning_log(cleaning_log)
 
-    to_save = {"log": cleaning_log, "eda": eda_payload, "preview": preview}
+    to_save = {"log": cleaning_log, "eda": eda_payload, "eda_version": EDA_VERSION,
+               "eda_key": eda_key, "preview": preview}
     try:
         with open(p["eda_json"], "w", encoding="utf-8") as f:
             json.dump(to_save, f)
@@ -2930,7 +2983,7 @@ def upload_eda(uid: str):  # Display exploratory data analysis results
         return render_template("error.html", title="Failed to persist EDA session",
                                messages=[f"{type(e).__name__}: {e}"]), 500
 
-    has_results = os.path.exists(p["results"])
+    has_results = frame_exists(p["results"])
     return render_template(
         "uploads/eda.html",
         uid=uid,
@@ -2949,107 +3002,100 @@ def upload_eda(uid: str):  # Display exploratory data analysis results
 @app.get("/upload/<uid>/preview")
 @login_required
 def upload_preview(uid: str):
-    p = _paths(uid)
-    if os.path.exists(p["results"]):
-        path = p["results"]
-    elif os.path.exists(p["clean"]):
-        path = p["clean"]
-    else:
-        path = p.get("mapped")
+    """Return one page of the session's newest dataset, with an ETag.
 
-    if not path or not os.path.exists(path):
+    Only the requested rows are read from the memory-mapped columns, so any
+    page costs the same. The ETag changes when the dataset is rewritten (or
+    a preprocessing step is applied or undone), so clients revalidate
+    unchanged pages with ``If-None-Match`` and get ``304``.
+    """
+    p = _paths(uid)
+    kind = next((k for k in ("results", "clean", "mapped") if frame_exists(p[k])), None)
+    if kind is None:
         return jsonify({"error": "not found"}), 404
-    start = int(request.args.get("start", 0))
-    limit = int(request.args.get("limit", 20))
-    try:
-        df = pd.read_csv(path)
-    except Exception as e:
-        return jsonify({"error": f"{type(e).__name__}: {e}"}), 400
-    rows = df.iloc[start:start + limit].drop(columns=["patient_name"], errors="ignore").replace({np.nan: None}).to_dict(orient="records")
-    return jsonify({"rows": rows})
+    start = max(0, request.args.get("start", 0, type=int))
+    limit = max(0, request.args.get("limit", 20, type=int))
+    history = _history(p) if kind == "mapped" else None
+    version = frame_version(p[kind]) + (f"-{history.version()}" if history else "")
+    etag = hashlib.sha1(f"{kind}:{version}:{start}:{limit}".encode()).hexdigest()
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        try:
+            cols = [c for c in frame_columns(p[kind]) if c != "patient_name"]
+            if history is not None:
+                df = history.read(cols, start, start + limit)
+            else:
+                df = read_frame(p[kind], cols, start, start + limit)
+        except Exception as e:
+            return jsonify({"error": f"{type(e).__name__}: {e}"}), 400
+        resp = jsonify({"rows": _records(df)})
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
 @app.get("/upload/<uid>/download/clean")
 @login_required
 def upload_download_clean(uid: str):
     p = _paths(uid)
-    if not os.path.exists(p["clean"]):
+    if not frame_exists(p["clean"]):
         return render_template("error.html", title="Not found",
                                messages=["Cleaned dataset not available."]), 404
-    return send_file(p["clean"], as_attachment=True, download_name=f"cleaned_{uid}.csv", mimetype="text/csv")
+    path = export_csv(p["clean"], p["clean_csv"])
+    return send_file(path, as_attachment=True, download_name=f"cleaned_{uid}.csv", mimetype="text/csv")
 
-@app.post("/upload/<uid>/predict")
-@login_required
-@csrf_protect
-def upload_predict(uid: str):  # Run batch predictions on uploaded data
+def _predict_upload(uid: str, active, on_progress=None) -> dict:
+    """Score the session's cleaned dataset, save the predictions and EDA.
+
+    ``on_progress(done, total)`` is called after every scored chunk; an
+    exception from it aborts the run. Returns the values the EDA page shows.
+    """
     p = _paths(uid)
-    if not os.path.exists(p["clean"]):
-        return render_template("error.html", title="Not found",
-                               messages=["Cleaned dataset not available."]), 404
-    try:
-        df = pd.read_csv(p["clean"])
-    except Exception as e:
-        return render_template("error.html", title="Failed to load cleaned CSV",
-                               messages=[f"{type(e).__name__}: {e}"]), 400
+    inserter = BulkInserter(
+        db.session,
+        Prediction,
+        batch_size=app.config.get("BATCH_INSERT_ROWS", 1000),
+        commit_rows=app.config.get("BATCH_INSERT_COMMIT_ROWS", 50000),
+    )
 
-    if model is None:
-        return render_template("error.html", title="Prediction error",
-                               messages=["Model not loaded. Place ml/model.pkl and restart."]), 500
+    def _save_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk["db_id"] = inserter.insert(prediction_rows(chunk, active.version))
+        return chunk
 
-    X = df[INPUT_COLUMNS].copy()
-    try:
-        yhat = model.predict(X)
-        pos_prob = model.predict_proba(X)[:, 1] if hasattr(model, "predict_proba") else np.full(len(df), np.nan)
-    except Exception as e:
-        return render_template("error.html", title="Prediction error",
-                               messages=[f"{type(e).__name__}: {e}"]), 500
+    def _progress(done: int, total: int) -> None:
+        _write_progress(p["progress"], "predict", done, total)
+        if on_progress is not None:
+            on_progress(done, total)
 
-    df["prediction"] = yhat.astype(int)
-    df["positive_probability"] = pos_prob.astype(float)
-
-    inserted_ids = []
-    for _, row in df.iterrows():
-        prob1 = None if pd.isna(row["positive_probability"]) else float(row["positive_probability"])
-        conf = prob1 if int(row["prediction"]) == 1 else (1.0 - prob1) if prob1 is not None else 0.5
-        def _int_or_none(value):
-            return int(value) if pd.notna(value) else None
-
-        nmv = _int_or_none(row.get("num_major_vessels"))
-        fbs = _int_or_none(row.get("fasting_blood_sugar"))
-        exang = _int_or_none(row.get("exercise_induced_angina"))
-        pred = Prediction(
-            patient_name=None,
-            age=int(row["age"]),
-            sex=int(row["sex"]),
-            chest_pain_type=str(row["chest_pain_type"]),
-            resting_bp=float(row["resting_blood_pressure"]),
-            cholesterol=float(row["cholesterol"]),
-            fasting_blood_sugar=fbs,
-            resting_ecg=str(row["Restecg"]),
-            max_heart_rate=float(row["max_heart_rate_achieved"]),
-            exercise_angina=exang,
-            oldpeak=float(row["st_depression"]),
-            st_slope=str(row["st_slope_type"]),
-            num_major_vessels=nmv,
-            thalassemia_type=str(row["thalassemia_type"]),
-            prediction=int(row["prediction"]),
-            confidence=float(conf),
-            model_version=model_name
+    try:
+        summary = score_dataset(
+            p["clean"],
+            p["results"],
+            model=active.model,
+            version=active.version,
+            model_path=model_registry.artifact_path(active.version),
+            chunk_size=app.config.get("BATCH_PREDICT_CHUNK_ROWS", 50000),
+            workers=app.config.get("BATCH_PREDICT_WORKERS", 0),
+            cache=app.prediction_cache,
+            on_chunk=_save_chunk,
+            progress=_progress,
         )
-        db.session.add(pred)
-        db.session.flush()
-        inserted_ids.append(pred.id)
-    db.session.commit()
-
-    df["db_id"] = inserted_ids
-    df["confidence"] = np.where(
-        df["prediction"] == 1,
-        df["positive_probability"],
-        1 - df["positive_probability"],
-    )
-    df.to_csv(p["results"], index=False)
+        inserter.commit()
+    except Exception:
+        # Chunks may already be committed; a failed or cancelled run must
+        # not leave half a batch in the predictions table.
+        try:
+            inserter.discard()
+        except Exception:
+            app.logger.exception("Could not remove the partial batch of upload %s", uid)
+            db.session.rollback()
+        raise
+    n_rows = summary["rows"]
+    # Only the columns and rows needed below are read back, so the results
+    # frame is never held in memory as a whole.
+    shown_cols = [c for c in frame_columns(p["results"]) if c != "patient_name"]
 
     # Detect numeric outliers (IQR method)
-    outliers = []
     num_cols = [
         "age",
         "resting_blood_pressure",
@@ -3058,45 +3104,78 @@ def upload_predict(uid: str):  # Run batch predictions on uploaded data
         "st_depression",
         "num_major_vessels",
     ]
-    mask = pd.Series(False, index=df.index)
-    reasons = [[] for _ in range(len(df))]
-    for col in num_cols:
-        if col not in df:
-            continue
-        q1 = df[col].quantile(0.25)
-        q3 = df[col].quantile(0.75)
+    nums = read_frame(p["results"], [c for c in num_cols if c in shown_cols])
+    mask = np.zeros(n_rows, dtype=bool)
+    col_masks = {}
+    for col in nums.columns:
+        vals = pd.to_numeric(nums[col], errors="coerce").astype(float)
+        q1 = vals.quantile(0.25)
+        q3 = vals.quantile(0.75)
         iqr = q3 - q1
         low = q1 - 1.5 * iqr
         high = q3 + 1.5 * iqr
-        col_mask = (df[col] < low) | (df[col] > high)
-        mask |= col_mask
-        for idx in df[col_mask].index:
-            reasons[idx].append(col)
-    out_df = df[mask].copy()
-    out_df["outlier_cols"] = [", ".join(reasons[i]) for i in out_df.index]
-    out_df = out_df.drop(columns=["patient_name"], errors="ignore")
-    outliers = out_df.to_dict(orient="records")
-
-
-    eda_payload = build_eda_payload(df)
-    eda_payload["predicted_distribution"] = {
-        "labels": ["No (0)", "Yes (1)"],
-        "values": [int((df["prediction"] == 0).sum()), int((df["prediction"] == 1).sum())],
-    }
-    preview = (
-        df.head(20)
-        .drop(columns=["patient_name"], errors="ignore")
-        .replace({np.nan: None})
-        .to_dict(orient="records")
+        col_masks[col] = ((vals < low) | (vals > high)).to_numpy()
+        mask |= col_masks[col]
+    del nums
+    out_idx = np.flatnonzero(mask)
+    reasons = {i: ", ".join(c for c, m in col_masks.items() if m[i]) for i in out_idx}
+    chunk_rows = app.config.get("BATCH_PREDICT_CHUNK_ROWS", 50000)
+    parts = []
+    for chunk in iter_frames(p["results"], chunk_rows, shown_cols):
+        hit = out_idx[(out_idx >= chunk.index[0]) & (out_idx <= chunk.index[-1])]
+        if len(hit):
+            parts.append(chunk.loc[hit])
+    out_df = pd.concat(parts) if parts else pd.DataFrame(columns=shown_cols)
+    out_df["outlier_cols"] = [reasons[i] for i in out_df.index]
+    outliers = _records(out_df)
+
+    eda_key, eda_payload = _session_eda(p["results"])
+    preview = _records(read_frame(p["results"], shown_cols, stop=20))
+    app.logger.info(
+        "Batch %s: inserted %d predictions in %.2fs (%.0f rows/s)",
+        uid, inserter.rows, inserter.seconds, inserter.rows_per_sec,
     )
-    log = normalize_log([{"text": f"Predictions added: {len(df)} rows"}])
+    log = normalize_log([{
+        "text": f"Predictions added: {n_rows} rows ({inserter.rows_per_sec:,.0f} rows/s saved)"
+    }])
     notice = log[0]["text"] if log else None
-    to_save = {"log": log, "eda": eda_payload, "preview": preview, "outliers": outliers}
+    to_save = {"log": log, "eda": eda_payload, "eda_version": EDA_VERSION, "eda_key": eda_key,
+               "preview": preview, "outliers": outliers}
     try:
         with open(p["eda_json"], "w", encoding="utf-8") as f:
             json.dump(to_save, f, indent=2)
     except Exception:
         pass
+    return {
+        "rows": n_rows,
+        "log": log,
+        "preview": preview,
+        "eda": eda_payload,
+        "outliers": outliers,
+        "notice": notice,
+    }
+
+
+@app.post("/upload/<uid>/predict")
+@login_required
+@csrf_protect
+def upload_predict(uid: str):  # Run batch predictions on uploaded data
+    p = _paths(uid)
+    if not frame_exists(p["clean"]):
+        return render_template("error.html", title="Not found",
+                               messages=["Cleaned dataset not available."]), 404
+
+    active = model_registry.active()
+    if active is None:
+        return render_template("error.html", title="Prediction error",
+                               messages=["Model not loaded. Place ml/model.pkl and restart."]), 500
+
+    try:
+        res = _predict_upload(uid, active)
+    except Exception as e:
+        return render_template("error.html", title="Prediction error",
+                               messages=[f"{type(e).__name__}: {e}"]), 500
+    log = res["log"]
     groups = group_cleaning_log(log)
     return render_template(
         "uploads/eda.html",
@@ -3104,47 +3183,52 @@ def upload_predict(uid: str):  # Run batch predictions on uploaded data
         cleaning_log=log,
         cleaning_groups=groups,
         cleaning_log_json=json.dumps(log),
-        preview_json=json.dumps(preview),
-        eda_json=json.dumps(eda_payload),
-        outliers_json=json.dumps(outliers),
+        preview_json=json.dumps(res["preview"]),
+        eda_json=json.dumps(res["eda"]),
+        outliers_json=json.dumps(res["outliers"]),
         has_results=True,
-        predict_notice=notice,
-        banner=f"Batch prediction complete: {len(df)} rows saved.",
-        outliers=outliers,
+        predict_notice=res["notice"],
+        banner=f"Batch prediction complete: {res['rows']} rows saved.",
+        outliers=res["outliers"],
     )
 
+@app.get("/upload/<uid>/progress")
+@login_required
+def upload_progress(uid: str):
+    """Return the progress of the session's current long-running step."""
+    p = _paths(uid)
+    try:
+        with open(p["progress"], "r", encoding="utf-8") as f:
+            return jsonify(json.load(f))
+    except (OSError, ValueError):
+        return jsonify({"stage": None, "done": 0, "total": 0})
+
 @app.get("/upload/<uid>/download/results")
 @login_required
 def upload_download_results(uid: str):
     """Send the batch prediction results CSV to the client."""
     p = _paths(uid)
-    if not os.path.exists(p["results"]):
+    if not frame_exists(p["results"]):
         return render_template("error.html", title="Not found",
                                messages=["No results available. Run predictions first."]), 404
-    return send_file(p["results"], as_attachment=True, download_name=f"results_{uid}.csv", mimetype="text/csv")
+    path = export_csv(p["results"], p["results_csv"])
+    return send_file(path, as_attachment=True, download_name=f"results_{uid}.csv", mimetype="text/csv")
 
-@app.get("/upload/<uid>/pdf")
-@login_required
-def upload_bulk_pdf(uid: str):
-    """Create a PDF report for all predictions in the batch."""
+def _write_batch_pdf(df: pd.DataFrame, out, model_name: str, on_progress=None) -> None:
+    """Write one report page per row of the results frame ``df`` to ``out``.
+
+    ``out`` is a path or binary file object. ``on_progress(done, total)`` is
+    called every 50 pages.
+    """
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import cm
     from reportlab.pdfgen import canvas
 
-    p = _paths(uid)
-    if not os.path.exists(p["results"]):
-        return render_template("error.html", title="Not found",
-                               messages=["No results available. Run predictions first."]), 404
-    df = pd.read_csv(p["results"])
-    if "db_id" not in df.columns:
-        return render_template("error.html", title="Not found",
-                               messages=["Results missing DB ids for PDF."]), 400
-
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
+    c = canvas.Canvas(out, pagesize=A4)
     width, height = A4
 
-    for _, r in df.iterrows():
+    total = len(df)
+    for i, (_, r) in enumerate(df.iterrows()):
         y = height - 2*cm
         c.setFont("Helvetica-Bold", 14)
         c.drawString(2*cm, y, "Heart Disease Prediction Report")
@@ -3158,7 +3242,7 @@ def upload_bulk_pdf(uid: str):
 
         lines = [
             f"DB ID: {int(r['db_id'])}",
-            f"Model Version: {model_name}",
+            f"Model Version: {r.get('model_version', model_name)}",
             "",
             f"Age: {int(r['age'])}    Sex: {SEX_MAP.get(int(r['sex']), r['sex'])}",
             f"Chest Pain Type: {str(r['chest_pain_type']).replace('_',' ')}    ST Slope: {str(r['st_slope_type']).replace('_',' ')}",
@@ -3177,12 +3261,120 @@ def upload_bulk_pdf(uid: str):
             c.drawString(2*cm, y, line)
             y -= 0.8*cm
         c.showPage()
+        if on_progress is not None and (i + 1) % 50 == 0:
+            on_progress(i + 1, total)
 
     c.save()
+
+
+@app.get("/upload/<uid>/pdf")
+@login_required
+def upload_bulk_pdf(uid: str):
+    """Create a PDF report for all predictions in the batch."""
+    p = _paths(uid)
+    if not frame_exists(p["results"]):
+        return render_template("error.html", title="Not found",
+                               messages=["No results available. Run predictions first."]), 404
+    df = read_frame(p["results"])
+    model_name = active_model_info()[0]
+    if "db_id" not in df.columns:
+        return render_template("error.html", title="Not found",
+                               messages=["Results missing DB ids for PDF."]), 400
+
+    buf = io.BytesIO()
+    _write_batch_pdf(df, buf, model_name)
     buf.seek(0)
     return send_file(buf, as_attachment=True, download_name=f"batch_report_{uid}.pdf", mimetype="application/pdf")
 
 
+UPLOAD_JOB_KINDS = ("preprocess", "finish", "predict", "pdf")
+
+
+def _payload_job(fn, *args) -> dict:
+    """Run a ``(payload, status)`` helper, failing the job on a non-200 status."""
+    payload, status = fn(*args)
+    if status != 200:
+        raise JobError(payload.get("error") or f"HTTP {status}")
+    return payload
+
+
+@app.post("/upload/<uid>/jobs")
+@login_required
+@csrf_protect_api
+def upload_submit_job(uid: str):
+    """Queue a preprocessing, prediction or bulk PDF step as a background job.
+
+    ``kind`` is one of :data:`UPLOAD_JOB_KINDS`; ``preprocess`` also takes
+    ``task`` and an optional ``strategy``. Returns the job id and the URL to
+    poll with 202, or 409 while another job for the upload is queued or
+    running. Preprocessing steps rewrite the session history in one go and
+    can only be cancelled while queued.
+    """
+    kind = request.values.get("kind", "")
+    p = _paths(uid)
+    if kind not in UPLOAD_JOB_KINDS:
+        return jsonify({"ok": False, "error": f"Unknown job kind: {kind}"}), 400
+    if not os.path.isdir(p["base"]):
+        return jsonify({"ok": False, "error": "Upload not found"}), 404
+    runner = app.job_runner
+
+    if kind == "preprocess":
+        task = request.values.get("task", "")
+        strategy = request.values.get("strategy")
+
+        def job(ctx):
+            return _payload_job(_preprocess_task, uid, task, strategy)
+
+    elif kind == "finish":
+        redirect_url = url_for("upload_eda", uid=uid)
+
+        def job(ctx):
+            _payload_job(_preprocess_finish, uid)
+            return {"redirect": redirect_url}
+
+    elif kind == "predict":
+        if not frame_exists(p["clean"]):
+            return jsonify({"ok": False, "error": "Cleaned dataset not available."}), 404
+        active = model_registry.active()
+        if active is None:
+            return jsonify({"ok": False, "error": "Model not loaded."}), 500
+        redirect_url = url_for("upload_eda", uid=uid)
+
+        def job(ctx):
+            res = _predict_upload(uid, active, on_progress=ctx.progress)
+            return {"rows": res["rows"], "notice": res["notice"], "redirect": redirect_url}
+
+    else:
+        if not frame_exists(p["results"]):
+            return jsonify({"ok": False, "error": "No results available. Run predictions first."}), 404
+        model_name = active_model_info()[0]
+
+        def job(ctx):
+            df = read_frame(p["results"])
+            if "db_id" not in df.columns:
+                raise JobError("Results missing DB ids for PDF.")
+            path = runner.file_path(ctx.job_id, ".pdf")
+            _write_batch_pdf(df, path, model_name, on_progress=ctx.progress)
+            return {
+                "file": path,
+                "download_name": f"batch_report_{uid}.pdf",
+                "mimetype": "application/pdf",
+            }
+
+    try:
+        job_id = runner.submit(
+            kind, job, owner=current_user.id, scope=uid, exclusive=True,
+            cancellable=kind not in ("preprocess", "finish"),
+        )
+    except JobBusy:
+        return jsonify({"ok": False, "error": "Another job is still running for this upload."}), 409
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status_url": url_for("jobs.job_status", job_id=job_id),
+    }), 202
+
+
 # ---------------------------
 # CLI role management
 # ---------------------------
@@ -3213,6 +3405,77 @@ def roles_set(email: str, role: str) -> None:  # Set user role via CLI
         echo(f"Updated {email} to {user.role}")
 
 
+@app.cli.group()
+def models():  # Model registry management
+    """Manage versioned model artifacts."""
+
+
+@models.command("list")
+def models_list() -> None:
+    """List registered model versions."""
+    from click import echo
+
+    for meta in model_registry.versions():
+        flag = "*" if meta.get("active") else " "
+        sha = (meta.get("sha256") or "")[:12]
+        echo(f"{flag} {meta['version']:<32} trained={meta.get('trained_at') or '-'} sha256={sha}")
+
+
+@models.command("register")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--version", "version", default=None, help="Version name (default: <stem>-<sha8>).")
+@click.option("--trained-at", default=None, help="Training date (ISO format).")
+@click.option("--notes", default=None)
+@click.option("--activate", is_flag=True, help="Activate the version after registering it.")
+@click.option("--skip-pdp", is_flag=True, help="With --activate, don't precompute partial-dependence tables.")
+def models_register(path: str, version, trained_at, notes, activate: bool, skip_pdp: bool) -> None:
+    """Copy the model at PATH into the registry."""
+    from click import echo
+
+    try:
+        meta = model_registry.register(path, version=version, trained_at=trained_at, notes=notes)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    echo(f"Registered {meta['version']} (sha256 {meta['sha256'][:12]})")
+    if activate:
+        model_registry.activate(meta["version"], notify=False)
+        echo(f"Activated {meta['version']}")
+        _cli_precompute_pdp(meta["version"], skip_pdp)
+
+
+@models.command("activate")
+@click.argument("version")
+@click.option("--skip-pdp", is_flag=True, help="Don't precompute partial-dependence tables.")
+def models_activate(version: str, skip_pdp: bool) -> None:
+    """Make VERSION the active model for all workers."""
+    from click import echo
+
+    try:
+        model_registry.activate(version, notify=False)
+    except KeyError:
+        raise click.ClickException(f"Unknown version {version}")
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    echo(f"Activated {version}")
+    _cli_precompute_pdp(version, skip_pdp)
+
+
+def _cli_precompute_pdp(version: str, skip: bool) -> None:
+    """Build the partial-dependence tables now; a CLI process exits too soon
+    for the background thread the web process uses."""
+    from click import echo
+
+    if skip:
+        echo("Skipped partial-dependence tables; the first /simulations/pdp request will build them.")
+        return
+    echo("Computing partial-dependence tables...")
+    payload = precompute_recorded(app, version)
+    if payload.get("status") == READY:
+        echo(f"Partial-dependence tables ready ({payload.get('reference_rows', 0)} reference rows).")
+    else:
+        echo(f"Partial-dependence tables not built ({payload.get('status')}): {payload.get('error')}")
+
+
 # ---------------------------
 # Entrypoint
 # ---------------------------
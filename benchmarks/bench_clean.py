@@ -0,0 +1,163 @@
+"""Categorical normalisation and numeric coercion: per-cell vs. compiled.
+
+Run from the repository root::
+
+    python benchmarks/bench_clean.py [--rows 10000 100000 1000000]
+
+The legacy path mirrors what ``services.data.clean_dataframe`` used to do:
+``Series.apply`` per cell, with ``_map_with_dict`` rebuilding its normalised
+lookups on every call. Both paths must produce identical frames, except for
+one intended difference: values matched through the allowed-value fallback
+(``typical_angina``, ``typical angina``, ``non-anginal``) came back from the
+legacy mapper as their squashed key (``typicalangina``), which
+``clean_dataframe`` then nulled as unknown; the compiled mapper returns the
+allowed value. :func:`intended` applies that
+change to the legacy output before comparing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from services.data import (  # noqa: E402
+    CATEGORICAL_ALLOWED,
+    CATEGORY_MAPPERS,
+    CP_MAP_NUM,
+    NUMERIC_FEATURES_FLOAT,
+    NUMERIC_FEATURES_INT,
+    RESTECG_MAP_NUM,
+    SLOPE_MAP_NUM,
+    THAL_MAP_NUM,
+    _coerce_float_series,
+    _coerce_int_series,
+    _map_unique,
+    _sex_to_binary,
+    _yes_no_to_binary,
+)
+
+LEGACY_MAPS = {
+    "chest_pain_type": CP_MAP_NUM,
+    "Restecg": RESTECG_MAP_NUM,
+    "st_slope_type": SLOPE_MAP_NUM,
+    "thalassemia_type": THAL_MAP_NUM,
+}
+
+
+def _legacy_map_with_dict(x, mapping, fallback_allowed=None):
+    def norm(val):
+        return re.sub(r"[_\s-]", "", str(val).strip().lower())
+
+    if pd.isna(x):
+        return None
+    if isinstance(x, (int, float)) and x in mapping:
+        return mapping[x]
+    s = norm(x).replace("reversabledefect", "reversibledefect")
+    norm_lookup = dict({(norm(k), v) for k, v in mapping.items()})
+    if s in norm_lookup:
+        return norm_lookup[s]
+    if fallback_allowed and s in {norm(v) for v in fallback_allowed}:
+        return s
+    return None
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Return a raw upload-like frame with mixed spellings and gaps."""
+    rng = np.random.default_rng(seed)
+
+    def pick(choices):
+        return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), rows)]
+
+    def gappy(values, frac=0.02):
+        values = values.astype(float)
+        values[rng.random(rows) < frac] = np.nan
+        return values
+
+    return pd.DataFrame({
+        "age": gappy(rng.integers(29, 80, rows)),
+        "sex": pick(["Male", "female", "M", "F", "1", "0", None]),
+        "chest_pain_type": pick(["typical angina", "Atypical_Angina", "non-anginal", "asymptomatic",
+                                 "typical_angina", None]),
+        "resting_blood_pressure": gappy(rng.normal(130, 18, rows).round()),
+        "cholesterol": gappy(rng.normal(240, 50, rows).round()),
+        "fasting_blood_sugar": pick(["yes", "no", "TRUE", "false", "1", "0"]),
+        "Restecg": pick(["normal", "lv hypertrophy", "ST-T wave abnormality", None]),
+        "max_heart_rate_achieved": gappy(rng.normal(150, 22, rows).round()),
+        "exercise_induced_angina": pick(["Y", "N", "yes", "no"]),
+        "st_depression": gappy(rng.exponential(1.0, rows).round(1)),
+        "st_slope_type": pick(["upsloping", "Flat", "down sloping", None]),
+        "num_major_vessels": gappy(rng.integers(0, 4, rows)),
+        "thalassemia_type": pick(["normal", "fixed defect", "reversable defect", "Reversible_Defect"]),
+    })
+
+
+def legacy(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["sex"] = df["sex"].apply(_sex_to_binary)
+    for b in ["fasting_blood_sugar", "exercise_induced_angina"]:
+        df[b] = df[b].apply(_yes_no_to_binary)
+    for col, mapping in LEGACY_MAPS.items():
+        allowed = CATEGORICAL_ALLOWED[col]
+        df[col] = df[col].apply(lambda x: _legacy_map_with_dict(x, mapping, allowed))
+    for n in NUMERIC_FEATURES_INT:
+        df[n] = df[n].apply(lambda v: None if pd.isna(v) or str(v).strip() == "" else int(round(float(v))))
+    for n in NUMERIC_FEATURES_FLOAT:
+        df[n] = df[n].apply(lambda v: None if pd.isna(v) or str(v).strip() == "" else float(v))
+    return df
+
+
+def intended(old: pd.DataFrame) -> pd.DataFrame:
+    """Return the legacy output with squashed canonical keys mapped back."""
+    out = old.copy()
+    for col in LEGACY_MAPS:
+        squashed = {re.sub(r"[_\s-]", "", v): v for v in CATEGORICAL_ALLOWED[col]}
+        out[col] = out[col].map(lambda x: squashed.get(x, x))
+    return out
+
+
+def compiled(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["sex"] = _map_unique(df["sex"], _sex_to_binary)
+    for b in ["fasting_blood_sugar", "exercise_induced_angina"]:
+        df[b] = _map_unique(df[b], _yes_no_to_binary)
+    for col, mapper in CATEGORY_MAPPERS.items():
+        df[col] = _map_unique(df[col], mapper)
+    for n in NUMERIC_FEATURES_INT:
+        df[n] = _coerce_int_series(df[n])
+    for n in NUMERIC_FEATURES_FLOAT:
+        df[n] = _coerce_float_series(df[n])
+    return df
+
+
+def _time(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, (time.perf_counter() - t0) * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'legacy ms':>14}{'compiled ms':>14}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        old, t_old = _time(legacy, df)
+        new, t_new = _time(compiled, df)
+        expected = intended(old)
+        pd.testing.assert_frame_equal(expected, new, check_exact=True)
+        changed = int((expected.ne(old) & expected.notna()).to_numpy().sum())
+        print(f"{rows:>10}{t_old:>14.1f}{t_new:>14.1f}   x{t_old / t_new:.1f}   ({changed} values legacy nulled)")
+
+
+if __name__ == "__main__":
+    main()
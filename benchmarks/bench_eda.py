@@ -0,0 +1,213 @@
+"""EDA payload: per-column pandas crosstabs vs. one pass over integer codes.
+
+Run from the repository root::
+
+    python benchmarks/bench_eda.py [--rows 100000 1000000]
+
+The legacy path is what ``build_eda_payload`` in ``app.py`` used to do: an
+``astype(str)`` and a ``pd.crosstab`` for every categorical column pair, for
+each column against the target (twice) and separate ``value_counts``. The
+new path is :func:`services.eda.build_eda_payload`. Both payloads must be
+identical.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from services.data import CATEGORICAL_FEATURES, NUMERIC_FEATURES_FLOAT, NUMERIC_FEATURES_INT  # noqa: E402
+from services.eda import build_eda_payload  # noqa: E402
+
+try:
+    from scipy.stats import chi2_contingency
+except Exception:  # pragma: no cover
+    chi2_contingency = None
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Return a cleaned, scored upload with a few gaps."""
+    rng = np.random.default_rng(seed)
+
+    def pick(choices):
+        return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), rows)]
+
+    def gappy(values, frac=0.01):
+        values = values.astype(float)
+        values[rng.random(rows) < frac] = np.nan
+        return values
+
+    prob = rng.random(rows)
+    return pd.DataFrame({
+        "age": rng.integers(29, 80, rows),
+        "sex": rng.integers(0, 2, rows),
+        "chest_pain_type": pick(["typical_angina", "atypical_angina", "non-anginal", "asymptomatic"]),
+        "resting_blood_pressure": rng.normal(130, 18, rows).round().astype(int),
+        "cholesterol": gappy(rng.normal(240, 50, rows).round()),
+        "fasting_blood_sugar": rng.integers(0, 2, rows),
+        "Restecg": pick(["normal", "left_ventricular_hypertrophy", "st_t_wave_abnormality", None]),
+        "max_heart_rate_achieved": rng.normal(150, 22, rows).round().astype(int),
+        "exercise_induced_angina": rng.integers(0, 2, rows),
+        "st_depression": gappy(rng.exponential(1.0, rows).round(1)),
+        "st_slope_type": pick(["upsloping", "flat", "downsloping"]),
+        "num_major_vessels": rng.integers(0, 4, rows),
+        "thalassemia_type": pick(["normal", "fixed_defect", "reversible_defect"]),
+        "prediction": (prob > 0.5).astype(int),
+        "positive_probability": prob,
+    })
+
+
+def legacy(df: pd.DataFrame) -> dict:
+    prob_dist = None
+    if "positive_probability" in df.columns:
+        vals = pd.to_numeric(df["positive_probability"], errors="coerce").dropna().values
+        if vals.size:
+            counts, edges = np.histogram(vals, bins=20, range=(0, 1))
+            centers = (edges[:-1] + edges[1:]) / 2
+            n = vals.size
+            mu = float(vals.mean())
+            sigma = float(vals.std(ddof=1)) if n > 1 else 0.0
+            bin_width = float(edges[1] - edges[0])
+            if sigma > 0:
+                normal_y = (1.0 / (sigma * np.sqrt(2*np.pi))) * np.exp(-0.5 * ((centers - mu)/sigma)**2)
+                normal_y = (normal_y * n * bin_width).tolist()
+            else:
+                normal_y = [0.0] * len(centers)
+            prob_dist = {"x": centers.tolist(), "y": counts.astype(int).tolist(),
+                         "normal_fit": {"mu": mu, "sigma": sigma, "y": normal_y}}
+        else:
+            prob_dist = {"x": [], "y": [], "normal_fit": {"mu": None, "sigma": None, "y": []}}
+
+    num_cols = list((NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT))
+    present_num = [c for c in num_cols if c in df.columns]
+    if present_num:
+        desc = df[present_num].describe().round(2)
+        if "count" in desc.index:
+            desc = desc.drop(index="count")
+        stats = desc.to_dict()
+    else:
+        stats = {}
+
+    hists = {}
+    for c in present_num:
+        vals = df[c].dropna().values
+        if len(vals):
+            counts, edges = np.histogram(vals, bins=20)
+            centers = (edges[:-1] + edges[1:]) / 2
+            hists[c] = {"x": centers.tolist(), "y": counts.tolist()}
+        else:
+            hists[c] = {"x": [], "y": []}
+
+    corr = df[present_num].corr(numeric_only=True).fillna(0) if present_num else pd.DataFrame()
+    corr_payload = {"z": (corr.values.tolist() if not corr.empty else []),
+                    "x": (list(corr.columns) if not corr.empty else []),
+                    "y": (list(corr.index) if not corr.empty else [])}
+
+    target_col = None
+    lower_map = {c.lower(): c for c in df.columns}
+    for name in ("num", "target", "prediction", "heartdisease", "heart_disease"):
+        if name in lower_map:
+            target_col = lower_map[name]
+            break
+
+    cat_cols = [c for c in CATEGORICAL_FEATURES if c in df.columns]
+    categorical = {}
+    for col in cat_cols:
+        vc = df[col].astype(str).value_counts(dropna=False)
+        labels = [str(x) for x in vc.index.tolist()]
+        counts = vc.values.astype(int).tolist()
+        total = int(vc.sum()) if int(vc.sum()) else 1
+        percents = [round(100.0 * v / total, 2) for v in vc.values.tolist()]
+        categorical[col] = {"counts": {"labels": labels, "counts": counts, "percents": percents}}
+
+    cat_vs_target = {}
+    if target_col is not None:
+        y = df[target_col].astype(str)
+        for col in cat_cols:
+            ct = pd.crosstab(df[col].astype(str), y, dropna=False).fillna(0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                row_pct = (ct.div(ct.sum(axis=1).replace(0, np.nan), axis=0) * 100).fillna(0)
+            cat_vs_target[col] = {"index": ct.index.tolist(), "columns": ct.columns.tolist(),
+                                  "counts": ct.values.astype(int).tolist(),
+                                  "col_percents": row_pct.values.round(2).tolist()}
+
+    def _cramers_v(table: pd.DataFrame) -> float:
+        n = table.values.sum()
+        if n == 0:
+            return 0.0
+        row_sums = table.sum(axis=1).values.reshape(-1, 1)
+        col_sums = table.sum(axis=0).values.reshape(1, -1)
+        expected = row_sums.dot(col_sums) / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            chi2 = np.nansum((table.values - expected) ** 2 / np.where(expected == 0, np.nan, expected))
+        denom = n * (min(table.shape[1] - 1, table.shape[0] - 1))
+        if denom <= 0:
+            return 0.0
+        return float(math.sqrt(max(chi2, 0.0) / denom))
+
+    cat_associations = []
+    if target_col is not None:
+        y = df[target_col].astype(str)
+        for col in cat_cols:
+            ct = pd.crosstab(df[col].astype(str), y, dropna=False)
+            v = _cramers_v(ct)
+            pval = None
+            if chi2_contingency is not None:
+                try:
+                    _, p, _, _ = chi2_contingency(ct.values, correction=False)
+                    pval = float(p)
+                except Exception:
+                    pval = None
+            cat_associations.append({"col": col, "cramers_v": round(v, 4),
+                                     "p_value": (None if pval is None else round(pval, 6))})
+
+    cat_assoc_matrix = None
+    if len(cat_cols) >= 2:
+        z = []
+        for rcol in cat_cols:
+            z.append([round(_cramers_v(pd.crosstab(df[rcol].astype(str), df[ccol].astype(str), dropna=False)), 4)
+                      for ccol in cat_cols])
+        cat_assoc_matrix = {"z": z, "x": cat_cols, "y": cat_cols}
+
+    target_dist = None
+    if target_col is not None:
+        counts = df[target_col].astype(str).value_counts(dropna=False).to_dict()
+        target_dist = {"labels": list(counts.keys()), "values": list(counts.values())}
+
+    return {"stats": stats, "hists": hists, "corr": corr_payload, "target": target_dist,
+            "categorical": categorical, "cat_vs_target": cat_vs_target,
+            "cat_associations": cat_associations, "cat_assoc_matrix": cat_assoc_matrix,
+            "viz": {}, "probability_distribution": prob_dist}
+
+
+def _time(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, (time.perf_counter() - t0) * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'legacy ms':>14}{'codes ms':>14}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        old, t_old = _time(legacy, df)
+        new, t_new = _time(build_eda_payload, df)
+        assert json.dumps(old) == json.dumps(new), "payloads differ"
+        print(f"{rows:>10}{t_old:>14.1f}{t_new:>14.1f}   x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Single-request inference latency: legacy two-pass vs. services.inference.
+
+Run from the repository root::
+
+    python benchmarks/bench_inference.py [--repeat 200]
+
+The legacy path mirrors what ``routes/predict.predict`` used to do: build a
+one-row DataFrame, then call ``predict`` and ``predict_proba`` on it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from services.data import INPUT_COLUMNS  # noqa: E402
+from services.inference import predict_frame, predict_one  # noqa: E402
+
+RECORD = {
+    "age": 57,
+    "sex": 1,
+    "chest_pain_type": "asymptomatic",
+    "resting_blood_pressure": 140.0,
+    "cholesterol": 241.0,
+    "fasting_blood_sugar": 0,
+    "Restecg": "normal",
+    "max_heart_rate_achieved": 123.0,
+    "exercise_induced_angina": 1,
+    "st_depression": 0.2,
+    "st_slope_type": "flat",
+    "num_major_vessels": 0,
+    "thalassemia_type": "reversible_defect",
+}
+
+
+def legacy(model, record):
+    X = pd.DataFrame([record], columns=INPUT_COLUMNS)
+    yhat = int(model.predict(X)[0])
+    pos_prob = float(model.predict_proba(X)[0][1])
+    return yhat, pos_prob
+
+
+def single_pass(model, record):
+    X = pd.DataFrame([record], columns=INPUT_COLUMNS)
+    labels, probs = predict_frame(model, X)
+    return int(labels[0]), float(probs[0])
+
+
+def fast_path(model, record):
+    res = predict_one(model, record)
+    return res["label"], res["pos_prob"]
+
+
+def _time(fn, model, repeat):
+    fn(model, RECORD)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(model, RECORD)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples), statistics.quantiles(samples, n=20)[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.path.join("ml", "model.pkl"))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+
+    assert legacy(model, RECORD) == single_pass(model, RECORD) == fast_path(model, RECORD)
+
+    print(f"{'path':<28}{'median ms':>12}{'p95 ms':>12}")
+    base = None
+    for name, fn in (
+        ("legacy predict+proba", legacy),
+        ("single pass (DataFrame)", single_pass),
+        ("fast path (no pandas)", fast_path),
+    ):
+        med, p95 = _time(fn, model, args.repeat)
+        base = base or med
+        print(f"{name:<28}{med:>12.2f}{p95:>12.2f}   x{base / med:.1f}")
+
+
+if __name__ == "__main__":
+    main()
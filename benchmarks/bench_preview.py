@@ -0,0 +1,66 @@
+"""Upload preview paging: time per page at the start, middle and end.
+
+Run from the repository root::
+
+    python benchmarks/bench_preview.py [--rows 1000000] [--limit 20]
+
+The frame has a unique ``patient_name`` per row, like real uploads. Every
+page request re-reads the schema and the requested rows of the other
+columns, as ``GET /upload/<uid>/preview`` does, so the time per page should
+not depend on the page or on the number of rows stored.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from services.frame_store import frame_columns, read_frame, write_frame  # noqa: E402
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "patient_name": [f"Patient {i}" for i in range(rows)],
+        "age": rng.integers(30, 80, rows),
+        "chest_pain_type": rng.choice(["typical_angina", "asymptomatic"], rows).astype(object),
+        "cholesterol": rng.normal(240, 40, rows),
+    })
+
+
+def page(path: str, start: int, limit: int) -> pd.DataFrame:
+    cols = [c for c in frame_columns(path) if c != "patient_name"]
+    return read_frame(path, cols, start, start + limit)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results")
+        write_frame(make_frame(args.rows), path)
+        print(f"{'page':>10}{'ms/page':>10}")
+        last = max(0, args.rows // args.limit - 1)
+        for n in (0, last // 2, last):
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                out = page(path, n * args.limit, args.limit)
+            ms = (time.perf_counter() - t0) * 1000.0 / args.repeat
+            assert len(out) == min(args.limit, args.rows - n * args.limit)
+            print(f"{n:>10}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,43 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     MODEL_PATH = os.environ.get("MODEL_PATH", str(BASE_DIR / 'ml' / 'model.pkl'))
+    MODEL_REGISTRY_DIR = os.environ.get(
+        "MODEL_REGISTRY_DIR", str(BASE_DIR / "ml" / "registry")
+    )
+    MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", "2"))
+    PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+    PREDICTION_CACHE_TTL_SEC = float(os.environ.get("PREDICTION_CACHE_TTL_SEC", "3600"))
+    PREDICTION_CACHE_MAX_ROWS = int(os.environ.get("PREDICTION_CACHE_MAX_ROWS", "256"))
+    INFERENCE_BATCHING = os.environ.get("INFERENCE_BATCHING", "0") == "1"
+    INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "64"))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "2"))
+    SIMULATION_CACHE_SIZE = int(os.environ.get("SIMULATION_CACHE_SIZE", "256"))
+    SIMULATION_SURFACE_BUDGET_MS = float(os.environ.get("SIMULATION_SURFACE_BUDGET_MS", "200"))
+    SIMULATION_MC_MAX_SAMPLES = int(os.environ.get("SIMULATION_MC_MAX_SAMPLES", "50000"))
+    SIMULATION_MC_CHUNK_ROWS = int(os.environ.get("SIMULATION_MC_CHUNK_ROWS", "10000"))
+    SIMULATION_COHORT_CHUNK_ROWS = int(os.environ.get("SIMULATION_COHORT_CHUNK_ROWS", "5000"))
+    PDP_REFERENCE_ROWS = int(os.environ.get("PDP_REFERENCE_ROWS", "500"))
+    PDP_GRID_POINTS = int(os.environ.get("PDP_GRID_POINTS", "20"))
+    UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+    UPLOAD_MAX_ROWS = int(os.environ.get("UPLOAD_MAX_ROWS", "2000000"))
+    UPLOAD_CHUNK_ROWS = int(os.environ.get("UPLOAD_CHUNK_ROWS", "50000"))
+    BATCH_PREDICT_CHUNK_ROWS = int(os.environ.get("BATCH_PREDICT_CHUNK_ROWS", "50000"))
+    BATCH_PREDICT_WORKERS = int(os.environ.get("BATCH_PREDICT_WORKERS", "0"))
+    BATCH_INSERT_ROWS = int(os.environ.get("BATCH_INSERT_ROWS", "1000"))
+    BATCH_INSERT_COMMIT_ROWS = int(os.environ.get("BATCH_INSERT_COMMIT_ROWS", "50000"))
+    IMPUTE_STRATEGY = os.environ.get("IMPUTE_STRATEGY", "rf")
+    IMPUTE_MAX_ROWS = int(os.environ.get("IMPUTE_MAX_ROWS", "20000"))
+    IMPUTE_SCORE = os.environ.get("IMPUTE_SCORE", "1").lower() not in {"0", "false"}
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_TTL_SEC = int(os.environ.get("JOB_TTL_SEC", "86400"))
+    LOG_DETAIL_SAMPLE_ROWS = int(os.environ.get("LOG_DETAIL_SAMPLE_ROWS", "20"))
+    API_BATCH_CHUNK_ROWS = int(os.environ.get("API_BATCH_CHUNK_ROWS", "5000"))
+    UPLOAD_SESSION_TTL_SEC = int(os.environ.get("UPLOAD_SESSION_TTL_SEC", "86400"))
+    UPLOAD_USER_QUOTA_BYTES = int(os.environ.get("UPLOAD_USER_QUOTA_BYTES", str(2 * 1024 ** 3)))
+    UPLOAD_TOTAL_QUOTA_BYTES = int(os.environ.get("UPLOAD_TOTAL_QUOTA_BYTES", str(20 * 1024 ** 3)))
+    UPLOAD_SWEEP_INTERVAL_SEC = int(os.environ.get("UPLOAD_SWEEP_INTERVAL_SEC", "600"))
+    EDA_CACHE_ENTRIES = int(os.environ.get("EDA_CACHE_ENTRIES", "256"))
+    EDA_SKETCH_ROWS = int(os.environ.get("EDA_SKETCH_ROWS", "1000000"))
     AVATAR_UPLOAD_FOLDER = os.environ.get(
         "AVATAR_UPLOAD_FOLDER", str(BASE_DIR / "static" / "avatars")
     )
@@ -5,4 +5,6 @@ Application route modules.
 
 routes/predict.py - Prediction API/UI routes
 routes/debug.py - Debug/dev routes
+routes/jobs.py - Background job status routes
+routes/batch_api.py - Streaming batch prediction API
 """
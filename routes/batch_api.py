@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import gzip
+import itertools
+
+import pandas as pd
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_login import login_required
+
+from auth.decorators import require_module_access
+from services.bulk_insert import BulkInserter, prediction_rows
+from services.data import INPUT_COLUMNS
+from services.security import csrf_protect_api, get_csrf_token
+from services.stream_predict import (
+    MIMETYPES,
+    StreamFormatError,
+    read_chunks,
+    score_chunk,
+    serialize,
+    stream_format,
+)
+
+
+batch_api_bp = Blueprint("batch_api", __name__, url_prefix="/api/batch")
+
+
+@batch_api_bp.get("/predict")
+@login_required
+@require_module_access("Batch")
+def batch_predict_info():
+    """Describe the streaming endpoint and hand out the session's CSRF token."""
+    return jsonify(
+        {
+            "ok": True,
+            "columns": INPUT_COLUMNS,
+            "formats": MIMETYPES,
+            "chunk_rows": current_app.config.get("API_BATCH_CHUNK_ROWS", 5000),
+            "csrf_token": get_csrf_token(),
+        }
+    )
+
+
+@batch_api_bp.post("/predict")
+@login_required
+@require_module_access("Batch")
+@csrf_protect_api
+def batch_predict():
+    """Score a CSV or NDJSON body and stream the predictions back.
+
+    The body is read ``API_BATCH_CHUNK_ROWS`` rows at a time (optionally
+    ``Content-Encoding: gzip``) and each chunk's results are written to the
+    response before the next chunk is read. The result format follows
+    ``?format=``, then ``Accept``, then the request format. ``?persist=1``
+    also saves the scored rows as predictions, committed chunk by chunk.
+    """
+    active = current_app.model_registry.active()
+    if active is None:
+        return jsonify({"ok": False, "error": "Model not loaded"}), 503
+    in_fmt = stream_format(request.mimetype)
+    if in_fmt is None:
+        return jsonify({"ok": False, "error": "Send text/csv or application/x-ndjson"}), 415
+    accepted = (stream_format(mimetype) for mimetype, _q in request.accept_mimetypes)
+    out_fmt = request.args.get("format") or next((f for f in accepted if f), None) or in_fmt
+    if out_fmt not in MIMETYPES:
+        return jsonify({"ok": False, "error": f"Unsupported format: {out_fmt}"}), 400
+
+    stream = request.stream
+    if (request.content_encoding or "").lower() == "gzip":
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    chunks = read_chunks(stream, in_fmt, current_app.config.get("API_BATCH_CHUNK_ROWS", 5000))
+    try:
+        # Read the first chunk now so a malformed body is a plain 400.
+        first = next(chunks, None)
+    except (StreamFormatError, ValueError, OSError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    inserter = None
+    if request.args.get("persist") == "1":
+        inserter = BulkInserter(
+            current_app.db.session,
+            current_app.Prediction,
+            batch_size=current_app.config.get("BATCH_INSERT_ROWS", 1000),
+        )
+
+    def _save(scored: pd.DataFrame) -> list:
+        ids = inserter.insert(prediction_rows(scored, active.version))
+        inserter.commit()
+        return ids
+
+    def generate():
+        start = 0
+        columns = None
+        try:
+            for chunk in itertools.chain([first] if first is not None else [], chunks):
+                out = score_chunk(
+                    chunk,
+                    start,
+                    model=active.model,
+                    version=active.version,
+                    cache=current_app.prediction_cache,
+                    on_scored=_save if inserter is not None else None,
+                )
+                header = columns is None
+                if header:
+                    columns = out.columns
+                elif out_fmt == "csv":
+                    # NDJSON chunks may carry different keys; CSV rows must
+                    # line up with the header written with the first chunk.
+                    out = out.reindex(columns=columns)
+                yield serialize(out, out_fmt, header=header)
+                start += len(chunk)
+        except Exception as e:
+            # The status line is already sent; report the failure in-band.
+            current_app.logger.exception("Streaming batch prediction failed at row %d", start)
+            if inserter is not None:
+                current_app.db.session.rollback()
+            error = pd.DataFrame({"row": [start], "error": [f"{type(e).__name__}: {e}"]})
+            if columns is not None and out_fmt == "csv":
+                error = error.reindex(columns=columns)
+            yield serialize(error, out_fmt, header=columns is None)
+
+    return Response(stream_with_context(generate()), mimetype=MIMETYPES[out_fmt])
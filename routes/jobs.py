@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from flask import Blueprint, current_app, jsonify, send_file, url_for
+from flask_login import current_user, login_required
+
+from services.jobs import DONE, RUNNING
+from services.security import csrf_protect_api
+
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+def _public(record: dict) -> dict:
+    """Return the fields of a job record the client may see."""
+    result = record.get("result") or {}
+    out = {
+        k: record.get(k)
+        for k in ("id", "kind", "status", "progress", "done", "total", "message", "error",
+                  "cancellable", "cancel_requested", "created_at", "updated_at")
+    }
+    if record.get("status") == DONE:
+        out["result_url"] = url_for("jobs.job_result", job_id=record["id"])
+        out["redirect"] = result.get("redirect")
+        out["has_file"] = bool(result.get("file"))
+    return out
+
+
+def _own_job(job_id: str):
+    record = current_app.job_runner.status(job_id)
+    if record is None or record.get("owner") != current_user.id:
+        return None
+    return record
+
+
+@jobs_bp.get("/<job_id>")
+@login_required
+def job_status(job_id: str):
+    """Return status and progress of one of the current user's jobs."""
+    record = _own_job(job_id)
+    if record is None:
+        return jsonify({"ok": False, "error": "Job not found"}), 404
+    return jsonify({"ok": True, **_public(record)})
+
+
+@jobs_bp.get("/<job_id>/result")
+@login_required
+def job_result(job_id: str):
+    """Send a finished job's file, or its JSON result."""
+    record = _own_job(job_id)
+    if record is None:
+        return jsonify({"ok": False, "error": "Job not found"}), 404
+    if record.get("status") != DONE:
+        return jsonify({"ok": False, "error": "Job not finished", **_public(record)}), 409
+    result = record.get("result") or {}
+    if result.get("file"):
+        return send_file(
+            result["file"],
+            as_attachment=True,
+            download_name=result.get("download_name"),
+            mimetype=result.get("mimetype"),
+        )
+    return jsonify({"ok": True, "result": result})
+
+
+@jobs_bp.post("/<job_id>/cancel")
+@login_required
+@csrf_protect_api
+def job_cancel(job_id: str):
+    """Ask a queued or running job to stop."""
+    record = _own_job(job_id)
+    if record is None:
+        return jsonify({"ok": False, "error": "Job not found"}), 404
+    if not current_app.job_runner.cancel(job_id):
+        if record.get("status") == RUNNING:
+            return jsonify({"ok": False, "error": "This job can't be cancelled once it has started"}), 409
+        return jsonify({"ok": False, "error": f"Job already {record.get('status')}"}), 409
+    return jsonify({"ok": True, **_public(current_app.job_runner.status(job_id))}), 202
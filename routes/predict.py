@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import pandas as pd
 from flask import (
     Blueprint,
     render_template,
@@ -20,6 +19,7 @@ from services.data import (
     NUMERIC_COLS,
     CATEGORICAL_COLS,
 )
+from services.inference import predict_one
 from services.simulation import simulate_risk_over_time
 
 
@@ -59,10 +59,11 @@ def predict():
     # module, which can create a secondary Flask application instance.
     db = current_app.db
     Prediction = current_app.Prediction
-    model = current_app.model
-    model_name = current_app.model_name
+    # Take one snapshot so a concurrent model swap cannot split this request
+    # across versions.
+    active = current_app.model_registry.active()
 
-    if model is None:
+    if active is None:
         flash("Model not loaded. Please place ml/model.pkl and restart the app.", "error")
         return redirect(url_for("index"))
 
@@ -100,12 +101,18 @@ def predict():
     fbs_val = float(cleaned["fasting_blood_sugar"])
     row = {col: cleaned[col] for col in INPUT_COLUMNS}
     row["fasting_blood_sugar"] = int(fbs_val >= 120)
-    X = pd.DataFrame([row], columns=INPUT_COLUMNS)
 
     try:
-        yhat = int(model.predict(X)[0])
-        pos_prob = float(model.predict_proba(X)[0][1]) if hasattr(model, "predict_proba") else None
-        confidence = pos_prob if yhat == 1 else (1.0 - pos_prob) if pos_prob is not None else 0.5
+        result = predict_one(
+            active.model,
+            row,
+            version=active.version,
+            cache=current_app.prediction_cache,
+            batcher=current_app.inference_batcher,
+        )
+        yhat = result["label"]
+        pos_prob = result["pos_prob"]
+        confidence = result["confidence"]
         confidence_pct_val = round(confidence * 100, 1)
     except Exception as e:
         flash(f"Prediction failed: {e}", "error")
@@ -128,7 +135,7 @@ def predict():
         thalassemia_type=str(cleaned["thalassemia_type"]),
         prediction=yhat,
         confidence=float(confidence),
-        model_version=model_name
+        model_version=active.version
     )
 
     db.session.add(pred)
@@ -144,7 +151,14 @@ def predict():
         rp = risk_pct_val
         risk_band = "Low" if rp < 30 else "Moderate" if rp < 60 else "High"
 
-    projection = simulate_risk_over_time(model, row, int(cleaned["age"]), 90)
+    projection = simulate_risk_over_time(
+        active.model,
+        row,
+        int(cleaned["age"]),
+        90,
+        version=active.version,
+        cache=current_app.prediction_cache,
+    )
 
     return render_template(
         "predict/result.html",
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+"""Chunked, optionally parallel scoring of cleaned upload datasets.
+
+:func:`score_dataset` reads the session's cleaned frame (see
+:mod:`services.frame_store`) in fixed-size chunks, scores them on a process
+pool whose workers each unpickle the model once, and appends the results to
+the results frame in the original row order. At most ``2 * workers`` chunks
+are in flight, so memory stays bounded by the chunk size rather than the
+dataset size. Datasets that fit in a single chunk (or ``workers=1``) are
+scored in-process on the already loaded model.
+
+The pool is created once per process and reused by later requests; it is
+only replaced when the model artifact or worker count changes, or after a
+worker died. Workers are started with ``spawn`` so they never inherit the
+locks held by the server's threads (micro-batcher, sweepers, job pool), and
+the pool is shut down at interpreter exit.
+"""
+
+import atexit
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data import INPUT_COLUMNS
+from .frame_store import FrameWriter, frame_rows, iter_frames
+from .inference import predict_frame
+from .prediction_cache import PredictionCache
+
+ProgressFn = Callable[[int, int], None]
+ChunkFn = Callable[[pd.DataFrame], Optional[pd.DataFrame]]
+
+_WORKER_MODEL = None
+
+
+def _init_worker(model_path: str) -> None:
+    """Load the model once per worker process."""
+    global _WORKER_MODEL
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    # The forest already runs one tree job per core; inside a pool that
+    # would oversubscribe the machine.
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(est, "n_jobs"):
+        est.n_jobs = 1
+    _WORKER_MODEL = model
+
+
+def _score_chunk(X: pd.DataFrame):
+    return predict_frame(_WORKER_MODEL, X)
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_KEY: Optional[Tuple[str, int]] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(model_path: str, workers: int) -> ProcessPoolExecutor:
+    """Return the shared pool for ``model_path``, creating it if needed."""
+    global _POOL, _POOL_KEY
+    key = (os.path.abspath(model_path), workers)
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_KEY != key:
+            if _POOL is not None:
+                # Requests still using the old pool finish their chunks.
+                _POOL.shutdown(wait=False)
+            _POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_path,),
+            )
+            _POOL_KEY = key
+        return _POOL
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop ``pool`` if it is still the shared one (e.g. after it broke)."""
+    global _POOL, _POOL_KEY
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL, _POOL_KEY = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool() -> None:
+    """Shut the shared pool down; the next parallel run starts a new one."""
+    global _POOL, _POOL_KEY
+    with _POOL_LOCK:
+        pool, _POOL, _POOL_KEY = _POOL, None, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Return a concrete worker count; ``None``/``0`` means one per CPU."""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def _finish_chunk(
+    chunk: pd.DataFrame,
+    labels: np.ndarray,
+    probs: Optional[np.ndarray],
+    version: str,
+    on_chunk: Optional[ChunkFn],
+) -> pd.DataFrame:
+    if probs is None:
+        probs = np.full(len(chunk), np.nan)
+    chunk["prediction"] = np.asarray(labels).astype(int)
+    chunk["positive_probability"] = np.asarray(probs, dtype=float)
+    if on_chunk is not None:
+        chunk = on_chunk(chunk)
+    chunk["model_version"] = version
+    chunk["confidence"] = np.where(
+        chunk["prediction"] == 1,
+        chunk["positive_probability"],
+        1 - chunk["positive_probability"],
+    )
+    return chunk
+
+
+def score_dataset(
+    clean_path: str,
+    results_path: str,
+    *,
+    model,
+    version: str,
+    model_path: Optional[str] = None,
+    chunk_size: int = 50000,
+    workers: Optional[int] = None,
+    cache: Optional[PredictionCache] = None,
+    on_chunk: Optional[ChunkFn] = None,
+    progress: Optional[ProgressFn] = None,
+) -> Dict[str, object]:
+    """Score the frame at ``clean_path`` into ``results_path`` chunk by chunk.
+
+    Parameters
+    ----------
+    model, version : object, str
+        Active model and its registry version. ``model`` scores in-process
+        chunks; workers load ``model_path`` instead.
+    model_path : str, optional
+        Pickled artifact for pool workers. Without it scoring is sequential.
+    chunk_size : int
+        Rows per chunk.
+    workers : int, optional
+        Pool size; ``None``/``0`` uses one process per CPU.
+    cache : PredictionCache, optional
+        Used for in-process scoring only.
+    on_chunk : callable, optional
+        Called in row order with each scored chunk (``prediction`` and
+        ``positive_probability`` filled in) before it is written; may return
+        a replacement frame, e.g. with database ids added.
+    progress : callable, optional
+        ``progress(rows_done, rows_total)`` after each written chunk.
+
+    The results frame is only published once every chunk has been written.
+
+    Returns
+    -------
+    dict
+        ``rows``, ``chunks``, ``workers`` (1 when sequential) and
+        ``predicted_positive``.
+    """
+    chunk_size = max(1, int(chunk_size))
+    total = frame_rows(clean_path)
+    reader: Iterator[pd.DataFrame] = iter_frames(clean_path, chunk_size)
+    first = next(reader, None)
+    second = next(reader, None) if first is not None else None
+    n_workers = resolve_workers(workers)
+    parallel = second is not None and n_workers > 1 and model_path is not None
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        for c in (first, second):
+            if c is not None:
+                yield c
+        yield from reader
+
+    done = n_chunks = positives = 0
+
+    with FrameWriter(results_path) as writer:
+
+        def write(chunk: pd.DataFrame) -> None:
+            nonlocal done, n_chunks, positives
+            writer.append(chunk)
+            done += len(chunk)
+            n_chunks += 1
+            positives += int((chunk["prediction"] == 1).sum())
+            if progress is not None:
+                progress(done, total)
+
+        if first is None:
+            writer.append(pd.DataFrame(columns=INPUT_COLUMNS))
+        elif not parallel:
+            for chunk in chunks():
+                labels, probs = predict_frame(
+                    model, chunk[INPUT_COLUMNS], version=version, cache=cache
+                )
+                write(_finish_chunk(chunk, labels, probs, version, on_chunk))
+        else:
+            pool = _get_pool(model_path, n_workers)
+            pending: deque = deque()
+            try:
+                for chunk in chunks():
+                    pending.append((chunk, pool.submit(_score_chunk, chunk[INPUT_COLUMNS])))
+                    if len(pending) >= 2 * n_workers:
+                        chunk0, fut = pending.popleft()
+                        write(_finish_chunk(chunk0, *fut.result(), version, on_chunk))
+                while pending:
+                    chunk0, fut = pending.popleft()
+                    write(_finish_chunk(chunk0, *fut.result(), version, on_chunk))
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                raise
+            finally:
+                # Don't leave this run's chunks queued ahead of the next one.
+                for _chunk, fut in pending:
+                    fut.cancel()
+
+    return {
+        "rows": done,
+        "chunks": n_chunks,
+        "workers": n_workers if parallel else 1,
+        "predicted_positive": positives,
+    }
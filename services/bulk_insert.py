@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+"""Bulk persistence of batch predictions.
+
+:class:`BulkInserter` writes rows with chunked ``executemany`` INSERTs and
+reads the generated primary keys back in the same statement
+(``INSERT ... RETURNING`` with parameter-order sorting), so one round-trip
+covers a whole batch instead of one INSERT and flush per row. It commits
+every ``commit_rows`` rows, which bounds how long a transaction holds the
+database lock on large uploads. :meth:`BulkInserter.discard` removes a
+partly committed batch again when the run fails.
+
+:func:`prediction_rows` converts a scored chunk into ``Prediction`` column
+values with the same conversions the per-row ORM path applied.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert
+
+# ``Prediction`` attribute -> results column, grouped by conversion
+_INT_COLS = {"age": "age", "sex": "sex", "prediction": "prediction"}
+_OPTIONAL_INT_COLS = {
+    "fasting_blood_sugar": "fasting_blood_sugar",
+    "exercise_angina": "exercise_induced_angina",
+    "num_major_vessels": "num_major_vessels",
+}
+_FLOAT_COLS = {
+    "resting_bp": "resting_blood_pressure",
+    "cholesterol": "cholesterol",
+    "max_heart_rate": "max_heart_rate_achieved",
+    "oldpeak": "st_depression",
+}
+_STR_COLS = {
+    "chest_pain_type": "chest_pain_type",
+    "resting_ecg": "Restecg",
+    "st_slope": "st_slope_type",
+    "thalassemia_type": "thalassemia_type",
+}
+
+
+def _floats(s: pd.Series) -> np.ndarray:
+    return pd.to_numeric(s, errors="raise").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _ints(s: pd.Series) -> List[int]:
+    vals = _floats(s)
+    if np.isnan(vals).any():
+        raise ValueError(f"cannot convert float NaN to integer ({s.name})")
+    return np.trunc(vals).astype(np.int64).tolist()
+
+
+def _optional_ints(s: pd.Series) -> List[Optional[int]]:
+    return [None if np.isnan(v) else int(v) for v in _floats(s).tolist()]
+
+
+def prediction_rows(chunk: pd.DataFrame, model_version: Optional[str]) -> List[Dict[str, object]]:
+    """Return ``Prediction`` column values for every row of a scored chunk.
+
+    Integers are truncated like ``int()``, optional integer columns that are
+    missing from ``chunk`` or NaN become ``None``, and categorical values are
+    stored as ``str()``. ``confidence`` is the probability of the predicted
+    class (0.5 without a probability).
+    """
+    n = len(chunk)
+    cols: Dict[str, list] = {name: _ints(chunk[src]) for name, src in _INT_COLS.items()}
+    for name, src in _OPTIONAL_INT_COLS.items():
+        cols[name] = _optional_ints(chunk[src]) if src in chunk.columns else [None] * n
+    for name, src in _FLOAT_COLS.items():
+        cols[name] = _floats(chunk[src]).tolist()
+    for name, src in _STR_COLS.items():
+        cols[name] = [str(v) for v in chunk[src].tolist()]
+
+    prob = _floats(chunk["positive_probability"])
+    conf = np.where(np.asarray(cols["prediction"]) == 1, prob, 1.0 - prob)
+    cols["confidence"] = np.where(np.isnan(prob), 0.5, conf).tolist()
+    cols["model_version"] = [model_version] * n
+
+    names = list(cols)
+    return [dict(zip(names, values)) for values in zip(*(cols[c] for c in names))]
+
+
+class BulkInserter:
+    """Insert ORM rows in ``batch_size`` executemany batches.
+
+    ``insert`` returns the generated primary keys in input order. The session
+    is committed whenever ``commit_rows`` rows have been written since the
+    last commit (``0`` leaves committing to the caller); call :meth:`commit`
+    once at the end, or :meth:`discard` to undo the whole run.
+    """
+
+    def __init__(self, session, model, *, batch_size: int = 1000, commit_rows: int = 0):
+        self.session = session
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.commit_rows = max(0, int(commit_rows))
+        self.rows = 0
+        self.seconds = 0.0
+        self._uncommitted = 0
+        self._ids: List[np.ndarray] = []
+        self._pk = pk = model.__mapper__.primary_key[0]
+        self._stmt = insert(model).returning(pk, sort_by_parameter_order=True)
+
+    def _insert_batch(self, batch: Sequence[Dict[str, object]]) -> List[int]:
+        dialect = self.session.get_bind().dialect
+        if getattr(dialect, "insert_executemany_returning_sort_by_parameter_order", False):
+            return list(self.session.execute(self._stmt, list(batch)).scalars())
+        # Backends without ordered RETURNING for executemany: one statement per
+        # row, still without ORM flushes.
+        return [self.session.execute(self._stmt, row).scalar_one() for row in batch]
+
+    def insert(self, rows: Sequence[Dict[str, object]]) -> List[int]:
+        """Insert ``rows`` and return their primary keys in the same order."""
+        t0 = time.perf_counter()
+        ids: List[int] = []
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            ids.extend(self._insert_batch(batch))
+            self._uncommitted += len(batch)
+            if self.commit_rows and self._uncommitted >= self.commit_rows:
+                self.commit()
+        self.rows += len(rows)
+        self.seconds += time.perf_counter() - t0
+        self._ids.append(np.asarray(ids, dtype=np.int64))
+        return ids
+
+    def commit(self) -> None:
+        self.session.commit()
+        self._uncommitted = 0
+
+    def discard(self) -> int:
+        """Roll back and delete every row inserted so far; returns how many.
+
+        Rows from earlier intermediate commits are deleted by primary key in
+        ``batch_size`` chunks, so a failed run leaves no partial batch.
+        """
+        self.session.rollback()
+        ids = np.concatenate(self._ids).tolist() if self._ids else []
+        for start in range(0, len(ids), self.batch_size):
+            self.session.execute(delete(self.model).where(self._pk.in_(ids[start:start + self.batch_size])))
+        self.session.commit()
+        self._ids = []
+        self._uncommitted = 0
+        return len(ids)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Set, Union
 
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.experimental import enable_iterative_imputer  # noqa: F401
-from sklearn.impute import IterativeImputer
-from sklearn.metrics import accuracy_score
+from sklearn.impute import IterativeImputer, KNNImputer
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
@@ -126,15 +127,20 @@ COLUMN_ALIASES = {
 # Helper functions
 # ---------------------------
 
+_YES_NO_TABLE = {
+    "1": 1, "true": 1, "t": 1, "yes": 1, "y": 1,
+    "0": 0, "false": 0, "f": 0, "no": 0, "n": 0,
+}
+_SEX_TABLE = {"male": 1, "m": 1, "1": 1, "female": 0, "f": 0, "0": 0}
+
+
 def _yes_no_to_binary(x):
     """Convert yes/no style values to binary."""
     if pd.isna(x):
         return None
     s = str(x).strip().lower()
-    if s in {"1", "true", "t", "yes", "y"}:
-        return 1
-    if s in {"0", "false", "f", "no", "n"}:
-        return 0
+    if s in _YES_NO_TABLE:
+        return _YES_NO_TABLE[s]
     try:
         v = float(s)
         return 1 if v >= 1 else 0
@@ -147,10 +153,8 @@ def _sex_to_binary(x):
     if pd.isna(x):
         return None
     s = str(x).strip().lower()
-    if s in {"male", "m", "1"}:
-        return 1
-    if s in {"female", "f", "0"}:
-        return 0
+    if s in _SEX_TABLE:
+        return _SEX_TABLE[s]
     try:
         v = float(s)
         return 1 if int(round(v)) == 1 else 0
@@ -162,19 +166,102 @@ def _normalize_key(val: object) -> str:
     return re.sub(r"[_\s-]", "", str(val).strip().lower())
 
 
+class _CategoryMapper:
+    """Map raw category values through ``mapping``, with lookups built once.
+
+    Numeric values are looked up directly; anything else is matched on its
+    normalised key (case, spaces, ``_`` and ``-`` ignored). Unmapped values
+    whose key matches one of ``fallback_allowed`` come back as that allowed
+    value, the rest as ``None``.
+    """
+
+    def __init__(self, mapping, fallback_allowed=None):
+        self.mapping = mapping
+        self.norm_lookup = {_normalize_key(k): v for k, v in mapping.items()}
+        self.allowed = {_normalize_key(v): v for v in fallback_allowed or ()}
+
+    def __call__(self, x):
+        if pd.isna(x):
+            return None
+        if isinstance(x, (int, float)) and x in self.mapping:
+            return self.mapping[x]
+        s = _normalize_key(x).replace("reversabledefect", "reversibledefect")
+        if s in self.norm_lookup:
+            return self.norm_lookup[s]
+        return self.allowed.get(s)
+
+
 def _map_with_dict(x, mapping, fallback_allowed=None):
-    if pd.isna(x):
-        return None
-    if isinstance(x, (int, float)) and x in mapping:
-        return mapping[x]
-    s = _normalize_key(x).replace("reversabledefect", "reversibledefect")
-    norm_map = {(_normalize_key(k), v) for k, v in mapping.items()}
-    norm_lookup = dict(norm_map)
-    if s in norm_lookup:
-        return norm_lookup[s]
-    if fallback_allowed and s in {_normalize_key(v) for v in fallback_allowed}:
-        return s
-    return None
+    return _CategoryMapper(mapping, fallback_allowed)(x)
+
+
+CATEGORY_MAPPERS = {
+    "chest_pain_type": _CategoryMapper(CP_MAP_NUM, CATEGORICAL_ALLOWED["chest_pain_type"]),
+    "Restecg": _CategoryMapper(RESTECG_MAP_NUM, CATEGORICAL_ALLOWED["Restecg"]),
+    "st_slope_type": _CategoryMapper(SLOPE_MAP_NUM, CATEGORICAL_ALLOWED["st_slope_type"]),
+    "thalassemia_type": _CategoryMapper(THAL_MAP_NUM, CATEGORICAL_ALLOWED["thalassemia_type"]),
+}
+
+
+def _map_unique(s: pd.Series, fn) -> pd.Series:
+    """Return ``s.apply(fn)`` while calling ``fn`` once per distinct value.
+
+    The column is factorised, ``fn`` is applied to the first row of each code
+    and the results are broadcast back through the codes. Object columns are
+    also keyed on the Python type, so values that compare equal across types
+    (``1``, ``1.0``, ``True``) still reach ``fn`` separately as they would per
+    cell. Because the representatives produce the same set of results, the
+    dtype pandas infers matches the per-cell ``apply``.
+    """
+    if s.empty or isinstance(s.dtype, pd.CategoricalDtype):
+        return s.apply(fn)
+    codes, _ = pd.factorize(s, use_na_sentinel=False)
+    if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) != "string":
+        kinds, _ = pd.factorize(s.map(type))
+        codes, _ = pd.factorize(codes.astype(np.int64) * (int(kinds.max()) + 1) + kinds)
+    # Codes are numbered in order of first appearance.
+    first = np.flatnonzero(~pd.Series(codes).duplicated().to_numpy())
+    mapped = s.iloc[first].apply(fn)
+    return pd.Series(mapped.to_numpy()[codes], index=s.index, name=s.name)
+
+
+def _to_int(v):
+    return None if pd.isna(v) or str(v).strip() == "" else int(round(float(v)))
+
+
+def _to_float(v):
+    return None if pd.isna(v) or str(v).strip() == "" else float(v)
+
+
+def _coerce_int_series(s: pd.Series) -> pd.Series:
+    """Round ``s`` to integers; missing or blank values become missing.
+
+    Plain numeric columns are converted with NumPy (``np.round`` rounds half
+    to even like ``round``); other dtypes go through :func:`_map_unique`.
+    Either way the result equals ``s.apply(_to_int)``: ``int64`` when nothing
+    is missing, otherwise ``float64`` with ``NaN``.
+    """
+    kind = s.dtype.kind if isinstance(s.dtype, np.dtype) else None
+    if kind in ("b", "i"):
+        return s.astype(np.int64)
+    if kind == "f":
+        vals = s.to_numpy(dtype=np.float64)
+        missing = np.isnan(vals)
+        present = vals[~missing]
+        if present.size and np.abs(present).max() < 2 ** 62:
+            rounded = np.round(vals) + 0.0  # drop the sign of -0.0
+            if missing.any():
+                return pd.Series(rounded, index=s.index, name=s.name)
+            return pd.Series(rounded.astype(np.int64), index=s.index, name=s.name)
+    return _map_unique(s, _to_int)
+
+
+def _coerce_float_series(s: pd.Series) -> pd.Series:
+    """Convert ``s`` to floats; equals ``s.apply(_to_float)``."""
+    kind = s.dtype.kind if isinstance(s.dtype, np.dtype) else None
+    if kind in ("b", "i") or (kind == "f" and s.notna().any()):
+        return s.astype(np.float64)
+    return _map_unique(s, _to_float)
 
 
 def normalize_log(log: List[Union[dict, str]]) -> List[dict]:
@@ -253,88 +340,102 @@ def find_optional_in_raw(df: pd.DataFrame, internal_name: str) -> str | None:
     return None
 
 
+IMPUTE_STRATEGIES = ("rf", "rf_parallel", "iterative", "knn", "median")
+IMPUTE_CATEGORICAL = [
+    "sex", "fasting_blood_sugar", "exercise_induced_angina",
+    "chest_pain_type", "Restecg", "st_slope_type", "thalassemia_type",
+]
+_LABEL_COLS = ("target", "prediction")
+
+
+def _mode(s: pd.Series):
+    mode_val = s.mode(dropna=True)
+    return mode_val.iloc[0] if len(mode_val) else s.dropna().iloc[0]
+
+
+def _sample_index(index: pd.Index, max_rows: int, random_state: int) -> pd.Index:
+    """Return at most ``max_rows`` labels of ``index`` (all when ``max_rows`` is 0)."""
+    if max_rows and len(index) > max_rows:
+        rng = np.random.default_rng(random_state)
+        return index[np.sort(rng.choice(len(index), size=max_rows, replace=False))]
+    return index
+
+
+def _predictors(df: pd.DataFrame, target_col: str) -> pd.DataFrame:
+    """Encode every column except ``target_col`` as floats with medians for gaps."""
+    drop = [target_col] + [c for c in _LABEL_COLS if c in df.columns]
+    X, _ = _encode_frame_for_ml(df.drop(columns=drop))
+    X = X.apply(pd.to_numeric, errors="coerce").astype(float)
+    return X.fillna(X.median()).fillna(0.0)
+
+
+def _fit(est, X, y, score: bool, random_state: int):
+    """Fit ``est``; with ``score`` hold out 20% and return its score on it."""
+    if score and len(X) >= 5:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=random_state)
+        est.fit(X_train, y_train)
+        try:
+            return est.score(X_test, y_test)
+        except Exception:
+            return None
+    est.fit(X, y)
+    return None
+
+
 def impute_categorical_missing(
     df: pd.DataFrame,
     target_col: str,
     bool_cols: Set[str] | None = None,
     log: List[str] | None = None,
+    *,
+    max_rows: int = 0,
+    score: bool = True,
+    n_jobs: int | None = -1,
+    random_state: int = 42,
 ) -> pd.Series:
-    """Impute a categorical/binary column using RandomForest + IterativeImputer."""
+    """Impute a categorical/binary column with a RandomForest classifier.
+
+    The forest is trained on at most ``max_rows`` observed rows (``0`` = all)
+    using the other columns, label-encoded and median-filled, as predictors.
+    ``score=False`` skips the hold-out accuracy reported in the log.
+    """
     if bool_cols is None:
         bool_cols = set()
-    df_null = df[df[target_col].isna()]
-    df_not_null = df[df[target_col].notna()]
-    if df_null.empty:
+    missing = df[target_col].isna()
+    n_missing = int(missing.sum())
+    if not n_missing:
         return df[target_col]
+    observed = df.loc[~missing, target_col]
 
-    drop_cols = {target_col}
-    for lab_col in ("target", "prediction"):
-        if lab_col in df.columns:
-            drop_cols.add(lab_col)
-
-    if len(df_not_null) == 0:
+    if observed.empty:
         fillv = 0 if target_col in bool_cols else "_missing_"
         if log is not None:
-            log.append(f"{target_col}: all values missing; filled {len(df_null)} NaNs with '{fillv}'.")
+            log.append(f"{target_col}: all values missing; filled {n_missing} NaNs with '{fillv}'.")
         return pd.Series([fillv] * len(df), index=df.index)
 
-    y = df_not_null[target_col].copy()
-    if len(df_not_null) < 2 or y.nunique(dropna=True) < 2:
-        mode_val = y.mode(dropna=True)
-        fillv = mode_val.iloc[0] if len(mode_val) else y.dropna().iloc[0]
+    if len(observed) < 2 or observed.nunique(dropna=True) < 2:
+        fillv = _mode(observed)
         if log is not None:
-            log.append(f"{target_col}: insufficient data; filled {len(df_null)} NaNs with mode '{fillv}'.")
+            log.append(f"{target_col}: insufficient data; filled {n_missing} NaNs with mode '{fillv}'.")
         return df[target_col].fillna(fillv)
 
-    X = df_not_null.drop(columns=list(drop_cols))
-    X_enc, _ = _encode_frame_for_ml(X)
-
-    y_enc = y.copy()
-    y_was_encoded = False
-    if (y.dtype == "object") or str(y.dtype).startswith("category") or (target_col in bool_cols):
-        y_le = LabelEncoder()
-        y_le.fit(y_enc.astype(str).fillna("_nan_"))
-        y_enc = pd.Series(y_le.transform(y_enc.astype(str).fillna("_nan_")), index=y.index)
-        y_was_encoded = True
-
-    iter_imp = IterativeImputer(estimator=RandomForestRegressor(random_state=42), add_indicator=True, random_state=42)
+    X = _predictors(df, target_col)
+    train = _sample_index(observed.index, max_rows, random_state)
+    codes, classes = pd.factorize(observed.loc[train])
+    clf = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs)
     try:
-        X_imp = pd.DataFrame(iter_imp.fit_transform(X_enc), index=X_enc.index, columns=X_enc.columns)
+        acc = _fit(clf, X.loc[train], codes, score, random_state)
     except Exception:
-        X_imp = X_enc.fillna(X_enc.median(numeric_only=True))
-
-    X_train, X_test, y_train, y_test = train_test_split(X_imp, y_enc, test_size=0.2, random_state=42)
-    clf = RandomForestClassifier(random_state=42, n_jobs=-1)
-    try:
-        clf.fit(X_train, y_train)
-        try:
-            acc = accuracy_score(y_test, clf.predict(X_test))
-            if log is not None:
-                log.append(f"{target_col}: categorical imputed with RF (acc≈{acc:.3f}, n_missing={len(df_null)}).")
-        except Exception:
-            if log is not None:
-                log.append(f"{target_col}: categorical imputed with RF (n_missing={len(df_null)}).")
-    except Exception:
-        mode_val = y.mode(dropna=True)
-        fillv = mode_val.iloc[0] if len(mode_val) else y.dropna().iloc[0]
+        fillv = _mode(observed)
         if log is not None:
-            log.append(f"{target_col}: RF failed; filled {len(df_null)} NaNs with mode '{fillv}'.")
+            log.append(f"{target_col}: RF failed; filled {n_missing} NaNs with mode '{fillv}'.")
         return df[target_col].fillna(fillv)
 
-    Xn = df_null.drop(columns=list(drop_cols))
-    Xn_enc, _ = _encode_frame_for_ml(Xn)
-    try:
-        Xn_imp = pd.DataFrame(iter_imp.transform(Xn_enc), index=Xn_enc.index, columns=Xn_enc.columns)
-    except Exception:
-        Xn_imp = Xn_enc.fillna(Xn_enc.median(numeric_only=True))
-
-    pred_enc = pd.Series(clf.predict(Xn_imp), index=Xn_imp.index)
-    if y_was_encoded:
-        pred = pd.Series(y_le.inverse_transform(pred_enc.astype(int)), index=pred_enc.index).replace({"_nan_": np.nan})
-    else:
-        pred = pred_enc
+    if log is not None:
+        acc_note = f"acc≈{acc:.3f}, " if acc is not None else ""
+        log.append(f"{target_col}: categorical imputed with RF ({acc_note}n_missing={n_missing}).")
     out = df[target_col].copy()
-    out.loc[df_null.index] = pred
+    out.loc[missing] = classes.take(clf.predict(X.loc[missing])).to_numpy()
     return out
 
 
@@ -342,121 +443,235 @@ def impute_continuous_missing(
     df: pd.DataFrame,
     target_col: str,
     log: List[str] | None = None,
+    *,
+    max_rows: int = 0,
+    score: bool = True,
+    n_jobs: int | None = -1,
+    random_state: int = 42,
 ) -> pd.Series:
-    """Impute a continuous column using RandomForest + IterativeImputer."""
-    df_null = df[df[target_col].isna()]
-    df_not_null = df[df[target_col].notna()]
-    if df_null.empty:
-        return df[target_col]
+    """Impute a continuous column with a RandomForest regressor.
 
-    drop_cols = {target_col}
-    for lab_col in ("target", "prediction"):
-        if lab_col in df.columns:
-            drop_cols.add(lab_col)
-
-    X = df_not_null.drop(columns=list(drop_cols))
-    y = df_not_null[target_col].astype(float)
-    X_enc, _ = _encode_frame_for_ml(X)
-
-    iter_imp = IterativeImputer(estimator=RandomForestRegressor(random_state=42), add_indicator=True, random_state=42)
-    try:
-        X_imp = pd.DataFrame(iter_imp.fit_transform(X_enc), index=X_enc.index, columns=X_enc.columns)
-    except Exception:
-        X_imp = X_enc.fillna(X_enc.median(numeric_only=True))
+    Trained like :func:`impute_categorical_missing`; ``score`` reports the
+    hold-out r2.
+    """
+    missing = df[target_col].isna()
+    n_missing = int(missing.sum())
+    if not n_missing:
+        return df[target_col]
+    y = pd.to_numeric(df.loc[~missing, target_col], errors="coerce").astype(float)
+    if y.empty:
+        if log is not None:
+            log.append(f"{target_col}: all values missing; left {n_missing} NaNs.")
+        return df[target_col]
 
-    X_train, X_test, y_train, y_test = train_test_split(X_imp, y, test_size=0.2, random_state=42)
-    reg = RandomForestRegressor(random_state=42, n_jobs=-1)
+    X = _predictors(df, target_col)
+    train = _sample_index(y.index, max_rows, random_state)
+    reg = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs)
     try:
-        reg.fit(X_train, y_train)
-        try:
-            r2 = reg.score(X_test, y_test)
-            if log is not None:
-                log.append(f"{target_col}: continuous imputed with RF (r2≈{r2:.3f}, n_missing={len(df_null)}).")
-        except Exception:
-            if log is not None:
-                log.append(f"{target_col}: continuous imputed with RF (n_missing={len(df_null)}).")
+        r2 = _fit(reg, X.loc[train], y.loc[train], score, random_state)
     except Exception:
         median = y.median()
         if log is not None:
-            log.append(f"{target_col}: RF failed; filled {len(df_null)} NaNs with median {median}.")
+            log.append(f"{target_col}: RF failed; filled {n_missing} NaNs with median {median}.")
         return df[target_col].fillna(median)
 
-    Xn = df_null.drop(columns=list(drop_cols))
-    Xn_enc, _ = _encode_frame_for_ml(Xn)
-    try:
-        Xn_imp = pd.DataFrame(iter_imp.transform(Xn_enc), index=Xn_enc.index, columns=Xn_enc.columns)
-    except Exception:
-        Xn_imp = Xn_enc.fillna(Xn_enc.median(numeric_only=True))
-
-    pred = pd.Series(reg.predict(Xn_imp), index=Xn_imp.index)
+    if log is not None:
+        r2_note = f"r2≈{r2:.3f}, " if r2 is not None else ""
+        log.append(f"{target_col}: continuous imputed with RF ({r2_note}n_missing={n_missing}).")
     out = df[target_col].copy()
-    out.loc[df_null.index] = pred
+    out.loc[missing] = reg.predict(X.loc[missing])
     return out
 
 
-def clean_dataframe(
+def _impute_simple(df: pd.DataFrame, col: str, continuous: bool, log: List[str]) -> pd.Series:
+    n_missing = int(df[col].isna().sum())
+    if continuous:
+        fillv = pd.to_numeric(df[col], errors="coerce").median()
+        log.append(f"{col}: filled {n_missing} NaNs with median {fillv}.")
+    else:
+        fillv = _mode(df[col])
+        log.append(f"{col}: filled {n_missing} NaNs with mode '{fillv}'.")
+    return df[col].fillna(fillv)
+
+
+def _impute_joint(
     df: pd.DataFrame,
-    *,
-    handle_duplicates: bool = True,
-    invalid_to_nan: bool = True,
-    impute_missing: bool = True,
-    soften_outliers: bool = True,
-) -> Tuple[pd.DataFrame, List[str]]:
-    """Clean a dataframe according to selectable steps."""
-    log: List[str] = []
-    df = normalize_columns(df, log)
+    columns: List[str],
+    strategy: str,
+    max_rows: int,
+    random_state: int,
+    log: List[str],
+) -> Dict[str, pd.Series]:
+    """Fill ``columns`` with one IterativeImputer or KNNImputer over all inputs.
+
+    Categorical columns are imputed as integer codes, rounded to the nearest
+    observed category. The imputer is fit on at most ``max_rows`` rows and
+    only rows with a gap in ``columns`` are transformed.
+    """
+    work = df.drop(columns=[c for c in _LABEL_COLS if c in df.columns])
+    enc = pd.DataFrame(index=work.index)
+    classes: Dict[str, pd.Index] = {}
+    for c in work.columns:
+        s = work[c]
+        if c in IMPUTE_CATEGORICAL or s.dtype == object or isinstance(s.dtype, pd.CategoricalDtype):
+            codes, uniques = pd.factorize(s)
+            enc[c] = np.where(codes < 0, np.nan, codes).astype(float)
+            classes[c] = pd.Index(uniques)
+        else:
+            enc[c] = pd.to_numeric(s, errors="coerce").astype(float)
+
+    fit_rows = _sample_index(enc.index, max_rows, random_state)
+    sample = enc.loc[fit_rows]
+    if strategy == "knn":
+        loc = sample.mean().fillna(0.0)
+        scale = sample.std().replace(0.0, 1.0).fillna(1.0)
+        imputer = KNNImputer(n_neighbors=5, keep_empty_features=True)
+        label = "KNN (k=5)"
+    else:
+        loc, scale = 0.0, 1.0
+        imputer = IterativeImputer(random_state=random_state, max_iter=10, keep_empty_features=True)
+        label = "IterativeImputer"
+    imputer.fit((sample - loc) / scale)
+
+    gaps = enc[columns].isna().any(axis=1)
+    filled = pd.DataFrame(
+        imputer.transform((enc.loc[gaps] - loc) / scale), index=enc.index[gaps], columns=enc.columns
+    ) * scale + loc
+
+    out: Dict[str, pd.Series] = {}
+    for c in columns:
+        missing = df[c].isna()
+        values = filled.loc[missing, c].to_numpy()
+        if c in classes:
+            codes = np.clip(np.round(values), 0, len(classes[c]) - 1).astype(int)
+            values = classes[c].take(codes).to_numpy()
+        col = df[c].copy()
+        col.loc[missing] = values
+        out[c] = col
+        log.append(
+            f"{c}: imputed {int(missing.sum())} NaNs with {label} "
+            f"(joint pass fit on {len(fit_rows)} rows)."
+        )
+    return out
 
-    ok, errs = validate_structure(df)
-    if not ok:
-        raise ValueError("; ".join(errs))
 
-    keep_cols = list(REQUIRED_INTERNAL_COLUMNS | OPTIONAL_KEEP | ({"target"} if "target" in df.columns else set()))
-    existing_keep = [c for c in keep_cols if c in df.columns]
-    df = df[existing_keep]
+def impute_missing_values(
+    df: pd.DataFrame,
+    strategy: str = "rf",
+    *,
+    bool_cols: Set[str] | None = None,
+    max_rows: int = 0,
+    score: bool = True,
+    n_jobs: int | None = None,
+    random_state: int = 42,
+    log: List[str] | None = None,
+) -> pd.DataFrame:
+    """Fill missing model inputs in ``df`` using one of ``IMPUTE_STRATEGIES``.
+
+    ``rf``
+        One capped-sample RandomForest per column (see
+        :func:`impute_continuous_missing`), continuous columns first; each
+        column is predicted from the values already imputed for the ones
+        before it.
+    ``rf_parallel``
+        The same forests fit independently against the original frame, on up
+        to ``n_jobs`` threads (default: one per CPU). Faster, but predictors
+        are median/mode filled, so results differ from ``rf``.
+    ``iterative`` / ``knn``
+        A single joint IterativeImputer or KNNImputer pass over all columns.
+    ``median``
+        Median for continuous columns, mode for categorical ones.
+
+    ``max_rows`` caps the rows any model is fit on (``0`` = all) and
+    ``score=False`` skips the RF hold-out score.
+    """
+    if strategy not in IMPUTE_STRATEGIES:
+        raise ValueError(f"Unknown imputation strategy: {strategy}")
+    if bool_cols is None:
+        bool_cols = BINARY_FEATURES
+    if log is None:
+        log = []
+    continuous = [c for c in sorted(NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT)
+                  if c in df.columns and df[c].isna().any()]
+    categorical = [c for c in IMPUTE_CATEGORICAL if c in df.columns and df[c].isna().any()]
+    if not continuous and not categorical:
+        return df
+
+    # Columns without a single observed value are handled the same way by
+    # every strategy.
+    logs: Dict[str, List[str]] = {c: [] for c in continuous + categorical}
+    opts = {"max_rows": max_rows, "score": score, "random_state": random_state}
+    if strategy == "rf":
+        out = df.copy()
+        for c in continuous:
+            out[c] = impute_continuous_missing(out, c, log=log, **opts)
+        for c in categorical:
+            out[c] = impute_categorical_missing(out, c, bool_cols=bool_cols, log=log, **opts)
+        return out
+
+    filled: Dict[str, pd.Series] = {}
+    for c in continuous + categorical:
+        if df[c].isna().all():
+            if c in continuous:
+                filled[c] = impute_continuous_missing(df, c, log=logs[c])
+            else:
+                filled[c] = impute_categorical_missing(df, c, bool_cols=bool_cols, log=logs[c])
+    pending = [c for c in continuous + categorical if c not in filled]
+
+    if strategy in ("iterative", "knn") and pending:
+        joint_log: List[str] = []
+        filled.update(_impute_joint(df, pending, strategy, max_rows, random_state, joint_log))
+        for c, line in zip(pending, joint_log):
+            logs[c].append(line)
+    elif strategy == "median":
+        for c in pending:
+            filled[c] = _impute_simple(df, c, c in continuous, logs[c])
+    elif pending:
+        workers = min(len(pending), n_jobs or os.cpu_count() or 1)
+        opts["n_jobs"] = 1 if workers > 1 else -1
+
+        def _one(c: str) -> pd.Series:
+            if c in continuous:
+                return impute_continuous_missing(df, c, log=logs[c], **opts)
+            return impute_categorical_missing(df, c, bool_cols=bool_cols, log=logs[c], **opts)
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                filled.update(zip(pending, pool.map(_one, pending)))
+        else:
+            filled.update((c, _one(c)) for c in pending)
+
+    out = df.copy()
+    for c in continuous + categorical:
+        out[c] = filled[c]
+        log.extend(logs[c])
+    return out
 
-    if handle_duplicates:
-        before = len(df)
-        df = df.drop_duplicates()
-        log.append(f"Duplicates removed: {before - len(df)}")
-    else:
-        log.append("Duplicate handling skipped.")
 
+def standardize_values(df: pd.DataFrame, log: List[str], invalid_to_nan: bool = True) -> pd.DataFrame:
+    """Map categories and binaries to their canonical values and coerce numerics.
+
+    With ``invalid_to_nan`` implausible numbers and unknown categories become
+    NaN (``st_depression`` is clamped to [0, 7] instead). Every rule looks at
+    one row at a time, so chunks of a stream can be standardized separately.
+    """
     if "sex" in df.columns:
-        df["sex"] = df["sex"].apply(_sex_to_binary)
+        df["sex"] = _map_unique(df["sex"], _sex_to_binary)
 
     for b in ["fasting_blood_sugar", "exercise_induced_angina"]:
         if b in df.columns:
-            df[b] = df[b].apply(_yes_no_to_binary)
+            df[b] = _map_unique(df[b], _yes_no_to_binary)
 
-    if "chest_pain_type" in df.columns:
-        df["chest_pain_type"] = df["chest_pain_type"].apply(
-            lambda x: _map_with_dict(x, CP_MAP_NUM, CATEGORICAL_ALLOWED["chest_pain_type"])
-        )
-    if "Restecg" in df.columns:
-        df["Restecg"] = df["Restecg"].apply(
-            lambda x: _map_with_dict(x, RESTECG_MAP_NUM, CATEGORICAL_ALLOWED["Restecg"])
-        )
-    if "st_slope_type" in df.columns:
-        df["st_slope_type"] = df["st_slope_type"].apply(
-            lambda x: _map_with_dict(x, SLOPE_MAP_NUM, CATEGORICAL_ALLOWED["st_slope_type"])
-        )
-    if "thalassemia_type" in df.columns:
-        df["thalassemia_type"] = df["thalassemia_type"].apply(
-            lambda x: _map_with_dict(x, THAL_MAP_NUM, CATEGORICAL_ALLOWED["thalassemia_type"])
-        )
-
-    def _coerce_int_series(s, name):
-        return s.apply(lambda v: None if pd.isna(v) or str(v).strip() == "" else int(round(float(v))))
-
-    def _coerce_float_series(s, name):
-        return s.apply(lambda v: None if pd.isna(v) or str(v).strip() == "" else float(v))
+    for col, mapper in CATEGORY_MAPPERS.items():
+        if col in df.columns:
+            df[col] = _map_unique(df[col], mapper)
 
     for n in NUMERIC_FEATURES_INT:
         if n in df.columns:
-            df[n] = _coerce_int_series(df[n], n)
+            df[n] = _coerce_int_series(df[n])
     for n in NUMERIC_FEATURES_FLOAT:
         if n in df.columns:
-            df[n] = _coerce_float_series(df[n], n)
+            df[n] = _coerce_float_series(df[n])
 
     fixes: List[str] = []
     if invalid_to_nan:
@@ -513,16 +728,53 @@ def clean_dataframe(
                     log.append(f"{col}: set {n_bad} unknown categories -> NaN (will impute).")
     else:
         log.append("Invalid/implausible value handling skipped.")
+    return df
+
+
+def clean_dataframe(
+    df: pd.DataFrame,
+    *,
+    handle_duplicates: bool = True,
+    invalid_to_nan: bool = True,
+    impute_missing: bool = True,
+    soften_outliers: bool = True,
+    impute_strategy: str = "rf",
+    impute_max_rows: int = 0,
+    impute_score: bool = True,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Clean a dataframe according to selectable steps.
+
+    ``impute_strategy``, ``impute_max_rows`` and ``impute_score`` are passed
+    to :func:`impute_missing_values`.
+    """
+    log: List[str] = []
+    df = normalize_columns(df, log)
+
+    ok, errs = validate_structure(df)
+    if not ok:
+        raise ValueError("; ".join(errs))
+
+    # Keep the input column order so unchanged columns line up step to step.
+    keep_cols = REQUIRED_INTERNAL_COLUMNS | OPTIONAL_KEEP | {"target"}
+    df = df[[c for c in df.columns if c in keep_cols]]
+
+    if handle_duplicates:
+        before = len(df)
+        df = df.drop_duplicates()
+        log.append(f"Duplicates removed: {before - len(df)}")
+    else:
+        log.append("Duplicate handling skipped.")
+
+    df = standardize_values(df, log, invalid_to_nan=invalid_to_nan)
 
     if impute_missing:
-        bool_cols = {"sex", "fasting_blood_sugar", "exercise_induced_angina"}
-        for col in sorted((NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT)):
-            if col in df.columns and df[col].isna().any():
-                df[col] = impute_continuous_missing(df, col, log=log)
-        for col in ["sex", "fasting_blood_sugar", "exercise_induced_angina",
-                    "chest_pain_type", "Restecg", "st_slope_type", "thalassemia_type"]:
-            if (col in df.columns) and df[col].isna().any():
-                df[col] = impute_categorical_missing(df, col, bool_cols=bool_cols, log=log)
+        df = impute_missing_values(
+            df,
+            impute_strategy,
+            max_rows=impute_max_rows,
+            score=impute_score,
+            log=log,
+        )
     else:
         log.append("Missing value imputation skipped.")
 
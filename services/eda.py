@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+"""Exploratory data analysis payload for uploaded and scored datasets.
+
+:func:`build_eda_payload` reads each column once. Every categorical column
+and the target are factorised into integer codes labelled the way
+``astype(str)`` labels them, and one ``np.bincount`` over the combined codes
+gives the joint contingency table. Value counts, category-vs-target tables
+and the Cramér's V matrix are all marginals of that table. The numeric
+columns are copied once into a column-major float matrix that the describe
+statistics, histograms and correlations all read.
+
+The payload matches the one built with ``value_counts``/``crosstab`` per
+column (including label order), so cached payloads and the templates did
+not change.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .data import CATEGORICAL_FEATURES, NUMERIC_FEATURES_FLOAT, NUMERIC_FEATURES_INT
+
+try:  # optional: p-values for the category/target associations
+    from scipy.stats import chi2_contingency  # type: ignore
+except Exception:  # pragma: no cover - scipy is a scikit-learn dependency
+    chi2_contingency = None
+
+# Bump whenever the payload's keys or contents change: cached payloads
+# (services.eda_cache) and sessions' eda.json record the version they were
+# built with and are rebuilt when it differs.
+EDA_VERSION = 3
+# Above this many cells the joint table is skipped and each pair of columns
+# gets its own bincount.
+MAX_JOINT_CELLS = 1 << 22
+HIST_BINS = 20
+TARGET_NAMES = ("num", "target", "prediction", "heartdisease", "heart_disease")
+_DESCRIBE_QUANTILES = ("25%", "50%", "75%")
+
+
+class _Codes:
+    """A column factorised as ``astype(str)`` labels it.
+
+    ``codes`` index ``labels``, which are sorted (missing last) like the
+    index of a ``crosstab``. ``first`` orders the labels by first
+    appearance, which ``value_counts`` uses to break ties.
+    """
+
+    __slots__ = ("codes", "labels", "first")
+
+    def __init__(self, s: pd.Series):
+        if s.dtype == object:
+            # Mixed objects (1 vs "1" vs 1.0) only compare equal as strings.
+            codes, uniques = pd.factorize(s.astype(str))
+            names = list(uniques)
+        else:
+            codes, uniques = pd.factorize(s)
+            names = pd.Series(uniques, dtype=s.dtype).astype(str).tolist()
+            merged, distinct = pd.factorize(np.asarray(names, dtype=object))
+            if len(distinct) < len(names):
+                codes = np.where(codes < 0, -1, merged[codes])
+                names = list(distinct)
+
+        m = len(names)
+        order = sorted(range(m), key=names.__getitem__)
+        rank = np.empty(m + 1, dtype=np.intp)
+        rank[order] = np.arange(m)
+        first = [float(i) for i in order]
+        labels: List[object] = [names[i] for i in order]
+        missing = np.flatnonzero(codes < 0)
+        if missing.size:
+            rank[m] = m  # code -1 picks the last slot
+            labels.append(np.nan)
+            # Labels seen before the first missing value sort ahead of it.
+            first.append(len(np.unique(codes[: missing[0]])) - 0.5)
+        self.codes = rank[codes]
+        self.labels = labels
+        self.first = np.asarray(first)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+def _value_counts(labels: Sequence[object], counts: np.ndarray, first: np.ndarray):
+    """Return ``(labels, counts)`` in ``value_counts`` order."""
+    order = np.lexsort((first, -counts))
+    return [labels[i] for i in order], counts[order]
+
+
+def _cramers_v(table: np.ndarray) -> float:
+    n = table.sum()
+    if n == 0:
+        return 0.0
+    row_sums = table.sum(axis=1).reshape(-1, 1)
+    col_sums = table.sum(axis=0).reshape(1, -1)
+    expected = row_sums.dot(col_sums) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi2 = np.nansum((table - expected) ** 2 / np.where(expected == 0, np.nan, expected))
+    k = table.shape[1]
+    r = table.shape[0]
+    denom = n * (min(k - 1, r - 1))
+    if denom <= 0:
+        return 0.0
+    return float(math.sqrt(max(chi2, 0.0) / denom))
+
+
+class _Contingency:
+    """Pairwise count tables for a list of :class:`_Codes`."""
+
+    def __init__(self, columns: List[_Codes]):
+        self.columns = columns
+        self.sizes = [len(c) for c in columns]
+        self.joint: Optional[np.ndarray] = None
+        cells = math.prod(self.sizes) if columns else 0
+        if columns and cells <= MAX_JOINT_CELLS:
+            combined = np.zeros(len(columns[0].codes), dtype=np.int64)
+            for col, size in zip(columns, self.sizes):
+                combined *= size
+                combined += col.codes
+            self.joint = np.bincount(combined, minlength=cells).reshape(self.sizes)
+
+    def counts(self, i: int) -> np.ndarray:
+        if self.joint is not None:
+            others = tuple(a for a in range(len(self.sizes)) if a != i)
+            return self.joint.sum(axis=others)
+        return np.bincount(self.columns[i].codes, minlength=self.sizes[i])
+
+    def table(self, i: int, j: int) -> np.ndarray:
+        if i == j:
+            return np.diag(self.counts(i))
+        if self.joint is not None:
+            others = tuple(a for a in range(len(self.sizes)) if a not in (i, j))
+            t = self.joint.sum(axis=others)
+            return t if i < j else t.T
+        ki, kj = self.sizes[i], self.sizes[j]
+        combined = self.columns[i].codes.astype(np.int64) * kj + self.columns[j].codes
+        return np.bincount(combined, minlength=ki * kj).reshape(ki, kj)
+
+
+def _probability_distribution(df: pd.DataFrame) -> Optional[dict]:
+    if "positive_probability" not in df.columns:
+        return None
+    vals = pd.to_numeric(df["positive_probability"], errors="coerce").dropna().values
+    if not vals.size:
+        return {"x": [], "y": [], "normal_fit": {"mu": None, "sigma": None, "y": []}}
+    counts, edges = np.histogram(vals, bins=HIST_BINS, range=(0, 1))
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    # Normal fit for a "bell-curve" overlay, scaled to histogram area
+    n = vals.size
+    mu = float(vals.mean())
+    sigma = float(vals.std(ddof=1)) if n > 1 else 0.0
+    bin_width = float(edges[1] - edges[0])
+    if sigma > 0:
+        normal_y = (1.0 / (sigma * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((centers - mu) / sigma) ** 2)
+        normal_y = (normal_y * n * bin_width).tolist()
+    else:
+        normal_y = [0.0] * len(centers)
+    return {
+        "x": centers.tolist(),
+        "y": counts.astype(int).tolist(),
+        "normal_fit": {"mu": mu, "sigma": sigma, "y": normal_y},
+    }
+
+
+def _describe(x: np.ndarray, mask: np.ndarray, nullable: bool = False) -> Dict[str, Optional[float]]:
+    """``Series.describe()`` without the count, rounded to 2 places.
+
+    Missing stats are NaN, or ``None`` for ``nullable`` (extension dtype)
+    columns, whose ``describe`` reports ``pd.NA``.
+    """
+    count = int(x.size - mask.sum())
+    filled = np.where(mask, 0.0, x)
+    stats = dict.fromkeys(("mean", "std", "min", *_DESCRIBE_QUANTILES, "max"), np.nan)
+    if count:
+        # Same two-pass sums as pandas' nanmean/nanvar, so the digits agree.
+        avg = filled.sum() / count
+        stats["mean"] = avg
+        if count > 1:
+            sqr = (avg - filled) ** 2
+            sqr[mask] = 0
+            stats["std"] = np.sqrt(sqr.sum() / (count - 1))
+        vals = x[~mask] if count < x.size else x
+        stats["min"], stats["max"] = vals.min(), vals.max()
+        for key, q in zip(_DESCRIBE_QUANTILES, np.percentile(vals, [25, 50, 75])):
+            stats[key] = q
+    out = {k: float(np.round(v, 2)) for k, v in stats.items()}
+    if nullable:
+        out = {k: None if np.isnan(v) else v for k, v in out.items()}
+    return out
+
+
+def _is_plain_numeric(s: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+
+def _numeric_summary(df: pd.DataFrame, present_num: List[str]):
+    """Describe stats, histograms and correlations from one float matrix."""
+    if not all(_is_plain_numeric(df[c]) for c in present_num):
+        # Mixed dtypes: pandas decides which columns describe/corr keep.
+        desc = df[present_num].describe().round(2)
+        stats = desc.drop(index="count", errors="ignore").to_dict()
+        corr = df[present_num].corr(numeric_only=True).fillna(0)
+        hists = {}
+        for c in present_num:
+            vals = df[c].dropna().values
+            if len(vals):
+                counts, edges = np.histogram(vals, bins=HIST_BINS)
+                hists[c] = {"x": ((edges[:-1] + edges[1:]) / 2).tolist(), "y": counts.tolist()}
+            else:
+                hists[c] = {"x": [], "y": []}
+        return stats, hists, corr
+
+    matrix = np.empty((len(df), len(present_num)), dtype=np.float64, order="F")
+    for i, c in enumerate(present_num):
+        matrix[:, i] = df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+    stats, hists = {}, {}
+    for i, c in enumerate(present_num):
+        x = matrix[:, i]
+        mask = np.isnan(x)
+        stats[c] = _describe(x, mask, pd.api.types.is_extension_array_dtype(df[c].dtype))
+        vals = x[~mask]
+        if vals.size:
+            counts, edges = np.histogram(vals, bins=HIST_BINS)
+            hists[c] = {"x": ((edges[:-1] + edges[1:]) / 2).tolist(), "y": counts.tolist()}
+        else:
+            hists[c] = {"x": [], "y": []}
+    corr = pd.DataFrame(matrix, columns=present_num, copy=False).corr().fillna(0)
+    return stats, hists, corr
+
+
+def find_target_column(df: pd.DataFrame) -> Optional[str]:
+    """Return the ground-truth/prediction column, matched case-insensitively.
+
+    Many heart-disease datasets name the label differently (``num`` staged
+    0..4, ``target``, ``prediction`` after batch predict, ``HeartDisease``);
+    the first of :data:`TARGET_NAMES` present wins.
+    """
+    lower_map = {c.lower(): c for c in df.columns}
+    return next((lower_map[name] for name in TARGET_NAMES if name in lower_map), None)
+
+
+def eda_columns(df: pd.DataFrame) -> List[str]:
+    """Return the columns of ``df`` that :func:`build_eda_payload` reads."""
+    target = find_target_column(df)
+    wanted = NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT | CATEGORICAL_FEATURES | {"positive_probability"}
+    return [c for c in df.columns if c in wanted or c == target]
+
+
+def build_eda_payload(df: pd.DataFrame) -> dict:
+    """Build the summary statistics and chart data shown on the EDA page."""
+    prob_dist = _probability_distribution(df)
+
+    # ----- numeric summary, histograms and correlation -----
+    num_cols = list((NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT))
+    present_num = [c for c in num_cols if c in df.columns]
+    if present_num:
+        stats, hists, corr = _numeric_summary(df, present_num)
+    else:
+        stats, hists, corr = {}, {}, pd.DataFrame()
+    corr_payload = {
+        "z": (corr.values.tolist() if not corr.empty else []),
+        "x": (list(corr.columns) if not corr.empty else []),
+        "y": (list(corr.index) if not corr.empty else []),
+    }
+
+    # ----- categorical columns (and target) as codes, counted together -----
+    target_col = find_target_column(df)
+    cat_cols = [c for c in CATEGORICAL_FEATURES if c in df.columns]
+    coded = [_Codes(df[c]) for c in cat_cols]
+    if target_col is not None:
+        coded.append(_Codes(df[target_col]))
+    tables = _Contingency(coded)
+    t = len(cat_cols)  # index of the target in ``coded``
+
+    categorical = {}
+    for i, col in enumerate(cat_cols):
+        labels, counts = _value_counts(coded[i].labels, tables.counts(i), coded[i].first)
+        total = int(counts.sum()) if int(counts.sum()) else 1
+        categorical[col] = {
+            "counts": {
+                "labels": [str(x) for x in labels],
+                "counts": counts.astype(int).tolist(),
+                "percents": [round(100.0 * v / total, 2) for v in counts.tolist()],
+            }
+        }
+
+    # ----- categorical vs target (stacked %) and associations -----
+    cat_vs_target = {}
+    cat_associations = []
+    if target_col is not None:
+        for i, col in enumerate(cat_cols):
+            ct = tables.table(i, t)
+            row_sums = ct.sum(axis=1).reshape(-1, 1)
+            row_pct = np.zeros(ct.shape)
+            np.divide(ct, row_sums, out=row_pct, where=row_sums != 0)
+            cat_vs_target[col] = {
+                "index": list(coded[i].labels),
+                "columns": list(coded[t].labels),
+                "counts": ct.astype(int).tolist(),
+                "col_percents": (row_pct * 100).round(2).tolist(),
+            }
+            pval = None
+            if chi2_contingency is not None:
+                try:
+                    _, p, _, _ = chi2_contingency(ct, correction=False)
+                    pval = float(p)
+                except Exception:
+                    pval = None
+            cat_associations.append({
+                "col": col,
+                "cramers_v": round(_cramers_v(ct), 4),
+                "p_value": (None if pval is None else round(pval, 6)),
+            })
+
+    # ----- categorical association matrix (Cramér's V between cats) -----
+    cat_assoc_matrix = None
+    if len(cat_cols) >= 2:
+        z = [[round(_cramers_v(tables.table(i, j)), 4) for j in range(t)] for i in range(t)]
+        cat_assoc_matrix = {"z": z, "x": cat_cols, "y": cat_cols}
+
+    # ----- raw target distribution -----
+    target_dist = None
+    if target_col is not None:
+        labels, counts = _value_counts(coded[t].labels, tables.counts(t), coded[t].first)
+        target_dist = {"labels": labels, "values": counts.tolist()}
+
+    return {
+        "stats": stats,
+        "hists": hists,
+        "corr": corr_payload,
+        "target": target_dist,
+        "categorical": categorical,
+        "cat_vs_target": cat_vs_target,
+        "cat_associations": cat_associations,
+        "cat_assoc_matrix": cat_assoc_matrix,
+        "viz": {},
+        "probability_distribution": prob_dist,
+    }
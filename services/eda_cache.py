@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+"""Content-addressed cache of EDA payloads shared by all upload sessions.
+
+An entry is ``<root>/<key>.json``. :func:`dataset_key` digests
+:data:`services.eda.EDA_VERSION` with the names, dtypes and values of the
+columns :func:`services.eda.build_eda_payload` reads. Identical data
+therefore gets the same payload, whichever session or user uploaded it, and
+bumping ``EDA_VERSION`` makes every older entry unreachable without probing
+payloads for missing keys. Entries hold only aggregates. Files are replaced
+atomically, so every worker process can share the directory, and the least
+recently read entries are pruned beyond ``max_entries``.
+
+:meth:`EdaCache.payload_for_frame` works from a stored frame without
+loading it: the key is hashed chunk by chunk, and frames above
+``sketch_rows`` rows get the one-pass approximate payload of
+:mod:`services.eda_sketch` (keyed separately from the exact one).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .eda import EDA_VERSION, build_eda_payload, eda_columns
+from .eda_sketch import sketch_eda_payload
+from .frame_store import frame_rows, iter_frames, read_frame
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_key(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], approximate: bool = False) -> str:
+    """Return the cache key for the EDA payload of ``data``.
+
+    ``data`` is a DataFrame or its chunks in order; the key does not depend
+    on where the chunks split. Row order counts (label ties are broken by
+    first appearance), columns the payload ignores such as ``patient_name``
+    do not. ``approximate`` keys the sketch payload apart from the exact one.
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    columns: Dict[str, Tuple[str, "hashlib._Hash"]] = {}
+    rows = 0
+    for chunk in chunks:
+        if not columns:
+            columns = {c: (str(chunk[c].dtype), hashlib.blake2b(digest_size=20)) for c in eda_columns(chunk)}
+        rows += len(chunk)
+        for col, (_dtype, h) in columns.items():
+            s = chunk[col]
+            if s.dtype.kind in "biuf":
+                h.update(s.to_numpy().tobytes())
+            elif isinstance(s.dtype, pd.CategoricalDtype):
+                # Hash each label once and gather by code; missing is code -1.
+                labels = pd.util.hash_array(s.cat.categories.to_numpy(dtype=object))
+                h.update(np.append(labels, np.uint64(0))[s.cat.codes.to_numpy()].tobytes())
+            else:
+                h.update(pd.util.hash_pandas_object(s, index=False).to_numpy().tobytes())
+    h = hashlib.blake2b(digest_size=20)
+    mode = "sketch" if approximate else "exact"
+    h.update(f"eda-v{EDA_VERSION}\n{mode}\n{rows}\n".encode())
+    for col, (dtype, col_hash) in columns.items():
+        h.update(f"{col}\0{dtype}\0{col_hash.hexdigest()}\n".encode())
+    return h.hexdigest()
+
+
+class EdaCache:
+    """EDA payloads on disk under ``root``, keyed by :func:`dataset_key`."""
+
+    def __init__(self, root: str, max_entries: int = 256):
+        self.root = root
+        self.max_entries = max(0, int(max_entries))
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a fresh copy of the payload stored under ``key``, or ``None``."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        if not self.max_entries:
+            return
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp, self._path(key))
+        except (OSError, TypeError, ValueError):
+            logger.exception("Could not cache EDA payload %s", key)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._prune()
+
+    def payload(self, df: pd.DataFrame) -> Tuple[str, dict]:
+        """Return ``(key, payload)`` for ``df``, building it on a miss."""
+        key = dataset_key(df)
+        payload = self.get(key)
+        if payload is None:
+            payload = build_eda_payload(df)
+            self.put(key, payload)
+        return key, payload
+
+    def payload_for_frame(self, path: str, sketch_rows: int = 0, chunk_rows: int = 50000) -> Tuple[str, dict]:
+        """Return ``(key, payload)`` for the frame stored at ``path``.
+
+        Only the columns the EDA reads are loaded. Frames with more than
+        ``sketch_rows`` rows (``0`` = never) are summarised in one streaming
+        pass of ``chunk_rows`` rows with bounded memory.
+        """
+        columns = eda_columns(read_frame(path, stop=0))
+        approximate = bool(sketch_rows) and frame_rows(path) > sketch_rows
+        key = dataset_key(iter_frames(path, chunk_rows, columns, categorical=True), approximate)
+        payload = self.get(key)
+        if payload is None:
+            if approximate:
+                payload = sketch_eda_payload(iter_frames(path, chunk_rows, columns, categorical=True))
+            else:
+                payload = build_eda_payload(read_frame(path, columns, categorical=True))
+            self.put(key, payload)
+        return key, payload
+
+    def _prune(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                try:
+                    entries.append((os.stat(os.path.join(self.root, name)).st_mtime, name))
+                except OSError:
+                    pass
+        entries.sort()
+        for _mtime, name in entries[: max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,629 @@
+from __future__ import annotations
+
+"""Approximate EDA payload from one streaming pass with mergeable sketches.
+
+:class:`EdaSketch` is fed DataFrame chunks (e.g. ``iter_frames``) and keeps
+state whose size does not depend on the number of rows:
+
+* numeric columns: exact co-moments for every column pair (count, means and
+  centred sums merged with Chan's formulas), giving the describe mean/std
+  and the Pearson correlation; exact min/max; and exact value counts while a
+  column has at most ``max_exact_values`` distinct values, after which a
+  :class:`QuantileSketch` takes over for the quartiles and histograms;
+* categorical columns and the target: exact counts per label and per label
+  pair (up to ``max_categories`` labels a column), so value counts,
+  category-vs-target tables and Cramér's V are exact;
+* ``positive_probability``: fixed 20-bin counts over ``[0, 1]`` plus moments.
+
+Two sketches built over different chunks can be combined with
+:meth:`EdaSketch.merge`. :meth:`EdaSketch.payload` returns the keys of
+:func:`services.eda.build_eda_payload` plus an ``approximate`` block with the
+row count and an error bound for every statistic.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data import CATEGORICAL_FEATURES, NUMERIC_FEATURES_FLOAT, NUMERIC_FEATURES_INT
+from .eda import (
+    EDA_VERSION,
+    HIST_BINS,
+    _Codes,
+    _Contingency,
+    _cramers_v,
+    _value_counts,
+    chi2_contingency,
+    find_target_column,
+)
+
+DEFAULT_K = 4096
+MAX_EXACT_VALUES = 4096
+MAX_CATEGORIES = 1000
+OTHER_LABEL = "Other"
+_QUARTILES = (("25%", 0.25), ("50%", 0.5), ("75%", 0.75))
+
+
+class QuantileSketch:
+    """Mergeable compactor sketch of a stream of floats.
+
+    Level ``h`` holds items of weight ``2**h``. A level that reaches ``k``
+    items is sorted and every other item (random offset) moves up a level.
+    Each such compaction shifts any rank estimate by at most ``2**h``, so
+    :attr:`error` is a deterministic bound on the absolute rank error; it is
+    about ``n * log2(n / k) / k``.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = max(8, int(k))
+        self.n = 0
+        self.error = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.error += other.error
+        self._compress()
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size >= self.k:
+                items = np.sort(items)
+                m = items.size - items.size % 2
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                offset = int(self._rng.integers(2))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[offset:m:2]])
+                self.levels[h] = items[m:]
+                self.error += 1 << h
+            h += 1
+
+    def _sorted(self) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 1 << h, dtype=np.int64)
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    @property
+    def rank_error(self) -> float:
+        """Bound on the error of :meth:`quantiles`, as a fraction of ``n``."""
+        if not self.n:
+            return 0.0
+        top = max((1 << h for h, items in enumerate(self.levels) if items.size), default=1)
+        return (self.error + top) / self.n
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        values, cum = self._sorted()
+        ranks = np.clip(np.asarray(qs, dtype=np.float64), 0, 1) * (self.n - 1)
+        idx = np.searchsorted(cum, ranks, side="right")
+        return values[np.minimum(idx, values.size - 1)]
+
+    def count_below(self, xs: np.ndarray, inclusive: bool = False) -> np.ndarray:
+        """Estimated number of items ``< xs`` (``<=`` with ``inclusive``)."""
+        values, cum = self._sorted()
+        idx = np.searchsorted(values, xs, side="right" if inclusive else "left")
+        return np.where(idx > 0, cum[np.maximum(idx - 1, 0)], 0)
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # numpy's linear-interpolation formula, so exact quartiles match describe()
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+class _NumericColumn:
+    """Min/max plus exact value counts, or a quantile sketch past the limit."""
+
+    def __init__(self, k: int, max_exact_values: int):
+        self.k = k
+        self.max_exact_values = max_exact_values
+        self.min = math.inf
+        self.max = -math.inf
+        self.values = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.sketch: Optional[QuantileSketch] = None
+
+    @property
+    def exact(self) -> bool:
+        return self.sketch is None
+
+    @property
+    def n(self) -> int:
+        return self.sketch.n if self.sketch is not None else int(self.counts.sum())
+
+    def update(self, vals: np.ndarray) -> None:
+        if not vals.size:
+            return
+        self.min = min(self.min, float(vals.min()))
+        self.max = max(self.max, float(vals.max()))
+        if self.sketch is not None:
+            self.sketch.update(vals)
+            return
+        values, counts = np.unique(vals, return_counts=True)
+        self._add_counts(values, counts)
+
+    def _add_counts(self, values: np.ndarray, counts: np.ndarray) -> None:
+        if self.values.size:
+            values, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts])).astype(np.int64)
+        self.values, self.counts = values, counts
+        if values.size > self.max_exact_values:
+            self._to_sketch()
+
+    def _to_sketch(self) -> None:
+        self.sketch = QuantileSketch(self.k)
+        self.sketch.update(np.repeat(self.values, self.counts))
+        self.values, self.counts = np.empty(0), np.empty(0, dtype=np.int64)
+
+    def merge(self, other: "_NumericColumn") -> None:
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        if self.exact and other.exact:
+            if other.values.size:
+                self._add_counts(other.values, other.counts)
+            return
+        if self.exact:
+            self._to_sketch()
+        if other.exact:
+            self.sketch.update(np.repeat(other.values, other.counts))
+        else:
+            self.sketch.merge(other.sketch)
+
+    def quartiles(self) -> Dict[str, Tuple[float, float, float]]:
+        """Return ``{stat: (estimate, low, high)}`` for the three quartiles."""
+        n = self.n
+        qs = np.array([q for _k, q in _QUARTILES])
+        if self.exact:
+            cum = np.cumsum(self.counts)
+            pos = qs * (n - 1)
+            lo = self.values[np.searchsorted(cum, np.floor(pos), side="right")]
+            hi = self.values[np.searchsorted(cum, np.ceil(pos), side="right")]
+            est = _lerp(lo, hi, pos - np.floor(pos))
+            return {k: (float(v), float(v), float(v)) for (k, _q), v in zip(_QUARTILES, est)}
+        eps = self.sketch.rank_error
+        est = self.sketch.quantiles(qs)
+        low = self.sketch.quantiles(qs - eps)
+        high = self.sketch.quantiles(qs + eps)
+        return {k: (float(e), float(lo), float(hi)) for (k, _q), e, lo, hi in zip(_QUARTILES, est, low, high)}
+
+    def histogram(self) -> Tuple[dict, int]:
+        """Return the 20 equal-width bins over [min, max] and the count error."""
+        if not self.n:
+            return {"x": [], "y": []}, 0
+        if self.exact:
+            counts, edges = np.histogram(self.values, bins=HIST_BINS, weights=self.counts)
+            counts, error = np.rint(counts).astype(np.int64), 0
+        else:
+            _none, edges = np.histogram(np.array([self.min, self.max]), bins=HIST_BINS)
+            below = self.sketch.count_below(edges[:-1])
+            below = np.append(below, self.sketch.n)
+            counts, error = np.diff(below), 2 * self.sketch.error
+        centers = (edges[:-1] + edges[1:]) / 2
+        return {"x": centers.tolist(), "y": counts.tolist()}, int(error)
+
+    def adaptive_histogram(self) -> dict:
+        """Equal-count bins: edges at the 0, 5, ..., 100th percentiles."""
+        if not self.n:
+            return {"edges": [], "y": []}
+        qs = np.linspace(0, 1, HIST_BINS + 1)
+        if self.exact:
+            cum = np.cumsum(self.counts)
+            edges = self.values[np.searchsorted(cum, qs * (self.n - 1), side="right")]
+            below = np.append(np.concatenate([[0], cum])[np.searchsorted(self.values, edges[:-1])], self.n)
+        else:
+            edges = self.sketch.quantiles(qs)
+            below = np.append(self.sketch.count_below(edges[:-1]), self.n)
+        edges[0], edges[-1] = self.min, self.max
+        return {"edges": edges.tolist(), "y": np.diff(below).tolist()}
+
+
+class _CoMoments:
+    """Pairwise-complete count, means and centred sums for ``k`` columns.
+
+    Entry ``[i, j]`` covers the rows where both column ``i`` and column
+    ``j`` are present, the way ``DataFrame.corr`` pairs them.
+    """
+
+    def __init__(self, k: int):
+        shape = (k, k)
+        self.n = np.zeros(shape)
+        self.mx = np.zeros(shape)
+        self.my = np.zeros(shape)
+        self.cxx = np.zeros(shape)
+        self.cyy = np.zeros(shape)
+        self.cxy = np.zeros(shape)
+
+    @classmethod
+    def of(cls, X: np.ndarray) -> "_CoMoments":
+        k = X.shape[1]
+        out = cls(k)
+        valid = ~np.isnan(X)
+        if valid.all():
+            if not len(X):
+                return out
+            mean = X.mean(axis=0)
+            D = X - mean
+            C = D.T @ D
+            out.n[:] = len(X)
+            out.mx[:] = mean.reshape(-1, 1)
+            out.my[:] = mean.reshape(1, -1)
+            out.cxy[:] = C
+            out.cxx[:] = np.diag(C).reshape(-1, 1)
+            out.cyy[:] = np.diag(C).reshape(1, -1)
+            return out
+        # Masked sums as matrix products: missing cells are zero in both ``D``
+        # and ``V``. Centring on the column means first keeps the
+        # sum-of-squares cancellation small.
+        V = valid.astype(float)
+        count = V.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            centre = np.where(count > 0, np.where(valid, X, 0.0).sum(axis=0) / count, 0.0)
+        D = np.where(valid, X - centre, 0.0)
+        n = V.T @ V
+        sx = D.T @ V
+        sxx = (D * D).T @ V
+        sxy = D.T @ D
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mx = np.where(n > 0, sx / n, 0.0)
+            out.cxx[:] = np.where(n > 0, np.maximum(sxx - sx * mx, 0.0), 0.0)
+            out.cyy[:] = out.cxx.T
+            out.cxy[:] = np.where(n > 0, sxy - sx * mx.T, 0.0)
+        out.n[:] = n
+        out.mx[:] = np.where(n > 0, mx + centre.reshape(-1, 1), 0.0)
+        out.my[:] = out.mx.T
+        return out
+
+    def merge(self, other: "_CoMoments") -> None:
+        n = self.n + other.n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(n > 0, other.n / n, 0.0)
+            dx = other.mx - self.mx
+            dy = other.my - self.my
+            cross = np.where(n > 0, self.n * other.n / n, 0.0)
+        self.cxx += other.cxx + dx * dx * cross
+        self.cyy += other.cyy + dy * dy * cross
+        self.cxy += other.cxy + dx * dy * cross
+        self.mx += dx * w
+        self.my += dy * w
+        self.n = n
+
+    def corr(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = self.cxy / np.sqrt(self.cxx * self.cyy)
+        return np.clip(r, -1.0, 1.0)
+
+
+class _Labels:
+    """Labels of one categorical column in first-appearance order."""
+
+    def __init__(self, max_categories: int):
+        self.max_categories = max_categories
+        self.labels: List[object] = []
+        self.index: Dict[object, int] = {}
+        self.truncated = False
+
+    def _code(self, label) -> int:
+        code = self.index.get(label)
+        if code is None:
+            if len(self.labels) >= self.max_categories:
+                self.truncated = True
+                label = OTHER_LABEL
+                code = self.index.get(label)
+                if code is not None:
+                    return code
+            code = self.index[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def lookup(self, labels: Sequence[object], first: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return global codes for ``labels``, adding new ones in ``first`` order."""
+        order = np.argsort(first, kind="stable") if first is not None else range(len(labels))
+        lut = np.empty(len(labels), dtype=np.intp)
+        for i in order:
+            lut[i] = self._code(labels[i])
+        return lut
+
+    def sorted_order(self) -> List[int]:
+        """Codes in ``crosstab`` order: sorted labels, missing last."""
+        present = [i for i, lab in enumerate(self.labels) if isinstance(lab, str)]
+        missing = [i for i, lab in enumerate(self.labels) if not isinstance(lab, str)]
+        return sorted(present, key=self.labels.__getitem__) + missing
+
+
+class _ChunkCodes:
+    __slots__ = ("codes", "size")
+
+    def __init__(self, codes: np.ndarray, size: int):
+        self.codes, self.size = codes, size
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _grow(table: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    if table.shape == shape:
+        return table
+    return np.pad(table, [(0, s - t) for s, t in zip(shape, table.shape)])
+
+
+class EdaSketch:
+    """Streaming, mergeable state for an approximate EDA payload."""
+
+    def __init__(self, k: int = DEFAULT_K, max_exact_values: int = MAX_EXACT_VALUES,
+                 max_categories: int = MAX_CATEGORIES):
+        self.k = k
+        self.max_exact_values = max_exact_values
+        self.max_categories = max_categories
+        self.rows = 0
+        self.chunks = 0
+        self.num_cols: Optional[List[str]] = None
+        self.cat_cols: List[str] = []
+        self.target_col: Optional[str] = None
+        self.numeric: Dict[str, _NumericColumn] = {}
+        self.moments: Optional[_CoMoments] = None
+        self.coded: List[_Labels] = []
+        self.counts: List[np.ndarray] = []
+        self.pairs: Dict[Tuple[int, int], np.ndarray] = {}
+        self.prob_counts: Optional[np.ndarray] = None
+        self.prob_moments: Optional[_CoMoments] = None
+
+    def _start(self, df: pd.DataFrame) -> None:
+        num_cols = list((NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT))
+        self.num_cols = [c for c in num_cols if c in df.columns]
+        self.cat_cols = [c for c in CATEGORICAL_FEATURES if c in df.columns]
+        self.target_col = find_target_column(df)
+        self.numeric = {c: _NumericColumn(self.k, self.max_exact_values) for c in self.num_cols}
+        self.moments = _CoMoments(len(self.num_cols))
+        n_coded = len(self.cat_cols) + (self.target_col is not None)
+        self.coded = [_Labels(self.max_categories) for _ in range(n_coded)]
+        self.counts = [np.zeros(0, dtype=np.int64) for _ in range(n_coded)]
+        if "positive_probability" in df.columns:
+            self.prob_counts = np.zeros(HIST_BINS, dtype=np.int64)
+            self.prob_moments = _CoMoments(1)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Add the rows of one chunk."""
+        if self.num_cols is None:
+            self._start(df)
+        self.rows += len(df)
+        self.chunks += 1
+
+        if self.num_cols:
+            X = np.empty((len(df), len(self.num_cols)), dtype=np.float64, order="F")
+            for i, c in enumerate(self.num_cols):
+                X[:, i] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                col = X[:, i]
+                self.numeric[c].update(col[~np.isnan(col)])
+            self.moments.merge(_CoMoments.of(X))
+
+        columns = self.cat_cols + ([self.target_col] if self.target_col is not None else [])
+        chunk_codes = []
+        for labels, col in zip(self.coded, columns):
+            local = _Codes(df[col])
+            lut = labels.lookup(local.labels, local.first)
+            chunk_codes.append(lut[local.codes] if local.codes.size else local.codes)
+        sizes = [len(labels.labels) for labels in self.coded]
+        self._add_tables(_Contingency([_ChunkCodes(c, s) for c, s in zip(chunk_codes, sizes)]), sizes)
+
+        if self.prob_counts is not None:
+            vals = pd.to_numeric(df["positive_probability"], errors="coerce").dropna().to_numpy(dtype=np.float64)
+            self.prob_counts += np.histogram(vals, bins=HIST_BINS, range=(0, 1))[0]
+            self.prob_moments.merge(_CoMoments.of(vals.reshape(-1, 1)))
+
+    def _add_tables(self, tables: _Contingency, sizes: List[int]) -> None:
+        for i, size in enumerate(sizes):
+            self.counts[i] = _grow(self.counts[i], (size,)) + tables.counts(i)
+            for j in range(i + 1, len(sizes)):
+                shape = (size, sizes[j])
+                self.pairs[(i, j)] = _grow(self.pairs.get((i, j), np.zeros((0, 0), dtype=np.int64)), shape) \
+                    + tables.table(i, j)
+
+    def merge(self, other: "EdaSketch") -> None:
+        """Add the state of a sketch built over other chunks of the same data."""
+        if other.num_cols is None:
+            return
+        if self.num_cols is None:
+            self.__dict__.update(other.__dict__)
+            return
+        if (other.num_cols, other.cat_cols, other.target_col) != (self.num_cols, self.cat_cols, self.target_col):
+            raise ValueError("Cannot merge EDA sketches of different columns")
+        self.rows += other.rows
+        self.chunks += other.chunks
+        for c in self.num_cols:
+            self.numeric[c].merge(other.numeric[c])
+        self.moments.merge(other.moments)
+
+        luts = [mine.lookup(theirs.labels) for mine, theirs in zip(self.coded, other.coded)]
+        sizes = [len(labels.labels) for labels in self.coded]
+        for i, lut in enumerate(luts):
+            self.counts[i] = _grow(self.counts[i], (sizes[i],))
+            np.add.at(self.counts[i], lut, other.counts[i])
+        for (i, j), table in other.pairs.items():
+            mine = _grow(self.pairs.get((i, j), np.zeros((0, 0), dtype=np.int64)), (sizes[i], sizes[j]))
+            np.add.at(mine, (luts[i][:, None], luts[j][None, :]), table)
+            self.pairs[(i, j)] = mine
+        if self.prob_counts is not None:
+            self.prob_counts += other.prob_counts
+            self.prob_moments.merge(other.prob_moments)
+
+    # -- payload ---------------------------------------------------------------
+    def _table(self, i: int, j: int) -> np.ndarray:
+        """Label-pair counts for coded columns ``i`` and ``j`` in crosstab order."""
+        if i == j:
+            t = np.diag(self.counts[i])
+        elif i < j:
+            t = self.pairs[(i, j)]
+        else:
+            t = self.pairs[(j, i)].T
+        return t[np.ix_(self.coded[i].sorted_order(), self.coded[j].sorted_order())]
+
+    def _value_counts(self, i: int):
+        labels = self.coded[i].labels
+        return _value_counts(labels, self.counts[i], np.arange(len(labels), dtype=np.float64))
+
+    def _probability_distribution(self) -> Optional[dict]:
+        if self.prob_counts is None:
+            return None
+        n = int(self.prob_moments.n[0, 0])
+        if not n:
+            return {"x": [], "y": [], "normal_fit": {"mu": None, "sigma": None, "y": []}}
+        edges = np.linspace(0, 1, HIST_BINS + 1)
+        centers = (edges[:-1] + edges[1:]) / 2
+        mu = float(self.prob_moments.mx[0, 0])
+        sigma = float(math.sqrt(self.prob_moments.cxx[0, 0] / (n - 1))) if n > 1 else 0.0
+        bin_width = float(edges[1] - edges[0])
+        if sigma > 0:
+            normal_y = (1.0 / (sigma * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((centers - mu) / sigma) ** 2)
+            normal_y = (normal_y * n * bin_width).tolist()
+        else:
+            normal_y = [0.0] * len(centers)
+        return {
+            "x": centers.tolist(),
+            "y": self.prob_counts.astype(int).tolist(),
+            "normal_fit": {"mu": mu, "sigma": sigma, "y": normal_y},
+        }
+
+    def payload(self) -> dict:
+        """Return the EDA payload, with error bounds under ``approximate``."""
+        if self.num_cols is None:
+            self._start(pd.DataFrame())
+        stats, hists, adaptive = {}, {}, {}
+        stat_bounds, hist_bounds, max_rank_error = {}, {}, 0.0
+        for i, c in enumerate(self.num_cols):
+            col = self.numeric[c]
+            n = int(self.moments.n[i, i])
+            mean = self.moments.mx[i, i] if n else np.nan
+            std = math.sqrt(self.moments.cxx[i, i] / (n - 1)) if n > 1 else np.nan
+            exact = {"mean": mean, "std": std,
+                     "min": col.min if n else np.nan, "max": col.max if n else np.nan}
+            quartiles = col.quartiles() if n else {k: (np.nan,) * 3 for k, _q in _QUARTILES}
+            values = {**exact, **{k: v[0] for k, v in quartiles.items()}}
+            stats[c] = {k: float(np.round(values[k], 2))
+                        for k in ("mean", "std", "min", "25%", "50%", "75%", "max")}
+            # Moments and extremes are exact; quartiles are exact while the
+            # column is still counted value by value.
+            bounds = {k: [float(np.round(v, 2))] * 2 for k, v in exact.items()}
+            for k, (_e, low, high) in quartiles.items():
+                bounds[k] = [float(np.round(low, 2)), float(np.round(high, 2))]
+            bounds["rank_error"] = 0.0 if col.exact else round(col.sketch.rank_error, 6)
+            max_rank_error = max(max_rank_error, bounds["rank_error"])
+            stat_bounds[c] = bounds
+            hists[c], hist_bounds[c] = col.histogram()
+            adaptive[c] = col.adaptive_histogram()
+
+        corr_payload = {"z": [], "x": [], "y": []}
+        if self.num_cols:
+            z = np.nan_to_num(self.moments.corr(), nan=0.0)
+            corr_payload = {"z": z.tolist(), "x": list(self.num_cols), "y": list(self.num_cols)}
+
+        t = len(self.cat_cols)
+        categorical = {}
+        for i, col in enumerate(self.cat_cols):
+            labels, counts = self._value_counts(i)
+            total = int(counts.sum()) if int(counts.sum()) else 1
+            categorical[col] = {
+                "counts": {
+                    "labels": [str(x) for x in labels],
+                    "counts": counts.astype(int).tolist(),
+                    "percents": [round(100.0 * v / total, 2) for v in counts.tolist()],
+                }
+            }
+
+        cat_vs_target, cat_associations, target_dist = {}, [], None
+        if self.target_col is not None:
+            target_labels = [self.coded[t].labels[k] for k in self.coded[t].sorted_order()]
+            for i, col in enumerate(self.cat_cols):
+                ct = self._table(i, t)
+                row_sums = ct.sum(axis=1).reshape(-1, 1)
+                row_pct = np.zeros(ct.shape)
+                np.divide(ct, row_sums, out=row_pct, where=row_sums != 0)
+                cat_vs_target[col] = {
+                    "index": [self.coded[i].labels[k] for k in self.coded[i].sorted_order()],
+                    "columns": target_labels,
+                    "counts": ct.astype(int).tolist(),
+                    "col_percents": (row_pct * 100).round(2).tolist(),
+                }
+                pval = None
+                if chi2_contingency is not None:
+                    try:
+                        pval = float(chi2_contingency(ct, correction=False)[1])
+                    except Exception:
+                        pval = None
+                cat_associations.append({
+                    "col": col,
+                    "cramers_v": round(_cramers_v(ct), 4),
+                    "p_value": (None if pval is None else round(pval, 6)),
+                })
+            labels, counts = self._value_counts(t)
+            target_dist = {"labels": labels, "values": counts.tolist()}
+
+        cat_assoc_matrix = None
+        if len(self.cat_cols) >= 2:
+            z = [[round(_cramers_v(self._table(i, j)), 4) for j in range(t)] for i in range(t)]
+            cat_assoc_matrix = {"z": z, "x": self.cat_cols, "y": self.cat_cols}
+
+        return {
+            "stats": stats,
+            "hists": hists,
+            "corr": corr_payload,
+            "target": target_dist,
+            "categorical": categorical,
+            "cat_vs_target": cat_vs_target,
+            "cat_associations": cat_associations,
+            "cat_assoc_matrix": cat_assoc_matrix,
+            "viz": {},
+            "probability_distribution": self._probability_distribution(),
+            "approximate": {
+                "method": "sketch",
+                "eda_version": EDA_VERSION,
+                "rows": self.rows,
+                "chunks": self.chunks,
+                "quantile_k": self.k,
+                "max_rank_error": max_rank_error,
+                "adaptive_hists": adaptive,
+                "error_bounds": {
+                    # [low, high] per describe statistic; rank_error is the
+                    # quartiles' bound as a fraction of the rows.
+                    "stats": stat_bounds,
+                    # Largest possible error of any bin count.
+                    "hists": hist_bounds,
+                    # Co-moments, category counts and the probability
+                    # histogram are exact up to floating-point rounding.
+                    "corr": 0.0,
+                    "categorical": 0,
+                    "cat_vs_target": 0,
+                    "cat_associations": 0.0,
+                    "cat_assoc_matrix": 0.0,
+                    "target": 0,
+                    "probability_distribution": 0,
+                },
+                "truncated_categories": [
+                    col for col, labels in zip(self.cat_cols + [self.target_col], self.coded) if labels.truncated
+                ],
+            },
+        }
+
+
+def sketch_eda_payload(chunks: Iterable[pd.DataFrame], k: int = DEFAULT_K) -> dict:
+    """Build the approximate EDA payload in one pass over ``chunks``."""
+    sketch = EdaSketch(k=k)
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch.payload()
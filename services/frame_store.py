@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+"""Typed columnar store for upload session datasets.
+
+A stored frame is a directory holding ``schema.json`` plus one raw binary
+file per column, read back through :class:`numpy.memmap`. Reading a subset of
+columns or a slice of rows therefore only touches those bytes, and dtypes
+survive the round trip (``Int64`` stays nullable integer instead of coming
+back as float, as it would through CSV).
+
+Column kinds:
+
+``bool`` / ``int`` / ``float``
+    ``bool``, ``int64`` or ``float64`` values.
+``Int64``
+    Pandas nullable integers: ``int64`` values plus a ``bool`` mask file.
+``cat``
+    Anything else: ``int32`` codes into ``categories`` (``-1`` is missing).
+    Read back as an ``object`` column, or with ``categorical=True`` as a
+    ``category`` column built straight from the codes. Up to ``INLINE_CATEGORIES`` values are
+    stored in the schema; longer lists (names, free text) go to a
+    ``<file>.cats`` sidecar that is only loaded when the column is read, so
+    the schema stays small and reading a page of other columns is O(rows
+    read), not O(rows stored).
+
+Column files are never modified in place. Every write creates new files and
+then atomically replaces ``schema.json``, so readers always see a consistent
+frame and unchanged column files can be hard-linked into another store.
+"""
+
+import functools
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_NAME = "schema.json"
+INLINE_CATEGORIES = 1024
+
+_DTYPES = {"bool": np.bool_, "int": np.int64, "float": np.float64, "Int64": np.int64, "cat": np.int32}
+# Numeric kinds ordered by generality; anything mixed with ``cat`` is ``cat``.
+_NUMERIC_ORDER = ["bool", "int", "Int64", "float"]
+
+
+def _kind_of(s: pd.Series) -> str:
+    dtype = s.dtype
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in "iu":
+        return "Int64"
+    if dtype == bool:
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    return "cat"
+
+
+def _promote(a: str, b: str) -> str:
+    if a == b:
+        return a
+    if a == "cat" or b == "cat":
+        return "cat"
+    if {a, b} == {"float", "Int64"}:
+        return "float"
+    return max(a, b, key=_NUMERIC_ORDER.index)
+
+
+def _py(value):
+    """Return a JSON-serialisable Python scalar for a category value."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+
+def read_schema(path: str) -> Optional[Dict[str, object]]:
+    """Return the schema of the frame at ``path`` or ``None`` if absent."""
+    try:
+        with open(os.path.join(path, SCHEMA_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def frame_exists(path: str) -> bool:
+    return read_schema(path) is not None
+
+
+def frame_rows(path: str) -> int:
+    schema = read_schema(path)
+    return int(schema["rows"]) if schema else 0
+
+
+def frame_version(path: str) -> Optional[str]:
+    """Return a token that changes whenever the frame at ``path`` is rewritten."""
+    try:
+        st = os.stat(os.path.join(path, SCHEMA_NAME))
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def frame_columns(path: str) -> List[str]:
+    schema = read_schema(path)
+    return [c["name"] for c in schema["columns"]] if schema else []
+
+
+def _write_schema(path: str, schema: Dict[str, object]) -> None:
+    tmp = os.path.join(path, f"{SCHEMA_NAME}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+    os.replace(tmp, os.path.join(path, SCHEMA_NAME))
+
+
+def _column_files(col: Dict[str, object]) -> List[str]:
+    return [col["file"]] + [col[k] for k in ("mask", "categories_file") if col.get(k)]
+
+
+@functools.lru_cache(maxsize=8)
+def _load_categories(fpath: str) -> List[object]:
+    # Column files are immutable and uniquely named, so the path is a safe key.
+    with open(fpath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _categories(path: str, col: Dict[str, object]) -> List[object]:
+    if col.get("categories_file"):
+        return _load_categories(os.path.join(path, col["categories_file"]))
+    return col["categories"]
+
+
+def _prune(path: str, schema: Dict[str, object]) -> None:
+    """Delete column files no longer referenced by ``schema``."""
+    keep = {SCHEMA_NAME}
+    for col in schema["columns"]:
+        keep.update(_column_files(col))
+    for name in os.listdir(path):
+        if name not in keep and not name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+
+class _ColumnWriter:
+    """Append-only writer for one column."""
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self.kind: Optional[str] = None
+        self.rows = 0
+        self.file = f"{uuid.uuid4().hex[:12]}.bin"
+        self.mask: Optional[str] = None
+        self.categories: List[object] = []
+        self._codes: Dict[object, int] = {}
+
+    def _fpath(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _append(self, name: str, arr: np.ndarray) -> None:
+        with open(self._fpath(name), "ab") as f:
+            f.write(np.ascontiguousarray(arr).tobytes())
+
+    def _existing(self) -> pd.Series:
+        """Return what has been written so far, for a kind promotion."""
+        col = {"kind": self.kind, "file": self.file, "mask": self.mask, "categories": self.categories}
+        return _read_column(self.path, col, self.rows, slice(None))
+
+    def _encode(self, s: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            value = _py(value)
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.categories)
+                self.categories.append(value)
+            lookup[i] = code
+        out = np.full(len(s), -1, dtype=np.int32)
+        present = codes >= 0
+        out[present] = lookup[codes[present]]
+        return out
+
+    def _write(self, s: pd.Series) -> None:
+        kind = self.kind
+        if kind == "cat":
+            self._append(self.file, self._encode(s.astype(object)))
+        elif kind == "Int64":
+            vals = s.astype("Int64")
+            self._append(self.file, vals.fillna(0).to_numpy(dtype=np.int64))
+            self._append(self.mask, vals.isna().to_numpy(dtype=np.bool_))
+        elif kind == "float":
+            self._append(self.file, s.to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            self._append(self.file, s.to_numpy(dtype=_DTYPES[kind]))
+        self.rows += len(s)
+
+    def _reset(self, kind: str) -> None:
+        for name in filter(None, (self.file, self.mask)):
+            if os.path.exists(self._fpath(name)):
+                os.remove(self._fpath(name))
+        self.kind, self.rows = kind, 0
+        self.categories, self._codes = [], {}
+        self.file = f"{uuid.uuid4().hex[:12]}.bin"
+        self.mask = None
+        self._start()
+
+    def append(self, s: pd.Series) -> None:
+        kind = _kind_of(s)
+        if self.rows == 0:
+            self._reset(kind)
+        else:
+            target = _promote(self.kind, kind)
+            if target != self.kind:
+                # Rare: a later chunk needs a more general kind. Rewrite what
+                # was already written under the new kind.
+                old = self._existing()
+                self._reset(target)
+                self._write(old)
+        self._write(s)
+
+    def _start(self) -> None:
+        open(self._fpath(self.file), "wb").close()
+        if self.kind == "Int64":
+            self.mask = f"{uuid.uuid4().hex[:12]}.mask"
+            open(self._fpath(self.mask), "wb").close()
+
+    def schema(self) -> Dict[str, object]:
+        col: Dict[str, object] = {"name": self.name, "kind": self.kind or "float", "file": self.file}
+        if self.mask:
+            col["mask"] = self.mask
+        if self.kind == "cat":
+            if len(self.categories) > INLINE_CATEGORIES:
+                col["categories_file"] = f"{self.file[:-4]}.cats"
+                with open(self._fpath(col["categories_file"]), "w", encoding="utf-8") as f:
+                    json.dump(self.categories, f)
+            else:
+                col["categories"] = self.categories
+        return col
+
+
+class FrameWriter:
+    """Write a frame to ``path`` chunk by chunk.
+
+    Chunks must share the same columns. Nothing is visible to readers until
+    :meth:`close`, which publishes the new schema; :meth:`abort` discards the
+    partial files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._columns: Optional[List[_ColumnWriter]] = None
+        self.rows = 0
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        if self._columns is None:
+            self._columns = [_ColumnWriter(self.path, str(c)) for c in chunk.columns]
+        elif [str(c) for c in chunk.columns] != [w.name for w in self._columns]:
+            raise ValueError("chunk columns differ from the first chunk")
+        for writer, (_, s) in zip(self._columns, chunk.items()):
+            writer.append(s)
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        for w in self._columns or []:
+            if w.kind is None:
+                w._start()
+        schema = {"rows": self.rows, "columns": [w.schema() for w in self._columns or []]}
+        _write_schema(self.path, schema)
+        _prune(self.path, schema)
+
+    def abort(self) -> None:
+        for w in self._columns or []:
+            for name in filter(None, (w.file, w.mask)):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_frame(df: pd.DataFrame, path: str, columns: Optional[Sequence[str]] = None) -> None:
+    """Store ``df`` at ``path``.
+
+    With ``columns``, and when the stored frame has the same columns and row
+    count, only those columns are rewritten; the other column files are kept.
+    """
+    schema = read_schema(path)
+    if (
+        columns is not None
+        and schema is not None
+        and int(schema["rows"]) == len(df)
+        and [c["name"] for c in schema["columns"]] == [str(c) for c in df.columns]
+    ):
+        changed = [str(c) for c in columns]
+        if not changed:
+            return
+        writers = {}
+        try:
+            for name in changed:
+                w = _ColumnWriter(path, name)
+                w.append(df[name])
+                writers[name] = w
+        except Exception:
+            for w in writers.values():
+                for f in filter(None, (w.file, w.mask)):
+                    os.remove(os.path.join(path, f))
+            raise
+        schema["columns"] = [
+            writers[c["name"]].schema() if c["name"] in writers else c for c in schema["columns"]
+        ]
+        _write_schema(path, schema)
+        _prune(path, schema)
+        return
+    with FrameWriter(path) as w:
+        w.append(df)
+
+
+def _read_column(
+    path: str, col: Dict[str, object], rows: int, sl: slice, categorical: bool = False
+) -> pd.Series:
+    kind = col["kind"]
+    fpath = os.path.join(path, col["file"])
+    if rows == 0:
+        values = np.empty(0, dtype=_DTYPES[kind])
+    else:
+        values = np.array(np.memmap(fpath, dtype=_DTYPES[kind], mode="r", shape=(rows,))[sl])
+    if kind == "Int64":
+        mask = np.array(
+            np.memmap(os.path.join(path, col["mask"]), dtype=np.bool_, mode="r", shape=(rows,))[sl]
+        ) if rows else np.empty(0, dtype=np.bool_)
+        return pd.Series(pd.arrays.IntegerArray(values, mask))
+    if kind == "cat":
+        categories = _categories(path, col)
+        if categorical:
+            try:
+                return pd.Series(pd.Categorical.from_codes(values, categories=categories))
+            except (TypeError, ValueError):
+                pass  # e.g. 1 and 1.0 stored as separate categories
+        lookup = np.empty(len(categories) + 1, dtype=object)
+        lookup[:-1] = categories
+        lookup[-1] = np.nan
+        return pd.Series(lookup[values], dtype=object)
+    return pd.Series(values)
+
+
+def read_frame(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    start: int = 0,
+    stop: Optional[int] = None,
+    categorical: bool = False,
+) -> pd.DataFrame:
+    """Return rows ``start:stop`` of ``columns`` (default: all) from ``path``.
+
+    Only the requested columns and rows are read from disk. ``categorical``
+    returns ``cat`` columns as ``category`` dtype instead of ``object``,
+    which skips materialising one Python object per row. Raises
+    ``FileNotFoundError`` if no frame is stored at ``path``.
+    """
+    schema = read_schema(path)
+    if schema is None:
+        raise FileNotFoundError(path)
+    rows = int(schema["rows"])
+    sl = slice(*slice(start, stop).indices(rows))
+    by_name = {c["name"]: c for c in schema["columns"]}
+    names = list(by_name) if columns is None else [str(c) for c in columns]
+    missing = [n for n in names if n not in by_name]
+    if missing:
+        raise KeyError(f"columns not stored: {missing}")
+    data = {n: _read_column(path, by_name[n], rows, sl, categorical) for n in names}
+    n = len(range(rows)[sl])
+    return pd.DataFrame(data, columns=names, index=pd.RangeIndex(n))
+
+
+def iter_frames(
+    path: str, chunk_rows: int, columns: Optional[Sequence[str]] = None, categorical: bool = False
+) -> Iterator[pd.DataFrame]:
+    """Yield the stored frame in chunks of ``chunk_rows`` rows."""
+    rows = frame_rows(path)
+    chunk_rows = max(1, int(chunk_rows))
+    for start in range(0, rows, chunk_rows):
+        chunk = read_frame(path, columns, start, start + chunk_rows, categorical)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        yield chunk
+
+
+def copy_frame(src: str, dst: str) -> None:
+    """Make ``dst`` a copy of ``src``, hard-linking column files when possible."""
+    schema = read_schema(src)
+    if schema is None:
+        raise FileNotFoundError(src)
+    os.makedirs(dst, exist_ok=True)
+    for col in schema["columns"]:
+        for name in _column_files(col):
+            target = os.path.join(dst, name)
+            if os.path.exists(target):
+                continue
+            try:
+                os.link(os.path.join(src, name), target)
+            except OSError:
+                shutil.copyfile(os.path.join(src, name), target)
+    _write_schema(dst, schema)
+    _prune(dst, schema)
+
+
+def export_csv(path: str, csv_path: str, chunk_rows: int = 50000) -> str:
+    """Write the stored frame to ``csv_path`` chunk by chunk and return it.
+
+    An existing export newer than the frame's schema is reused.
+    """
+    schema_path = os.path.join(path, SCHEMA_NAME)
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(schema_path):
+        return csv_path
+    tmp = f"{csv_path}.{os.getpid()}.tmp"
+    try:
+        header = True
+        for chunk in iter_frames(path, chunk_rows):
+            chunk.to_csv(tmp, mode="w" if header else "a", header=header, index=False)
+            header = False
+        if header:
+            pd.DataFrame(columns=frame_columns(path)).to_csv(tmp, index=False)
+        os.replace(tmp, csv_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return csv_path
+
+
+def remove_frame(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+"""Copy-on-write preprocessing history for an upload session.
+
+The mapped frame written at ingestion is the immutable base. Every
+preprocessing step is stored in its own directory as a delta against the
+state before it:
+
+``deleted``
+    Ids of the rows the step removed (a one-column frame store).
+``edit_<n>``
+    For each column whose values changed, the ids and new values of the
+    changed cells.
+``log.json``
+    The cleaning-log entries the step produced.
+``ref_<n>``
+    Ids of the rows log entry ``n`` refers to (e.g. the rows a step
+    imputed), paged from the state before the step by :meth:`referenced_rows`.
+
+Row ids are positions in the base frame, so a step writes bytes in
+proportion to what it changed rather than to the dataset. A step that adds,
+drops or reorders columns or rows is stored as a full snapshot instead.
+
+``history.json`` lists the steps and a cursor. Undo and redo only move the
+cursor; committing a new step discards the undone ones. The state at the
+cursor is materialised on demand (base plus applied deltas) and kept in a
+small per-process cache keyed by step id, so consecutive steps never replay
+the history.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.frame_store import SCHEMA_NAME, frame_exists, frame_rows, read_frame, write_frame
+
+MANIFEST_NAME = "history.json"
+CACHE_SIZE = 4
+_REF_RE = re.compile(r"^([0-9a-f]{12})-(\d+)$")
+
+_State = Tuple[pd.DataFrame, np.ndarray]
+_cache: "OrderedDict[Tuple[str, int, str], _State]" = OrderedDict()
+_cache_lock = threading.Lock()
+_locks: Dict[str, threading.RLock] = {}
+
+
+def _cache_get(key) -> Optional[_State]:
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+        return hit
+
+
+def _cache_put(key, state: _State) -> None:
+    with _cache_lock:
+        _cache[key] = state
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cache_drop(root: str) -> None:
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] == root]:
+            del _cache[key]
+
+
+def _changed(before: pd.Series, after: pd.Series) -> np.ndarray:
+    """Return a mask of the cells whose value differs (NaN equals NaN)."""
+    both_na = before.isna().to_numpy(dtype=bool) & after.isna().to_numpy(dtype=bool)
+    try:
+        eq = (before == after).fillna(False).to_numpy(dtype=bool)
+    except (TypeError, ValueError):
+        eq = before.to_numpy(dtype=object) == after.to_numpy(dtype=object)
+    return ~(eq | both_na)
+
+
+def _astype(s: pd.Series, dtype: str) -> pd.Series:
+    if str(s.dtype) == dtype:
+        return s
+    try:
+        return s.astype(dtype)
+    except (TypeError, ValueError):
+        return s
+
+
+def _assign(s: pd.Series, pos: np.ndarray, values: pd.Series, dtype: str) -> pd.Series:
+    """Return ``s`` with ``values`` at positions ``pos``, cast to ``dtype``."""
+    if str(s.dtype) == dtype:
+        try:
+            out = s.copy()
+            out.iloc[pos] = values.to_numpy()
+            return out
+        except (TypeError, ValueError):
+            pass
+    vals = s.to_numpy(dtype=object, copy=True)
+    vals[pos] = values.to_numpy(dtype=object)
+    return _astype(pd.Series(vals, name=s.name), dtype)
+
+
+class FrameHistory:
+    """Undoable sequence of preprocessing steps over the frame at ``base_path``.
+
+    Step files and the manifest live under ``root``.
+    """
+
+    def __init__(self, base_path: str, root: str):
+        self.base_path = base_path
+        self.root = os.path.abspath(root)
+        with _cache_lock:
+            self._lock = _locks.setdefault(self.root, threading.RLock())
+
+    # -- manifest ----------------------------------------------------------
+    def _manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"steps": [], "cursor": 0}
+
+    def _save(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST_NAME)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def _key(self, manifest: Dict[str, Any], cursor: int) -> Tuple[str, int, str]:
+        # The base token changes when the upload is re-ingested.
+        token = os.stat(os.path.join(self.base_path, SCHEMA_NAME)).st_mtime_ns
+        return self.root, token, manifest["steps"][cursor - 1]["id"] if cursor else "base"
+
+    # -- materialisation ---------------------------------------------------
+    def _apply(self, step: Dict[str, Any], df: pd.DataFrame, ids: np.ndarray) -> _State:
+        step_dir = os.path.join(self.root, step["id"])
+        if step.get("snapshot"):
+            df = read_frame(os.path.join(step_dir, "frame"))
+            return df, np.arange(len(df), dtype=np.int64)
+        if step["deleted"]:
+            dead = read_frame(os.path.join(step_dir, "deleted"))["row"].to_numpy(dtype=np.int64)
+            keep = ~np.isin(ids, dead)
+            df, ids = df.loc[keep].reset_index(drop=True), ids[keep]
+        elif step["columns"]:
+            df = df.copy()
+        for col in step["columns"]:
+            name = col["name"]
+            if col["edits"]:
+                edit = read_frame(os.path.join(step_dir, col["dir"]))
+                pos = np.searchsorted(ids, edit["row"].to_numpy(dtype=np.int64))
+                df[name] = _assign(df[name], pos, edit["value"], col["dtype"])
+            else:
+                df[name] = _astype(df[name], col["dtype"])
+        return df, ids
+
+    def _materialise(self, manifest: Dict[str, Any], cursor: Optional[int] = None) -> _State:
+        cursor = manifest["cursor"] if cursor is None else cursor
+        state, start = None, 0
+        for i in range(cursor, -1, -1):
+            state = _cache_get(self._key(manifest, i))
+            if state is not None:
+                start = i
+                break
+        if state is None:
+            df = read_frame(self.base_path)
+            state = df, np.arange(len(df), dtype=np.int64)
+        for step in manifest["steps"][start:cursor]:
+            state = self._apply(step, *state)
+        if start != cursor:
+            _cache_put(self._key(manifest, cursor), state)
+        return state
+
+    def current(self) -> pd.DataFrame:
+        """Return the dataset at the cursor (a copy the caller may modify)."""
+        with self._lock:
+            return self._materialise(self._manifest())[0].copy()
+
+    def read(self, columns=None, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """Return rows ``start:stop`` of ``columns`` of the current dataset.
+
+        Without applied steps only those rows are read from the base frame;
+        otherwise they are sliced from the cached state.
+        """
+        with self._lock:
+            manifest = self._manifest()
+            if not manifest["cursor"]:
+                return read_frame(self.base_path, columns, start, stop)
+            df = self._materialise(manifest)[0]
+        part = df.iloc[start:stop]
+        if columns is not None:
+            part = part[list(columns)]
+        return part.reset_index(drop=True)
+
+    def version(self) -> str:
+        """Return an id that changes whenever the current dataset changes."""
+        manifest = self._manifest()
+        return self._key(manifest, manifest["cursor"])[2]
+
+    # -- steps -------------------------------------------------------------
+    def commit(
+        self,
+        task: str,
+        after: pd.DataFrame,
+        entries: List[Dict[str, Any]],
+        refs: Optional[Dict[int, np.ndarray]] = None,
+    ) -> Dict[str, Any]:
+        """Record ``after`` as the result of ``task`` applied to :meth:`current`.
+
+        ``after`` must keep the row labels of the frame it was computed from;
+        anything else is stored as a snapshot. Undone steps are discarded.
+        ``refs`` maps a log entry's index to row positions in :meth:`current`;
+        the entry gets a ``details_ref`` for :meth:`referenced_rows`.
+        """
+        with self._lock:
+            manifest = self._manifest()
+            before, ids = self._materialise(manifest)
+            step: Dict[str, Any] = {"id": uuid.uuid4().hex[:12], "task": task,
+                                    "deleted": 0, "columns": [], "log": len(entries)}
+            step_dir = os.path.join(self.root, step["id"])
+            os.makedirs(step_dir, exist_ok=True)
+            for i, pos in (refs or {}).items():
+                write_frame(pd.DataFrame({"row": ids[np.asarray(pos, dtype=np.int64)]}),
+                            os.path.join(step_dir, f"ref_{i}"))
+                entries[i]["details_ref"] = f"{step['id']}-{i}"
+            labels = after.index
+            delta = (
+                after.columns.equals(before.columns)
+                and labels.is_unique
+                and labels.is_monotonic_increasing
+                and pd.api.types.is_integer_dtype(labels.dtype)
+                and (len(labels) == 0 or (labels[0] >= 0 and labels[-1] < len(before)))
+            )
+            after = after.reset_index(drop=True)
+            if delta:
+                pos = labels.to_numpy(dtype=np.int64)
+                keep = np.zeros(len(before), dtype=bool)
+                keep[pos] = True
+                if not keep.all():
+                    write_frame(pd.DataFrame({"row": ids[~keep]}), os.path.join(step_dir, "deleted"))
+                    step["deleted"] = int((~keep).sum())
+                    before = before.iloc[pos].reset_index(drop=True)
+                    ids = ids[pos]
+                for i, name in enumerate(after.columns):
+                    a, b = before[name], after[name]
+                    mask = _changed(a, b)
+                    n = int(mask.sum())
+                    if not n and str(a.dtype) == str(b.dtype):
+                        continue
+                    col = {"name": name, "dtype": str(b.dtype), "edits": n}
+                    if n:
+                        col["dir"] = f"edit_{i}"
+                        write_frame(
+                            pd.DataFrame({"row": ids[mask], "value": b[mask].reset_index(drop=True)}),
+                            os.path.join(step_dir, col["dir"]),
+                        )
+                    step["columns"].append(col)
+            else:
+                write_frame(after, os.path.join(step_dir, "frame"))
+                step["snapshot"] = True
+                ids = np.arange(len(after), dtype=np.int64)
+            with open(os.path.join(step_dir, "log.json"), "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+
+            cursor = manifest["cursor"]
+            for old in manifest["steps"][cursor:]:
+                shutil.rmtree(os.path.join(self.root, old["id"]), ignore_errors=True)
+            manifest["steps"] = manifest["steps"][:cursor] + [step]
+            manifest["cursor"] = cursor + 1
+            self._save(manifest)
+            _cache_put(self._key(manifest, manifest["cursor"]), (after, ids))
+            return step
+
+    def _move(self, delta: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            manifest = self._manifest()
+            cursor = manifest["cursor"] + delta
+            if not 0 <= cursor <= len(manifest["steps"]):
+                return None
+            step = manifest["steps"][min(cursor, manifest["cursor"])]
+            manifest["cursor"] = cursor
+            self._save(manifest)
+            return step
+
+    def undo(self) -> Optional[Dict[str, Any]]:
+        """Step back one step; returns the undone step or ``None``."""
+        return self._move(-1)
+
+    def redo(self) -> Optional[Dict[str, Any]]:
+        """Re-apply the next undone step; returns it or ``None``."""
+        return self._move(1)
+
+    def referenced_rows(
+        self, ref: str, start: int = 0, stop: Optional[int] = None
+    ) -> Tuple[pd.DataFrame, int]:
+        """Return rows ``start:stop`` of a log entry's rows and their total.
+
+        Rows show their values before the step ran. Raises ``KeyError`` for
+        an unknown or discarded reference.
+        """
+        m = _REF_RE.match(ref or "")
+        if m is None:
+            raise KeyError(ref)
+        with self._lock:
+            manifest = self._manifest()
+            k = next((i for i, s in enumerate(manifest["steps"]) if s["id"] == m.group(1)), None)
+            path = os.path.join(self.root, m.group(1), f"ref_{m.group(2)}")
+            if k is None or not frame_exists(path):
+                raise KeyError(ref)
+            wanted = read_frame(path, ["row"], start, stop)["row"].to_numpy(dtype=np.int64)
+            df, ids = self._materialise(manifest, k)
+        rows = df.iloc[np.searchsorted(ids, wanted)].reset_index(drop=True)
+        return rows, frame_rows(path)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Return the cleaning-log entries of the applied steps, in order."""
+        manifest = self._manifest()
+        out: List[Dict[str, Any]] = []
+        for step in manifest["steps"][:manifest["cursor"]]:
+            try:
+                with open(os.path.join(self.root, step["id"], "log.json"), "r", encoding="utf-8") as f:
+                    out.extend(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return out
+
+    def state(self) -> Dict[str, Any]:
+        """Return the cursor, undo/redo availability and step summaries."""
+        manifest = self._manifest()
+        cursor = manifest["cursor"]
+        return {
+            "cursor": cursor,
+            "can_undo": cursor > 0,
+            "can_redo": cursor < len(manifest["steps"]),
+            "steps": [
+                {
+                    "task": s["task"],
+                    "deleted": s["deleted"],
+                    "edited": sum(c["edits"] for c in s["columns"]),
+                    "applied": i < cursor,
+                }
+                for i, s in enumerate(manifest["steps"])
+            ],
+        }
+
+    def reset(self) -> None:
+        """Forget every step, e.g. after the base frame was re-ingested."""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            _cache_drop(self.root)
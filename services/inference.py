@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+"""Single-pass model inference helpers.
+
+``predict`` and ``predict_proba`` on a scikit-learn pipeline each run the full
+ColumnTransformer -> RandomForest pass. The helpers here derive the label from
+the probabilities of a single ``predict_proba`` call instead, and offer a fast
+path for one validated record that skips building a :class:`pandas.DataFrame`.
+"""
+
+import math
+import weakref
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data import INPUT_COLUMNS
+from .prediction_cache import PredictionCache, canonical_record, canonical_rows
+
+
+class FeatureEncoder:
+    """Encode an ``INPUT_COLUMNS`` dict straight into the forest's input row.
+
+    Built from a fitted ``Pipeline(ColumnTransformer, estimator)`` whose
+    transformers are one-hot encoders or passthroughs, which is the layout of
+    ``ml/model.pkl``. Use :func:`get_encoder` rather than instantiating this
+    directly; it returns ``None`` for pipelines the encoder cannot mirror.
+    """
+
+    def __init__(self, blocks: list, n_features: int, estimator):
+        self._blocks = blocks
+        self.n_features = n_features
+        self.estimator = estimator
+
+    def encode(self, record: Mapping[str, object]) -> Optional[np.ndarray]:
+        """Return a ``(1, n_features)`` array or ``None`` if a value is missing."""
+        out = np.zeros((1, self.n_features), dtype=float)
+        row = out[0]
+        for kind, offset, cols, lookups in self._blocks:
+            if kind == "onehot":
+                for col, lookup in zip(cols, lookups):
+                    val = record.get(col)
+                    if val is None or (isinstance(val, float) and math.isnan(val)):
+                        return None
+                    idx = lookup[0].get(val)
+                    if idx is not None:
+                        row[offset + idx] = 1.0
+                    elif lookup[1]:
+                        raise ValueError(f"Found unknown categories ['{val}'] in column '{col}'")
+                    offset += lookup[2]
+            else:
+                for i, col in enumerate(cols):
+                    val = record.get(col)
+                    if val is None:
+                        return None
+                    fval = float(val)
+                    if math.isnan(fval):
+                        return None
+                    row[offset + i] = fval
+        return out
+
+
+def _compile_encoder(model) -> Optional[FeatureEncoder]:
+    steps = getattr(model, "steps", None)
+    if not steps or len(steps) != 2:
+        return None
+    pre, est = steps[0][1], steps[1][1]
+    if not hasattr(pre, "transformers_") or not hasattr(est, "predict_proba"):
+        return None
+    # Estimators fitted on named frames warn when handed bare arrays.
+    if hasattr(est, "feature_names_in_"):
+        return None
+
+    blocks = []
+    n_features = 0
+    for name, trans, cols in pre.transformers_:
+        if (isinstance(trans, str) and trans == "drop") or (
+            isinstance(cols, (list, tuple)) and not cols
+        ):
+            continue
+        if not isinstance(cols, (list, tuple)) or not all(isinstance(c, str) for c in cols):
+            return None
+        sl = pre.output_indices_.get(name)
+        if sl is None:
+            return None
+        if (isinstance(trans, str) and trans == "passthrough") or (
+            type(trans).__name__ == "FunctionTransformer"
+            and trans.func is None
+        ):
+            blocks.append(("passthrough", sl.start, list(cols), None))
+            n_features = max(n_features, sl.stop)
+            continue
+        if type(trans).__name__ == "OneHotEncoder":
+            if (
+                getattr(trans, "drop_idx_", None) is not None
+                or getattr(trans, "_infrequent_enabled", False)
+            ):
+                return None
+            lookups = []
+            for cats in trans.categories_:
+                mapping = {}
+                for i, c in enumerate(cats):
+                    if isinstance(c, float) and math.isnan(c):
+                        return None
+                    mapping[c] = i
+                lookups.append((mapping, trans.handle_unknown == "error", len(cats)))
+            blocks.append(("onehot", sl.start, list(cols), lookups))
+            n_features = max(n_features, sl.stop)
+            continue
+        return None
+
+    if n_features != getattr(est, "n_features_in_", n_features):
+        return None
+    return FeatureEncoder(blocks, n_features, est)
+
+
+_ENCODERS: "weakref.WeakKeyDictionary[object, Optional[FeatureEncoder]]" = weakref.WeakKeyDictionary()
+
+
+def get_encoder(model) -> Optional[FeatureEncoder]:
+    """Return a cached :class:`FeatureEncoder` for ``model`` if supported."""
+    try:
+        return _ENCODERS[model]
+    except KeyError:
+        pass
+    except TypeError:  # pragma: no cover - model not weak-referenceable
+        return _compile_encoder(model)
+    enc = _compile_encoder(model)
+    try:
+        _ENCODERS[model] = enc
+    except TypeError:  # pragma: no cover
+        pass
+    return enc
+
+
+def _labels_from_proba(model, proba: np.ndarray) -> np.ndarray:
+    classes = getattr(model, "classes_", None)
+    if classes is None:
+        classes = np.arange(proba.shape[1])
+    return np.asarray(classes).take(np.argmax(proba, axis=1), axis=0)
+
+
+def _predict_uncached(model, X: pd.DataFrame) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    if not hasattr(model, "predict_proba"):
+        return np.asarray(model.predict(X)), None
+    proba = np.asarray(model.predict_proba(X))
+    return _labels_from_proba(model, proba), proba[:, 1].astype(float)
+
+
+def predict_frame(
+    model,
+    X: pd.DataFrame,
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return ``(labels, positive_probabilities)`` from one forward pass.
+
+    Labels are derived from the probabilities exactly as scikit-learn's
+    classifiers do (``classes_[argmax]``). Models without ``predict_proba``
+    fall back to ``predict`` and yield ``None`` probabilities.
+
+    When both ``version`` and ``cache`` are given, rows already scored by that
+    model version are served from the cache and only the misses are passed to
+    the model, still in a single call. Frames longer than ``cache.max_rows``
+    skip the cache entirely.
+    """
+    if cache is None or version is None or not cache.enabled or not hasattr(model, "predict_proba"):
+        return _predict_uncached(model, X)
+    if cache.max_rows and len(X) > cache.max_rows:
+        return _predict_uncached(model, X)
+    keys = canonical_rows(X)
+    if keys is None:
+        return _predict_uncached(model, X)
+
+    n = len(keys)
+    labels = np.empty(n, dtype=object)
+    probs = np.empty(n, dtype=float)
+    miss_idx = []
+    for i, key in enumerate(keys):
+        hit = cache.get((version, key))
+        if hit is None:
+            miss_idx.append(i)
+        else:
+            labels[i], probs[i] = hit
+    if miss_idx:
+        sub = X.iloc[miss_idx] if len(miss_idx) < n else X
+        sub_labels, sub_probs = _predict_uncached(model, sub)
+        for j, i in enumerate(miss_idx):
+            labels[i] = sub_labels[j]
+            probs[i] = sub_probs[j]
+            cache.put((version, keys[i]), (sub_labels[j], float(sub_probs[j])))
+    return np.asarray(labels.tolist()), probs
+
+
+def summarize(label: int, pos_prob: Optional[float]) -> Dict[str, object]:
+    """Return the label/probability/confidence triple shown to users."""
+    if pos_prob is None:
+        confidence = 0.5
+    else:
+        confidence = pos_prob if label == 1 else 1.0 - pos_prob
+    return {"label": label, "pos_prob": pos_prob, "confidence": float(confidence)}
+
+
+def predict_one(
+    model,
+    record: Mapping[str, object],
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
+    batcher=None,
+) -> Dict[str, object]:
+    """Predict a single validated ``INPUT_COLUMNS`` record.
+
+    Uses the DataFrame-free fast path when the pipeline layout is supported
+    and falls back to :func:`predict_frame` otherwise. ``version``/``cache``
+    behave as in :func:`predict_frame`. Cache misses are handed to
+    ``batcher`` (a :class:`services.batching.MicroBatcher`) when given, so
+    concurrent callers share one model call.
+
+    Returns
+    -------
+    dict
+        ``label`` (int), ``pos_prob`` (float or ``None``) and ``confidence``.
+    """
+    key = None
+    if cache is not None and version is not None and cache.enabled:
+        try:
+            key = (version, canonical_record(record))
+        except (TypeError, ValueError):
+            key = None
+        hit = cache.get(key) if key is not None else None
+        if hit is not None:
+            return summarize(int(hit[0]), hit[1])
+
+    if batcher is not None:
+        result = batcher.predict(model, record)
+        if key is not None and result["pos_prob"] is not None:
+            cache.put(key, (result["label"], result["pos_prob"]))
+        return result
+
+    enc = get_encoder(model)
+    x = enc.encode(record) if enc is not None else None
+    if x is not None:
+        proba = np.asarray(enc.estimator.predict_proba(x))
+        label = int(_labels_from_proba(enc.estimator, proba)[0])
+        pos_prob: Optional[float] = float(proba[0, 1])
+    else:
+        X = pd.DataFrame([record], columns=INPUT_COLUMNS)
+        labels, probs = _predict_uncached(model, X)
+        label = int(labels[0])
+        pos_prob = None if probs is None else float(probs[0])
+    if key is not None and pos_prob is not None:
+        cache.put(key, (label, pos_prob))
+    return summarize(label, pos_prob)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+"""Streaming CSV ingestion for uploaded files.
+
+The encoding and delimiter are sniffed from a prefix of the file, headers are
+read without touching the body, and :func:`ingest_csv` converts the file
+chunk by chunk into a :mod:`services.frame_store` frame, so peak memory
+depends on ``chunk_rows`` rather than on the size of the upload.
+
+Uploads may be gzip, bz2, xz or single-member zip compressed.
+:func:`save_upload` decompresses them block by block while writing the raw
+file, which is itself gzip-compressed when its name ends in ``.gz``; every
+reader here opens it through :func:`open_raw`, so the expanded CSV never
+exists on disk.
+"""
+
+import bz2
+import codecs
+import contextlib
+import csv
+import gzip
+import json
+import lzma
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .frame_store import FrameWriter
+
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = ",;\t|"
+
+# Upload suffix -> compression understood by :func:`save_upload`.
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zip": "zip"}
+# Raw uploads are re-read a few times at most; favour write speed.
+RAW_COMPRESSLEVEL = 1
+
+ChunkTransform = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+class IngestLimitError(ValueError):
+    """Raised when an upload exceeds the configured row or byte limit."""
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    """Encoding and delimiter of an uploaded CSV."""
+
+    encoding: str = "utf-8"
+    delimiter: str = ","
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CsvFormat"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def upload_compression(filename: str) -> Optional[str]:
+    """Return the compression of an upload named ``filename``.
+
+    ``None`` means a plain ``.csv``. ``.csv.gz``, ``.csv.bz2``, ``.csv.xz``
+    and ``.zip`` are accepted; anything else raises :class:`ValueError`.
+    """
+    name = filename.lower()
+    stem, ext = os.path.splitext(name)
+    if ext == ".csv":
+        return None
+    if ext == ".zip" or (ext in COMPRESSIONS and stem.endswith(".csv")):
+        return COMPRESSIONS[ext]
+    raise ValueError("Only .csv files (optionally .gz, .bz2, .xz or .zip compressed) are supported.")
+
+
+def open_raw(path: str, mode: str = "rb"):
+    """Open ``path`` in binary ``mode``, gzip-compressed if it ends in ``.gz``."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=RAW_COMPRESSLEVEL)
+    return open(path, mode)
+
+
+@contextlib.contextmanager
+def _decompressed(stream, compression: Optional[str]) -> Iterator:
+    """Yield a binary reader over the decompressed contents of ``stream``."""
+    if compression is None:
+        yield stream
+    elif compression == "gzip":
+        with gzip.GzipFile(fileobj=stream, mode="rb") as f:
+            yield f
+    elif compression == "bz2":
+        with bz2.BZ2File(stream) as f:
+            yield f
+    elif compression == "xz":
+        with lzma.LZMAFile(stream) as f:
+            yield f
+    elif compression == "zip":
+        with contextlib.ExitStack() as stack:
+            if not (hasattr(stream, "seekable") and stream.seekable()):
+                # The zip directory is at the end; spool the compressed bytes.
+                spool = stack.enter_context(tempfile.TemporaryFile())
+                shutil.copyfileobj(stream, spool)
+                spool.seek(0)
+                stream = spool
+            archive = stack.enter_context(zipfile.ZipFile(stream))
+            members = [m for m in archive.infolist()
+                       if not m.is_dir() and not m.filename.startswith("__MACOSX/")]
+            if len(members) != 1:
+                raise ValueError("ZIP archives must contain exactly one CSV file.")
+            yield stack.enter_context(archive.open(members[0]))
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+
+def sniff_csv(path: str, sample_bytes: int = SNIFF_BYTES) -> CsvFormat:
+    """Guess the encoding and delimiter of ``path`` from its first bytes.
+
+    UTF-8 (with or without BOM) is preferred; a prefix that does not decode
+    falls back to latin-1, which accepts any byte sequence.
+    """
+    with open_raw(path) as f:
+        prefix = f.read(sample_bytes)
+    encoding = "utf-8-sig" if prefix.startswith(codecs.BOM_UTF8) else "utf-8"
+    try:
+        # ``final=False`` tolerates a multi-byte character cut off at the end.
+        text = codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+        text = prefix.decode(encoding)
+
+    lines = text.splitlines()
+    sample = "\n".join(lines[:-1] if len(lines) > 1 else lines)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    return CsvFormat(encoding=encoding, delimiter=delimiter)
+
+
+def read_header(path: str, fmt: CsvFormat) -> List[str]:
+    """Return the column names of ``path`` without reading its body."""
+    return list(pd.read_csv(path, nrows=0, encoding=fmt.encoding, sep=fmt.delimiter).columns)
+
+
+def save_upload(
+    stream,
+    dst: str,
+    max_bytes: int = 0,
+    block_size: int = 1 << 20,
+    compression: Optional[str] = None,
+) -> int:
+    """Copy ``stream`` to ``dst`` in blocks, stopping at ``max_bytes``.
+
+    ``compression`` (see :func:`upload_compression`) is undone on the fly,
+    and ``dst`` is written through :func:`open_raw`. ``max_bytes`` limits
+    the decompressed size. Raises :class:`IngestLimitError` (and removes
+    ``dst``) as soon as the limit is crossed, so an oversized upload is never
+    written out in full; a corrupt archive also leaves no ``dst`` behind.
+    Returns the number of decompressed bytes written.
+    """
+    size = 0
+    try:
+        with _decompressed(stream, compression) as src, open_raw(dst, "wb") as out:
+            for block in iter(lambda: src.read(block_size), b""):
+                size += len(block)
+                if max_bytes and size > max_bytes:
+                    raise IngestLimitError(
+                        f"File is larger than the {max_bytes / 1e6:.1f} MB limit."
+                    )
+                out.write(block)
+    except Exception:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+    return size
+
+
+def _ingest(
+    src: str,
+    dst: str,
+    fmt: CsvFormat,
+    transform: Optional[ChunkTransform],
+    chunk_rows: int,
+    max_rows: int,
+) -> int:
+    rows = 0
+    reader = pd.read_csv(src, chunksize=chunk_rows, encoding=fmt.encoding, sep=fmt.delimiter)
+    with FrameWriter(dst) as writer:
+        for chunk in reader:
+            rows += len(chunk)
+            if max_rows and rows > max_rows:
+                raise IngestLimitError(f"File has more than {max_rows} rows.")
+            writer.append(transform(chunk) if transform is not None else chunk)
+        if writer.rows == 0:
+            # Header-only file: keep the (transformed) columns.
+            empty = pd.read_csv(src, nrows=0, encoding=fmt.encoding, sep=fmt.delimiter)
+            writer.append(transform(empty) if transform is not None else empty)
+    return rows
+
+
+def ingest_csv(
+    src: str,
+    dst: str,
+    fmt: CsvFormat,
+    transform: Optional[ChunkTransform] = None,
+    *,
+    chunk_rows: int = 50000,
+    max_rows: int = 0,
+) -> Tuple[int, CsvFormat]:
+    """Stream ``src`` through ``transform`` into the frame store at ``dst``.
+
+    Nothing is published at ``dst`` unless the whole input was read (see
+    :class:`services.frame_store.FrameWriter`). If a byte past the sniffed
+    prefix turns out not to be UTF-8 the pass is restarted as latin-1,
+    matching the old whole-file fallback.
+
+    Returns
+    -------
+    tuple
+        ``(rows, fmt)`` with the number of data rows and the format actually
+        used to decode ``src``.
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    try:
+        rows = _ingest(src, dst, fmt, transform, chunk_rows, max_rows)
+    except UnicodeDecodeError:
+        if fmt.encoding == "latin-1":
+            raise
+        fmt = CsvFormat(encoding="latin-1", delimiter=fmt.delimiter)
+        rows = _ingest(src, dst, fmt, transform, chunk_rows, max_rows)
+    return rows, fmt
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+"""In-process background jobs with file-backed status records.
+
+:class:`JobRunner` runs job functions on a thread pool inside an application
+context. Each job's state lives in ``<root>/<job_id>.json`` (written
+atomically), so any worker process can report status, and cancellation is a
+``<job_id>.cancel`` marker that the running job polls through
+:meth:`JobContext.progress`. No external broker is needed.
+
+A job function receives a :class:`JobContext` and returns a JSON-serialisable
+dict. The keys ``file``, ``download_name`` and ``mimetype`` mark a downloadable
+result; ``redirect`` tells the client where to go next.
+
+A job submitted with ``exclusive=True`` is refused with :class:`JobBusy`
+while another job with the same ``scope`` is queued or running, and one
+submitted with ``cancellable=False`` can only be cancelled before it starts.
+
+Finished jobs are kept for ``ttl`` seconds after their last update;
+:meth:`JobRunner.prune` then deletes the record and every ``<job_id>.*`` file
+(e.g. the PDF), and a daemon thread runs it every ``sweep_interval`` seconds.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = {QUEUED, RUNNING}
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested."""
+
+
+class JobError(Exception):
+    """Raised by a job function to fail with a user-facing message."""
+
+
+class JobBusy(Exception):
+    """Raised by :meth:`JobRunner.submit` when the scope already has a job."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class JobContext:
+    """Handle passed to a running job for progress reports and cancellation."""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self.runner = runner
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return os.path.exists(self.runner._cancel_path(self.job_id))
+
+    def check(self) -> None:
+        """Raise :class:`JobCancelled` if cancellation was requested."""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done: int, total: int, message: Optional[str] = None) -> None:
+        """Record progress and stop the job if it was cancelled."""
+        self.check()
+        pct = round(done * 100.0 / total, 1) if total else 0.0
+        self.runner._update(self.job_id, done=done, total=total, progress=min(pct, 100.0),
+                            **({"message": message} if message else {}))
+
+
+JobFn = Callable[[JobContext], Dict[str, Any]]
+
+
+class JobRunner:
+    """Run jobs on ``max_workers`` threads and persist their records in ``root``.
+
+    Records and files of finished jobs are deleted ``ttl`` seconds after
+    their last update (``0`` keeps them forever).
+    """
+
+    def __init__(self, root: str, max_workers: int = 2, app=None, ttl: float = 86400,
+                 sweep_interval: float = 600):
+        self.root = root
+        self.app = app
+        self.ttl = max(0.0, float(ttl))
+        self.sweep_interval = max(0.0, float(sweep_interval))
+        os.makedirs(root, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Any] = {}
+        self._scopes: Dict[str, Optional[str]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- records -----------------------------------------------------------
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def _cancel_path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.cancel")
+
+    def file_path(self, job_id: str, suffix: str) -> str:
+        """Return a path under the jobs directory for a job's output file."""
+        return os.path.join(self.root, f"{job_id}{suffix}")
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        record["updated_at"] = _now()
+        path = self._path(record["id"])
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _update(self, job_id: str, **fields) -> Dict[str, Any]:
+        with self._lock:
+            record = self._read(job_id) or {"id": job_id}
+            record.update(fields)
+            self._write(record)
+            return record
+
+    # -- public API --------------------------------------------------------
+    def submit(self, kind: str, fn: JobFn, *, owner=None, scope: Optional[str] = None,
+               exclusive: bool = False, cancellable: bool = True) -> str:
+        """Queue ``fn`` and return the new job id.
+
+        With ``exclusive`` (and a ``scope``), raises :class:`JobBusy` if a job
+        for that scope is queued or running in any worker process.
+        ``cancellable=False`` is for jobs that cannot stop half way.
+        """
+        job_id = uuid.uuid4().hex
+        record = {
+            "id": job_id,
+            "kind": kind,
+            "owner": owner,
+            "scope": scope,
+            "status": QUEUED,
+            "progress": 0.0,
+            "done": 0,
+            "total": 0,
+            "message": None,
+            "error": None,
+            "result": None,
+            "cancellable": cancellable,
+            "pid": os.getpid(),
+            "created_at": _now(),
+        }
+        with self._lock:
+            # Records are written under this lock, so the check and the new
+            # record are atomic within the process.
+            if exclusive and scope and scope in self._record_scopes():
+                raise JobBusy(scope)
+            self._write(record)
+        future = self._pool.submit(self._run, job_id, fn)
+        with self._lock:
+            self._futures[job_id] = future
+            self._scopes[job_id] = scope
+        future.add_done_callback(lambda _f: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._scopes.pop(job_id, None)
+
+    def _run(self, job_id: str, fn: JobFn) -> None:
+        ctx = JobContext(self, job_id)
+        if ctx.cancelled:
+            self._update(job_id, status=CANCELLED)
+            return
+        self._update(job_id, status=RUNNING, started_at=_now())
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    result = fn(ctx)
+            else:
+                result = fn(ctx)
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, finished_at=_now())
+        except JobError as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=_now())
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}", finished_at=_now())
+        else:
+            self._update(job_id, status=DONE, progress=100.0, result=result or {}, finished_at=_now())
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or ``None`` for an unknown id.
+
+        Jobs left queued or running by a process that no longer exists are
+        reported as failed.
+        """
+        record = self._read(job_id)
+        if record is None:
+            return None
+        if record.get("status") in ACTIVE_STATES and record.get("pid") != os.getpid() \
+                and not _pid_alive(int(record.get("pid") or 0)):
+            record = self._update(job_id, status=FAILED, error="Interrupted: the worker running this job exited.")
+        record["cancel_requested"] = os.path.exists(self._cancel_path(job_id))
+        return record
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; returns ``False`` if the job already finished
+        or cannot be cancelled any more."""
+        record = self._read(job_id)
+        if record is None or record.get("status") not in ACTIVE_STATES:
+            return False
+        if record.get("status") == RUNNING and not record.get("cancellable", True):
+            return False
+        open(self._cancel_path(job_id), "a").close()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self._update(job_id, status=CANCELLED, finished_at=_now())
+        return True
+
+    def active_scopes(self) -> set:
+        """Return the scopes of jobs queued or running in any worker process.
+
+        Read from the job records, so a session used by a job in another
+        process counts too; records left by dead processes do not.
+        """
+        with self._lock:
+            scopes = {s for s in self._scopes.values() if s}
+        return scopes | self._record_scopes()
+
+    def _record_scopes(self) -> set:
+        scopes: set = set()
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return scopes
+        for name in names:
+            job_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            record = self._read(job_id)
+            if not record or not record.get("scope") or record.get("status") not in ACTIVE_STATES:
+                continue
+            pid = int(record.get("pid") or 0)
+            if pid == os.getpid() or _pid_alive(pid):
+                scopes.add(record["scope"])
+        return scopes
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete finished jobs not updated for ``ttl`` seconds; returns how many."""
+        if not self.ttl:
+            return 0
+        now = time.time() if now is None else now
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            job_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            try:
+                age = now - os.stat(self._path(job_id)).st_mtime
+            except OSError:
+                continue
+            if age <= self.ttl:
+                continue
+            record = self.status(job_id)
+            if record is None or record.get("status") in ACTIVE_STATES:
+                continue
+            for other in names:
+                if other.startswith(f"{job_id}."):
+                    try:
+                        os.remove(os.path.join(self.root, other))
+                    except OSError:
+                        pass
+            removed += 1
+        return removed
+
+    # -- background sweeper --------------------------------------------------
+    def start(self) -> None:
+        """Start the daemon pruning thread (no-op when disabled or running)."""
+        if not self.ttl or not self.sweep_interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="job-sweeper", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.prune()
+            except Exception:
+                logger.exception("Job record prune failed")
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+"""Versioned model artifacts with lazy loading and atomic activation.
+
+Layout under the registry root (``MODEL_REGISTRY_DIR``)::
+
+    <root>/<version>/model.pkl   # the pickled estimator
+    <root>/<version>/meta.json   # sha256, training date, feature schema
+    <root>/active.json           # {"version": "<version>"}
+
+The legacy ``MODEL_PATH`` file is exposed as a read-only version named after
+its file name (``model.pkl``) so existing predictions keep matching their
+recorded ``model_version`` until another version is registered and activated.
+
+Callers take one :class:`ActiveModel` snapshot per request. Activating a new
+version only swaps the pointer, so in-flight requests finish on the model they
+started with. Every process re-reads ``active.json`` when its mtime changes,
+which lets the CLI switch versions for all running workers. Artifacts are
+hashed and unpickled outside the registry lock, so a slow load never holds up
+``active_version()``; concurrent callers of one version share a single load.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from flask import current_app
+
+ARTIFACT_NAME = "model.pkl"
+META_NAME = "meta.json"
+ACTIVE_NAME = "active.json"
+_VERSION_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,119}$")
+
+
+@dataclass(frozen=True)
+class ActiveModel:
+    """A loaded model together with the version that serves it."""
+
+    version: str
+    model: object
+    meta: Dict[str, object] = field(default_factory=dict)
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 digest of the file at ``path``."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _feature_schema(model) -> List[str]:
+    names = getattr(model, "feature_names_in_", None)
+    return [str(n) for n in names] if names is not None else []
+
+
+def _atomic_write_json(path: str, payload: dict) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    """Registry of versioned model artifacts with an in-process LRU."""
+
+    def __init__(self, root: str, legacy_path: Optional[str] = None, cache_size: int = 2):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.cache_size = max(1, int(cache_size))
+        self._lock = threading.RLock()
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._active_version: Optional[str] = None
+        self._active_stamp: Optional[int] = -1
+        self._listeners: list = []
+        self._legacy_meta: Optional[tuple] = None
+        self._meta_cache: Dict[str, Dict[str, object]] = {}
+
+    # ----- metadata -----
+    @property
+    def legacy_version(self) -> Optional[str]:
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            return os.path.basename(self.legacy_path)
+        return None
+
+    def _version_dir(self, version: str) -> str:
+        # Every path below the registry is built here, so a name such as
+        # ``../x`` is rejected before anything is opened or unpickled.
+        if not isinstance(version, str) or not _VERSION_RE.match(version) or version == ACTIVE_NAME:
+            raise ValueError(f"invalid version name: {version!r}")
+        return os.path.join(self.root, version)
+
+    def artifact_path(self, version: str) -> str:
+        """Return the on-disk path of ``version``'s pickled estimator.
+
+        Raises ``ValueError`` for a malformed version name.
+        """
+        if version == self.legacy_version and not os.path.isdir(self._version_dir(version)):
+            return self.legacy_path  # type: ignore[return-value]
+        return os.path.join(self._version_dir(version), ARTIFACT_NAME)
+
+    def artifact_dir(self, version: str) -> str:
+        """Return the directory that holds ``version``'s artifact."""
+        return os.path.dirname(os.path.abspath(self.artifact_path(version)))
+
+    def metadata(self, version: str) -> Dict[str, object]:
+        """Return stored metadata for ``version``.
+
+        Raises ``KeyError`` if unknown and ``ValueError`` if malformed.
+        """
+        cached = self._meta_cache.get(version)
+        if cached is not None:
+            return dict(cached)
+        meta_path = os.path.join(self._version_dir(version), META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # Registered versions are immutable, so their metadata can be kept.
+            self._meta_cache[version] = meta
+            return dict(meta)
+        if version == self.legacy_version:
+            path = self.legacy_path
+            mtime = os.path.getmtime(path)
+            with self._lock:
+                cached_legacy = self._legacy_meta
+            if cached_legacy is None or cached_legacy[0] != mtime:
+                cached_legacy = (mtime, {
+                    "version": version,
+                    "sha256": file_sha256(path),
+                    "trained_at": datetime.fromtimestamp(mtime).date().isoformat(),
+                    "registered_at": None,
+                    "features": [],
+                    "legacy": True,
+                })
+                with self._lock:
+                    self._legacy_meta = cached_legacy
+            return dict(cached_legacy[1])
+        raise KeyError(version)
+
+    def versions(self) -> List[Dict[str, object]]:
+        """Return metadata for every known version, newest registration first."""
+        out = []
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if _VERSION_RE.match(name) and os.path.exists(os.path.join(self.root, name, META_NAME)):
+                    out.append(self.metadata(name))
+        out.sort(key=lambda m: m.get("registered_at") or "", reverse=True)
+        legacy = self.legacy_version
+        if legacy and all(m["version"] != legacy for m in out):
+            out.append(self.metadata(legacy))
+        active = self.active_version()
+        for m in out:
+            m["active"] = m["version"] == active
+        return out
+
+    # ----- active pointer -----
+    def _active_file(self) -> str:
+        return os.path.join(self.root, ACTIVE_NAME)
+
+    def active_version(self) -> Optional[str]:
+        """Return the active version name, re-reading the pointer if it changed."""
+        path = self._active_file()
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp != self._active_stamp:
+                version = None
+                if stamp is not None:
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            version = json.load(f).get("version")
+                    except (OSError, ValueError):
+                        version = None
+                self._active_version = version or self.legacy_version
+                self._active_stamp = stamp
+            return self._active_version
+
+    def active(self) -> Optional[ActiveModel]:
+        """Return the active model, loading it on first use."""
+        version = self.active_version()
+        if version is None:
+            return None
+        return ActiveModel(version=version, model=self.load(version), meta=self.metadata(version))
+
+    def activate(self, version: str, notify: bool = True) -> Dict[str, object]:
+        """Atomically make ``version`` the active model.
+
+        The artifact is loaded (and its checksum verified) before the pointer
+        moves, so a broken artifact never becomes active. ``notify=False``
+        skips the :meth:`on_activate` listeners.
+        """
+        meta = self.metadata(version)
+        self.load(version)
+        os.makedirs(self.root, exist_ok=True)
+        _atomic_write_json(
+            self._active_file(),
+            {"version": version, "activated_at": datetime.now(timezone.utc).isoformat()},
+        )
+        self.active_version()
+        if notify:
+            for fn in list(self._listeners):
+                fn(version)
+        return meta
+
+    def on_activate(self, fn) -> None:
+        """Register ``fn(version)`` to run after a version is activated here."""
+        self._listeners.append(fn)
+
+    # ----- loading -----
+    def load(self, version: str):
+        """Return the unpickled model for ``version`` (cached, LRU).
+
+        The first caller for a version verifies and unpickles it without
+        holding the registry lock; concurrent callers wait for that load.
+        """
+        with self._lock:
+            if version in self._loaded:
+                self._loaded.move_to_end(version)
+                return self._loaded[version]
+            pending = self._loading.get(version)
+            if pending is None:
+                pending = self._loading[version] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            model = self._read_artifact(version)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(version, None)
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._loaded[version] = model
+            while len(self._loaded) > self.cache_size:
+                self._loaded.popitem(last=False)
+            self._loading.pop(version, None)
+        pending.set_result(model)
+        return model
+
+    def _read_artifact(self, version: str):
+        meta = self.metadata(version)
+        path = self.artifact_path(version)
+        expected = meta.get("sha256")
+        if expected and file_sha256(path) != expected:
+            raise ValueError(f"checksum mismatch for model version {version}")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def loaded_versions(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded.keys())
+
+    # ----- registration -----
+    def register(
+        self,
+        src_path: str,
+        version: Optional[str] = None,
+        trained_at: Optional[str] = None,
+        notes: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """Copy ``src_path`` into the registry and record its metadata."""
+        digest = file_sha256(src_path)
+        if version is None:
+            stem = os.path.splitext(os.path.basename(src_path))[0] or "model"
+            version = f"{stem}-{digest[:8]}"
+        vdir = self._version_dir(version)
+        if os.path.exists(os.path.join(vdir, META_NAME)):
+            raise ValueError(f"version {version} already registered")
+
+        with open(src_path, "rb") as f:
+            model = pickle.load(f)
+        if not hasattr(model, "predict"):
+            raise ValueError("artifact does not look like a trained model")
+
+        os.makedirs(vdir, exist_ok=True)
+        tmp = os.path.join(vdir, ARTIFACT_NAME + ".tmp")
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, os.path.join(vdir, ARTIFACT_NAME))
+        meta = {
+            "version": version,
+            "sha256": digest,
+            "trained_at": trained_at
+            or datetime.fromtimestamp(os.path.getmtime(src_path)).date().isoformat(),
+            "registered_at": datetime.now(timezone.utc).isoformat(),
+            "features": _feature_schema(model),
+            "estimator": type(model).__name__,
+            "size_bytes": os.path.getsize(src_path),
+            "notes": notes,
+        }
+        _atomic_write_json(os.path.join(vdir, META_NAME), meta)
+        return meta
+
+
+def get_active_model(app=None) -> Optional[ActiveModel]:
+    """Return the active model for ``app`` (defaults to ``current_app``)."""
+    app = app or current_app
+    return app.model_registry.active()
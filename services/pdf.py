@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from io import BytesIO
 from typing import Dict
 
@@ -7,6 +8,10 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.pdfgen import canvas
 
+# pyplot figures, rcParams and seaborn themes are process-global, so charts
+# for PDFs built on request and job threads are drawn one report at a time.
+PLOT_LOCK = threading.Lock()
+
 
 def generate_prediction_pdf(pred, sex_map: Dict[int, str], yesno: Dict[int, str]) -> BytesIO:
     """Generate a simple PDF report for a prediction."""
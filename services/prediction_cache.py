@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+"""Bounded LRU + TTL cache for model inference results.
+
+Keys are ``(model_version, canonical INPUT_COLUMNS tuple)`` so activating a
+different model version never serves stale results; entries for the old
+version simply age out. Values are ``(label, positive_probability)`` pairs.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data import INPUT_COLUMNS, NUMERIC_COLS
+
+_MISSING = object()
+
+
+def _canon_value(col: str, val):
+    if val is None:
+        return None
+    if col in NUMERIC_COLS:
+        fval = float(val)
+        return None if math.isnan(fval) else fval
+    if isinstance(val, float) and math.isnan(val):
+        return None
+    return str(val)
+
+
+def canonical_record(record: Mapping[str, object]) -> Tuple:
+    """Return the hashable, order-fixed form of one ``INPUT_COLUMNS`` record.
+
+    Numeric features are compared as floats (``50`` and ``50.0`` are the same
+    input to the forest) and categoricals as strings.
+    """
+    return tuple(_canon_value(c, record.get(c)) for c in INPUT_COLUMNS)
+
+
+def canonical_rows(X: pd.DataFrame) -> Optional[List[Tuple]]:
+    """Return :func:`canonical_record` keys for every row of ``X``.
+
+    Returns ``None`` when a numeric column holds values that do not convert
+    cleanly, in which case callers should bypass the cache.
+    """
+    cols = []
+    for c in INPUT_COLUMNS:
+        s = X[c]
+        if c in NUMERIC_COLS:
+            vals = pd.to_numeric(s, errors="coerce")
+            if (vals.isna() & s.notna()).any():
+                return None
+            arr = vals.to_numpy(dtype=float, na_value=np.nan)
+            lst = arr.tolist()
+            if np.isnan(arr).any():
+                lst = [None if v != v else v for v in lst]
+        else:
+            lst = [
+                None if v is None or (isinstance(v, float) and v != v) else str(v)
+                for v in s.tolist()
+            ]
+        cols.append(lst)
+    return list(zip(*cols))
+
+
+class PredictionCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``max_rows`` (``0`` = no limit) is the largest frame
+    :func:`services.inference.predict_frame` looks up row by row; bigger
+    calls such as batch uploads bypass the cache so they neither pay for
+    canonicalising every row nor evict the interactive entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_rows: int = 0,
+    ):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.max_rows = max(0, int(max_rows))
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable, default=None):
+        """Return the cached value for ``key`` or ``default``."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires, value = item
+            if self.ttl > 0 and expires <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        """Store ``value`` for ``key``, evicting least-recently-used entries."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys: List[Hashable]) -> List[object]:
+        """Vector form of :meth:`get`; missing entries come back as ``None``."""
+        return [self.get(k) for k in keys]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, object]:
+        """Return counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "max_rows": self.max_rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
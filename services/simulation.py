@@ -1,13 +1,88 @@
 from __future__ import annotations
 
-from typing import List, Dict
+from typing import List, Dict, Mapping, Optional, Sequence
 
+import numpy as np
 import pandas as pd
 
 from .data import INPUT_COLUMNS
+from .inference import predict_frame
+from .prediction_cache import PredictionCache
 
 
-def simulate_risk_over_time(model, patient_record: Dict[str, object], start_age: int, end_age: int) -> List[Dict[str, float]]:
+def build_grid_frame(baseline: Dict[str, object], overrides: Mapping[str, Sequence]) -> pd.DataFrame:
+    """Return a frame repeating ``baseline`` once per grid point.
+
+    Parameters
+    ----------
+    baseline : dict
+        Baseline feature values for a single patient.
+    overrides : mapping
+        Column name to a sequence of values. All sequences must share the
+        same length (or have length one, which is broadcast); each position
+        describes one grid point.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Frame with ``INPUT_COLUMNS`` in model order and one row per point.
+    """
+    cols = {k: np.asarray(v) for k, v in overrides.items()}
+    lengths = {len(v) for v in cols.values() if len(v) != 1}
+    if len(lengths) > 1:
+        raise ValueError("override sequences must have the same length")
+    n = lengths.pop() if lengths else 1
+
+    data: Dict[str, object] = {}
+    for col in INPUT_COLUMNS:
+        if col in cols:
+            vals = cols[col]
+            data[col] = np.repeat(vals, n) if len(vals) == 1 and n != 1 else vals
+        else:
+            data[col] = [baseline.get(col)] * n
+    return pd.DataFrame(data, columns=INPUT_COLUMNS)
+
+
+def evaluate_grid(
+    model,
+    baseline: Dict[str, object],
+    overrides: Mapping[str, Sequence],
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
+) -> np.ndarray:
+    """Score every grid point described by ``overrides`` in one batched call.
+
+    The whole perturbation matrix is materialised once and passed to
+    ``model.predict_proba`` in a single call, so the cost is dominated by one
+    pipeline pass regardless of how many points the grid contains. With
+    ``version`` and ``cache``, points scored before are served from the cache
+    (see :func:`services.inference.predict_frame`).
+
+    Returns
+    -------
+    numpy.ndarray
+        Positive class probability for each grid point (empty if the model
+        cannot produce probabilities or the grid is empty).
+    """
+    if not hasattr(model, "predict_proba"):
+        return np.empty(0, dtype=float)
+    if any(len(v) == 0 for v in overrides.values()):
+        return np.empty(0, dtype=float)
+    X = build_grid_frame(baseline, overrides)
+    _, probs = predict_frame(model, X, version=version, cache=cache)
+    return np.asarray(probs, dtype=float)
+
+
+def simulate_risk_over_time(
+    model,
+    patient_record: Dict[str, object],
+    start_age: int,
+    end_age: int,
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
+) -> List[Dict[str, float]]:
     """Simulate future heart disease risk by varying age only.
 
     Parameters
@@ -20,6 +95,8 @@ def simulate_risk_over_time(model, patient_record: Dict[str, object], start_age:
         Current age of the patient.
     end_age : int
         Final age (inclusive) for simulation.
+    version, cache : optional
+        Model version and :class:`PredictionCache` used to reuse results.
 
     Returns
     -------
@@ -30,12 +107,9 @@ def simulate_risk_over_time(model, patient_record: Dict[str, object], start_age:
     if not hasattr(model, "predict_proba"):
         return []
 
-    results: List[Dict[str, float]] = []
-    base = patient_record.copy()
-    for age in range(start_age, end_age + 1):
-        row = base.copy()
-        row["age"] = age
-        X = pd.DataFrame([row], columns=INPUT_COLUMNS)
-        prob = float(model.predict_proba(X)[0][1])
-        results.append({"age": age, "risk_pct": round(prob * 100.0, 1)})
-    return results
+    ages = list(range(start_age, end_age + 1))
+    probs = evaluate_grid(model, patient_record, {"age": ages}, version=version, cache=cache)
+    return [
+        {"age": age, "risk_pct": round(float(prob) * 100.0, 1)}
+        for age, prob in zip(ages, probs)
+    ]
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+"""Chunked scoring of streamed patient rows for the batch prediction API.
+
+:func:`read_chunks` turns a CSV or NDJSON byte stream into DataFrames of at
+most ``chunk_rows`` rows, with aliased columns renamed, without reading
+ahead. :func:`score_chunk` standardizes values with the upload cleaning rules
+(:func:`services.data.standardize_values`) and scores every valid row of the
+chunk with one model call; rows that are missing a feature or fail
+validation get an ``error`` instead of a prediction. :func:`serialize` writes
+a result chunk in the response format. Chained together these keep memory
+bounded by the chunk size whatever the length of the stream.
+"""
+
+import json
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .data import (
+    BINARY_FEATURES,
+    INPUT_COLUMNS,
+    NUMERIC_FEATURES_FLOAT,
+    NUMERIC_FEATURES_INT,
+    normalize_columns,
+    standardize_values,
+    validate_structure,
+)
+from .inference import predict_frame
+from .prediction_cache import PredictionCache
+
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# Non-feature input columns copied to the results to help match rows up.
+PASSTHROUGH_COLUMNS = ("patient_name", "id", "record_id")
+
+SavedFn = Callable[[pd.DataFrame], List[int]]
+
+
+class StreamFormatError(ValueError):
+    """Raised when the request body cannot be read as patient rows."""
+
+
+def stream_format(mimetype: Optional[str]) -> Optional[str]:
+    """Return ``"csv"`` or ``"ndjson"`` for a request/Accept mimetype."""
+    mimetype = (mimetype or "").split(";")[0].strip().lower()
+    if mimetype in ("text/csv", "application/csv"):
+        return "csv"
+    if mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def _ndjson_chunks(stream, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    rows: List[dict] = []
+    for lineno, line in enumerate(iter(stream.readline, b""), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise StreamFormatError(f"Line {lineno}: invalid JSON ({e})") from None
+        if not isinstance(record, dict):
+            raise StreamFormatError(f"Line {lineno}: expected a JSON object")
+        rows.append(record)
+        if len(rows) >= chunk_rows:
+            yield pd.DataFrame.from_records(rows)
+            rows = []
+    if rows:
+        yield pd.DataFrame.from_records(rows)
+
+
+def read_chunks(stream, fmt: str, chunk_rows: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a binary ``stream`` in chunks of ``chunk_rows``.
+
+    The first chunk must have every required column (after aliases), else
+    :class:`StreamFormatError` is raised before anything is scored.
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    if fmt == "csv":
+        try:
+            chunks = pd.read_csv(stream, chunksize=chunk_rows, encoding="utf-8-sig")
+        except pd.errors.EmptyDataError:
+            raise StreamFormatError("Request body is empty.") from None
+    elif fmt == "ndjson":
+        chunks = _ndjson_chunks(stream, chunk_rows)
+    else:
+        raise StreamFormatError(f"Unsupported format: {fmt}")
+
+    first = True
+    for chunk in chunks:
+        chunk = normalize_columns(chunk, [])
+        if first:
+            ok, errs = validate_structure(chunk)
+            if not ok:
+                raise StreamFormatError("; ".join(errs))
+            first = False
+        yield chunk
+
+
+def _row_errors(bad: pd.DataFrame) -> pd.Series:
+    errors = pd.Series(None, index=bad.index, dtype=object)
+    rows = bad.any(axis=1)
+    cols = np.asarray(bad.columns)
+    for i in np.flatnonzero(rows.to_numpy()):
+        errors.iloc[i] = "Missing or invalid: " + ", ".join(cols[bad.iloc[i].to_numpy()])
+    return errors
+
+
+def score_chunk(
+    chunk: pd.DataFrame,
+    start: int,
+    *,
+    model,
+    version: str,
+    cache: Optional[PredictionCache] = None,
+    on_scored: Optional[SavedFn] = None,
+) -> pd.DataFrame:
+    """Score the valid rows of ``chunk``; return one result row per input row.
+
+    ``start`` is the 0-based position of the chunk's first row in the stream
+    and becomes the ``row`` column. ``on_scored`` receives the scored valid
+    rows (features, ``prediction`` and ``positive_probability``) and may
+    return their database ids, added as ``db_id``.
+    """
+    n = len(chunk)
+    X = chunk.reindex(columns=INPUT_COLUMNS)
+    for col in NUMERIC_FEATURES_INT | NUMERIC_FEATURES_FLOAT:
+        # Unparseable numbers become NaN here and are reported per row.
+        X[col] = pd.to_numeric(X[col], errors="coerce")
+    X = standardize_values(X, [])
+    errors = _row_errors(X.isna())
+    valid = errors.isna().to_numpy()
+
+    out = pd.DataFrame({"row": np.arange(start, start + n)}, index=chunk.index)
+    for col in PASSTHROUGH_COLUMNS:
+        if col in chunk.columns:
+            out[col] = chunk[col]
+    out["prediction"] = pd.array([pd.NA] * n, dtype="Int64")
+    out["positive_probability"] = np.nan
+    out["confidence"] = np.nan
+    out["model_version"] = version
+    out["error"] = errors
+    if on_scored is not None:
+        out["db_id"] = pd.array([pd.NA] * n, dtype="Int64")
+
+    if valid.any():
+        scored = X.loc[valid].copy()
+        for col in NUMERIC_FEATURES_INT | BINARY_FEATURES:
+            scored[col] = scored[col].astype(np.int64)
+        labels, probs = predict_frame(model, scored, version=version, cache=cache)
+        labels = np.asarray(labels).astype(int)
+        probs = np.full(len(scored), np.nan) if probs is None else np.asarray(probs, dtype=float)
+        scored["prediction"] = labels
+        scored["positive_probability"] = probs
+        out.loc[valid, "prediction"] = labels
+        out.loc[valid, "positive_probability"] = probs
+        out.loc[valid, "confidence"] = np.where(np.isnan(probs), 0.5, np.where(labels == 1, probs, 1 - probs))
+        if on_scored is not None:
+            ids = on_scored(scored)
+            if ids is not None:
+                out.loc[valid, "db_id"] = ids
+    return out
+
+
+def serialize(out: pd.DataFrame, fmt: str, header: bool) -> str:
+    """Return a result chunk as CSV (with ``header`` once) or NDJSON lines."""
+    if fmt == "csv":
+        return out.to_csv(index=False, header=header)
+    text = out.to_json(orient="records", lines=True)
+    return text if text.endswith("\n") else text + "\n"
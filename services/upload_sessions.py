@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+"""Lifetime and disk quotas for upload session directories.
+
+Every upload gets ``<root>/<uid>`` (see ``_make_upload_dir`` in ``app.py``).
+:class:`UploadSessions` records the owner in ``<uid>/session.json`` and uses
+that file's mtime as the last access time, so :meth:`UploadSessions.touch`
+is a single ``utime`` and every worker process sees the same clock.
+
+:meth:`UploadSessions.sweep` deletes sessions idle for longer than ``ttl``,
+then evicts the least recently used sessions until each owner is within
+``user_quota`` bytes and the whole directory within ``total_quota`` bytes.
+Sessions with running jobs (``busy``) and the one being kept are never
+evicted. A daemon thread runs the sweep every ``sweep_interval`` seconds;
+it is started per process by the server (see ``app.py``), not on import.
+:meth:`UploadSessions.admit` checks a new upload against the sizes recorded
+by the last sweep and only sweeps itself when that estimate is over quota.
+Routes find an evicted session's files missing and answer with their usual
+"Session expired" pages. Directories created before this module existed have
+no ``session.json``; they are treated as ownerless and aged by their mtime.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+
+SESSION_FILE = "session.json"
+UID_RE = re.compile(r"^[0-9a-f]{6,32}$")
+
+logger = logging.getLogger(__name__)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class UploadSessions:
+    """Track, expire and size-limit the upload directories under ``root``.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding one sub-directory per upload.
+    ttl : float
+        Seconds since last access after which a session is deleted; ``0``
+        keeps sessions forever.
+    user_quota, total_quota : int
+        Byte limits per owner and for all sessions; ``0`` disables a limit.
+    sweep_interval : float
+        Seconds between background sweeps; ``0`` disables the thread.
+    busy : callable, optional
+        Returns the uids that must not be evicted right now (e.g. sessions
+        with a running job).
+    """
+
+    def __init__(self, root: str, ttl: float = 86400, user_quota: int = 0, total_quota: int = 0,
+                 sweep_interval: float = 600, busy: Optional[Callable[[], Iterable[str]]] = None):
+        self.root = root
+        self.ttl = max(0.0, float(ttl))
+        self.user_quota = max(0, int(user_quota))
+        self.total_quota = max(0, int(total_quota))
+        self.sweep_interval = max(0.0, float(sweep_interval))
+        self.busy = busy
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._evicted = {"expired": 0, "user_quota": 0, "total_quota": 0}
+        self._freed = 0
+        self._last_sweep: Optional[float] = None
+        self._usage: Optional[Dict[str, tuple]] = None
+
+    # -- sessions ------------------------------------------------------------
+    def path(self, uid: str) -> str:
+        return os.path.join(self.root, uid)
+
+    def _meta_path(self, uid: str) -> str:
+        return os.path.join(self.root, uid, SESSION_FILE)
+
+    def create(self, owner=None) -> tuple[str, str]:
+        """Create a session directory for ``owner`` and return ``(uid, path)``."""
+        uid = uuid.uuid4().hex[:12]
+        path = self.path(uid)
+        os.makedirs(path, exist_ok=True)
+        with open(self._meta_path(uid), "w", encoding="utf-8") as f:
+            json.dump({"uid": uid, "owner": owner, "created_at": time.time()}, f)
+        return uid, path
+
+    def touch(self, uid: str) -> None:
+        """Mark ``uid`` as used now; unknown sessions are ignored."""
+        if not UID_RE.match(uid):
+            return
+        try:
+            os.utime(self._meta_path(uid))
+        except OSError:
+            pass
+
+    def info(self, uid: str) -> Optional[Dict[str, object]]:
+        """Return owner, times and size of a session, or ``None``."""
+        path = self.path(uid)
+        if not UID_RE.match(uid) or not os.path.isdir(path):
+            return None
+        meta: Dict[str, object] = {}
+        try:
+            with open(self._meta_path(uid), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            last_access = os.stat(self._meta_path(uid)).st_mtime
+        except (OSError, ValueError):
+            try:
+                last_access = os.stat(path).st_mtime
+            except OSError:
+                return None
+        return {
+            "uid": uid,
+            "owner": meta.get("owner"),
+            "created_at": meta.get("created_at"),
+            "last_access": last_access,
+            "bytes": _dir_size(path),
+        }
+
+    def sessions(self) -> List[Dict[str, object]]:
+        """Return :meth:`info` for every session, least recently used first."""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        out = [s for s in (self.info(n) for n in names) if s is not None]
+        out.sort(key=lambda s: s["last_access"])
+        return out
+
+    def remove(self, uid: str) -> int:
+        """Delete a session; returns the bytes freed."""
+        info = self.info(uid)
+        if info is None:
+            return 0
+        shutil.rmtree(self.path(uid), ignore_errors=True)
+        with self._lock:
+            if self._usage is not None:
+                self._usage.pop(uid, None)
+        return int(info["bytes"])
+
+    # -- eviction ------------------------------------------------------------
+    def _evict(self, session: Dict[str, object], reason: str) -> None:
+        shutil.rmtree(self.path(str(session["uid"])), ignore_errors=True)
+        with self._lock:
+            self._evicted[reason] += 1
+            self._freed += int(session["bytes"])
+        logger.info("Evicted upload session %s (%s, %d bytes)", session["uid"], reason, session["bytes"])
+
+    def sweep(self, keep: Iterable[str] = (), now: Optional[float] = None) -> Dict[str, int]:
+        """Apply the TTL and quotas once; returns evictions by reason.
+
+        Sessions in ``keep`` or reported by ``busy`` are skipped, so a
+        single session larger than its quota is left for the caller to
+        reject (see :meth:`over_quota`).
+        """
+        now = time.time() if now is None else now
+        protected = set(keep) | set(self.busy() if self.busy else ())
+        counts = {"expired": 0, "user_quota": 0, "total_quota": 0}
+        live = []
+        for s in self.sessions():
+            if s["uid"] not in protected and self.ttl and now - float(s["last_access"]) > self.ttl:
+                self._evict(s, "expired")
+                counts["expired"] += 1
+            else:
+                live.append(s)
+
+        if self.user_quota:
+            by_owner: Dict[object, List[Dict[str, object]]] = {}
+            for s in live:
+                by_owner.setdefault(s["owner"], []).append(s)
+            for owner, owned in by_owner.items():
+                used = sum(int(s["bytes"]) for s in owned)
+                for s in owned:  # oldest first
+                    if used <= self.user_quota or owner is None:
+                        break
+                    if s["uid"] in protected:
+                        continue
+                    self._evict(s, "user_quota")
+                    counts["user_quota"] += 1
+                    used -= int(s["bytes"])
+                    live.remove(s)
+
+        if self.total_quota:
+            used = sum(int(s["bytes"]) for s in live)
+            for s in list(live):
+                if used <= self.total_quota:
+                    break
+                if s["uid"] in protected:
+                    continue
+                self._evict(s, "total_quota")
+                counts["total_quota"] += 1
+                used -= int(s["bytes"])
+                live.remove(s)
+
+        with self._lock:
+            self._last_sweep = now
+            self._usage = {str(s["uid"]): (s["owner"], int(s["bytes"])) for s in live}
+        return counts
+
+    def admit(self, uid: str) -> Optional[str]:
+        """Return a message if the new session ``uid`` must be refused, else ``None``.
+
+        Other sessions are counted at the sizes the last sweep recorded, so
+        the usual case walks only ``uid``. When that estimate is over a quota
+        (or nothing was swept yet) a full :meth:`sweep` makes room first.
+        """
+        if not (self.user_quota or self.total_quota):
+            return None
+        info = self.info(uid)
+        if info is None:
+            return None
+        owner, size = info["owner"], int(info["bytes"])
+        with self._lock:
+            usage = None if self._usage is None else {k: v for k, v in self._usage.items() if k != uid}
+        if usage is not None:
+            owned = size + sum(b for o, b in usage.values() if o == owner)
+            total = size + sum(b for _o, b in usage.values())
+            if (not self.user_quota or owner is None or owned <= self.user_quota) and \
+                    (not self.total_quota or total <= self.total_quota):
+                with self._lock:
+                    if self._usage is not None:
+                        self._usage[uid] = (owner, size)
+                return None
+        self.sweep(keep=[uid])
+        return self.over_quota(uid)
+
+    def over_quota(self, uid: str) -> Optional[str]:
+        """Return a message if ``uid`` alone exceeds a quota, else ``None``.
+
+        Call after :meth:`sweep` with ``keep=[uid]`` has made room by
+        evicting older sessions.
+        """
+        info = self.info(uid)
+        if info is None:
+            return None
+        size = int(info["bytes"])
+        if self.user_quota and info["owner"] is not None:
+            used = sum(int(s["bytes"]) for s in self.sessions() if s["owner"] == info["owner"])
+            if used > self.user_quota:
+                return f"Upload storage quota exceeded ({size} bytes; limit {self.user_quota} bytes per user)."
+        if self.total_quota and sum(int(s["bytes"]) for s in self.sessions()) > self.total_quota:
+            return "Upload storage is full; please try again later."
+        return None
+
+    # -- metrics -------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        """Return current usage and eviction counters for this process."""
+        sessions = self.sessions()
+        owners: Dict[str, Dict[str, int]] = {}
+        for s in sessions:
+            o = owners.setdefault(str(s["owner"]), {"sessions": 0, "bytes": 0})
+            o["sessions"] += 1
+            o["bytes"] += int(s["bytes"])
+        now = time.time()
+        with self._lock:
+            return {
+                "sessions": len(sessions),
+                "bytes": sum(int(s["bytes"]) for s in sessions),
+                "owners": owners,
+                "oldest_access_age_sec": round(now - float(sessions[0]["last_access"]), 1) if sessions else None,
+                "ttl_sec": self.ttl,
+                "user_quota_bytes": self.user_quota,
+                "total_quota_bytes": self.total_quota,
+                "evicted": dict(self._evicted),
+                "freed_bytes": self._freed,
+                "last_sweep": self._last_sweep,
+            }
+
+    # -- background sweeper --------------------------------------------------
+    def start(self) -> None:
+        """Start the daemon sweeper thread (no-op when disabled or running)."""
+        if not self.sweep_interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="upload-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Upload session sweep failed")
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 """Simulation of risk curves for exercise-induced angina."""
 
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
-import pandas as pd
-
-from services.data import INPUT_COLUMNS
+from services.prediction_cache import PredictionCache
+from services.simulation import evaluate_grid
 
 
 def simulate_angina_sensitivity(
-    model, baseline: Dict[str, object], variable: str, values: Iterable[float]
+    model,
+    baseline: Dict[str, object],
+    variable: str,
+    values: Iterable[float],
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
 ) -> Dict[str, List[Dict[str, float]]]:
     """Return risk percentages for each value of *variable* with and without angina.
 
@@ -24,22 +29,24 @@ def simulate_angina_sensitivity(
         Feature to vary along the X-axis.
     values: iterable of float
         Values to substitute for ``variable``.
+    version, cache: optional
+        Model version and :class:`PredictionCache` used to reuse results.
     """
     if not hasattr(model, "predict_proba"):
         return {"no": [], "yes": []}
 
-    base = baseline.copy()
-    no: List[Dict[str, float]] = []
-    yes: List[Dict[str, float]] = []
-    for v in values:
-        row_no = base.copy()
-        row_yes = base.copy()
-        row_no[variable] = v
-        row_yes[variable] = v
-        row_no["exercise_induced_angina"] = 0
-        row_yes["exercise_induced_angina"] = 1
-        X = pd.DataFrame([row_no, row_yes], columns=INPUT_COLUMNS)
-        probs = model.predict_proba(X)[:, 1]
-        no.append({"value": v, "risk_pct": round(probs[0] * 100.0, 1)})
-        yes.append({"value": v, "risk_pct": round(probs[1] * 100.0, 1)})
+    values = list(values)
+    n = len(values)
+    # Both curves share one grid: the first half without angina, the second with.
+    overrides = {variable: values + values}
+    overrides["exercise_induced_angina"] = [0] * n + [1] * n
+    probs = evaluate_grid(model, baseline, overrides, version=version, cache=cache)
+    no = [
+        {"value": v, "risk_pct": round(float(p) * 100.0, 1)}
+        for v, p in zip(values, probs[:n])
+    ]
+    yes = [
+        {"value": v, "risk_pct": round(float(p) * 100.0, 1)}
+        for v, p in zip(values, probs[n:])
+    ]
     return {"no": no, "yes": yes}
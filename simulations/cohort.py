@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+"""Population-level what-if simulation over stored predictions."""
+
+import operator
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.data import CATEGORICAL_COLS, INPUT_COLUMNS, NUMERIC_COLS
+from services.inference import predict_frame
+
+from .uncertainty import RISK_BANDS
+
+# ``Prediction`` attribute holding each model input.
+PREDICTION_FIELDS: Dict[str, str] = {
+    "age": "age",
+    "sex": "sex",
+    "chest_pain_type": "chest_pain_type",
+    "resting_blood_pressure": "resting_bp",
+    "cholesterol": "cholesterol",
+    "fasting_blood_sugar": "fasting_blood_sugar",
+    "Restecg": "resting_ecg",
+    "max_heart_rate_achieved": "max_heart_rate",
+    "exercise_induced_angina": "exercise_angina",
+    "st_depression": "oldpeak",
+    "st_slope_type": "st_slope",
+    "num_major_vessels": "num_major_vessels",
+    "thalassemia_type": "thalassemia_type",
+}
+
+HISTOGRAM_BINS = 10
+
+_OPS = {"set", "shift", "scale"}
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _check_feature(feature) -> str:
+    if feature not in INPUT_COLUMNS:
+        raise ValueError(f"unknown feature: {feature}")
+    return feature
+
+
+def parse_interventions(spec: Sequence[Mapping[str, object]]) -> List[Dict[str, object]]:
+    """Validate a declarative intervention list.
+
+    Each item is ``{"feature", "op", "value"}`` with ``op`` one of ``set``,
+    ``shift`` or ``scale`` and an optional ``where`` filter
+    ``{"feature", "op", "value"}`` using a comparison operator or ``in``.
+    ``shift``/``scale`` only apply to numeric features.
+    """
+    if not isinstance(spec, (list, tuple)) or not spec:
+        raise ValueError("interventions must be a non-empty list")
+    parsed = []
+    for item in spec:
+        if not isinstance(item, Mapping):
+            raise ValueError("each intervention must be an object")
+        feature = _check_feature(item.get("feature"))
+        op = item.get("op")
+        if op not in _OPS:
+            raise ValueError(f"unknown intervention op: {op}")
+        value = item.get("value")
+        if op in {"shift", "scale"}:
+            if feature not in NUMERIC_COLS:
+                raise ValueError(f"{op} needs a numeric feature, got {feature}")
+            value = float(value)
+        elif feature in NUMERIC_COLS:
+            value = float(value)
+        elif value not in CATEGORICAL_COLS.get(feature, {value}):
+            raise ValueError(f"invalid value for {feature}: {value}")
+
+        where = item.get("where")
+        if where is not None:
+            if not isinstance(where, Mapping):
+                raise ValueError("where must be an object")
+            cmp = where.get("op", "==")
+            if cmp != "in" and cmp not in _COMPARE:
+                raise ValueError(f"unknown comparison: {cmp}")
+            if cmp == "in" and not isinstance(where.get("value"), (list, tuple)):
+                raise ValueError("'in' needs a list value")
+            where = {
+                "feature": _check_feature(where.get("feature")),
+                "op": cmp,
+                "value": where.get("value"),
+            }
+        parsed.append({"feature": feature, "op": op, "value": value, "where": where})
+    return parsed
+
+
+def _where_mask(X: pd.DataFrame, where: Optional[Mapping[str, object]]) -> np.ndarray:
+    if where is None:
+        return np.ones(len(X), dtype=bool)
+    col = X[where["feature"]]
+    value = where["value"]
+    if where["op"] == "in":
+        return col.isin(list(value)).to_numpy()
+    if where["feature"] in NUMERIC_COLS:
+        col = pd.to_numeric(col, errors="coerce")
+        value = float(value)
+    return _COMPARE[where["op"]](col, value).fillna(False).to_numpy(dtype=bool)
+
+
+def apply_interventions(X: pd.DataFrame, interventions: Iterable[Mapping[str, object]]) -> pd.DataFrame:
+    """Return a copy of ``X`` with ``interventions`` applied in order."""
+    out = X.copy()
+    for item in interventions:
+        feature, op, value = item["feature"], item["op"], item["value"]
+        mask = _where_mask(out, item.get("where"))
+        if not mask.any():
+            continue
+        if feature in NUMERIC_COLS:
+            col = out[feature].astype(float)
+            if op == "set":
+                col[mask] = value
+            elif op == "shift":
+                col[mask] = col[mask] + value
+            else:
+                col[mask] = col[mask] * value
+            out[feature] = col
+        else:
+            out.loc[mask, feature] = value
+    return out
+
+
+def iter_prediction_frames(session, prediction_model, chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield stored predictions as ``INPUT_COLUMNS`` frames of ``chunk_size`` rows.
+
+    Uses keyset pagination on the primary key and selects only the feature
+    columns, so memory is bounded by one chunk however large the table is.
+    """
+    id_col = prediction_model.id
+    cols = [getattr(prediction_model, PREDICTION_FIELDS[c]) for c in INPUT_COLUMNS]
+    last_id = 0
+    while True:
+        rows = (
+            session.query(id_col, *cols)
+            .filter(id_col > last_id)
+            .order_by(id_col)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield pd.DataFrame([r[1:] for r in rows], columns=INPUT_COLUMNS)
+
+
+def _band_index(probs: np.ndarray) -> np.ndarray:
+    cuts = [upper / 100.0 for _, upper in RISK_BANDS[:-1]]
+    return np.searchsorted(cuts, probs, side="right")
+
+
+def simulate_cohort_what_if(
+    model,
+    frames: Iterable[pd.DataFrame],
+    interventions: Sequence[Mapping[str, object]],
+) -> Dict[str, object]:
+    """Re-score a cohort before and after ``interventions``.
+
+    Each frame from ``frames`` is scored together with its intervened copy in
+    one :func:`services.inference.predict_frame` call; only running counts
+    are kept between frames. Rows with missing inputs are skipped.
+
+    Returns
+    -------
+    dict
+        ``patients``, ``skipped``, ``affected`` (rows whose inputs the
+        interventions changed), ``before`` and ``after`` summaries (positive rate,
+        mean risk, band counts, risk histogram), ``band_changes`` (counts per
+        ``"from->to"`` band transition) and ``changed_band``.
+    """
+    if not hasattr(model, "predict_proba"):
+        raise ValueError("model cannot produce probabilities")
+    n_bands = len(RISK_BANDS)
+    edges = np.linspace(0.0, 1.0, HISTOGRAM_BINS + 1)
+    patients = skipped = affected = 0
+    positives = np.zeros(2, dtype=np.int64)
+    prob_sum = np.zeros(2, dtype=float)
+    hist = np.zeros((2, HISTOGRAM_BINS), dtype=np.int64)
+    transitions = np.zeros((n_bands, n_bands), dtype=np.int64)
+
+    for frame in frames:
+        complete = frame.notna().all(axis=1).to_numpy()
+        skipped += int((~complete).sum())
+        X = frame.loc[complete].reset_index(drop=True)
+        if X.empty:
+            continue
+        after = apply_interventions(X, interventions)
+        affected += int((after.ne(X)).any(axis=1).sum())
+        labels, probs = predict_frame(model, pd.concat([X, after], ignore_index=True))
+        n = len(X)
+        labels = np.asarray(labels).astype(int).reshape(2, n)
+        probs = np.asarray(probs, dtype=float).reshape(2, n)
+        patients += n
+        positives += (labels == 1).sum(axis=1)
+        prob_sum += probs.sum(axis=1)
+        for i in range(2):
+            hist[i] += np.histogram(probs[i], bins=edges)[0]
+        np.add.at(transitions, (_band_index(probs[0]), _band_index(probs[1])), 1)
+
+    names = [label for label, _ in RISK_BANDS]
+
+    def _summary(i: int) -> Dict[str, object]:
+        bands = transitions.sum(axis=1 - i)
+        return {
+            "positive": int(positives[i]),
+            "positive_rate": round(float(positives[i]) / patients, 4) if patients else None,
+            "mean_risk_pct": round(float(prob_sum[i]) / patients * 100.0, 1) if patients else None,
+            "bands": {name: int(c) for name, c in zip(names, bands)},
+            "histogram": [int(c) for c in hist[i]],
+        }
+
+    band_changes = {
+        f"{names[a]}->{names[b]}": int(transitions[a, b])
+        for a in range(n_bands)
+        for b in range(n_bands)
+        if a != b and transitions[a, b]
+    }
+    return {
+        "patients": patients,
+        "skipped": skipped,
+        "affected": affected,
+        "histogram_edges": [round(float(e) * 100.0, 1) for e in edges],
+        "before": _summary(0),
+        "after": _summary(1),
+        "band_changes": band_changes,
+        "changed_band": int(transitions.sum() - np.trace(transitions)),
+    }
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+"""Precomputed partial-dependence and centred ICE tables per model version.
+
+Curve shapes depend on the model far more than on any one patient, so they are
+computed once per activated version against a reference sample and stored as
+``pdp.json`` next to the model artifact. :func:`precompute_async` runs the
+computation on a background thread of the web process, and
+:func:`precompute_recorded` runs it in the caller (the CLI, whose process
+would exit before a thread finished); the simulations endpoint then only
+reads the file. A run without a reference sample or one that raises stores a
+``status`` of ``no_reference`` or ``failed`` instead, so clients stop polling
+and activating the version (or ``?retry=1``) starts a new run.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+
+from services.data import INPUT_COLUMNS, NUMERIC_COLS
+from services.inference import predict_frame
+from services.simulation import build_grid_frame
+
+from .cohort import PREDICTION_FIELDS
+
+PDP_NAME = "pdp.json"
+READY = "ready"
+NO_REFERENCE = "no_reference"
+FAILED = "failed"
+GRID_POINTS = 20
+ICE_PERCENTILES = (10, 50, 90)
+
+logger = logging.getLogger(__name__)
+
+_running: set = set()
+_running_lock = threading.Lock()
+
+
+def pdp_path(registry, version: str) -> str:
+    """Return where ``version``'s tables are stored."""
+    return os.path.join(registry.artifact_dir(version), PDP_NAME)
+
+
+def feature_grid(values: pd.Series, points: int = GRID_POINTS) -> np.ndarray:
+    """Return grid values for one feature of the reference sample.
+
+    Features with few distinct values (binary flags, vessel counts) use those
+    values; continuous ones use evenly spaced points between the 5th and 95th
+    percentiles.
+    """
+    vals = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=float)
+    if vals.size == 0:
+        return np.empty(0)
+    uniq = np.unique(vals)
+    if uniq.size <= points:
+        return uniq
+    lo, hi = np.percentile(vals, [5, 95])
+    return np.linspace(lo, hi, points)
+
+
+def compute_pdp_tables(model, reference: pd.DataFrame, points: int = GRID_POINTS) -> Dict[str, Dict[str, object]]:
+    """Return partial-dependence and centred ICE summaries per numeric feature.
+
+    For each feature the reference sample is repeated once per grid value and
+    scored in a single call. ``pd_pct`` is the mean risk at each value and
+    ``ice_p10``/``ice_p50``/``ice_p90`` are percentiles of the individual
+    curves after centring each at the first grid value.
+    """
+    reference = reference[INPUT_COLUMNS].reset_index(drop=True)
+    n = len(reference)
+    tables: Dict[str, Dict[str, object]] = {}
+    for feature in INPUT_COLUMNS:
+        if feature not in NUMERIC_COLS:
+            continue
+        grid = feature_grid(reference[feature], points)
+        if grid.size == 0 or n == 0:
+            continue
+        # Row i * n + j is reference patient j at grid value i.
+        overrides = {c: np.tile(reference[c].to_numpy(), grid.size) for c in INPUT_COLUMNS}
+        overrides[feature] = np.repeat(grid, n)
+        X = build_grid_frame({}, overrides)
+        _, probs = predict_frame(model, X)
+        if probs is None:
+            raise ValueError("model cannot produce probabilities")
+        ice = np.asarray(probs, dtype=float).reshape(grid.size, n) * 100.0
+        centred = ice - ice[0]
+        bands = np.percentile(centred, ICE_PERCENTILES, axis=1)
+        table = {
+            "values": [round(float(v), 4) for v in grid],
+            "pd_pct": [round(float(v), 2) for v in ice.mean(axis=1)],
+        }
+        for q, row in zip(ICE_PERCENTILES, bands):
+            table[f"ice_p{q}"] = [round(float(v), 2) for v in row]
+        tables[feature] = table
+    return tables
+
+
+def reference_sample(session, prediction_model, size: int, fallback_csv: Optional[str] = None) -> pd.DataFrame:
+    """Return up to ``size`` complete stored predictions as model inputs.
+
+    Falls back to ``fallback_csv`` when the database holds no complete rows.
+    """
+    cols = [getattr(prediction_model, PREDICTION_FIELDS[c]) for c in INPUT_COLUMNS]
+    rows = session.query(*cols).order_by(func.random()).limit(size).all()
+    df = pd.DataFrame(rows, columns=INPUT_COLUMNS).dropna()
+    if df.empty and fallback_csv and os.path.exists(fallback_csv):
+        df = pd.read_csv(fallback_csv)[INPUT_COLUMNS].dropna()
+    return df.reset_index(drop=True)
+
+
+def write_pdp_tables(path: str, version: str, tables: Dict[str, object], reference_rows: int,
+                     status: str = READY, error: Optional[str] = None) -> None:
+    payload = {
+        "version": version,
+        "status": status,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+        "reference_rows": reference_rows,
+        "features": tables,
+    }
+    if error:
+        payload["error"] = error
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def load_pdp_tables(path: str, version: str) -> Optional[Dict[str, object]]:
+    """Return stored tables for ``version`` or ``None`` if missing or stale.
+
+    The payload's ``status`` is ``ready`` (files from before statuses were
+    recorded included), ``no_reference`` or ``failed``.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if payload.get("version") != version:
+        return None
+    payload.setdefault("status", READY)
+    return payload
+
+
+def is_running(version: str) -> bool:
+    with _running_lock:
+        return version in _running
+
+
+def precompute(app, version: str) -> Optional[str]:
+    """Compute and store the tables for ``version``; returns the file path.
+
+    Without a reference sample a ``no_reference`` record is stored instead.
+    """
+    registry = app.model_registry
+    path = pdp_path(registry, version)
+    with app.app_context():
+        reference = reference_sample(
+            app.db.session,
+            app.Prediction,
+            app.config.get("PDP_REFERENCE_ROWS", 500),
+            fallback_csv=os.path.join(app.static_folder, "sample.csv"),
+        )
+        app.db.session.remove()
+    if reference.empty:
+        logger.warning("No reference sample for partial dependence of %s", version)
+        write_pdp_tables(path, version, {}, 0, status=NO_REFERENCE,
+                         error="No complete stored predictions or sample data to use as a reference.")
+        return path
+    tables = compute_pdp_tables(
+        registry.load(version), reference, app.config.get("PDP_GRID_POINTS", GRID_POINTS)
+    )
+    write_pdp_tables(path, version, tables, len(reference))
+    return path
+
+
+def precompute_recorded(app, version: str) -> Dict[str, object]:
+    """Run :func:`precompute` in this thread, storing a ``failed`` record if it raises.
+
+    Returns the stored payload (``{"status": "failed", ...}`` if even that
+    could not be written).
+    """
+    path = pdp_path(app.model_registry, version)
+    try:
+        precompute(app, version)
+    except Exception as e:
+        logger.exception("Partial dependence precomputation failed for %s", version)
+        error = f"{type(e).__name__}: {e}"
+        try:
+            write_pdp_tables(path, version, {}, 0, status=FAILED, error=error)
+        except Exception:  # pragma: no cover - logged for operators
+            logger.exception("Could not record the partial dependence failure for %s", version)
+            return {"status": FAILED, "error": error}
+    return load_pdp_tables(path, version) or {"status": FAILED, "error": "No tables were stored."}
+
+
+def precompute_async(app, version: str) -> bool:
+    """Start :func:`precompute_recorded` on a daemon thread unless already running.
+
+    Returns ``True`` when a new computation was started.
+    """
+    with _running_lock:
+        if version in _running:
+            return False
+        _running.add(version)
+
+    def _run():
+        try:
+            precompute_recorded(app, version)
+        finally:
+            with _running_lock:
+                _running.discard(version)
+
+    threading.Thread(target=_run, name=f"pdp-{version}", daemon=True).start()
+    return True
+
+
+def feature_tables(payload: Dict[str, object], features: List[str]) -> Dict[str, object]:
+    """Return the stored tables restricted to ``features`` (all if empty)."""
+    tables = payload.get("features", {})
+    if not features:
+        return tables
+    return {f: tables[f] for f in features if f in tables}
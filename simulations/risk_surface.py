@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+"""Two-variable risk surface simulation module."""
+
+from typing import Dict, Hashable, Optional, Sequence
+
+import numpy as np
+
+from services.prediction_cache import canonical_record
+from services.simulation import evaluate_grid
+
+MAX_SURFACE_STEPS = 100
+
+
+def grid_axis(vmin: float, vmax: float, steps: int) -> np.ndarray:
+    """Return ``steps`` evenly spaced values from ``vmin`` to ``vmax`` inclusive."""
+    steps = max(2, min(int(steps), MAX_SURFACE_STEPS))
+    return np.linspace(float(vmin), float(vmax), steps)
+
+
+def surface_cache_key(
+    version: Optional[str],
+    baseline: Dict[str, object],
+    x_variable: str,
+    x_values: Sequence[float],
+    y_variable: str,
+    y_values: Sequence[float],
+) -> Hashable:
+    """Return the cache key of a surface: model version, baseline and grid spec."""
+    x = np.asarray(x_values, dtype=float)
+    y = np.asarray(y_values, dtype=float)
+    return (
+        "surface",
+        version,
+        canonical_record(baseline),
+        x_variable,
+        float(x[0]) if len(x) else None,
+        float(x[-1]) if len(x) else None,
+        len(x),
+        y_variable,
+        float(y[0]) if len(y) else None,
+        float(y[-1]) if len(y) else None,
+        len(y),
+    )
+
+
+def simulate_risk_surface(
+    model,
+    baseline: Dict[str, object],
+    x_variable: str,
+    x_values: Sequence[float],
+    y_variable: str,
+    y_values: Sequence[float],
+) -> Dict[str, object]:
+    """Return the risk percentage over the ``x_values`` × ``y_values`` grid.
+
+    The full grid (at most :data:`MAX_SURFACE_STEPS` per axis) is scored in a
+    single ``predict_proba`` call. Points bypass the per-record prediction
+    cache on purpose: a 100×100 surface would otherwise evict every cached
+    patient; callers cache the finished surface instead.
+
+    Parameters
+    ----------
+    model: object
+        Trained model supporting ``predict_proba``.
+    baseline: dict
+        Baseline feature values.
+    x_variable, y_variable: str
+        Features varied along the columns and rows of the surface.
+    x_values, y_values: sequence of float
+        Values to substitute for each variable.
+
+    Returns
+    -------
+    dict
+        ``x`` and ``y`` axis values and ``z``, a row-major list of ``len(y)``
+        rows holding the risk percentage for each ``x`` (empty when the model
+        cannot produce probabilities).
+    """
+    if x_variable == y_variable:
+        raise ValueError("surface variables must differ")
+    x = [float(v) for v in x_values][:MAX_SURFACE_STEPS]
+    y = [float(v) for v in y_values][:MAX_SURFACE_STEPS]
+    if not hasattr(model, "predict_proba") or not x or not y:
+        return {"x": x, "y": y, "z": []}
+
+    xx, yy = np.meshgrid(x, y)
+    probs = evaluate_grid(
+        model, baseline, {x_variable: xx.ravel(), y_variable: yy.ravel()}
+    )
+    if probs.size == 0:
+        return {"x": x, "y": y, "z": []}
+    z = np.round(probs.reshape(len(y), len(x)) * 100.0, 1)
+    return {"x": x, "y": y, "z": z.tolist()}
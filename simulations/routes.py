@@ -2,23 +2,61 @@ from __future__ import annotations
 
 """Routes for simulations dashboard."""
 
+import time
+
 from flask import current_app, render_template, request, jsonify
 from flask_login import login_required
 
-import pandas as pd
-
 from auth.decorators import require_roles
-from services.data import INPUT_COLUMNS
+from services.inference import predict_one
 
 from . import simulations_bp
 from .angina_curve import simulate_angina_sensitivity
+from .cohort import iter_prediction_frames, parse_interventions, simulate_cohort_what_if
+from .partial_dependence import READY, feature_tables, load_pdp_tables, pdp_path, precompute_async
+from .risk_surface import grid_axis, simulate_risk_surface, surface_cache_key
+from .uncertainty import simulate_measurement_uncertainty
 
+_DEFAULTS = {
+    "age": 50,
+    "sex": 1,
+    "chest_pain_type": "non-anginal",
+    "resting_blood_pressure": 120.0,
+    "cholesterol": 200.0,
+    "fasting_blood_sugar": 100.0,
+    "Restecg": "normal",
+    "max_heart_rate_achieved": 150.0,
+    "exercise_induced_angina": 0,
+    "st_depression": 1.0,
+    "st_slope_type": "flat",
+    "num_major_vessels": 0,
+    "thalassemia_type": "normal",
+}
 
-def _run_simulation(form: dict, defaults: dict):
-    """Execute the heart disease risk simulation."""
-    model = current_app.model
+_RANGES = {
+    "age": (0, 120),
+    "resting_blood_pressure": (80, 250),
+    "cholesterol": (100, 600),
+    "fasting_blood_sugar": (60, 200),
+    "max_heart_rate_achieved": (60, 220),
+    "st_depression": (0, 6.2),
+    "num_major_vessels": (0, 3),
+}
 
-    baseline = {
+_LABELS = {
+    "age": "Age",
+    "cholesterol": "Cholesterol (mg/dL)",
+    "resting_blood_pressure": "Resting Blood Pressure (systolic mmHg)",
+    "fasting_blood_sugar": "Fasting Blood Sugar / Glucose (mg/dL)",
+    "max_heart_rate_achieved": "Max Heart Rate Achieved (bpm)",
+    "st_depression": "ST Depression",
+    "num_major_vessels": "Num Major Vessels",
+}
+
+
+def _parse_baseline(form: dict, defaults: dict) -> dict:
+    """Return the baseline patient from ``form``, falling back to ``defaults``."""
+    return {
         "age": int(form.get("age", defaults["age"])),
         "sex": int(form.get("sex", defaults["sex"])),
         "chest_pain_type": form.get("chest_pain_type", defaults["chest_pain_type"]),
@@ -44,6 +82,18 @@ def _run_simulation(form: dict, defaults: dict):
         "thalassemia_type": form.get("thalassemia_type", defaults["thalassemia_type"]),
     }
 
+
+def _run_simulation(form: dict, defaults: dict):
+    """Execute the heart disease risk simulation."""
+    active = current_app.model_registry.active()
+    model = active.model if active is not None else None
+    cache_kw = {
+        "version": active.version if active is not None else None,
+        "cache": current_app.prediction_cache,
+    }
+
+    baseline = _parse_baseline(form, defaults)
+
     variable = form.get("variable", "age")
 
     results: dict = {}
@@ -52,18 +102,12 @@ def _run_simulation(form: dict, defaults: dict):
 
     # Baseline prediction with confidence
     try:
-        X = pd.DataFrame([baseline], columns=INPUT_COLUMNS)
-        yhat = int(model.predict(X)[0])
-        pos_prob = (
-            float(model.predict_proba(X)[0][1])
-            if hasattr(model, "predict_proba")
-            else None
-        )
-        confidence = (
-            pos_prob if yhat == 1 else (1.0 - pos_prob)
-            if pos_prob is not None
-            else None
+        result = predict_one(
+            model, baseline, batcher=current_app.inference_batcher, **cache_kw
         )
+        yhat = result["label"]
+        pos_prob = result["pos_prob"]
+        confidence = result["confidence"] if pos_prob is not None else None
         prediction = {
             "label": "Heart Disease" if yhat == 1 else "No Heart Disease",
             "risk_pct": round(pos_prob * 100.0, 1) if pos_prob is not None else None,
@@ -74,40 +118,21 @@ def _run_simulation(form: dict, defaults: dict):
     except Exception as e:  # pragma: no cover - defensive
         errors["prediction"] = str(e)
 
-    ranges = {
-        "age": (0, 120),
-        "resting_blood_pressure": (80, 250),
-        "cholesterol": (100, 600),
-        "fasting_blood_sugar": (60, 200),
-        "max_heart_rate_achieved": (60, 220),
-        "st_depression": (0, 6.2),
-        "num_major_vessels": (0, 3),
-    }
-
     try:
-        vmin, vmax = ranges.get(
+        vmin, vmax = _RANGES.get(
             variable, (baseline.get(variable, 0) - 50, baseline.get(variable, 0) + 50)
         )
         steps = 50
         step = (vmax - vmin) / steps
         values = [vmin + i * step for i in range(steps + 1)]
-        curves = simulate_angina_sensitivity(model, baseline, variable, values)
-        labels = {
-            "age": "Age",
-            "cholesterol": "Cholesterol (mg/dL)",
-            "resting_blood_pressure": "Resting Blood Pressure (systolic mmHg)",
-            "fasting_blood_sugar": "Fasting Blood Sugar / Glucose (mg/dL)",
-            "max_heart_rate_achieved": "Max Heart Rate Achieved (bpm)",
-            "st_depression": "ST Depression",
-            "num_major_vessels": "Num Major Vessels",
-        }
+        curves = simulate_angina_sensitivity(model, baseline, variable, values, **cache_kw)
         current = simulate_angina_sensitivity(
-            model, baseline, variable, [baseline[variable]]
+            model, baseline, variable, [baseline[variable]], **cache_kw
         )
         current_key = "yes" if baseline["exercise_induced_angina"] else "no"
         results["exercise_angina"] = {
             "variable": variable,
-            "label": labels.get(variable, variable),
+            "label": _LABELS.get(variable, variable),
             "vmin": vmin,
             "vmax": vmax,
             "no": curves["no"],
@@ -129,22 +154,7 @@ def _run_simulation(form: dict, defaults: dict):
 @require_roles("Doctor", "SuperAdmin")
 def index():
     """Render simulations page with enabled modules."""
-    defaults = {
-        "age": 50,
-        "sex": 1,
-        "chest_pain_type": "non-anginal",
-        "resting_blood_pressure": 120.0,
-        "cholesterol": 200.0,
-        "fasting_blood_sugar": 100.0,
-        "Restecg": "normal",
-        "max_heart_rate_achieved": 150.0,
-        "exercise_induced_angina": 0,
-        "st_depression": 1.0,
-        "st_slope_type": "flat",
-        "num_major_vessels": 0,
-        "thalassemia_type": "normal",
-    }
-    baseline = defaults.copy()
+    baseline = _DEFAULTS.copy()
     return render_template("simulations/index.html", baseline=baseline)
 
 
@@ -153,23 +163,8 @@ def index():
 @require_roles("Doctor", "SuperAdmin")
 def run():
     """Run simulation and return JSON data."""
-    defaults = {
-        "age": 50,
-        "sex": 1,
-        "chest_pain_type": "non-anginal",
-        "resting_blood_pressure": 120.0,
-        "cholesterol": 200.0,
-        "fasting_blood_sugar": 100.0,
-        "Restecg": "normal",
-        "max_heart_rate_achieved": 150.0,
-        "exercise_induced_angina": 0,
-        "st_depression": 1.0,
-        "st_slope_type": "flat",
-        "num_major_vessels": 0,
-        "thalassemia_type": "normal",
-    }
     baseline, prediction, results, errors, variable = _run_simulation(
-        request.form, defaults
+        request.form, _DEFAULTS
     )
     return jsonify(
         baseline=baseline,
@@ -179,3 +174,161 @@ def run():
         variable=variable,
     )
 
+
+
+def _axis(form: dict, prefix: str, default_var: str):
+    """Return ``(variable, values)`` for one surface axis from ``form``."""
+    variable = form.get(f"{prefix}_variable", default_var)
+    if variable not in _RANGES:
+        raise ValueError(f"unsupported surface variable: {variable}")
+    vmin, vmax = _RANGES[variable]
+    vmin = float(form.get(f"{prefix}_min", vmin))
+    vmax = float(form.get(f"{prefix}_max", vmax))
+    if vmax <= vmin:
+        raise ValueError(f"{prefix}_max must be greater than {prefix}_min")
+    steps = int(form.get(f"{prefix}_steps", 50))
+    return variable, grid_axis(vmin, vmax, steps)
+
+
+@simulations_bp.route("/surface", methods=["POST"])
+@login_required
+@require_roles("Doctor", "SuperAdmin")
+def surface():
+    """Return a two-variable risk surface for the baseline patient as JSON."""
+    try:
+        baseline = _parse_baseline(request.form, _DEFAULTS)
+        x_var, x_values = _axis(request.form, "x", "cholesterol")
+        y_var, y_values = _axis(request.form, "y", "resting_blood_pressure")
+        if x_var == y_var:
+            raise ValueError("surface variables must differ")
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    active = current_app.model_registry.active()
+    if active is None:
+        return jsonify(error="Model not loaded"), 503
+
+    cache = current_app.simulation_cache
+    key = surface_cache_key(active.version, baseline, x_var, x_values, y_var, y_values)
+    payload = cache.get(key)
+    cached = payload is not None
+    start = time.perf_counter()
+    if payload is None:
+        payload = simulate_risk_surface(
+            active.model, baseline, x_var, x_values, y_var, y_values
+        )
+        cache.put(key, payload)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    budget_ms = current_app.config.get("SIMULATION_SURFACE_BUDGET_MS", 200)
+    if not cached and elapsed_ms > budget_ms:
+        current_app.logger.warning(
+            "Risk surface %dx%d took %.0f ms (budget %s ms)",
+            len(x_values), len(y_values), elapsed_ms, budget_ms,
+        )
+    return jsonify(
+        x={"variable": x_var, "label": _LABELS.get(x_var, x_var), "values": payload["x"]},
+        y={"variable": y_var, "label": _LABELS.get(y_var, y_var), "values": payload["y"]},
+        z=payload["z"],
+        current={"x": baseline[x_var], "y": baseline[y_var]},
+        model_version=active.version,
+        cached=cached,
+        elapsed_ms=round(elapsed_ms, 1),
+    )
+
+
+@simulations_bp.route("/uncertainty", methods=["POST"])
+@login_required
+@require_roles("Doctor", "SuperAdmin")
+def uncertainty():
+    """Return Monte Carlo risk bands for the baseline patient as JSON."""
+    try:
+        baseline = _parse_baseline(request.form, _DEFAULTS)
+        n_samples = int(request.form.get("n_samples", 10000))
+        seed = request.form.get("seed")
+        seed = int(seed) if seed not in (None, "") else None
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    max_samples = current_app.config.get("SIMULATION_MC_MAX_SAMPLES", 50000)
+    if not 1 <= n_samples <= max_samples:
+        return jsonify(error=f"n_samples must be between 1 and {max_samples}"), 400
+
+    active = current_app.model_registry.active()
+    if active is None:
+        return jsonify(error="Model not loaded"), 503
+
+    start = time.perf_counter()
+    result = simulate_measurement_uncertainty(
+        active.model,
+        baseline,
+        n_samples,
+        chunk_size=current_app.config.get("SIMULATION_MC_CHUNK_ROWS", 10000),
+        seed=seed,
+    )
+    return jsonify(
+        result=result,
+        model_version=active.version,
+        elapsed_ms=round((time.perf_counter() - start) * 1000.0, 1),
+    )
+
+
+@simulations_bp.route("/cohort", methods=["POST"])
+@login_required
+@require_roles("Doctor", "SuperAdmin")
+def cohort():
+    """Re-score every stored prediction under a what-if intervention."""
+    body = request.get_json(silent=True) or {}
+    try:
+        interventions = parse_interventions(body.get("interventions"))
+    except (TypeError, ValueError) as e:
+        return jsonify(error=str(e)), 400
+
+    active = current_app.model_registry.active()
+    if active is None:
+        return jsonify(error="Model not loaded"), 503
+
+    start = time.perf_counter()
+    frames = iter_prediction_frames(
+        current_app.db.session,
+        current_app.Prediction,
+        chunk_size=current_app.config.get("SIMULATION_COHORT_CHUNK_ROWS", 5000),
+    )
+    try:
+        result = simulate_cohort_what_if(active.model, frames, interventions)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(
+        result=result,
+        interventions=interventions,
+        model_version=active.version,
+        elapsed_ms=round((time.perf_counter() - start) * 1000.0, 1),
+    )
+
+
+@simulations_bp.route("/pdp", methods=["GET"])
+@login_required
+@require_roles("Doctor", "SuperAdmin")
+def partial_dependence():
+    """Serve precomputed partial-dependence and ICE tables for the active model.
+
+    A stored ``failed`` or ``no_reference`` result is returned as is (``503``)
+    until the version is activated again or ``?retry=1`` is passed.
+    """
+    registry = current_app.model_registry
+    version = registry.active_version()
+    if version is None:
+        return jsonify(error="Model not loaded"), 503
+    payload = load_pdp_tables(pdp_path(registry, version), version)
+    retry = payload is not None and payload["status"] != READY and request.args.get("retry") == "1"
+    if payload is None or retry:
+        started = precompute_async(current_app._get_current_object(), version)
+        return jsonify(status="pending", started=started, model_version=version), 202
+    if payload["status"] != READY:
+        return jsonify(status=payload["status"], error=payload.get("error"), model_version=version,
+                       computed_at=payload.get("computed_at")), 503
+    return jsonify(
+        status="ready",
+        model_version=version,
+        computed_at=payload.get("computed_at"),
+        reference_rows=payload.get("reference_rows"),
+        features=feature_tables(payload, request.args.getlist("feature")),
+    )
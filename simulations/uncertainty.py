@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+"""Monte Carlo measurement-uncertainty simulation module."""
+
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.simulation import evaluate_grid
+
+MAX_SAMPLES = 50000
+
+# Per-feature measurement noise: ("normal", sd in feature units) or
+# ("relative", sd as a fraction of the measured value).
+DEFAULT_NOISE: Dict[str, Tuple[str, float]] = {
+    "resting_blood_pressure": ("normal", 5.0),
+    "cholesterol": ("relative", 0.05),
+    "fasting_blood_sugar": ("relative", 0.05),
+    "max_heart_rate_achieved": ("normal", 3.0),
+    "st_depression": ("normal", 0.1),
+}
+
+# Same cut-offs as the risk band shown on the prediction result page.
+RISK_BANDS: Tuple[Tuple[str, float], ...] = (("Low", 30.0), ("Moderate", 60.0), ("High", 100.0))
+
+PERCENTILES: Sequence[int] = (5, 25, 50, 75, 95)
+
+
+def risk_band(risk_pct: float) -> str:
+    """Return the risk band label for a percentage."""
+    for label, upper in RISK_BANDS:
+        if risk_pct < upper:
+            return label
+    return RISK_BANDS[-1][0]
+
+
+def sample_measurements(
+    baseline: Dict[str, object],
+    n_samples: int,
+    noise: Mapping[str, Tuple[str, float]],
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """Return ``n_samples`` noisy draws of every feature in ``noise``.
+
+    Draws are clipped at zero since none of the measured vitals can be
+    negative.
+    """
+    draws: Dict[str, np.ndarray] = {}
+    for col, (kind, scale) in noise.items():
+        value = float(baseline[col])
+        if kind == "relative":
+            sd = abs(value) * float(scale)
+        elif kind == "normal":
+            sd = float(scale)
+        else:
+            raise ValueError(f"unknown noise model for {col}: {kind}")
+        draws[col] = np.clip(rng.normal(value, sd, n_samples), 0.0, None)
+    return draws
+
+
+def simulate_measurement_uncertainty(
+    model,
+    baseline: Dict[str, object],
+    n_samples: int = 10000,
+    *,
+    noise: Optional[Mapping[str, Tuple[str, float]]] = None,
+    chunk_size: int = 10000,
+    seed: Optional[int] = None,
+) -> Dict[str, object]:
+    """Return the spread of predicted risk under measurement noise.
+
+    ``n_samples`` perturbed copies of ``baseline`` (capped at
+    :data:`MAX_SAMPLES`) are drawn from ``noise`` and scored with
+    :func:`services.simulation.evaluate_grid` in chunks of ``chunk_size``
+    rows. The per-record prediction cache is bypassed because random draws
+    practically never repeat.
+
+    Parameters
+    ----------
+    model: object
+        Trained model supporting ``predict_proba``.
+    baseline: dict
+        Measured feature values for the patient.
+    n_samples: int
+        Number of Monte Carlo samples.
+    noise: mapping, optional
+        Feature to ``(kind, scale)`` noise model; defaults to
+        :data:`DEFAULT_NOISE`.
+    chunk_size: int
+        Rows scored per model call.
+    seed: int, optional
+        Seed for reproducible draws.
+
+    Returns
+    -------
+    dict
+        ``n_samples``, ``point_pct`` and ``point_band`` of the unperturbed
+        record, ``mean_pct``, ``percentiles`` (percentile to risk
+        percentage), ``bands`` (fraction of samples in each risk band) and
+        ``band_change`` (fraction outside the band of the unperturbed
+        record). Empty when the model cannot produce probabilities.
+    """
+    if not hasattr(model, "predict_proba"):
+        return {}
+    n_samples = max(1, min(int(n_samples), MAX_SAMPLES))
+    chunk_size = max(1, int(chunk_size))
+    noise = DEFAULT_NOISE if noise is None else noise
+    rng = np.random.default_rng(seed)
+    draws = sample_measurements(baseline, n_samples, noise, rng)
+
+    point = evaluate_grid(model, baseline, {})
+    probs = np.empty(n_samples, dtype=float)
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        chunk = {col: vals[start:stop] for col, vals in draws.items()}
+        probs[start:stop] = evaluate_grid(model, baseline, chunk)
+
+    risk = probs * 100.0
+    point_band = risk_band(float(point[0]) * 100.0) if point.size else None
+    cuts = [upper for _, upper in RISK_BANDS[:-1]]
+    counts = np.bincount(np.searchsorted(cuts, risk, side="right"), minlength=len(RISK_BANDS))
+    bands = {
+        label: round(float(count) / n_samples, 4)
+        for (label, _), count in zip(RISK_BANDS, counts)
+    }
+    return {
+        "n_samples": n_samples,
+        "point_pct": round(float(point[0]) * 100.0, 1) if point.size else None,
+        "point_band": point_band,
+        "mean_pct": round(float(risk.mean()), 1),
+        "percentiles": {
+            str(q): round(float(v), 1)
+            for q, v in zip(PERCENTILES, np.percentile(risk, PERCENTILES))
+        },
+        "bands": bands,
+        "band_change": round(1.0 - bands[point_band], 4) if point_band else None,
+    }
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 """Variable sensitivity (what-if) simulation module."""
 
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
-import pandas as pd
-
-from services.data import INPUT_COLUMNS
+from services.prediction_cache import PredictionCache
+from services.simulation import evaluate_grid
 
 
 def simulate_variable_sensitivity(
-    model, baseline: Dict[str, object], variable: str, values: Iterable[float]
+    model,
+    baseline: Dict[str, object],
+    variable: str,
+    values: Iterable[float],
+    *,
+    version: Optional[str] = None,
+    cache: Optional[PredictionCache] = None,
 ) -> List[Dict[str, float]]:
     """Return predicted risk percentages for each ``value`` of ``variable``.
 
@@ -24,15 +29,14 @@ def simulate_variable_sensitivity(
         Feature name to vary.
     values: iterable
         Values to substitute for ``variable``.
+    version, cache: optional
+        Model version and :class:`PredictionCache` used to reuse results.
     """
     if not hasattr(model, "predict_proba"):
         return []
-    base = baseline.copy()
-    results: List[Dict[str, float]] = []
-    for v in values:
-        row = base.copy()
-        row[variable] = v
-        X = pd.DataFrame([row], columns=INPUT_COLUMNS)
-        prob = float(model.predict_proba(X)[0][1])
-        results.append({"value": v, "risk_pct": round(prob * 100.0, 1)})
-    return results
+    values = list(values)
+    probs = evaluate_grid(model, baseline, {variable: values}, version=version, cache=cache)
+    return [
+        {"value": v, "risk_pct": round(float(p) * 100.0, 1)}
+        for v, p in zip(values, probs)
+    ]
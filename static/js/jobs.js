@@ -0,0 +1,80 @@
+// Background job helper for the upload wizard and PDF exports.
+// - Jobs.run(url, opts) submits a job, polls /jobs/<id> and resolves with the
+//   finished job record (rejects on failure or cancellation)
+// - While polling, a progress bar with a Cancel button is shown in
+//   opts.progressEl (optional)
+// - Jobs.result(job) fetches a JSON result; Jobs.download(job) fetches a file
+
+(function () {
+  const POLL_MS = 750;
+
+  async function parseJson(res) {
+    const text = await res.text();
+    try { return JSON.parse(text); }
+    catch { throw new Error(text.slice(0, 200) || String(res.status)); }
+  }
+
+  function progressBar(container, onCancel) {
+    if (!container) return { update() {}, remove() {} };
+    const el = document.createElement('div');
+    el.className = 'd-flex align-items-center gap-2 mt-2';
+    el.innerHTML =
+      '<div class="progress flex-grow-1" style="height:.75rem">' +
+      '<div class="progress-bar" role="progressbar" style="width:0%" aria-valuemin="0" aria-valuemax="100"></div></div>' +
+      '<span class="small text-muted">0%</span>' +
+      '<button type="button" class="btn btn-sm btn-outline-secondary">Cancel</button>';
+    const bar = el.querySelector('.progress-bar');
+    const label = el.querySelector('span');
+    const cancel = el.querySelector('button');
+    cancel.addEventListener('click', () => { cancel.disabled = true; onCancel(); });
+    container.appendChild(el);
+    return {
+      update(job) {
+        const pct = Math.round(job.progress || 0);
+        bar.style.width = `${pct}%`;
+        bar.setAttribute('aria-valuenow', pct);
+        label.textContent = job.status === 'queued' ? 'Queued' : `${pct}%`;
+        if (job.status === 'running' && job.cancellable === false) cancel.hidden = true;
+      },
+      remove() { el.remove(); },
+    };
+  }
+
+  async function run(url, { csrfToken, body, progressEl } = {}) {
+    const headers = { 'X-CSRF-Token': csrfToken };
+    const res = await fetch(url, { method: 'POST', headers, body, credentials: 'same-origin' });
+    const submitted = await parseJson(res);
+    if (!res.ok || !submitted.ok) throw new Error(submitted.error || res.status);
+
+    const cancelUrl = `/jobs/${submitted.job_id}/cancel`;
+    const ui = progressBar(progressEl, () =>
+      fetch(cancelUrl, { method: 'POST', headers, credentials: 'same-origin' }));
+    try {
+      for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, POLL_MS));
+        const st = await fetch(submitted.status_url, { credentials: 'same-origin' });
+        const job = await parseJson(st);
+        if (!st.ok || !job.ok) throw new Error(job.error || st.status);
+        ui.update(job);
+        if (job.status === 'done') return job;
+        if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+        if (job.status === 'cancelled') throw new Error('Cancelled');
+      }
+    } finally {
+      ui.remove();
+    }
+  }
+
+  async function result(job) {
+    const res = await fetch(job.result_url, { credentials: 'same-origin' });
+    const data = await parseJson(res);
+    if (!res.ok || !data.ok) throw new Error(data.error || res.status);
+    return data.result;
+  }
+
+  function download(job) {
+    window.location = job.result_url;
+  }
+
+  window.Jobs = { run, result, download };
+})();
@@ -0,0 +1,54 @@
+// Renders the rows behind a cleaning-log entry into a modal body.
+// - Starts with the inline sample (entry.details)
+// - "Load more" pages the remaining rows from
+//   /upload/<uid>/preprocess/details/<entry.details_ref>
+
+(function () {
+  const PAGE = 100;
+
+  function esc(v) {
+    return String(v ?? '').replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+  }
+
+  function render(body, uid, entry) {
+    let rows = (entry.details || []).slice();
+    const total = entry.details_total || rows.length;
+    if (!rows.length) { body.innerHTML = '<div class="text-muted">No details</div>'; return; }
+    const cols = Object.keys(rows[0]);
+    body.innerHTML =
+      '<div class="table-responsive"><table class="table table-sm table-striped"><thead><tr>' +
+      cols.map(c => `<th>${esc(c)}</th>`).join('') + '</tr></thead><tbody></tbody></table></div>' +
+      '<div class="d-flex align-items-center gap-2 small"><span class="text-muted"></span>' +
+      '<button type="button" class="btn btn-sm btn-outline-secondary">Load more</button></div>';
+    const tbody = body.querySelector('tbody');
+    const count = body.querySelector('span');
+    const more = body.querySelector('button');
+    let shown = 0;
+
+    function append(batch) {
+      tbody.insertAdjacentHTML('beforeend',
+        batch.map(r => '<tr>' + cols.map(c => `<td>${esc(r[c])}</td>`).join('') + '</tr>').join(''));
+      shown += batch.length;
+      count.textContent = `Showing ${shown} of ${total} rows`;
+      more.hidden = !entry.details_ref || shown >= total;
+    }
+    append(rows);
+
+    more.addEventListener('click', async () => {
+      more.disabled = true;
+      try {
+        const res = await fetch(`/upload/${uid}/preprocess/details/${entry.details_ref}?start=${shown}&limit=${PAGE}`,
+          { credentials: 'same-origin' });
+        const data = await res.json();
+        if (!res.ok || !data.ok) throw new Error(data.error || res.status);
+        append(data.rows);
+      } catch (e) {
+        count.textContent = `Error: ${e.message}`;
+      } finally {
+        more.disabled = false;
+      }
+    });
+  }
+
+  window.LogDetails = { render };
+})();
@@ -6,6 +6,7 @@ from flask import (
     Blueprint,
     current_app,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
@@ -17,7 +18,7 @@ from datetime import datetime, timedelta
 import secrets
 
 from auth.decorators import require_roles
-from services.security import csrf_protect
+from services.security import csrf_protect, csrf_protect_api
 from services.crypto import envelope, get_keyring
 
 superadmin_bp = Blueprint("superadmin", __name__, url_prefix="/superadmin")
@@ -589,3 +590,73 @@ def encryption_set_name_pred(pred_id: int):
         db.session.rollback()
         flash(f"Failed to set name: {type(exc).__name__}", "error")
     return redirect(url_for("superadmin.encryption_view_pred", pred_id=pred_id))
+
+
+@superadmin_bp.get("/models")
+@login_required
+@require_roles("SuperAdmin")
+def models_index():
+    """List registered model versions and which one is active."""
+    registry = current_app.model_registry
+    return jsonify(
+        {
+            "active": registry.active_version(),
+            "loaded": registry.loaded_versions(),
+            "versions": registry.versions(),
+        }
+    )
+
+
+@superadmin_bp.get("/inference/stats")
+@login_required
+@require_roles("SuperAdmin")
+def inference_stats():
+    """Return this worker's prediction cache and micro-batching counters."""
+    batcher = current_app.inference_batcher
+    return jsonify(
+        {
+            "cache": current_app.prediction_cache.stats(),
+            "batching": batcher.stats() if batcher is not None else None,
+        }
+    )
+
+
+@superadmin_bp.get("/uploads/stats")
+@login_required
+@require_roles("SuperAdmin")
+def upload_stats():
+    """Return upload session storage usage and eviction counters."""
+    return jsonify(current_app.upload_sessions.stats())
+
+
+@superadmin_bp.post("/models/activate")
+@login_required
+@require_roles("SuperAdmin")
+@csrf_protect_api
+def models_activate():
+    """Atomically switch the model that serves new predictions."""
+    db = current_app.db
+    AuditLog = current_app.AuditLog
+    registry = current_app.model_registry
+    payload = request.get_json(silent=True) or request.form
+    version = (payload.get("version") or "").strip()
+    if not version:
+        return jsonify({"ok": False, "error": "version is required"}), 400
+    previous = registry.active_version()
+    try:
+        meta = registry.activate(version)
+    except KeyError:
+        return jsonify({"ok": False, "error": "Unknown version"}), 404
+    except Exception as exc:
+        return jsonify({"ok": False, "error": f"{type(exc).__name__}: {exc}"}), 400
+    db.session.add(
+        AuditLog(
+            acting_user_id=current_user.id,
+            target_user_id=current_user.id,
+            action="model_activate",
+            old_value=previous,
+            new_value=version,
+        )
+    )
+    db.session.commit()
+    return jsonify({"ok": True, "active": version, "meta": meta})
@@ -0,0 +1,106 @@
+"""Tests for the streaming batch prediction API."""
+
+import gzip
+import io
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from services.stream_predict import StreamFormatError, read_chunks
+
+
+def _sample(app):
+    return pd.read_csv(Path(app.static_folder) / "sample.csv")
+
+
+def _token(client):
+    return client.get("/api/batch/predict").get_json()["csrf_token"]
+
+
+def test_read_chunks_are_bounded_and_renamed():
+    row = {"age": 63, "sex": 1, "cp": "typical angina", "trestbps": 145, "chol": 233, "fbs": 0,
+           "restecg": "normal", "thalach": 150, "exang": 0, "oldpeak": 2.3, "slope": "upsloping",
+           "ca": 0, "thal": "normal"}
+    body = "\n".join(json.dumps(row) for _ in range(25)).encode()
+    chunks = list(read_chunks(io.BytesIO(body), "ndjson", chunk_rows=10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert "resting_blood_pressure" in chunks[0].columns
+
+    with pytest.raises(StreamFormatError, match="Missing required columns"):
+        next(read_chunks(io.BytesIO(b"trestbps,x\n120,1\n"), "csv"))
+
+
+def test_csv_stream_scores_rows_and_flags_invalid_ones(auth_client):
+    app = auth_client.application
+    df = pd.concat([_sample(app)] * 4, ignore_index=True)
+    df["cholesterol"] = df["cholesterol"].astype(object)
+    df.loc[1, "cholesterol"] = "abc"
+    df.loc[2, "chest_pain_type"] = "unknown"
+    app.config["API_BATCH_CHUNK_ROWS"] = 3
+    try:
+        res = auth_client.post("/api/batch/predict", data=df.to_csv(index=False),
+                               headers={"Content-Type": "text/csv", "X-CSRF-Token": _token(auth_client)})
+        body = res.get_data(as_text=True)
+    finally:
+        app.config.pop("API_BATCH_CHUNK_ROWS")
+    assert res.status_code == 200 and res.mimetype == "text/csv"
+    out = pd.read_csv(io.StringIO(body))
+    assert out["row"].tolist() == list(range(len(df)))
+    assert "cholesterol" in out.loc[1, "error"] and "chest_pain_type" in out.loc[2, "error"]
+    ok = out["error"].isna()
+    assert ok.sum() == len(df) - 2 and out.loc[ok, "prediction"].isin([0, 1]).all()
+
+
+def test_ndjson_with_mixed_keys_keeps_csv_columns_aligned(auth_client):
+    app = auth_client.application
+    records = pd.concat([_sample(app)] * 3, ignore_index=True).head(3).to_dict(orient="records")
+    records[0]["patient_name"] = "Ann"
+    records[2]["id"] = 7
+    body = "\n".join(json.dumps(r) for r in records)
+    app.config["API_BATCH_CHUNK_ROWS"] = 1
+    try:
+        res = auth_client.post("/api/batch/predict?format=csv", data=body, headers={
+            "Content-Type": "application/x-ndjson", "X-CSRF-Token": _token(auth_client)})
+        text = res.get_data(as_text=True)
+    finally:
+        app.config.pop("API_BATCH_CHUNK_ROWS")
+    assert res.mimetype == "text/csv"
+    lines = text.splitlines()
+    assert len({line.count(",") for line in lines}) == 1
+    out = pd.read_csv(io.StringIO(text))
+    assert list(out.columns[:3]) == ["row", "patient_name", "prediction"]
+    assert out["row"].tolist() == [0, 1, 2]
+    assert out["patient_name"].tolist()[0] == "Ann" and out["patient_name"].isna().tolist()[1:] == [True, True]
+    assert out["prediction"].isin([0, 1]).all() and out["error"].isna().all()
+
+
+def test_ndjson_gzip_stream_with_persist(auth_client):
+    app = auth_client.application
+    df = pd.concat([_sample(app)] * 3, ignore_index=True).head(5)
+    df = df.rename(columns={"resting_blood_pressure": "trestbps"})
+    body = gzip.compress(df.to_json(orient="records", lines=True).encode())
+    with app.app_context():
+        before = app.Prediction.query.count()
+    res = auth_client.post("/api/batch/predict?persist=1", data=body, headers={
+        "Content-Type": "application/x-ndjson", "Content-Encoding": "gzip",
+        "X-CSRF-Token": _token(auth_client)})
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert res.mimetype == "application/x-ndjson" and len(rows) == 5
+    assert all(r["error"] is None and r["db_id"] for r in rows)
+    with app.app_context():
+        assert app.Prediction.query.count() == before + 5
+
+
+def test_bad_requests(auth_client):
+    headers = {"Content-Type": "text/csv"}
+    assert auth_client.post("/api/batch/predict", data="a\n1\n", headers=headers).status_code == 400
+    headers["X-CSRF-Token"] = _token(auth_client)
+    res = auth_client.post("/api/batch/predict", data="a\n1\n", headers=headers)
+    assert res.status_code == 400 and "Missing required columns" in res.get_json()["error"]
+    res = auth_client.post("/api/batch/predict", data="x", headers={**headers, "Content-Type": "text/plain"})
+    assert res.status_code == 415
+    res = auth_client.post("/api/batch/predict", data='{"age": 1}\n[1]\n',
+                           headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert res.status_code == 400
@@ -0,0 +1,175 @@
+"""Tests for chunked batch prediction of uploaded CSVs."""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import batch_predict
+from services.batch_predict import score_dataset, shutdown_pool
+from services.data import INPUT_COLUMNS
+from services.frame_store import frame_rows, read_frame, write_frame
+from services.inference import predict_frame
+
+MODEL_PATH = Path(__file__).resolve().parent.parent / "ml" / "model.pkl"
+
+
+@pytest.fixture(scope="module")
+def model():
+    if not MODEL_PATH.exists():
+        pytest.skip("model.pkl not available")
+    with open(MODEL_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def clean_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 250
+    df = pd.DataFrame(
+        {
+            "age": rng.integers(30, 80, n),
+            "sex": rng.integers(0, 2, n),
+            "chest_pain_type": rng.choice(["typical_angina", "non_anginal", "asymptomatic"], n),
+            "resting_blood_pressure": rng.uniform(100, 180, n).round(1),
+            "cholesterol": rng.uniform(150, 350, n).round(1),
+            "fasting_blood_sugar": rng.integers(0, 2, n),
+            "Restecg": rng.choice(["normal", "left_ventricular_hypertrophy"], n),
+            "max_heart_rate_achieved": rng.uniform(90, 200, n).round(1),
+            "exercise_induced_angina": rng.integers(0, 2, n),
+            "st_depression": rng.uniform(0, 4, n).round(1),
+            "st_slope_type": rng.choice(["upsloping", "flat", "downsloping"], n),
+            "num_major_vessels": rng.integers(0, 4, n),
+            "thalassemia_type": rng.choice(["normal", "fixed_defect", "reversable_defect"], n),
+        }
+    )
+    path = tmp_path / "clean"
+    write_frame(df, str(path))
+    return path, df
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_chunked_scoring_matches_single_pass(model, clean_csv, tmp_path, workers):
+    path, df = clean_csv
+    labels, probs = predict_frame(model, df[INPUT_COLUMNS])
+    seen, progress = [], []
+
+    def on_chunk(chunk):
+        seen.append(len(chunk))
+        chunk["db_id"] = chunk.index + 1
+        return chunk
+
+    out = tmp_path / "results"
+    summary = score_dataset(
+        str(path),
+        str(out),
+        model=model,
+        version="v1",
+        model_path=str(MODEL_PATH),
+        chunk_size=100,
+        workers=workers,
+        on_chunk=on_chunk,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+
+    res = read_frame(str(out))
+    assert summary["rows"] == 250 and summary["chunks"] == 3
+    assert summary["workers"] == workers
+    assert seen == [100, 100, 50]
+    assert progress[-1] == (250, 250)
+    assert res["db_id"].tolist() == list(range(1, 251))
+    assert res["prediction"].tolist() == labels.astype(int).tolist()
+    assert np.allclose(res["positive_probability"], probs)
+    assert list(res.columns[-5:]) == [
+        "prediction", "positive_probability", "db_id", "model_version", "confidence",
+    ]
+
+
+def test_small_file_is_scored_in_process(model, clean_csv, tmp_path):
+    path, _ = clean_csv
+    summary = score_dataset(
+        str(path), str(tmp_path / "r"), model=model, version="v1",
+        model_path=str(MODEL_PATH), chunk_size=1000, workers=4,
+    )
+    assert summary["workers"] == 1
+    assert frame_rows(str(tmp_path / "r")) == 250
+
+
+def test_parallel_runs_reuse_one_spawned_pool(model, clean_csv, tmp_path):
+    path, _ = clean_csv
+    shutdown_pool()
+    kwargs = dict(model=model, version="v1", model_path=str(MODEL_PATH), chunk_size=100, workers=2)
+    try:
+        score_dataset(str(path), str(tmp_path / "a"), **kwargs)
+        pool = batch_predict._POOL
+        assert pool is not None
+        assert pool._mp_context.get_start_method() == "spawn"
+        score_dataset(str(path), str(tmp_path / "b"), **kwargs)
+        assert batch_predict._POOL is pool
+        score_dataset(str(path), str(tmp_path / "c"), **{**kwargs, "workers": 3})
+        assert batch_predict._POOL is not pool
+    finally:
+        shutdown_pool()
+    assert batch_predict._POOL is None
+    assert read_frame(str(tmp_path / "a")).equals(read_frame(str(tmp_path / "b")))
+
+
+def test_failed_upload_run_leaves_no_predictions(app, clean_csv):
+    import uuid
+
+    import app as app_module
+
+    _, df = clean_csv
+    uid = uuid.uuid4().hex[:12]
+    write_frame(df, str(Path(app.instance_path) / "uploads" / uid / "clean"))
+    saved = {k: app.config.get(k) for k in ("BATCH_PREDICT_CHUNK_ROWS", "BATCH_INSERT_COMMIT_ROWS")}
+    app.config.update(BATCH_PREDICT_CHUNK_ROWS=100, BATCH_INSERT_COMMIT_ROWS=50)
+
+    def stop_after_first(done, total):
+        if done >= 100:
+            raise RuntimeError("cancelled")
+
+    try:
+        with app.app_context():
+            before = app.Prediction.query.count()
+            with pytest.raises(RuntimeError):
+                app_module._predict_upload(uid, app.model_registry.active(), on_progress=stop_after_first)
+            assert app.Prediction.query.count() == before
+    finally:
+        app.config.update(saved)
+
+
+def test_upload_outliers_and_preview_match_a_full_read(app, clean_csv):
+    import json
+    import uuid
+
+    import app as app_module
+
+    _, df = clean_csv
+    df = df.copy()
+    df.loc[[3, 140, 230], "cholesterol"] = [900.0, 20.0, 880.0]
+    df.loc[140, "age"] = 200
+    df["patient_name"] = [f"p{i}" for i in range(len(df))]
+    uid = uuid.uuid4().hex[:12]
+    base = Path(app.instance_path) / "uploads" / uid
+    write_frame(df, str(base / "clean"))
+    saved = app.config.get("BATCH_PREDICT_CHUNK_ROWS")
+    app.config["BATCH_PREDICT_CHUNK_ROWS"] = 100
+    try:
+        with app.app_context():
+            res = app_module._predict_upload(uid, app.model_registry.active())
+    finally:
+        app.config["BATCH_PREDICT_CHUNK_ROWS"] = saved
+
+    full = read_frame(str(base / "results")).drop(columns=["patient_name"])
+    assert res["rows"] == len(df)
+    assert res["preview"] == app_module._records(full.head(20))
+    reasons = {o["db_id"]: o["outlier_cols"] for o in res["outliers"]}
+    ids = full["db_id"].tolist()
+    assert reasons[ids[3]] == "cholesterol" and reasons[ids[230]] == "cholesterol"
+    assert reasons[ids[140]] == "age, cholesterol"
+    assert all("patient_name" not in o for o in res["outliers"])
+    with open(base / "eda.json", encoding="utf-8") as f:
+        assert json.load(f)["outliers"] == json.loads(json.dumps(res["outliers"]))
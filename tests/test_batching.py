@@ -0,0 +1,74 @@
+"""Tests for the micro-batching inference dispatcher."""
+
+import threading
+
+import numpy as np
+
+from services.batching import MicroBatcher
+from services.inference import predict_one
+
+RECORD = {
+    "age": 63,
+    "sex": 1,
+    "chest_pain_type": "typical_angina",
+    "resting_blood_pressure": 145.0,
+    "cholesterol": 233.0,
+    "fasting_blood_sugar": 1,
+    "Restecg": "left_ventricular_hypertrophy",
+    "max_heart_rate_achieved": 150.0,
+    "exercise_induced_angina": 0,
+    "st_depression": 2.3,
+    "st_slope_type": "downsloping",
+    "num_major_vessels": 0,
+    "thalassemia_type": "fixed_defect",
+}
+
+
+class _CountingModel:
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        p = np.clip(np.asarray(X["age"], dtype=float) / 100.0, 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+def test_concurrent_requests_share_model_calls():
+    model = _CountingModel()
+    batcher = MicroBatcher(max_batch=16, max_wait_ms=50)
+    ages = list(range(20, 52))
+    results = {}
+    start = threading.Barrier(len(ages))
+
+    def worker(age):
+        start.wait()
+        results[age] = predict_one(model, dict(RECORD, age=age), batcher=batcher)
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in ages]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    calls = model.calls
+    assert calls < len(ages)
+    for age in ages:
+        assert results[age] == predict_one(model, dict(RECORD, age=age))
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == calls
+    assert stats["batch_size"]["max"] <= 16
+    assert stats["queue_depth"]["count"] == len(ages)
+
+
+def test_bad_record_does_not_fail_its_batch():
+    model = _CountingModel()
+    batcher = MicroBatcher(max_batch=8, max_wait_ms=50)
+    good = batcher.submit(model, RECORD)
+    bad = batcher.submit(model, dict(RECORD, age="not a number"))
+    assert good.result()["label"] == 1
+    assert isinstance(bad.exception(), Exception)
+    batcher.close()
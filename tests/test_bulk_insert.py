@@ -0,0 +1,62 @@
+"""Tests for bulk persistence of batch predictions."""
+
+import numpy as np
+import pandas as pd
+
+from services.bulk_insert import BulkInserter, prediction_rows
+
+
+def _scored(n=5):
+    return pd.DataFrame({
+        "age": [63.7] * n,
+        "sex": [1] * n,
+        "chest_pain_type": ["typical_angina"] * n,
+        "resting_blood_pressure": [145.0] * n,
+        "cholesterol": [233.0] * n,
+        "fasting_blood_sugar": [np.nan] + [1.0] * (n - 1),
+        "Restecg": ["normal"] * n,
+        "max_heart_rate_achieved": [150.0] * n,
+        "exercise_induced_angina": [0] * n,
+        "st_depression": [2.3] * n,
+        "st_slope_type": ["upsloping"] * n,
+        "thalassemia_type": ["normal"] * n,
+        "prediction": [1, 0] * (n // 2) + [1] * (n % 2),
+        "positive_probability": [0.8, 0.3] * (n // 2) + [np.nan] * (n % 2),
+    })
+
+
+def test_prediction_rows_match_orm_conversions():
+    rows = prediction_rows(_scored(), "v1")
+    assert rows[0]["age"] == 63 and type(rows[0]["age"]) is int
+    assert rows[0]["fasting_blood_sugar"] is None and rows[1]["fasting_blood_sugar"] == 1
+    assert rows[0]["num_major_vessels"] is None  # column absent from the chunk
+    assert [r["confidence"] for r in rows] == [0.8, 0.7, 0.8, 0.7, 0.5]
+    assert rows[0]["resting_ecg"] == "normal" and rows[0]["model_version"] == "v1"
+
+
+def test_bulk_insert_returns_ids_in_order(app):
+    from app import Prediction, db
+
+    with app.app_context():
+        inserter = BulkInserter(db.session, Prediction, batch_size=2, commit_rows=3)
+        rows = prediction_rows(_scored(7), "v1")
+        for i, row in enumerate(rows):
+            row["cholesterol"] = 200.0 + i
+        ids = inserter.insert(rows)
+        inserter.commit()
+        assert len(ids) == 7 and inserter.rows == 7 and inserter.rows_per_sec > 0
+        stored = {p.id: p.cholesterol for p in Prediction.query.filter(Prediction.id.in_(ids))}
+        assert [stored[i] for i in ids] == [200.0 + i for i in range(7)]
+
+
+def test_discard_removes_committed_chunks(app):
+    from app import Prediction, db
+
+    with app.app_context():
+        before = Prediction.query.count()
+        inserter = BulkInserter(db.session, Prediction, batch_size=2, commit_rows=3)
+        inserter.insert(prediction_rows(_scored(5), "v1"))
+        inserter.insert(prediction_rows(_scored(2), "v1"))
+        assert Prediction.query.count() == before + 7
+        assert inserter.discard() == 7
+        assert Prediction.query.count() == before
@@ -0,0 +1,85 @@
+"""Tests for the compiled normalisation used by ``clean_dataframe``."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.data import (
+    CATEGORY_MAPPERS,
+    _coerce_float_series,
+    _coerce_int_series,
+    _map_unique,
+    _map_with_dict,
+    _sex_to_binary,
+    _to_float,
+    _to_int,
+    _yes_no_to_binary,
+    clean_dataframe,
+)
+
+SERIES = [
+    pd.Series(["Male", "f", " 1 ", "female", None, "x", "Male"], dtype=object),
+    pd.Series([1, 1.0, True, "1", None, np.nan, 4, 4.0, "4", np.int64(4)], dtype=object),
+    pd.Series(["typical angina", "Reversable Defect", "lv_hypertrophy", "FLAT", 3.0, 7.0]),
+    pd.Series([0.5, 1.5, -0.4, 2.5, np.nan]),
+    pd.Series([0.5, 1.5, 2.0]),
+    pd.Series([np.nan, np.nan]),
+    pd.Series([1, 2, 3]),
+    pd.Series([1, None, 3], dtype="Int64"),
+    pd.Series([], dtype=float),
+]
+
+
+@pytest.mark.parametrize("s", SERIES)
+def test_map_unique_matches_apply(s):
+    for fn in (_sex_to_binary, _yes_no_to_binary, *CATEGORY_MAPPERS.values()):
+        pd.testing.assert_series_equal(_map_unique(s, fn), s.apply(fn), check_exact=True)
+
+
+@pytest.mark.parametrize("s", SERIES[3:])
+def test_numeric_coercion_matches_apply(s):
+    pd.testing.assert_series_equal(_coerce_int_series(s), s.apply(_to_int), check_exact=True)
+    pd.testing.assert_series_equal(_coerce_float_series(s), s.apply(_to_float), check_exact=True)
+
+
+def test_compiled_mapper_matches_per_call_lookup():
+    mapper = CATEGORY_MAPPERS["thalassemia_type"]
+    for raw in ["reversable_defect", "Fixed Defect", 7.0, 3, "normal", "bogus", None]:
+        assert mapper(raw) == _map_with_dict(raw, mapper.mapping, {"normal", "fixed_defect", "reversible_defect"})
+
+
+def test_canonical_spellings_map_to_themselves():
+    mapper = CATEGORY_MAPPERS["chest_pain_type"]
+    assert [mapper(v) for v in ["typical_angina", "Non-Anginal", "atypical angina"]] == [
+        "typical_angina", "non-anginal", "atypical_angina"]
+
+
+def test_clean_dataframe_keeps_canonical_multi_word_categories():
+    raw = pd.DataFrame({
+        "age": [63, 58], "sex": [1, 0], "chest_pain_type": ["typical_angina", "Typical Angina"],
+        "resting_blood_pressure": [145, 130], "cholesterol": [233, 250], "fasting_blood_sugar": [1, 0],
+        "Restecg": ["normal", "normal"], "max_heart_rate_achieved": [150, 150],
+        "exercise_induced_angina": [0, 1], "st_depression": [2.3, 1.2], "st_slope_type": ["flat", "flat"],
+        "num_major_vessels": [0, 1], "thalassemia_type": ["normal", "fixed_defect"],
+    })
+    df, log = clean_dataframe(raw, impute_missing=False, soften_outliers=False)
+    assert df["chest_pain_type"].tolist() == ["typical_angina", "typical_angina"]
+    assert not any("unknown categories" in line for line in log)
+
+
+def test_clean_dataframe_normalises_mixed_spellings():
+    raw = pd.DataFrame({
+        "age": [63.0, 37.4], "sex": ["Male", "F"], "cp": [3, " Asymptomatic"],
+        "trestbps": [145, 130], "chol": [233, 250], "fbs": ["yes", 0],
+        "restecg": ["normal", "LV Hypertrophy"], "thalach": [150, 187],
+        "exang": ["N", "y"], "oldpeak": [2.3, 3.5], "slope": [0, "Flat"],
+        "ca": [0, 1], "thal": ["fixed defect", "reversable defect"],
+    })
+    df, _ = clean_dataframe(raw, impute_missing=False, soften_outliers=False)
+    assert df["age"].tolist() == [63, 37]
+    assert df["sex"].tolist() == [1, 0]
+    assert df["chest_pain_type"].tolist() == ["non-anginal", "asymptomatic"]
+    assert df["Restecg"].tolist() == ["normal", "left_ventricular_hypertrophy"]
+    assert df["st_slope_type"].tolist() == ["upsloping", "flat"]
+    assert df["thalassemia_type"].tolist() == ["fixed_defect", "reversible_defect"]
+    assert df["fasting_blood_sugar"].tolist() == [1, 0]
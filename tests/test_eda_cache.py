@@ -0,0 +1,74 @@
+"""Tests for the content-addressed EDA cache."""
+
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+import services.eda_cache as eda_cache
+from services.eda_cache import EdaCache, dataset_key
+from services.frame_store import read_frame, write_frame
+
+
+def _frame(app):
+    return pd.read_csv(Path(app.static_folder) / "sample.csv")
+
+
+def test_key_follows_eda_columns_and_version(app, monkeypatch):
+    df = _frame(app)
+    other = df.assign(patient_name=["x"] * len(df))
+    assert dataset_key(df) == dataset_key(other.drop(columns=["patient_name"])) == dataset_key(other)
+    changed = df.copy()
+    changed.loc[0, "cholesterol"] += 1
+    assert dataset_key(changed) != dataset_key(df)
+    assert dataset_key(df.astype({"cholesterol": float})) != dataset_key(df)
+
+    key = dataset_key(df)
+    monkeypatch.setattr(eda_cache, "EDA_VERSION", 999)
+    assert dataset_key(df) != key
+
+
+def test_payload_is_built_once_and_pruned(tmp_path, app):
+    cache = EdaCache(str(tmp_path), max_entries=2)
+    df = _frame(app)
+    key, first = cache.payload(df)
+    first["stats"] = "mutated by caller"
+    again_key, again = cache.payload(df.copy())
+    assert again_key == key and again["stats"] != "mutated by caller"
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+    for n in (1, 2):
+        cache.payload(pd.concat([df] * (n + 1), ignore_index=True))
+    assert len(os.listdir(tmp_path)) == 2 and cache.get(key) is None
+
+
+def test_sessions_share_entries_and_stale_eda_json_is_rebuilt_once(auth_client):
+    app = auth_client.application
+    df = _frame(app)
+    uids = []
+    for _ in range(2):
+        uid = uuid.uuid4().hex[:12]
+        write_frame(df, os.path.join(app.instance_path, "uploads", uid, "clean"))
+        uids.append(uid)
+
+    before = app.eda_cache.stats()
+    for uid in uids:
+        assert auth_client.get(f"/upload/{uid}/eda").status_code == 200
+    after = app.eda_cache.stats()
+    assert after["hits"] - before["hits"] >= 1
+
+    eda_json = Path(app.instance_path) / "uploads" / uids[0] / "eda.json"
+    saved = json.loads(eda_json.read_text())
+    assert saved["eda_key"] == dataset_key(read_frame(os.path.join(eda_json.parent, "clean"), categorical=True))
+    saved.pop("eda_version")
+    saved["eda"] = {"stats": {}}
+    eda_json.write_text(json.dumps(saved))
+    assert auth_client.get(f"/upload/{uids[0]}/eda").status_code == 200
+    rebuilt = json.loads(eda_json.read_text())
+    assert rebuilt["eda_version"] == eda_cache.EDA_VERSION and rebuilt["eda"]["stats"]
+
+    mtime = eda_json.stat().st_mtime_ns
+    assert auth_client.get(f"/upload/{uids[0]}/eda").status_code == 200
+    assert eda_json.stat().st_mtime_ns == mtime
@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 
-from app import build_eda_payload
+from services.eda import build_eda_payload
 
 
 def test_build_eda_payload_excludes_removed_visuals_with_predictions():
@@ -25,3 +26,47 @@ def test_build_eda_payload_excludes_removed_visuals_without_target():
     payload = build_eda_payload(df)
     assert payload["viz"] == {}
 
+
+
+def test_category_counts_and_tables_match_pandas():
+    df = pd.DataFrame(
+        {
+            "chest_pain_type": ["b", "a", None, "b", "a", "c", None, "b"],
+            "sex": [1, 0, 1, 1, 0, 0, 1, 0],
+            "thalassemia_type": pd.array([2, None, 1, 1, 2, 2, None, 1], dtype="Int64"),
+            "cholesterol": [200.0, None, 240.0, 260.0, 180.0, 300.0, 210.0, 199.0],
+            "target": ["1", "0", "1", None, "0", "1", "1", "0"],
+        }
+    )
+    payload = build_eda_payload(df)
+    y = df["target"].astype(str)
+
+    for col in ("chest_pain_type", "sex", "thalassemia_type"):
+        vc = df[col].astype(str).value_counts(dropna=False)
+        assert payload["categorical"][col]["counts"]["labels"] == [str(x) for x in vc.index]
+        assert payload["categorical"][col]["counts"]["counts"] == vc.tolist()
+        ct = pd.crosstab(df[col].astype(str), y, dropna=False)
+        got = payload["cat_vs_target"][col]
+        assert [str(x) for x in got["index"]] == [str(x) for x in ct.index]
+        assert [str(x) for x in got["columns"]] == [str(x) for x in ct.columns]
+        assert got["counts"] == ct.values.tolist()
+
+    vc = y.value_counts(dropna=False)
+    assert [str(x) for x in payload["target"]["labels"]] == [str(x) for x in vc.index]
+    assert payload["target"]["values"] == vc.tolist()
+    z = payload["cat_assoc_matrix"]["z"]
+    assert all(z[i][i] == 1.0 for i in range(len(z)))
+    assert payload["stats"]["cholesterol"] == df[["cholesterol"]].describe().round(2).drop(index="count").to_dict()["cholesterol"]
+
+
+
+def test_tiny_frames_report_missing_nullable_stats_as_null():
+    df = pd.DataFrame({"cholesterol": [233.0], "num_major_vessels": pd.array([2], dtype="Int64")})
+    stats = build_eda_payload(df)["stats"]
+    assert stats["num_major_vessels"] == {"mean": 2.0, "std": None, "min": 2.0, "25%": 2.0,
+                                          "50%": 2.0, "75%": 2.0, "max": 2.0}
+    assert np.isnan(stats["cholesterol"]["std"]) and stats["cholesterol"]["mean"] == 233.0
+
+    stats = build_eda_payload(df.iloc[:0])["stats"]
+    assert set(stats["num_major_vessels"].values()) == {None}
+    assert all(np.isnan(v) for v in stats["cholesterol"].values())
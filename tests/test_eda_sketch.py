@@ -0,0 +1,108 @@
+"""Tests for the one-pass approximate EDA."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.eda import build_eda_payload
+from services.eda_cache import EdaCache
+from services.eda_sketch import EdaSketch, QuantileSketch, sketch_eda_payload
+from services.frame_store import write_frame
+
+
+def _frame(rows=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "age": rng.integers(29, 78, rows),
+            "resting_blood_pressure": rng.integers(90, 200, rows).astype(float),
+            "cholesterol": rng.integers(120, 400, rows),
+            "max_heart_rate_achieved": rng.integers(70, 200, rows),
+            "st_depression": rng.integers(0, 60, rows) / 10,
+            "chest_pain_type": rng.choice(["typical angina", "atypical angina", "non-anginal", "asymptomatic"], rows),
+            "sex": rng.choice(["male", "female"], rows),
+            "prediction": rng.integers(0, 2, rows),
+        }
+    )
+    df.loc[rng.random(rows) < 0.05, "resting_blood_pressure"] = np.nan
+    df["chest_pain_type"] = df["chest_pain_type"].astype(object)
+    df.loc[rng.random(rows) < 0.02, "chest_pain_type"] = None
+    return df
+
+
+def _chunks(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def _assert_close(a, b):
+    if isinstance(a, dict):
+        assert set(a) == set(b)
+        for k in a:
+            _assert_close(a[k], b[k])
+    elif isinstance(a, list):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_close(x, y)
+    elif isinstance(a, float) or isinstance(b, float):
+        assert a == pytest.approx(b, rel=1e-6, abs=1e-9, nan_ok=True)
+    else:
+        assert a == b
+
+
+def test_sketch_matches_exact_payload_and_merges():
+    df = _frame()
+    exact = build_eda_payload(df)
+    approx = sketch_eda_payload(_chunks(df, 700))
+    meta = approx.pop("approximate")
+    assert meta["rows"] == len(df) and meta["max_rank_error"] == 0
+    _assert_close(exact, approx)
+
+    left, right = EdaSketch(), EdaSketch()
+    for chunk in _chunks(df.iloc[:2500], 1000):
+        left.update(chunk)
+    right.update(df.iloc[2500:])
+    left.merge(right)
+    merged = left.payload()
+    merged.pop("approximate")
+    _assert_close(exact, merged)
+
+
+def test_quartile_bounds_hold_for_high_cardinality_columns():
+    df = _frame(rows=40000, seed=1)
+    df["cholesterol"] = np.random.default_rng(2).normal(240, 50, len(df))
+    exact = build_eda_payload(df)
+    approx = sketch_eda_payload(_chunks(df, 3000), k=256)
+    bounds = approx["approximate"]["error_bounds"]
+    assert 0 < approx["approximate"]["max_rank_error"] < 0.05
+    for stat in ("25%", "50%", "75%"):
+        lo, hi = bounds["stats"]["cholesterol"][stat]
+        assert lo <= exact["stats"]["cholesterol"][stat] <= hi
+    errors = np.abs(np.subtract(exact["hists"]["cholesterol"]["y"], approx["hists"]["cholesterol"]["y"]))
+    assert errors.max() <= bounds["hists"]["cholesterol"]
+    assert approx["categorical"] == exact["categorical"]
+    _assert_close(exact["corr"], approx["corr"])
+
+
+def test_quantile_sketch_rank_error_is_bounded():
+    values = np.random.default_rng(3).random(100000)
+    sketch = QuantileSketch(k=128)
+    for part in np.array_split(values, 17):
+        sketch.update(part)
+    edges = np.linspace(0, 1, 11)
+    true = np.searchsorted(np.sort(values), edges, side="left")
+    assert np.abs(sketch.count_below(edges) - true).max() <= sketch.rank_error * len(values)
+
+
+def test_large_frames_switch_to_the_sketch(tmp_path):
+    df = _frame(rows=3000)
+    path = str(tmp_path / "frame")
+    write_frame(df, path)
+    cache = EdaCache(str(tmp_path / "cache"))
+    exact_key, exact = cache.payload_for_frame(path, sketch_rows=3000, chunk_rows=700)
+    approx_key, approx = cache.payload_for_frame(path, sketch_rows=2999, chunk_rows=700)
+    assert "approximate" not in exact and approx["approximate"]["chunks"] == 5
+    assert approx_key != exact_key
+    assert cache.payload_for_frame(path, sketch_rows=2999, chunk_rows=1000)[0] == approx_key
+    assert cache.stats()["hits"] == 1
+    approx.pop("approximate")
+    _assert_close(exact, approx)
@@ -0,0 +1,89 @@
+"""Tests for the columnar upload session store."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.frame_store import (
+    FrameWriter,
+    copy_frame,
+    export_csv,
+    frame_columns,
+    frame_rows,
+    iter_frames,
+    read_frame,
+    read_schema,
+    write_frame,
+)
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "age": np.array([63, 58, 41], dtype=np.int64),
+            "num_major_vessels": pd.array([0, None, 2], dtype="Int64"),
+            "st_depression": [2.3, np.nan, 0.0],
+            "chest_pain_type": ["typical_angina", None, "asymptomatic"],
+            "flag": [True, False, True],
+        }
+    )
+
+
+def test_round_trip_keeps_dtypes(tmp_path):
+    path = str(tmp_path / "clean")
+    df = _frame()
+    write_frame(df, path)
+    out = read_frame(path)
+    assert frame_rows(path) == 3 and frame_columns(path) == list(df.columns)
+    assert out["age"].dtype == np.int64
+    assert str(out["num_major_vessels"].dtype) == "Int64"
+    assert out["num_major_vessels"].isna().tolist() == [False, True, False]
+    assert out["flag"].dtype == bool
+    pd.testing.assert_frame_equal(out.astype(object), df.astype(object), check_dtype=False)
+
+    part = read_frame(path, ["chest_pain_type"], start=1, stop=3)
+    assert part.index.tolist() == [0, 1]
+    assert part["chest_pain_type"].isna().tolist() == [True, False]
+
+
+def test_chunked_writer_promotes_kinds(tmp_path):
+    path = str(tmp_path / "mapped")
+    with FrameWriter(path) as w:
+        w.append(pd.DataFrame({"a": [1, 2], "b": [1, 2]}))
+        w.append(pd.DataFrame({"a": [1.5, np.nan], "b": ["x", "y"]}))
+    out = read_frame(path)
+    assert out["a"].dtype == np.float64 and out["a"].tolist()[:3] == [1.0, 2.0, 1.5]
+    assert out["b"].tolist() == [1, 2, "x", "y"]
+    assert [len(c) for c in iter_frames(path, 3)] == [3, 1]
+
+
+def test_column_update_and_copy(tmp_path):
+    path = str(tmp_path / "mapped")
+    df = _frame()
+    write_frame(df, path)
+    before = {c["name"]: c["file"] for c in read_schema(path)["columns"]}
+    df["st_depression"] = df["st_depression"].fillna(1.0)
+    write_frame(df, path, columns=["st_depression"])
+    after = {c["name"]: c["file"] for c in read_schema(path)["columns"]}
+    assert after["age"] == before["age"] and after["st_depression"] != before["st_depression"]
+    assert len(os.listdir(path)) == len(read_schema(path)["columns"]) + 2  # + schema + Int64 mask
+
+    copy_frame(path, str(tmp_path / "clean"))
+    csv_path = export_csv(str(tmp_path / "clean"), str(tmp_path / "clean.csv"))
+    exported = pd.read_csv(csv_path)
+    assert exported["st_depression"].tolist() == [2.3, 1.0, 0.0]
+
+
+def test_large_category_lists_live_outside_the_schema(tmp_path, monkeypatch):
+    import services.frame_store as fs
+
+    monkeypatch.setattr(fs, "INLINE_CATEGORIES", 4)
+    path = str(tmp_path / "names")
+    df = pd.DataFrame({"name": [f"p{i}" for i in range(10)], "age": np.arange(10)})
+    write_frame(df, path)
+    col = read_schema(path)["columns"][0]
+    assert "categories" not in col and os.path.exists(os.path.join(path, col["categories_file"]))
+    assert read_frame(path, ["name"], 7, 9)["name"].tolist() == ["p7", "p8"]
+    copy_frame(path, str(tmp_path / "copy"))
+    pd.testing.assert_frame_equal(read_frame(str(tmp_path / "copy")), read_frame(path))
@@ -0,0 +1,169 @@
+"""Tests for the copy-on-write preprocessing history."""
+
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from services import history as history_mod
+from services.frame_store import frame_rows, read_frame, write_frame
+from services.history import FrameHistory
+
+
+def _base(tmp_path, rows=1000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "age": rng.integers(30, 80, rows),
+        "cholesterol": rng.normal(240, 40, rows),
+        "chest_pain_type": rng.choice(["typical_angina", "asymptomatic"], rows).astype(object),
+    })
+    df.loc[::10, "cholesterol"] = np.nan
+    write_frame(df, str(tmp_path / "mapped"))
+    h = FrameHistory(str(tmp_path / "mapped"), str(tmp_path / "history"))
+    return read_frame(str(tmp_path / "mapped")), h
+
+
+def _size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _cold(h):
+    history_mod._cache_drop(h.root)
+    return h.current()
+
+
+def test_steps_store_only_deltas_and_replay_exactly(tmp_path):
+    df, h = _base(tmp_path)
+    step1 = df.drop(index=[3, 5, 7])
+    h.commit("dup", step1, [{"text": "dropped 3", "step": "dup"}])
+    step2 = h.current()
+    step2.loc[step2["cholesterol"].isna(), "cholesterol"] = 200.0
+    step2.loc[0, "chest_pain_type"] = "atypical_angina"
+    s = h.commit("impute", step2, [{"text": "filled", "step": "impute"}])
+
+    assert s["deleted"] == 0 and {c["name"]: c["edits"] for c in s["columns"]} == {
+        "cholesterol": 100, "chest_pain_type": 1}
+    assert _size(tmp_path / "history") < _size(tmp_path / "mapped") / 4
+    expected = step2.reset_index(drop=True)
+    pd.testing.assert_frame_equal(h.current(), expected)
+    pd.testing.assert_frame_equal(_cold(h), expected)
+    assert [e["text"] for e in h.entries()] == ["dropped 3", "filled"]
+
+
+def test_undo_redo_and_new_step_discards_redo(tmp_path):
+    df, h = _base(tmp_path)
+    assert h.undo() is None
+    h.commit("dropna", df.dropna(), [])
+    after_dropna = h.current()
+    clipped = after_dropna.assign(age=after_dropna["age"].clip(upper=60))
+    h.commit("outliers", clipped, [{"text": "clipped", "step": "outliers"}])
+
+    assert h.undo()["task"] == "outliers"
+    pd.testing.assert_frame_equal(_cold(h), after_dropna)
+    assert h.entries() == []
+    assert h.undo()["task"] == "dropna"
+    pd.testing.assert_frame_equal(_cold(h), df)
+    assert h.redo()["task"] == "dropna"
+    assert h.state()["can_redo"]
+    pd.testing.assert_frame_equal(_cold(h), after_dropna)
+
+    h.commit("dup", h.current().iloc[:10], [])
+    state = h.state()
+    assert [s["task"] for s in state["steps"]] == ["dropna", "dup"] and not state["can_redo"]
+    assert len(_cold(h)) == 10
+
+
+def test_dtype_changes_and_snapshots(tmp_path):
+    df, h = _base(tmp_path)
+    h.commit("invalid", df.assign(age=df["age"].astype(float)), [])
+    assert str(_cold(h)["age"].dtype) == "float64"
+    h.commit("rename", h.current().rename(columns={"age": "years"}), [])
+    assert h._manifest()["steps"][-1].get("snapshot")
+    assert list(_cold(h).columns) == ["years", "cholesterol", "chest_pain_type"]
+    h.reset()
+    assert not os.path.exists(h.root)
+    pd.testing.assert_frame_equal(h.current(), df)
+
+
+def test_undo_redo_endpoints(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    base.mkdir(parents=True, exist_ok=True)
+    df = pd.read_csv(Path(app.static_folder) / "sample.csv")
+    df = pd.concat([df, df.head(3)], ignore_index=True)
+    dups = int(df.duplicated().sum())
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+    headers = {"X-CSRF-Token": "tok"}
+
+    assert auth_client.post(f"/upload/{uid}/preprocess/undo", headers=headers).status_code == 409
+    res = auth_client.post(f"/upload/{uid}/preprocess/dup", headers=headers).get_json()
+    assert res["total_rows"] == len(df) - dups and res["history"]["can_undo"]
+    res = auth_client.post(f"/upload/{uid}/preprocess/undo", headers=headers).get_json()
+    assert res["ok"] and res["step"] == "dup" and res["total_rows"] == len(df)
+    assert res["history"]["can_redo"]
+    res = auth_client.post(f"/upload/{uid}/preprocess/redo", headers=headers).get_json()
+    assert res["total_rows"] == len(df) - dups
+    assert auth_client.post(f"/upload/{uid}/preprocess/finish", headers=headers).get_json()["ok"]
+    assert frame_rows(str(base / "clean")) == len(df) - dups
+
+
+def test_log_details_are_capped_and_paged(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    df = pd.read_csv(Path(app.static_folder) / "sample.csv")
+    df = pd.concat([df] * 30, ignore_index=True)
+    df["age"] = np.arange(len(df)) + 30
+    df.loc[::2, "cholesterol"] = 0
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+    headers = {"X-CSRF-Token": "tok"}
+    app.config["LOG_DETAIL_SAMPLE_ROWS"] = 5
+
+    try:
+        assert auth_client.post(f"/upload/{uid}/preprocess/invalid", headers=headers).get_json()["ok"]
+    finally:
+        app.config.pop("LOG_DETAIL_SAMPLE_ROWS")
+    h = FrameHistory(str(base / "mapped"), str(base / "history"))
+    entry = next(e for e in h.entries() if e["text"].startswith("cholesterol"))
+    affected = int((df["cholesterol"] == 0).sum())
+    assert len(entry["details"]) == 5 and entry["details_total"] == affected
+
+    url = f"/upload/{uid}/preprocess/details/{entry['details_ref']}"
+    page = auth_client.get(f"{url}?start=5&limit=100").get_json()
+    assert page["total"] == affected and len(page["rows"]) == affected - 5
+    # Rows show their values before the step, in their original order.
+    assert [r["age"] for r in page["rows"]] == df.loc[df["cholesterol"] == 0, "age"].tolist()[5:]
+    assert all(r["cholesterol"] == 0 for r in page["rows"])
+    res = auth_client.get(f"{url}?start=abc&limit=")
+    assert res.status_code == 200 and res.get_json()["total"] == affected
+    assert auth_client.get(f"/upload/{uid}/preprocess/details/../x").status_code == 404
+    assert auth_client.get(f"/upload/{uid}/preprocess/details/0123456789ab-0").status_code == 404
+
+
+def test_route_steps_on_an_upload_are_stored_as_deltas(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    df = pd.read_csv(Path(app.static_folder) / "sample.csv")
+    df = pd.concat([df, df.head(3)], ignore_index=True)
+    df.loc[5, "cholesterol"] = np.nan
+    dups = int(df.duplicated().sum())
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+    headers = {"X-CSRF-Token": "tok"}
+
+    for task in ("dup", "invalid", "impute", "outliers"):
+        assert auth_client.post(f"/upload/{uid}/preprocess/{task}", headers=headers).get_json()["ok"]
+    h = FrameHistory(str(base / "mapped"), str(base / "history"))
+    steps = h._manifest()["steps"]
+    assert [s["task"] for s in steps] == ["dup", "invalid", "impute", "outliers"]
+    assert not any(s.get("snapshot") for s in steps)
+    assert steps[0]["deleted"] == dups
@@ -0,0 +1,103 @@
+"""Tests for the missing-value imputation strategies."""
+
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.data import (
+    BINARY_FEATURES,
+    CATEGORICAL_ALLOWED,
+    IMPUTE_STRATEGIES,
+    impute_categorical_missing,
+    impute_continuous_missing,
+    impute_missing_values,
+)
+
+
+def _frame(rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "age": rng.integers(30, 80, rows).astype(float),
+        "sex": rng.integers(0, 2, rows).astype(float),
+        "chest_pain_type": rng.choice(sorted(CATEGORICAL_ALLOWED["chest_pain_type"]), rows).astype(object),
+        "cholesterol": rng.normal(240, 40, rows),
+        "st_depression": rng.exponential(1.0, rows),
+        "thalassemia_type": rng.choice(sorted(CATEGORICAL_ALLOWED["thalassemia_type"]), rows).astype(object),
+    })
+    for col in ["age", "sex", "chest_pain_type", "cholesterol", "thalassemia_type"]:
+        df.loc[rng.random(rows) < 0.15, col] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("strategy", IMPUTE_STRATEGIES)
+def test_strategies_fill_every_gap_with_valid_values(strategy):
+    df = _frame()
+    log = []
+    out = impute_missing_values(df, strategy, max_rows=40, log=log)
+    assert not out.isna().any().any()
+    assert out.index.equals(df.index)
+    observed = df.notna()
+    pd.testing.assert_frame_equal(out[observed], df[observed])
+    assert set(out["sex"]) <= {0.0, 1.0}
+    for col in ("chest_pain_type", "thalassemia_type"):
+        assert set(out[col]) <= CATEGORICAL_ALLOWED[col]
+    assert len(log) == 5
+
+
+def test_rf_imputes_columns_in_sequence_like_the_original_cleaner():
+    df = _frame()
+    expected = df.copy()
+    for col in ["age", "cholesterol"]:
+        expected[col] = impute_continuous_missing(expected, col, log=[])
+    for col in ["sex", "chest_pain_type", "thalassemia_type"]:
+        expected[col] = impute_categorical_missing(expected, col, bool_cols=BINARY_FEATURES, log=[])
+    pd.testing.assert_frame_equal(impute_missing_values(df, "rf"), expected)
+
+
+def test_rf_parallel_columns_run_in_parallel_and_skip_scoring():
+    df = _frame()
+    log = []
+    serial = impute_missing_values(df, "rf_parallel", n_jobs=1, score=False, log=log)
+    parallel = impute_missing_values(df, "rf_parallel", n_jobs=4, score=False)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert not any("acc≈" in line or "r2≈" in line for line in log)
+    scored = []
+    impute_missing_values(df, "rf_parallel", log=scored)
+    assert any("acc≈" in line for line in scored)
+
+
+def test_all_missing_column_and_unknown_strategy():
+    df = _frame()
+    df["thalassemia_type"] = np.nan
+    out = impute_missing_values(df, "median")
+    assert set(out["thalassemia_type"]) == {"_missing_"}
+    with pytest.raises(ValueError):
+        impute_missing_values(df, "mice")
+
+
+def test_preprocess_impute_uses_requested_strategy(auth_client):
+    from services.frame_store import write_frame
+    from services.history import FrameHistory
+
+    uid = uuid.uuid4().hex
+    base = Path(auth_client.application.instance_path) / "uploads" / uid
+    base.mkdir(parents=True, exist_ok=True)
+    df = pd.read_csv(Path(auth_client.application.static_folder) / "sample.csv")
+    df.loc[::7, "cholesterol"] = np.nan
+    df.loc[::5, "chest_pain_type"] = np.nan
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+    headers = {"X-CSRF-Token": "tok"}
+
+    res = auth_client.post(f"/upload/{uid}/preprocess/impute?strategy=bogus", headers=headers)
+    assert res.status_code == 400
+
+    res = auth_client.post(f"/upload/{uid}/preprocess/impute?strategy=median", headers=headers)
+    assert res.status_code == 200 and res.get_json()["ok"]
+    assert "median" in res.get_json()["info"]
+    current = FrameHistory(str(base / "mapped"), str(base / "history")).current()
+    assert not current.drop(columns=["patient_name"], errors="ignore").isna().any().any()
@@ -0,0 +1,58 @@
+"""Tests for the single-pass inference helpers."""
+
+import pickle
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from services.data import INPUT_COLUMNS
+from services.inference import get_encoder, predict_frame, predict_one
+
+MODEL_PATH = Path(__file__).resolve().parent.parent / "ml" / "model.pkl"
+
+RECORD = {
+    "age": 63,
+    "sex": 1,
+    "chest_pain_type": "typical_angina",
+    "resting_blood_pressure": 145.0,
+    "cholesterol": 233.0,
+    "fasting_blood_sugar": 1,
+    "Restecg": "left_ventricular_hypertrophy",
+    "max_heart_rate_achieved": 150.0,
+    "exercise_induced_angina": 0,
+    "st_depression": 2.3,
+    "st_slope_type": "downsloping",
+    "num_major_vessels": 0,
+    "thalassemia_type": "fixed_defect",
+}
+
+
+@pytest.fixture(scope="module")
+def model():
+    if not MODEL_PATH.exists():
+        pytest.skip("model.pkl not available")
+    with open(MODEL_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+def test_fast_path_matches_pipeline(model):
+    assert get_encoder(model) is not None
+    X = pd.DataFrame([RECORD], columns=INPUT_COLUMNS)
+    res = predict_one(model, RECORD)
+    assert res["label"] == int(model.predict(X)[0])
+    assert res["pos_prob"] == float(model.predict_proba(X)[0][1])
+
+
+def test_predict_frame_single_pass(model):
+    X = pd.DataFrame([RECORD, {**RECORD, "age": 30, "cholesterol": 180.0}], columns=INPUT_COLUMNS)
+    labels, probs = predict_frame(model, X)
+    assert labels.tolist() == model.predict(X).tolist()
+    assert probs.tolist() == model.predict_proba(X)[:, 1].tolist()
+
+
+def test_missing_value_falls_back_to_dataframe(model):
+    record = {**RECORD, "num_major_vessels": None}
+    assert get_encoder(model).encode(record) is None
+    res = predict_one(model, record)
+    assert res["label"] in (0, 1)
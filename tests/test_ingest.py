@@ -0,0 +1,111 @@
+"""Tests for streaming CSV ingestion."""
+
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+
+import pandas as pd
+import pytest
+
+from services.frame_store import frame_exists, read_frame
+from services.ingest import (
+    CsvFormat,
+    IngestLimitError,
+    ingest_csv,
+    read_header,
+    save_upload,
+    sniff_csv,
+    upload_compression,
+)
+
+
+def test_sniff_and_header(tmp_path):
+    path = tmp_path / "raw.csv"
+    path.write_bytes("Age;Sex;Note\n63;1;caf\xe9\n58;0;ok\n".encode("latin-1"))
+    fmt = sniff_csv(str(path))
+    assert fmt == CsvFormat(encoding="latin-1", delimiter=";")
+    assert read_header(str(path), fmt) == ["Age", "Sex", "Note"]
+
+
+def test_transform_streams_chunks_in_order(tmp_path):
+    src = tmp_path / "raw.csv"
+    pd.DataFrame({"a": range(25), "b": range(25)}).to_csv(src, index=False)
+    sizes = []
+
+    def rename(chunk):
+        sizes.append(len(chunk))
+        return chunk.rename(columns={"a": "x"})
+
+    dst = tmp_path / "mapped"
+    rows, fmt = ingest_csv(str(src), str(dst), sniff_csv(str(src)), rename, chunk_rows=10)
+    assert rows == 25 and sizes == [10, 10, 5]
+    out = read_frame(str(dst))
+    assert list(out.columns) == ["x", "b"] and out["x"].tolist() == list(range(25))
+
+    with pytest.raises(IngestLimitError):
+        ingest_csv(str(src), str(tmp_path / "other"), fmt, chunk_rows=10, max_rows=20)
+    assert not frame_exists(str(tmp_path / "other"))
+
+
+def test_transform_falls_back_to_latin1_past_prefix(tmp_path):
+    src = tmp_path / "raw.csv"
+    body = "a,b\n" + "1,x\n" * 5000 + "2,caf\xe9\n"
+    src.write_bytes(body.encode("latin-1"))
+    fmt = sniff_csv(str(src), sample_bytes=64)
+    assert fmt.encoding == "utf-8"
+    rows, used = ingest_csv(str(src), str(tmp_path / "out"), fmt, chunk_rows=1000)
+    assert rows == 5001 and used.encoding == "latin-1"
+
+
+def test_save_upload_enforces_byte_limit(tmp_path):
+    dst = tmp_path / "raw.csv"
+    assert save_upload(io.BytesIO(b"a,b\n1,2\n"), str(dst), max_bytes=100) == 8
+    with pytest.raises(IngestLimitError):
+        save_upload(io.BytesIO(b"x" * 200), str(dst), max_bytes=100, block_size=64)
+    assert not dst.exists()
+
+
+def _zip(*members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("name, pack", [
+    ("a.csv.gz", gzip.compress),
+    ("a.csv.bz2", bz2.compress),
+    ("a.csv.xz", lzma.compress),
+    ("a.zip", lambda b: _zip(("__MACOSX/._a.csv", b"junk"), ("a.csv", b))),
+])
+def test_compressed_uploads_are_stored_gzipped(tmp_path, name, pack):
+    body = "Age;Sex\n" + "63;1\n" * 2000
+    dst = str(tmp_path / "raw.csv.gz")
+    n = save_upload(io.BytesIO(pack(body.encode())), dst, compression=upload_compression(name),
+                    block_size=1000)
+    assert n == len(body)
+    assert gzip.decompress((tmp_path / "raw.csv.gz").read_bytes()).decode() == body
+    fmt = sniff_csv(dst)
+    assert fmt.delimiter == ";" and read_header(dst, fmt) == ["Age", "Sex"]
+    rows, _ = ingest_csv(dst, str(tmp_path / "out"), fmt, chunk_rows=500)
+    assert rows == 2000
+
+
+def test_compressed_upload_limits_and_errors(tmp_path):
+    dst = tmp_path / "raw.csv.gz"
+    bomb = gzip.compress(b"0" * 10_000)
+    with pytest.raises(IngestLimitError):
+        save_upload(io.BytesIO(bomb), str(dst), max_bytes=5000, compression="gzip", block_size=1000)
+    assert not dst.exists()
+    with pytest.raises(ValueError, match="exactly one"):
+        save_upload(io.BytesIO(_zip(("a.csv", b"x"), ("b.csv", b"y"))), str(dst), compression="zip")
+    with pytest.raises(OSError):
+        save_upload(io.BytesIO(b"not gzip"), str(dst), compression="gzip")
+    assert not dst.exists()
+    assert upload_compression("A.CSV") is None
+    for bad in ("a.txt", "a.gz", "a.tar.gz"):
+        with pytest.raises(ValueError):
+            upload_compression(bad)
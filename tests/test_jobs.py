@@ -0,0 +1,172 @@
+"""Tests for the background job runner and its endpoints."""
+
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.jobs import CANCELLED, DONE, FAILED, JobBusy, JobError, JobRunner
+
+
+def _wait(runner, job_id, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = runner.status(job_id)
+        if record["status"] in {DONE, FAILED, CANCELLED}:
+            return record
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def runner(tmp_path):
+    r = JobRunner(str(tmp_path / "jobs"), max_workers=1)
+    yield r
+    r.shutdown()
+
+
+def test_job_reports_progress_and_result(runner):
+    seen = []
+
+    def job(ctx):
+        for i in range(1, 5):
+            ctx.progress(i, 4)
+            seen.append(runner.status(ctx.job_id)["progress"])
+        return {"answer": 42}
+
+    record = _wait(runner, runner.submit("demo", job, owner=7))
+    assert record["status"] == DONE and record["result"] == {"answer": 42}
+    assert record["owner"] == 7 and record["progress"] == 100.0
+    assert seen == [25.0, 50.0, 75.0, 100.0]
+
+
+def test_job_errors_become_failed_records(runner):
+    def user_error(ctx):
+        raise JobError("No mapped dataset")
+
+    def crash(ctx):
+        raise ZeroDivisionError("boom")
+
+    assert _wait(runner, runner.submit("a", user_error))["error"] == "No mapped dataset"
+    record = _wait(runner, runner.submit("b", crash))
+    assert record["status"] == FAILED and record["error"].startswith("ZeroDivisionError")
+    assert runner.status("missing") is None
+
+
+def test_cancel_running_and_queued_jobs(runner):
+    started = threading.Event()
+
+    def slow(ctx):
+        started.set()
+        for i in range(1000):
+            ctx.progress(i, 1000)
+            time.sleep(0.01)
+        return {}
+
+    running = runner.submit("slow", slow)
+    queued = runner.submit("slow", slow)
+    assert started.wait(5)
+    assert runner.cancel(running) and runner.cancel(queued)
+    assert _wait(runner, running)["status"] == CANCELLED
+    assert _wait(runner, queued)["status"] == CANCELLED
+    assert not runner.cancel(running)
+
+
+def test_exclusive_scope_and_uncancellable_jobs(runner):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(ctx):
+        started.set()
+        release.wait(5)
+        return {}
+
+    try:
+        job_id = runner.submit("step", blocking, scope="u1", exclusive=True, cancellable=False)
+        with pytest.raises(JobBusy):
+            runner.submit("step", blocking, scope="u1", exclusive=True)
+        other = runner.submit("step", lambda ctx: {}, scope="u2", exclusive=True)
+        assert started.wait(5)
+        assert not runner.cancel(job_id)
+    finally:
+        release.set()
+    assert _wait(runner, job_id)["status"] == DONE
+    assert _wait(runner, other)["status"] == DONE
+    again = runner.submit("step", lambda ctx: {}, scope="u1", exclusive=True)
+    assert _wait(runner, again)["status"] == DONE
+
+
+def test_stale_job_from_dead_process_is_failed(runner):
+    job_id = runner.submit("demo", lambda ctx: {})
+    _wait(runner, job_id)
+    runner._update(job_id, status="running", pid=2 ** 22 + 1)
+    record = runner.status(job_id)
+    assert record["status"] == FAILED and "Interrupted" in record["error"]
+
+
+def test_prune_deletes_old_finished_jobs_and_their_files(runner):
+    done = runner.submit("demo", lambda ctx: {})
+    _wait(runner, done)
+    Path(runner.file_path(done, ".pdf")).write_bytes(b"%PDF")
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(ctx):
+        started.set()
+        release.wait(5)
+        return {}
+
+    running = runner.submit("slow", slow)
+    started.wait(5)
+    try:
+        assert runner.prune() == 0
+        assert runner.prune(now=time.time() + runner.ttl + 1) == 1
+        assert runner.status(done) is None and not Path(runner.file_path(done, ".pdf")).exists()
+        assert runner.status(running)["status"] == "running"
+    finally:
+        release.set()
+
+
+def test_preprocess_job_via_endpoints(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    base.mkdir(parents=True, exist_ok=True)
+    from services.frame_store import write_frame
+
+    df = pd.read_csv(Path(app.static_folder) / "sample.csv")
+    df.loc[::7, "cholesterol"] = np.nan
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+    headers = {"X-CSRF-Token": "tok"}
+
+    assert auth_client.post(f"/upload/{uid}/jobs", data={"kind": "bogus"}, headers=headers).status_code == 400
+    res = auth_client.post(f"/upload/{uid}/jobs", data={"kind": "preprocess", "task": "impute",
+                                                         "strategy": "median"}, headers=headers)
+    assert res.status_code == 202
+    job_id = res.get_json()["job_id"]
+    record = _wait(app.job_runner, job_id)
+    assert record["status"] == DONE
+
+    status = auth_client.get(res.get_json()["status_url"]).get_json()
+    assert status["status"] == DONE and not status["has_file"]
+    result = auth_client.get(status["result_url"]).get_json()["result"]
+    assert result["ok"] and "median" in result["info"]
+    assert auth_client.post(f"/jobs/{job_id}/cancel", headers=headers).status_code == 409
+
+    res = auth_client.post(f"/upload/{uid}/jobs", data={"kind": "preprocess", "task": "nope"}, headers=headers)
+    record = _wait(app.job_runner, res.get_json()["job_id"])
+    assert record["status"] == FAILED and "Unknown task" in record["error"]
+
+    release = threading.Event()
+    busy = app.job_runner.submit("predict", lambda ctx: release.wait(5) and {}, scope=uid)
+    try:
+        res = auth_client.post(f"/upload/{uid}/jobs", data={"kind": "finish"}, headers=headers)
+        assert res.status_code == 409 and "Another job" in res.get_json()["error"]
+    finally:
+        release.set()
+    assert _wait(app.job_runner, busy)["status"] == DONE
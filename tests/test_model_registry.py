@@ -0,0 +1,99 @@
+"""Tests for the versioned model registry."""
+
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from services import model_registry as registry_module
+from services.model_registry import ModelRegistry
+
+MODEL_PATH = Path(__file__).resolve().parent.parent / "ml" / "model.pkl"
+
+
+@pytest.fixture
+def registry(tmp_path):
+    if not MODEL_PATH.exists():
+        pytest.skip("model.pkl not available")
+    legacy = tmp_path / "model.pkl"
+    shutil.copyfile(MODEL_PATH, legacy)
+    return ModelRegistry(str(tmp_path / "registry"), legacy_path=str(legacy), cache_size=1)
+
+
+def test_legacy_model_is_active_and_loaded_lazily(registry):
+    assert registry.active_version() == "model.pkl"
+    assert registry.loaded_versions() == []
+    active = registry.active()
+    assert active.version == "model.pkl"
+    assert hasattr(active.model, "predict_proba")
+    assert registry.loaded_versions() == ["model.pkl"]
+
+
+def test_register_and_activate_swaps_version(registry):
+    before = registry.active()
+    meta = registry.register(str(MODEL_PATH), version="v2", trained_at="2025-01-31")
+    assert meta["sha256"] and meta["trained_at"] == "2025-01-31"
+    registry.activate("v2")
+    after = registry.active()
+    assert after.version == "v2"
+    # the snapshot taken before the swap still holds a usable model
+    assert before.version == "model.pkl" and before.model is not None
+    # LRU capacity of one keeps only the active version loaded
+    assert registry.loaded_versions() == ["v2"]
+    assert {m["version"]: m["active"] for m in registry.versions()} == {"v2": True, "model.pkl": False}
+
+
+def test_pointer_change_is_seen_by_other_instances(registry):
+    registry.register(str(MODEL_PATH), version="v2")
+    other = ModelRegistry(registry.root, legacy_path=registry.legacy_path)
+    assert other.active_version() == "model.pkl"
+    registry.activate("v2")
+    assert other.active_version() == "v2"
+
+
+def test_checksum_mismatch_blocks_activation(registry):
+    registry.register(str(MODEL_PATH), version="v2")
+    with open(Path(registry.artifact_path("v2")), "ab") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError):
+        registry.activate("v2")
+    assert registry.active_version() == "model.pkl"
+
+
+@pytest.mark.parametrize("version", ["../model", "v2/../../x", "..", "active.json", ""])
+def test_malformed_versions_never_reach_the_filesystem(registry, version):
+    for call in (registry.artifact_dir, registry.metadata, registry.activate, registry.load):
+        with pytest.raises(ValueError, match="invalid version"):
+            call(version)
+    assert registry.active_version() == "model.pkl"
+
+
+def test_slow_load_does_not_block_lookups_and_runs_once(registry, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    real_load = registry_module.pickle.load
+
+    def slow_load(f):
+        calls.append(1)
+        started.set()
+        assert release.wait(5)
+        return real_load(f)
+
+    monkeypatch.setattr(registry_module.pickle, "load", slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.load("model.pkl"))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        assert started.wait(5)
+        # Unpickling must not hold the lock every request takes.
+        assert registry.active_version() == "model.pkl"
+        assert registry.loaded_versions() == []
+    finally:
+        release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and len(results) == 3
+    assert results[0] is results[1] is results[2]
+    assert registry.loaded_versions() == ["model.pkl"]
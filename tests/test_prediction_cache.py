@@ -0,0 +1,107 @@
+"""Tests for the version-aware prediction cache."""
+
+import numpy as np
+import pandas as pd
+
+from services.data import INPUT_COLUMNS
+from services.inference import predict_frame, predict_one
+from services.prediction_cache import PredictionCache, canonical_record
+
+RECORD = {
+    "age": 63,
+    "sex": 1,
+    "chest_pain_type": "typical_angina",
+    "resting_blood_pressure": 145.0,
+    "cholesterol": 233.0,
+    "fasting_blood_sugar": 1,
+    "Restecg": "left_ventricular_hypertrophy",
+    "max_heart_rate_achieved": 150.0,
+    "exercise_induced_angina": 0,
+    "st_depression": 2.3,
+    "st_slope_type": "downsloping",
+    "num_major_vessels": 0,
+    "thalassemia_type": "fixed_defect",
+}
+
+
+class _CountingModel:
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.rows = 0
+
+    def predict_proba(self, X):
+        self.rows += len(X)
+        p = np.clip(np.asarray(X["age"], dtype=float) / 100.0, 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl_expiry():
+    clock = _Clock()
+    cache = PredictionCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_canonical_record_ignores_int_float_difference():
+    other = dict(RECORD, age=63.0, sex=1.0)
+    assert canonical_record(RECORD) == canonical_record(other)
+
+
+def test_predict_frame_scores_only_misses_per_version():
+    model = _CountingModel()
+    cache = PredictionCache()
+    X = pd.DataFrame([dict(RECORD, age=a) for a in (40, 50, 60)], columns=INPUT_COLUMNS)
+    predict_frame(model, X, version="v1", cache=cache)
+    assert model.rows == 3
+
+    X2 = pd.DataFrame([dict(RECORD, age=a) for a in (50, 60, 70)], columns=INPUT_COLUMNS)
+    labels, probs = predict_frame(model, X2, version="v1", cache=cache)
+    assert model.rows == 4
+    assert np.allclose(probs, [0.5, 0.6, 0.7])
+    assert labels.tolist() == [0, 1, 1]
+
+    predict_frame(model, X2, version="v2", cache=cache)
+    assert model.rows == 7
+
+
+def test_predict_one_uses_cache():
+    model = _CountingModel()
+    cache = PredictionCache()
+    first = predict_one(model, RECORD, version="v1", cache=cache)
+    again = predict_one(model, RECORD, version="v1", cache=cache)
+    assert first == again
+    assert model.rows == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_frames_above_max_rows_bypass_the_cache():
+    model = _CountingModel()
+    cache = PredictionCache(max_rows=3)
+    small = pd.DataFrame([dict(RECORD, age=a) for a in (40, 50, 60)], columns=INPUT_COLUMNS)
+    predict_frame(model, small, version="v1", cache=cache)
+    assert len(cache) == 3
+
+    big = pd.DataFrame([dict(RECORD, age=a) for a in range(40, 80)], columns=INPUT_COLUMNS)
+    labels, probs = predict_frame(model, big, version="v1", cache=cache)
+    assert model.rows == 43
+    assert np.allclose(probs, np.arange(40, 80) / 100.0)
+    assert len(cache) == 3
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 3
@@ -0,0 +1,52 @@
+"""Tests for the paged upload preview endpoint."""
+
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from services.frame_store import write_frame
+
+
+def test_preview_pages_and_etag_revalidation(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    df = pd.DataFrame({"patient_name": [f"p{i}" for i in range(100)], "age": np.arange(100)})
+    write_frame(df, str(base / "clean"))
+
+    res = auth_client.get(f"/upload/{uid}/preview?start=95&limit=10")
+    assert res.status_code == 200
+    assert res.get_json()["rows"] == [{"age": i} for i in range(95, 100)]
+    etag = res.headers["ETag"]
+    assert res.headers["Cache-Control"] == "private, no-cache"
+    # Malformed paging falls back to the defaults instead of a 500.
+    res = auth_client.get(f"/upload/{uid}/preview?start=abc&limit=x")
+    assert res.status_code == 200 and res.get_json()["rows"][0] == {"age": 0}
+
+    res = auth_client.get(f"/upload/{uid}/preview?start=95&limit=10", headers={"If-None-Match": etag})
+    assert res.status_code == 304 and not res.data
+    other = auth_client.get(f"/upload/{uid}/preview?start=0&limit=10", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    write_frame(df.assign(age=df["age"] + 1), str(base / "clean"))
+    res = auth_client.get(f"/upload/{uid}/preview?start=95&limit=10", headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.get_json()["rows"][0] == {"age": 96}
+
+
+def test_preview_of_mapped_follows_preprocessing_history(auth_client):
+    app = auth_client.application
+    uid = uuid.uuid4().hex
+    base = Path(app.instance_path) / "uploads" / uid
+    df = pd.read_csv(Path(app.static_folder) / "sample.csv")
+    df = pd.concat([df] * 3, ignore_index=True)
+    write_frame(df, str(base / "mapped"))
+    with auth_client.session_transaction() as sess:
+        sess["_csrf_token"] = "tok"
+
+    first = auth_client.get(f"/upload/{uid}/preview?limit=50")
+    assert len(first.get_json()["rows"]) == len(df)
+    auth_client.post(f"/upload/{uid}/preprocess/dup", headers={"X-CSRF-Token": "tok"})
+    res = auth_client.get(f"/upload/{uid}/preview?limit=50", headers={"If-None-Match": first.headers["ETag"]})
+    assert res.status_code == 200 and len(res.get_json()["rows"]) == len(df.drop_duplicates())
@@ -10,3 +10,216 @@ def test_simulations_page(auth_client):
     data = resp.get_json()
     assert "exercise_angina" in data["results"]
     assert data["results"]["exercise_angina"]["variable"] == "age"
+
+
+class _CountingModel:
+    """Stub model recording how many rows each ``predict_proba`` call sees."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        self.calls.append(len(X))
+        p = (X["age"].to_numpy(dtype=float) / 100.0).clip(0, 1)
+        return np.column_stack([1 - p, p])
+
+
+def test_simulations_score_grid_in_one_call():
+    from services.simulation import simulate_risk_over_time
+    from simulations.angina_curve import simulate_angina_sensitivity
+
+    baseline = {"age": 50, "exercise_induced_angina": 0}
+    model = _CountingModel()
+    projection = simulate_risk_over_time(model, baseline, 50, 90)
+    assert model.calls == [41]
+    assert projection[0] == {"age": 50, "risk_pct": 50.0}
+
+    model = _CountingModel()
+    curves = simulate_angina_sensitivity(model, baseline, "age", [10, 20, 30])
+    assert model.calls == [6]
+    assert [p["risk_pct"] for p in curves["yes"]] == [10.0, 20.0, 30.0]
+
+
+def test_risk_surface_scores_grid_in_one_call():
+    from simulations.risk_surface import grid_axis, simulate_risk_surface
+
+    model = _CountingModel()
+    ages = grid_axis(40, 60, 3)
+    surface = simulate_risk_surface(
+        model, {"age": 50}, "age", ages, "cholesterol", [200, 250]
+    )
+    assert model.calls == [6]
+    assert surface["x"] == [40.0, 50.0, 60.0]
+    assert surface["z"] == [[40.0, 50.0, 60.0], [40.0, 50.0, 60.0]]
+    assert len(grid_axis(0, 1, 500)) == 100
+
+
+def test_risk_surface_endpoint_is_cached(auth_client):
+    data = {"x_variable": "cholesterol", "y_variable": "age", "x_steps": 5, "y_steps": 4}
+    resp = auth_client.post("/simulations/surface", data=data)
+    if resp.status_code == 503:
+        return  # model artifact not available
+    assert resp.status_code == 200
+    payload = resp.get_json()
+    assert len(payload["z"]) == 4 and len(payload["z"][0]) == 5
+    assert payload["cached"] is False
+    assert auth_client.post("/simulations/surface", data=data).get_json()["cached"] is True
+
+    bad = auth_client.post("/simulations/surface", data={"x_variable": "age", "y_variable": "age"})
+    assert bad.status_code == 400
+
+
+def test_measurement_uncertainty_scores_in_chunks():
+    from simulations.uncertainty import simulate_measurement_uncertainty
+
+    model = _CountingModel()
+    result = simulate_measurement_uncertainty(
+        model, {"age": 50, "cholesterol": 200.0}, 2500,
+        noise={"cholesterol": ("relative", 0.05)}, chunk_size=1000, seed=1,
+    )
+    # One call for the unperturbed record, then three chunks.
+    assert model.calls == [1, 1000, 1000, 500]
+    assert result["point_band"] == "Moderate"
+    assert result["percentiles"]["50"] == 50.0
+    assert result["bands"] == {"Low": 0.0, "Moderate": 1.0, "High": 0.0}
+    assert result["band_change"] == 0.0
+
+
+def test_cohort_what_if_streams_chunks():
+    import pandas as pd
+    import pytest
+
+    from simulations.cohort import parse_interventions, simulate_cohort_what_if
+    from services.data import INPUT_COLUMNS
+
+    def frame(ages):
+        df = pd.DataFrame({c: [1] * len(ages) for c in INPUT_COLUMNS})
+        df["age"] = ages
+        return df
+
+    interventions = parse_interventions(
+        [{"feature": "age", "op": "shift", "value": -20,
+          "where": {"feature": "age", "op": ">=", "value": 65}}]
+    )
+    model = _CountingModel()
+    missing = frame([50])
+    missing.loc[0, "cholesterol"] = None
+    result = simulate_cohort_what_if(
+        model, iter([frame([20, 50, 70]), frame([80]), missing]), interventions
+    )
+    # Each chunk is scored once together with its intervened copy.
+    assert model.calls == [6, 2]
+    assert result["patients"] == 4 and result["skipped"] == 1
+    assert result["affected"] == 2
+    assert result["before"]["bands"] == {"Low": 1, "Moderate": 1, "High": 2}
+    assert result["after"]["bands"] == {"Low": 1, "Moderate": 2, "High": 1}
+    assert result["band_changes"] == {"High->Moderate": 1}
+    assert result["changed_band"] == 1
+
+    with pytest.raises(ValueError):
+        parse_interventions([{"feature": "chest_pain_type", "op": "shift", "value": 1}])
+
+
+def test_partial_dependence_tables(tmp_path):
+    import pandas as pd
+
+    from services.data import INPUT_COLUMNS, NUMERIC_COLS
+    from simulations.partial_dependence import (
+        compute_pdp_tables, load_pdp_tables, write_pdp_tables,
+    )
+
+    reference = pd.DataFrame({c: [1, 0, 1] for c in INPUT_COLUMNS})
+    reference["age"] = [40, 50, 60]
+    model = _CountingModel()
+    tables = compute_pdp_tables(model, reference)
+    assert set(tables) == set(NUMERIC_COLS)
+    # One call per feature, covering every reference row at every grid value.
+    assert model.calls[0] == 9
+    age = tables["age"]
+    assert age["values"] == [40.0, 50.0, 60.0]
+    assert age["pd_pct"] == [40.0, 50.0, 60.0]
+    assert age["ice_p50"] == [0.0, 10.0, 20.0]
+    assert tables["sex"]["ice_p90"] == [0.0, 0.0]
+
+    path = str(tmp_path / "pdp.json")
+    write_pdp_tables(path, "v1", tables, len(reference))
+    assert load_pdp_tables(path, "v1")["features"]["age"] == age
+    assert load_pdp_tables(path, "v2") is None
+
+
+def test_partial_dependence_failure_is_stored_not_retried(auth_client, tmp_path, monkeypatch):
+    import time
+
+    import simulations.partial_dependence as pdp
+    import simulations.routes as routes
+
+    path = str(tmp_path / "pdp.json")
+    monkeypatch.setattr(pdp, "pdp_path", lambda registry, version: path)
+    monkeypatch.setattr(routes, "pdp_path", lambda registry, version: path)
+    calls = []
+
+    def boom(app, version):
+        calls.append(version)
+        raise RuntimeError("no probabilities")
+
+    monkeypatch.setattr(pdp, "precompute", boom)
+    resp = auth_client.get("/simulations/pdp")
+    if resp.status_code == 503 and resp.get_json().get("error") == "Model not loaded":
+        return
+    assert resp.status_code == 202
+    version = resp.get_json()["model_version"]
+
+    def wait():
+        deadline = time.time() + 5
+        while pdp.is_running(version) and time.time() < deadline:
+            time.sleep(0.01)
+
+    wait()
+    for _ in range(2):
+        resp = auth_client.get("/simulations/pdp")
+        assert resp.status_code == 503
+        assert resp.get_json()["status"] == pdp.FAILED and "no probabilities" in resp.get_json()["error"]
+    assert calls == [version]
+    assert auth_client.get("/simulations/pdp?retry=1").status_code == 202
+    wait()
+    assert calls == [version, version]
+
+
+def test_cli_activation_precomputes_partial_dependence_synchronously(app, tmp_path, monkeypatch):
+    import shutil
+    from pathlib import Path
+
+    import pytest
+
+    import app as app_module
+    import simulations.partial_dependence as pdp
+    from services.model_registry import ModelRegistry
+
+    model_path = Path(app.root_path) / "ml" / "model.pkl"
+    if not model_path.exists():
+        pytest.skip("model.pkl not available")
+    legacy = tmp_path / "model.pkl"
+    shutil.copyfile(model_path, legacy)
+    registry = ModelRegistry(str(tmp_path / "registry"), legacy_path=str(legacy))
+    started = []
+    registry.on_activate(started.append)
+    registry.register(str(model_path), version="v2")
+    registry.register(str(model_path), version="v3")
+    monkeypatch.setattr(app_module, "model_registry", registry)
+    monkeypatch.setattr(app, "model_registry", registry)
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["models", "activate", "v2"])
+    assert result.exit_code == 0, result.output
+    assert "tables ready" in result.output
+    payload = pdp.load_pdp_tables(pdp.pdp_path(registry, "v2"), "v2")
+    assert payload["status"] == pdp.READY and payload["features"]
+
+    result = runner.invoke(args=["models", "activate", "v3", "--skip-pdp"])
+    assert result.exit_code == 0 and "Skipped" in result.output
+    assert registry.active_version() == "v3"
+    assert pdp.load_pdp_tables(pdp.pdp_path(registry, "v3"), "v3") is None
+    # No background thread was started in the short-lived CLI process.
+    assert started == [] and not pdp.is_running("v2")
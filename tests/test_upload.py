@@ -1,5 +1,7 @@
 """Tests for upload workflow."""
 
+import gzip
+import io
 import uuid
 from pathlib import Path
 
@@ -13,6 +15,22 @@ def test_upload_page(auth_client):
     assert response.status_code == 200
 
 
+def test_gzip_upload_is_ingested_and_kept_compressed(auth_client):
+    app = auth_client.application
+    csv = (Path(app.static_folder) / "sample.csv").read_bytes()
+    res = auth_client.post("/upload?ajax=1", data={"file": (io.BytesIO(gzip.compress(csv)), "s.csv.gz")},
+                           content_type="multipart/form-data")
+    uid = res.get_json()["redirect"].split("/")[2]
+    base = Path(app.instance_path) / "uploads" / uid
+    assert gzip.decompress((base / "raw.csv.gz").read_bytes()) == csv
+    assert not (base / "raw.csv").exists()
+    assert auth_client.get(f"/upload/{uid}/preprocess").status_code == 200
+
+    res = auth_client.post("/upload?ajax=1", data={"file": (io.BytesIO(b"x"), "s.txt")},
+                           content_type="multipart/form-data")
+    assert res.status_code == 400 and ".zip" in res.get_json()["error"]
+
+
 @pytest.mark.parametrize(
     "missing_column, attr",
     [
@@ -41,7 +59,9 @@ def test_batch_prediction_handles_missing_int_fields(auth_client, missing_column
     }
     data[missing_column] = [np.nan]
     df = pd.DataFrame(data)
-    df.to_csv(uploads_base / "clean.csv", index=False)
+    from services.frame_store import write_frame
+
+    write_frame(df, str(uploads_base / "clean"))
     with auth_client.application.app_context():
         from app import Prediction, db
         before = Prediction.query.count()
@@ -0,0 +1,123 @@
+"""Tests for upload session expiry, quotas and storage metrics."""
+
+import io
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from services.jobs import JobRunner
+from services.upload_sessions import UploadSessions
+
+
+def _session(store, owner, size, age):
+    uid, path = store.create(owner)
+    with open(os.path.join(path, "data"), "wb") as f:
+        f.write(b"x" * size)
+    t = time.time() - age
+    os.utime(os.path.join(path, "session.json"), (t, t))
+    return uid
+
+
+def test_sweep_expires_idle_sessions_and_touch_renews(tmp_path):
+    store = UploadSessions(str(tmp_path), ttl=60)
+    old = _session(store, 1, 10, age=120)
+    renewed = _session(store, 1, 10, age=120)
+    fresh = _session(store, 1, 10, age=5)
+    legacy = tmp_path / "abcdef012345"
+    legacy.mkdir()
+    os.utime(legacy, (time.time() - 120,) * 2)
+    store.touch(renewed)
+
+    assert store.sweep() == {"expired": 2, "user_quota": 0, "total_quota": 0}
+    assert not os.path.exists(store.path(old)) and not legacy.exists()
+    assert [s["uid"] for s in store.sessions()] == [fresh, renewed]
+
+
+def test_quotas_evict_least_recently_used_but_not_protected(tmp_path):
+    store = UploadSessions(str(tmp_path), ttl=0, user_quota=2500, total_quota=3500,
+                           busy=lambda: {busy})
+    a1 = _session(store, "a", 1000, age=50)
+    busy = _session(store, "a", 1000, age=40)
+    a3 = _session(store, "a", 1000, age=30)
+    b1 = _session(store, "b", 500, age=20)
+    b2 = _session(store, "b", 500, age=10)
+
+    counts = store.sweep()
+    # "a" drops its oldest idle session; the total is then within quota.
+    assert counts == {"expired": 0, "user_quota": 1, "total_quota": 0}
+    assert not os.path.exists(store.path(a1))
+    new = _session(store, "b", 500, age=0)
+    # Over the total: the oldest session is busy, so the next one goes.
+    assert store.sweep(keep=[new])["total_quota"] == 1
+    assert not os.path.exists(store.path(a3))
+    assert {s["uid"] for s in store.sessions()} == {busy, b1, b2, new}
+
+    stats = store.stats()
+    assert stats["sessions"] == 4 and stats["bytes"] >= 2500
+    assert stats["owners"]["b"]["sessions"] == 3
+    assert stats["evicted"] == {"expired": 0, "user_quota": 1, "total_quota": 1}
+
+
+def test_single_session_over_quota_is_reported(tmp_path):
+    store = UploadSessions(str(tmp_path), user_quota=50)
+    uid = _session(store, 7, 100, age=0)
+    store.sweep(keep=[uid])
+    assert os.path.exists(store.path(uid))
+    assert "quota" in store.over_quota(uid)
+    assert store.remove(uid) >= 100 and store.info(uid) is None
+
+
+def test_upload_records_owner_and_enforces_quota(auth_client):
+    app = auth_client.application
+    store = app.upload_sessions
+    csv = (Path(app.static_folder) / "sample.csv").read_bytes()
+
+    res = auth_client.post("/upload?ajax=1", data={"file": (io.BytesIO(csv), "s.csv")},
+                           content_type="multipart/form-data")
+    uid = res.get_json()["redirect"].split("/")[2]
+    assert store.info(uid)["owner"] is not None
+
+    store.user_quota = 10
+    try:
+        res = auth_client.post("/upload?ajax=1", data={"file": (io.BytesIO(csv), "s.csv")},
+                               content_type="multipart/form-data")
+    finally:
+        store.user_quota = 0
+    assert res.status_code == 413 and "quota" in res.get_json()["error"]
+
+    # Making room evicted the user's older session.
+    assert store.info(uid) is None
+    res = auth_client.get(f"/upload/{uid}/preprocess")
+    assert res.status_code == 404 and b"Session expired" in res.data
+
+
+def test_upload_stats_endpoint(superadmin_client):
+    stats = superadmin_client.get("/superadmin/uploads/stats").get_json()
+    assert {"sessions", "bytes", "owners", "evicted"} <= set(stats)
+
+
+def test_admit_uses_last_sweep_sizes_and_sweeps_only_when_over(tmp_path, monkeypatch):
+    store = UploadSessions(str(tmp_path), user_quota=350)
+    old = _session(store, "a", 100, age=50)
+    store.sweep()
+    uid = _session(store, "a", 100, age=0)
+    monkeypatch.setattr(store, "sweep", lambda **kw: pytest.fail("swept within quota"))
+    assert store.admit(uid) is None
+    monkeypatch.undo()
+
+    new = _session(store, "a", 100, age=0)
+    assert store.admit(new) is None
+    assert store.info(old) is None and store.info(uid) and store.info(new)
+
+
+def test_jobs_in_other_processes_keep_their_session_busy(tmp_path):
+    runner = JobRunner(str(tmp_path / "jobs"), max_workers=1)
+    try:
+        runner._write({"id": "a" * 32, "status": "running", "scope": "abc123", "pid": 1})
+        runner._write({"id": "b" * 32, "status": "running", "scope": "def456", "pid": 2 ** 22 + 1})
+        runner._write({"id": "c" * 32, "status": "done", "scope": "fed789", "pid": 1})
+        assert runner.active_scopes() == {"abc123"}
+    finally:
+        runner.shutdown()